@@ -0,0 +1,279 @@
+"""
+Content-addressed cache for LLM responses.
+
+Responses are keyed on a normalized hash of (operation, prompt, model,
+temperature). Lookups go to a small in-process LRU first and then to the
+shared Django cache (Redis in production), so identical prompts issued by
+any worker are only paid for once per TTL.
+"""
+import copy
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# Per-operation TTLs in seconds. Overridable through settings.AI_CACHE['TTLS'].
+DEFAULT_TTLS = {
+    'generate_questions': 60 * 60 * 24,
+    'generate_topics': 60 * 60 * 24 * 7,
+    'generate_study_plan': 60 * 60 * 6,
+    'grade_theory': 60 * 60 * 24 * 30,
+}
+DEFAULT_TTL = 60 * 60
+KEY_PREFIX = 'ai_cache'
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+class _CachedFailure:
+    """Marker stored in the cache when every provider failed for a key."""
+
+    def __init__(self, message):
+        self.message = message
+
+    def __reduce__(self):
+        return (_CachedFailure, (self.message,))
+
+
+class CachedProviderFailure(Exception):
+    """Raised when a recent identical request is known to have failed."""
+
+
+class AIResponseCache:
+    """
+    Two-level (local LRU + shared backend) cache for AI provider responses.
+    """
+
+    def __init__(self, alias='default', local_maxsize=None):
+        config = getattr(settings, 'AI_CACHE', {})
+        self.alias = alias
+        self.enabled = config.get('ENABLED', True)
+        self.local_maxsize = local_maxsize or config.get('LOCAL_MAXSIZE', 512)
+        self.negative_ttl = config.get('NEGATIVE_TTL', 30)
+        self.ttls = {**DEFAULT_TTLS, **config.get('TTLS', {})}
+
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: defaultdict(int))
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _normalize(value):
+        if isinstance(value, str):
+            return _WHITESPACE_RE.sub(' ', value).strip()
+        if isinstance(value, dict):
+            return {str(k): AIResponseCache._normalize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [AIResponseCache._normalize(v) for v in value]
+        return value
+
+    def make_key(self, operation, prompt, model='', temperature=None):
+        """Build the content-addressed key for a request."""
+        payload = json.dumps(
+            {
+                'op': operation,
+                'prompt': self._normalize(prompt),
+                'model': model or '',
+                'temperature': None if temperature is None else round(float(temperature), 3),
+            },
+            sort_keys=True,
+            default=str,
+        )
+        digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        return f"{KEY_PREFIX}:{operation}:{digest}"
+
+    def get_ttl(self, operation):
+        return self.ttls.get(operation, DEFAULT_TTL)
+
+    # ------------------------------------------------------------------
+    # Local LRU
+    # ------------------------------------------------------------------
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return entry
+
+    def _local_set(self, key, value, ttl):
+        with self._lock:
+            self._local[key] = (time.monotonic() + ttl, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_maxsize:
+                self._local.popitem(last=False)
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    # ------------------------------------------------------------------
+    # Shared backend (errors never break the caller)
+    # ------------------------------------------------------------------
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def _backend_get(self, key):
+        try:
+            return self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"AI cache backend get failed: {e}")
+            return None
+
+    def _backend_set(self, key, value, ttl):
+        try:
+            self.backend.set(key, value, ttl)
+        except Exception as e:
+            logger.warning(f"AI cache backend set failed: {e}")
+
+    async def _abackend_get(self, key):
+        try:
+            return await self.backend.aget(key)
+        except Exception as e:
+            logger.warning(f"AI cache backend get failed: {e}")
+            return None
+
+    async def _abackend_set(self, key, value, ttl):
+        try:
+            await self.backend.aset(key, value, ttl)
+        except Exception as e:
+            logger.warning(f"AI cache backend set failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Counters
+    # ------------------------------------------------------------------
+
+    def _count(self, operation, event):
+        with self._lock:
+            self._counters[operation][event] += 1
+
+    def stats(self):
+        """Return hit/miss counters per operation for this process."""
+        with self._lock:
+            return {op: dict(events) for op, events in self._counters.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self._counters.clear()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def _unwrap(self, operation, value):
+        if isinstance(value, _CachedFailure):
+            self._count(operation, 'negative_hits')
+            raise CachedProviderFailure(value.message)
+        return copy.deepcopy(value)
+
+    def _store(self, operation, key, value):
+        if value is None:
+            return
+        ttl = self.get_ttl(operation)
+        self._local_set(key, value, ttl)
+        return ttl
+
+    def _failure(self, operation, key, error):
+        self._count(operation, 'failures')
+        marker = _CachedFailure(str(error))
+        self._local_set(key, marker, self.negative_ttl)
+        return marker
+
+    def fetch(self, operation, prompt, producer, model='', temperature=None):
+        """
+        Return the cached response for a request, calling ``producer`` on a miss.
+
+        ``None`` results are never cached. If ``producer`` raises, the failure
+        is cached for ``NEGATIVE_TTL`` seconds and re-raised.
+        """
+        if not self.enabled:
+            return producer()
+
+        key = self.make_key(operation, prompt, model, temperature)
+
+        entry = self._local_get(key)
+        if entry is not None:
+            self._count(operation, 'local_hits')
+            return self._unwrap(operation, entry[1])
+
+        value = self._backend_get(key)
+        if value is not None:
+            self._count(operation, 'hits')
+            ttl = self.negative_ttl if isinstance(value, _CachedFailure) else self.get_ttl(operation)
+            self._local_set(key, value, ttl)
+            return self._unwrap(operation, value)
+
+        self._count(operation, 'misses')
+        try:
+            result = producer()
+        except Exception as e:
+            self._backend_set(key, self._failure(operation, key, e), self.negative_ttl)
+            raise
+
+        ttl = self._store(operation, key, result)
+        if ttl:
+            self._backend_set(key, result, ttl)
+        return copy.deepcopy(result)
+
+    async def afetch(self, operation, prompt, producer, model='', temperature=None):
+        """Async counterpart of :meth:`fetch`; ``producer`` returns an awaitable."""
+        if not self.enabled:
+            return await producer()
+
+        key = self.make_key(operation, prompt, model, temperature)
+
+        entry = self._local_get(key)
+        if entry is not None:
+            self._count(operation, 'local_hits')
+            return self._unwrap(operation, entry[1])
+
+        value = await self._abackend_get(key)
+        if value is not None:
+            self._count(operation, 'hits')
+            ttl = self.negative_ttl if isinstance(value, _CachedFailure) else self.get_ttl(operation)
+            self._local_set(key, value, ttl)
+            return self._unwrap(operation, value)
+
+        self._count(operation, 'misses')
+        try:
+            result = await producer()
+        except Exception as e:
+            await self._abackend_set(key, self._failure(operation, key, e), self.negative_ttl)
+            raise
+
+        ttl = self._store(operation, key, result)
+        if ttl:
+            await self._abackend_set(key, result, ttl)
+        return copy.deepcopy(result)
+
+
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+
+def get_ai_cache():
+    """Return the process-wide AI response cache."""
+    global _cache_instance
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                _cache_instance = AIResponseCache()
+    return _cache_instance
@@ -0,0 +1,430 @@
+"""
+Per-provider circuit breakers for the AI router.
+
+Each provider gets a breaker that tracks error rate and latency. Outcome
+counters and the "open" flag live in the shared Django cache (Redis in
+production) so every Daphne / Django-Q process sees the same provider health;
+latency samples used for hedging are kept per process.
+
+A breaker is closed, open (for COOLDOWN_SECONDS after tripping) or half-open.
+Half-open lets a single probe call through across all processes (claimed
+with an atomic cache add); its success closes the breaker, its failure trips
+it again. Every state change and counter has an async counterpart (a-prefixed)
+using the async cache API, so the router's async paths never block the event
+loop on cache round trips.
+"""
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'ai_breaker'
+# The open flag outlives its cooldown: until a probe succeeds the breaker is half-open
+STATE_TTL = 60 * 60 * 24
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+DEFAULTS = {
+    'ERROR_RATE_THRESHOLD': 0.5,
+    'MIN_REQUESTS': 5,
+    'CONSECUTIVE_FAILURES': 3,
+    'WINDOW_SECONDS': 60,
+    'COOLDOWN_SECONDS': 30,
+    'PROBE_TIMEOUT_SECONDS': 30,
+    'SLOW_CALL_SECONDS': 20,
+    'STATE_REFRESH_SECONDS': 1,
+    'LATENCY_SAMPLES': 200,
+    'HEDGE_MIN_DELAY': 0.5,
+    'HEDGE_MAX_DELAY': 10,
+    'HEDGE_DEFAULT_DELAY': 3,
+}
+
+
+def get_router_config():
+    return {**DEFAULTS, **getattr(settings, 'AI_ROUTER', {})}
+
+
+class CircuitOpenError(Exception):
+    """The provider's breaker is open, or another call is already probing it."""
+
+
+class CircuitBreaker:
+    """
+    Error-rate / latency circuit breaker for a single provider.
+
+    Calls slower than SLOW_CALL_SECONDS count as failures. The breaker opens
+    when the error rate over the current window exceeds ERROR_RATE_THRESHOLD
+    (with at least MIN_REQUESTS calls), or after CONSECUTIVE_FAILURES local
+    failures in a row, and stays open for COOLDOWN_SECONDS. It is then
+    half-open until a probe call (at most one per PROBE_TIMEOUT_SECONDS)
+    succeeds.
+    """
+
+    def __init__(self, name, config=None, alias='default'):
+        self.name = name
+        self.alias = alias
+        self.config = config or get_router_config()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=self.config['LATENCY_SAMPLES'])
+        self._consecutive_failures = 0
+        # 0 while closed; past while half-open
+        self._open_until = 0.0
+        self._probe_until = 0.0
+        self._state_checked_at = 0.0
+
+    # ------------------------------------------------------------------
+    # Shared state helpers
+    # ------------------------------------------------------------------
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def _open_key(self):
+        return f"{KEY_PREFIX}:{self.name}:open_until"
+
+    def _probe_key(self):
+        return f"{KEY_PREFIX}:{self.name}:probe"
+
+    def _bucket_keys(self, bucket):
+        base = f"{KEY_PREFIX}:{self.name}:{bucket}"
+        return f"{base}:total", f"{base}:failures"
+
+    def _current_bucket(self, now=None):
+        return int((now or time.time()) // self.config['WINDOW_SECONDS'])
+
+    def _incr(self, key):
+        ttl = self.config['WINDOW_SECONDS'] * 2
+        self.backend.add(key, 0, ttl)
+        try:
+            return self.backend.incr(key)
+        except ValueError:
+            # Key expired between add() and incr()
+            self.backend.set(key, 1, ttl)
+            return 1
+
+    async def _aincr(self, key):
+        ttl = self.config['WINDOW_SECONDS'] * 2
+        await self.backend.aadd(key, 0, ttl)
+        try:
+            return await self.backend.aincr(key)
+        except ValueError:
+            await self.backend.aset(key, 1, ttl)
+            return 1
+
+    def _window_counts(self):
+        bucket = self._current_bucket()
+        total_key, failure_key = self._bucket_keys(bucket)
+        values = self.backend.get_many([total_key, failure_key])
+        return values.get(total_key, 0), values.get(failure_key, 0)
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+
+    def _refresh_due(self, now):
+        return now - self._state_checked_at >= self.config['STATE_REFRESH_SECONDS']
+
+    def _apply_shared(self, shared, now):
+        with self._lock:
+            # A missing flag means closed, possibly by another process's probe
+            self._open_until = max(float(shared or 0), self._open_until if self._open_until > now else 0)
+
+    def _current_state(self, now):
+        if not self._open_until:
+            return CLOSED
+        return OPEN if now < self._open_until else HALF_OPEN
+
+    def state(self):
+        """closed, open or half_open; shared state is re-read every STATE_REFRESH_SECONDS."""
+        now = time.time()
+        if self._refresh_due(now):
+            try:
+                self._apply_shared(self.backend.get(self._open_key()), now)
+            except Exception as e:
+                logger.debug(f"Breaker state read failed for {self.name}: {e}")
+            self._state_checked_at = now
+        return self._current_state(now)
+
+    async def astate(self):
+        now = time.time()
+        if self._refresh_due(now):
+            try:
+                self._apply_shared(await self.backend.aget(self._open_key()), now)
+            except Exception as e:
+                logger.debug(f"Breaker state read failed for {self.name}: {e}")
+            self._state_checked_at = now
+        return self._current_state(now)
+
+    def is_open(self):
+        return self.state() == OPEN
+
+    def _reserve_probe(self):
+        """Claim this process's probe slot; False if a local probe is in flight."""
+        now = time.time()
+        with self._lock:
+            if now < self._probe_until:
+                return False
+            self._probe_until = now + self.config['PROBE_TIMEOUT_SECONDS']
+            return True
+
+    def _probe_claimed(self, added):
+        if not added:
+            # Another process holds the probe
+            with self._lock:
+                self._probe_until = 0.0
+        return added
+
+    def allow_request(self):
+        """
+        True if a call may go ahead now. While half-open only the caller that
+        claims the probe gets True, so call it right before the call is made.
+        """
+        state = self.state()
+        if state != HALF_OPEN:
+            return state == CLOSED
+        if not self._reserve_probe():
+            return False
+        try:
+            added = self.backend.add(self._probe_key(), 1, self.config['PROBE_TIMEOUT_SECONDS'])
+        except Exception as e:
+            logger.debug(f"Breaker probe claim failed for {self.name}: {e}")
+            added = True
+        return self._probe_claimed(added)
+
+    async def aallow_request(self):
+        state = await self.astate()
+        if state != HALF_OPEN:
+            return state == CLOSED
+        if not self._reserve_probe():
+            return False
+        try:
+            added = await self.backend.aadd(self._probe_key(), 1, self.config['PROBE_TIMEOUT_SECONDS'])
+        except Exception as e:
+            logger.debug(f"Breaker probe claim failed for {self.name}: {e}")
+            added = True
+        return self._probe_claimed(added)
+
+    def _set_open(self):
+        cooldown = self.config['COOLDOWN_SECONDS']
+        open_until = time.time() + cooldown
+        with self._lock:
+            self._open_until = open_until
+            self._probe_until = 0.0
+            self._consecutive_failures = 0
+        logger.warning(f"Circuit breaker opened for {self.name} ({cooldown}s cooldown)")
+        return open_until
+
+    def trip(self):
+        open_until = self._set_open()
+        try:
+            self.backend.set(self._open_key(), open_until, STATE_TTL)
+            self.backend.delete_many([self._probe_key(), *self._bucket_keys(self._current_bucket())])
+        except Exception as e:
+            logger.debug(f"Breaker state write failed for {self.name}: {e}")
+
+    async def atrip(self):
+        open_until = self._set_open()
+        try:
+            await self.backend.aset(self._open_key(), open_until, STATE_TTL)
+            await self.backend.adelete_many([self._probe_key(), *self._bucket_keys(self._current_bucket())])
+        except Exception as e:
+            logger.debug(f"Breaker state write failed for {self.name}: {e}")
+
+    def _set_closed(self):
+        """Close after a successful probe; False unless the breaker was half-open."""
+        with self._lock:
+            if not self._open_until or time.time() < self._open_until:
+                return False
+            self._open_until = 0.0
+            self._probe_until = 0.0
+        logger.info(f"Circuit breaker closed for {self.name} after a successful probe")
+        return True
+
+    def reset(self):
+        with self._lock:
+            self._open_until = 0.0
+            self._probe_until = 0.0
+            self._consecutive_failures = 0
+            self._latencies.clear()
+        try:
+            self.backend.delete_many([
+                self._open_key(), self._probe_key(), *self._bucket_keys(self._current_bucket())
+            ])
+        except Exception as e:
+            logger.debug(f"Breaker reset failed for {self.name}: {e}")
+
+    # ------------------------------------------------------------------
+    # Outcomes
+    # ------------------------------------------------------------------
+
+    def _is_slow(self, latency):
+        return latency is not None and latency > self.config['SLOW_CALL_SECONDS']
+
+    def _note_success(self, latency):
+        with self._lock:
+            self._consecutive_failures = 0
+            if latency is not None:
+                self._latencies.append(latency)
+
+    def _note_failure(self, latency):
+        """Record a failure locally; returns (consecutive failures, was half-open)."""
+        with self._lock:
+            self._consecutive_failures += 1
+            if latency is not None:
+                self._latencies.append(latency)
+            half_open = bool(self._open_until) and time.time() >= self._open_until
+            return self._consecutive_failures, half_open
+
+    def _should_trip(self, consecutive, total, failures):
+        over_rate = (
+            total >= self.config['MIN_REQUESTS']
+            and failures / total >= self.config['ERROR_RATE_THRESHOLD']
+        )
+        return over_rate or consecutive >= self.config['CONSECUTIVE_FAILURES']
+
+    def record_success(self, latency):
+        if self._is_slow(latency):
+            self.record_failure(latency)
+            return
+        self._note_success(latency)
+        try:
+            if self._set_closed():
+                self.backend.delete_many([self._open_key(), self._probe_key()])
+            self._incr(self._bucket_keys(self._current_bucket())[0])
+        except Exception as e:
+            logger.debug(f"Breaker counter update failed for {self.name}: {e}")
+
+    async def arecord_success(self, latency):
+        if self._is_slow(latency):
+            await self.arecord_failure(latency)
+            return
+        self._note_success(latency)
+        try:
+            if self._set_closed():
+                await self.backend.adelete_many([self._open_key(), self._probe_key()])
+            await self._aincr(self._bucket_keys(self._current_bucket())[0])
+        except Exception as e:
+            logger.debug(f"Breaker counter update failed for {self.name}: {e}")
+
+    def record_failure(self, latency=None):
+        consecutive, half_open = self._note_failure(latency)
+        if half_open:
+            # The probe failed
+            self.trip()
+            return
+
+        total, failures = 0, 0
+        try:
+            total_key, failure_key = self._bucket_keys(self._current_bucket())
+            total = self._incr(total_key)
+            failures = self._incr(failure_key)
+        except Exception as e:
+            logger.debug(f"Breaker counter update failed for {self.name}: {e}")
+
+        if self._should_trip(consecutive, total, failures):
+            self.trip()
+
+    async def arecord_failure(self, latency=None):
+        consecutive, half_open = self._note_failure(latency)
+        if half_open:
+            await self.atrip()
+            return
+
+        total, failures = 0, 0
+        try:
+            total_key, failure_key = self._bucket_keys(self._current_bucket())
+            total = await self._aincr(total_key)
+            failures = await self._aincr(failure_key)
+        except Exception as e:
+            logger.debug(f"Breaker counter update failed for {self.name}: {e}")
+
+        if self._should_trip(consecutive, total, failures):
+            await self.atrip()
+
+    def call(self, func, *args, **kwargs):
+        """Run ``func`` and record its outcome; CircuitOpenError if not allowed."""
+        if not self.allow_request():
+            raise CircuitOpenError(f"circuit breaker open for {self.name}")
+        start = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure(time.monotonic() - start)
+            raise
+        self.record_success(time.monotonic() - start)
+        return result
+
+    async def acall(self, func, *args, **kwargs):
+        """Await ``func(*args, **kwargs)`` and record its outcome without blocking the loop."""
+        if not await self.aallow_request():
+            raise CircuitOpenError(f"circuit breaker open for {self.name}")
+        start = time.monotonic()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception:
+            await self.arecord_failure(time.monotonic() - start)
+            raise
+        await self.arecord_success(time.monotonic() - start)
+        return result
+
+    # ------------------------------------------------------------------
+    # Latency
+    # ------------------------------------------------------------------
+
+    def latency_percentile(self, pct):
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        idx = min(len(samples) - 1, max(0, math.ceil(pct / 100 * len(samples)) - 1))
+        return samples[idx]
+
+    def hedge_delay(self):
+        """Seconds to wait on this provider before firing a hedged request."""
+        p95 = self.latency_percentile(95)
+        if p95 is None:
+            return self.config['HEDGE_DEFAULT_DELAY']
+        return min(self.config['HEDGE_MAX_DELAY'], max(self.config['HEDGE_MIN_DELAY'], p95))
+
+    def snapshot(self):
+        try:
+            total, failures = self._window_counts()
+        except Exception:
+            total, failures = None, None
+        state = self.state()
+        return {
+            'provider': self.name,
+            'state': state,
+            'open': state == OPEN,
+            'window_total': total,
+            'window_failures': failures,
+            'p50_latency': self.latency_percentile(50),
+            'p95_latency': self.latency_percentile(95),
+        }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    """Return the process-wide breaker for a provider."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(name, CircuitBreaker(name))
+    return breaker
+
+
+def reset_breakers():
+    with _breakers_lock:
+        for breaker in _breakers.values():
+            breaker.reset()
+        _breakers.clear()
@@ -7,18 +7,28 @@ from django.conf import settings
 logger = logging.getLogger(__name__)
 
 class CohereClient:
-    def __init__(self):
+    def __init__(self, registry=None):
         import cohere
+        from .registry import get_client_registry
+        self.registry = registry or get_client_registry()
         self.api_key = settings.COHERE_API_KEY
         self.model = settings.COHERE_MODEL or "command-r-plus-08-2024"
         
         if not self.api_key:
             logger.warning("COHERE_API_KEY is not set.")
             self.client = None
-            self.async_client = None
         else:
-            self.client = cohere.Client(self.api_key)
-            self.async_client = cohere.AsyncClient(self.api_key)
+            self.client = cohere.Client(self.api_key, httpx_client=self.registry.http_client())
+
+    @property
+    def async_client(self):
+        """cohere.AsyncClient bound to the running event loop (None without a key)."""
+        if not self.api_key:
+            return None
+        import cohere
+        return self.registry.async_handle(
+            'cohere', lambda http_client: cohere.AsyncClient(self.api_key, httpx_client=http_client)
+        )
 
     def generate_questions(self, topic, difficulty, count=5, q_type="MCQ", additional_context=""):
         if not self.client:
@@ -104,6 +114,26 @@ class CohereClient:
             logger.error(f"Error streaming chat response with Cohere: {e}")
             raise
 
+    async def astream_response(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1024, image_data=None):
+        """Async streaming chat completion response on cohere.AsyncClient."""
+        if not self.async_client:
+            raise ValueError("Cohere API key not configured")
+
+        try:
+            async for event in self.async_client.chat_stream(
+                message=prompt,
+                model=self.model,
+                preamble=system_prompt,
+                temperature=temperature,
+                max_tokens=max_tokens
+            ):
+                if event.event_type == "text-generation":
+                    yield event.text
+
+        except Exception as e:
+            logger.error(f"Error streaming chat response async with Cohere: {e}")
+            raise
+
     def generate_study_plan(self, exam_type, subjects, days_available, difficulty_level, daily_hours, weekly_days):
         """Generates a structured study plan using Cohere API."""
         if not self.client:
@@ -167,20 +197,27 @@ class CohereClient:
             logger.error(f"Error grading theory with Cohere: {e}")
             raise
 
+    # Cohere's embed endpoint accepts at most 96 texts per call
+    EMBEDDING_BATCH_SIZE = 96
+
     def generate_embedding(self, text):
         """Generate vector embedding for text."""
+        return self.generate_embeddings([text])[0]
+
+    def generate_embeddings(self, texts):
+        """Generate vector embeddings for a batch of texts in a single request."""
         if not self.client:
             raise ValueError("Cohere API key not configured")
 
         try:
             # Cohere embed API
             response = self.client.embed(
-                texts=[text],
+                texts=list(texts),
                 model="embed-english-v3.0", # or make this configurable
                 input_type="components"  # correct for RAG content
             )
-            return response.embeddings[0]
+            return list(response.embeddings)
             
         except Exception as e:
-            logger.error(f"Error generating embedding with Cohere: {e}")
+            logger.error(f"Error generating embeddings with Cohere: {e}")
             raise
@@ -5,16 +5,25 @@ import json
 logger = logging.getLogger(__name__)
 
 class GroqClient:
-    def __init__(self):
-        from groq import Groq, AsyncGroq
+    def __init__(self, registry=None):
+        from groq import Groq
+        from .registry import get_client_registry
+        self.registry = registry or get_client_registry()
         self.api_key = settings.GROQ_API_KEY
         if not self.api_key:
             logger.warning("GROQ_API_KEY is not set.")
-        self.client = Groq(api_key=self.api_key)
-        self.async_client = AsyncGroq(api_key=self.api_key)
+        self.client = Groq(api_key=self.api_key, http_client=self.registry.http_client())
         self.model = settings.GROQ_MODEL
         self.timeout = settings.GROQ_TIMEOUT
 
+    @property
+    def async_client(self):
+        """AsyncGroq handle bound to the running event loop."""
+        from groq import AsyncGroq
+        return self.registry.async_handle(
+            'groq', lambda http_client: AsyncGroq(api_key=self.api_key, http_client=http_client)
+        )
+
     def generate_questions(self, topic, difficulty, count=5, q_type="MCQ", additional_context=""):
         """
         Generates questions using Groq API.
@@ -131,41 +140,32 @@ class GroqClient:
             logger.error(f"Failed to parse Groq response: {response_text}")
             raise ValueError("Invalid JSON response from AI")
 
+    def _chat_messages(self, prompt, system_prompt=None, image_data=None):
+        """Chat messages and model for a prompt; images switch to the vision model."""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+
+        if image_data:
+            # Use multi-modal format for vision tasks
+            user_content = [
+                {"type": "text", "text": prompt},
+                {"type": "image_url", "image_url": {"url": image_data}},
+            ]
+        else:
+            user_content = prompt
+        messages.append({"role": "user", "content": user_content})
+
+        model = "meta-llama/llama-4-maverick-17b-128e-instruct" if image_data else self.model
+        return messages, model
+
     def generate_response(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1024, image_data=None):
         """
         Generates a chat response using Groq API.
         Supports multi-modal input (text + image).
         """
         try:
-            messages = []
-            
-            if system_prompt:
-                messages.append({
-                    "role": "system",
-                    "content": system_prompt
-                })
-            
-            if image_data:
-                # Use multi-modal format for vision tasks
-                user_content = [
-                    {"type": "text", "text": prompt},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": image_data,
-                        },
-                    },
-                ]
-            else:
-                user_content = prompt
-
-            messages.append({
-                "role": "user",
-                "content": user_content
-            })
-            
-            # Switch to vision model if image is provided
-            model = "meta-llama/llama-4-maverick-17b-128e-instruct" if image_data else self.model
+            messages, model = self._chat_messages(prompt, system_prompt, image_data)
             
             chat_completion = self.client.chat.completions.create(
                 messages=messages,
@@ -188,35 +188,7 @@ class GroqClient:
         Yields chunks of text.
         """
         try:
-            messages = []
-            
-            if system_prompt:
-                messages.append({
-                    "role": "system",
-                    "content": system_prompt
-                })
-            
-            if image_data:
-                # Use multi-modal format for vision tasks
-                user_content = [
-                    {"type": "text", "text": prompt},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": image_data,
-                        },
-                    },
-                ]
-            else:
-                user_content = prompt
-
-            messages.append({
-                "role": "user",
-                "content": user_content
-            })
-            
-            # Switch to vision model if image is provided
-            model = "meta-llama/llama-4-maverick-17b-128e-instruct" if image_data else self.model
+            messages, model = self._chat_messages(prompt, system_prompt, image_data)
             
             stream = self.client.chat.completions.create(
                 messages=messages,
@@ -235,6 +207,29 @@ class GroqClient:
             logger.error(f"Error streaming response with Groq: {e}")
             raise
 
+    async def astream_response(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1024, image_data=None):
+        """
+        Async counterpart of :meth:`stream_response` on AsyncGroq.
+        Yields chunks of text without leaving the event loop.
+        """
+        try:
+            messages, model = self._chat_messages(prompt, system_prompt, image_data)
+            stream = await self.async_client.chat.completions.create(
+                messages=messages,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                timeout=self.timeout
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content is not None:
+                    yield chunk.choices[0].delta.content
+
+        except Exception as e:
+            logger.error(f"Error streaming response async with Groq: {e}")
+            raise
+
     def generate_study_plan(self, exam_type, subjects, days_available, difficulty_level, daily_hours, weekly_days):
         """
         Generates a structured study plan using Groq API.
@@ -8,7 +8,10 @@ from django.conf import settings
 logger = logging.getLogger(__name__)
 
 class HuggingFaceClient:
-    def __init__(self):
+    def __init__(self, registry=None):
+        from .registry import get_client_registry
+        self.registry = registry or get_client_registry()
+        self.session = self.registry.requests_session()
         self.api_key = settings.HUGGINGFACE_API_KEY
         self.model = settings.HUGGINGFACE_MODEL or "microsoft/Phi-3-mini-4k-instruct"
         self.api_url = f"https://api-inference.huggingface.co/models/{self.model}"
@@ -33,7 +36,7 @@ class HuggingFaceClient:
         }
         
         try:
-            response = requests.post(self.api_url, headers=headers, json=payload, timeout=settings.HUGGINGFACE_TIMEOUT)
+            response = self.session.post(self.api_url, headers=headers, json=payload, timeout=settings.HUGGINGFACE_TIMEOUT)
             response.raise_for_status()
             
             result = response.json()
@@ -71,7 +74,7 @@ class HuggingFaceClient:
         }
         
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.api_url, 
                 headers=headers, 
                 json=payload, 
@@ -109,7 +112,7 @@ class HuggingFaceClient:
         }
         
         try:
-            response = requests.post(self.api_url, headers=headers, json=payload, timeout=30)
+            response = self.session.post(self.api_url, headers=headers, json=payload, timeout=30)
             response.raise_for_status()
             
             result = response.json()
@@ -146,7 +149,7 @@ class HuggingFaceClient:
         }
         
         try:
-            response = requests.post(self.api_url, headers=headers, json=payload, timeout=30)
+            response = self.session.post(self.api_url, headers=headers, json=payload, timeout=30)
             response.raise_for_status()
             
             result = response.json()
@@ -7,9 +7,11 @@ from django.conf import settings
 logger = logging.getLogger(__name__)
 
 class MistralClient:
-    def __init__(self):
+    def __init__(self, registry=None):
         from mistralai import Mistral
+        from .registry import get_client_registry
         
+        self.registry = registry or get_client_registry()
         self.api_key = settings.MISTRAL_API_KEY
         self.model = settings.MISTRAL_MODEL or "mistral-small-latest"
         
@@ -17,7 +19,17 @@ class MistralClient:
             logger.warning("MISTRAL_API_KEY is not set.")
             self.client = None
         else:
-            self.client = Mistral(api_key=self.api_key)
+            self.client = Mistral(api_key=self.api_key, client=self.registry.http_client())
+
+    @property
+    def async_client(self):
+        """Mistral handle whose async methods run on the event loop's httpx client (None without a key)."""
+        if not self.api_key:
+            return None
+        from mistralai import Mistral
+        return self.registry.async_handle(
+            'mistral', lambda http_client: Mistral(api_key=self.api_key, async_client=http_client)
+        )
 
     def generate_questions(self, topic, difficulty, count=5, q_type="MCQ", additional_context=""):
         if not self.client:
@@ -96,6 +108,34 @@ class MistralClient:
             logger.error(f"Error streaming chat response with Mistral: {e}")
             raise
 
+    async def astream_response(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1024, image_data=None):
+        """Async streaming chat completion response (chat.stream_async)."""
+        if not self.async_client:
+            raise ValueError("Mistral API key not configured")
+
+        try:
+            from mistralai.models import UserMessage, SystemMessage
+            messages = []
+            if system_prompt:
+                messages.append(SystemMessage(content=system_prompt))
+            messages.append(UserMessage(content=prompt))
+
+            stream = await self.async_client.chat.stream_async(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+
+            async for event in stream:
+                choices = event.data.choices
+                if choices and choices[0].delta.content:
+                    yield choices[0].delta.content
+
+        except Exception as e:
+            logger.error(f"Error streaming chat response async with Mistral: {e}")
+            raise
+
     def _build_prompt(self, topic, difficulty, count, q_type, context):
         from .prompts import PromptTemplates
         return PromptTemplates.get_question_prompt(topic, difficulty, count, q_type, context)
@@ -196,18 +236,25 @@ class MistralClient:
             logger.error(f"Error grading theory with Mistral: {e}")
             raise
 
+    # mistral-embed caps a request at 16k tokens; 64 chunks of ~1000 chars stay well under it
+    EMBEDDING_BATCH_SIZE = 64
+
     def generate_embedding(self, text):
         """Generate vector embedding for text."""
+        return self.generate_embeddings([text])[0]
+
+    def generate_embeddings(self, texts):
+        """Generate vector embeddings for a batch of texts in a single request."""
         if not self.client:
             raise ValueError("Mistral API key not configured")
 
         try:
             embeddings_batch_response = self.client.embeddings.create(
                 model="mistral-embed",
-                inputs=[text]
+                inputs=list(texts)
             )
-            return embeddings_batch_response.data[0].embedding
+            return [item.embedding for item in embeddings_batch_response.data]
             
         except Exception as e:
-            logger.error(f"Error generating embedding with Mistral: {e}")
+            logger.error(f"Error generating embeddings with Mistral: {e}")
             raise
@@ -0,0 +1,153 @@
+"""
+Token-budgeted assembly of tutor chat prompts.
+
+Chat prompts used to be the full document context, the last five messages
+and the new message, whatever their size. assemble_chat_prompt() instead
+fits them into AI_PROMPT_BUDGET['MAX_PROMPT_TOKENS'] (the system prompt
+included):
+
+    1. the system prompt and the new message are always sent
+    2. the rolling conversation summary, capped at SUMMARY_MAX_TOKENS
+    3. recent turns, newest first, whole turns only; room for the last
+       MIN_RECENT_TURNS is reserved (the oldest of them is shortened only
+       if they cannot fit at all)
+    4. retrieved document context, whole chunks in rank order, up to
+       CONTEXT_SHARE of what is left, plus anything history did not use
+
+Token counts come from the estimator shared with document chunking
+(ai_services/tokens.py). Every assembled prompt reports its usage per part next to the
+tokens the old, unbudgeted prompt would have cost.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from .tokens import get_token_estimator
+
+DEFAULTS = {
+    'MAX_PROMPT_TOKENS': 6000,
+    'SUMMARY_MAX_TOKENS': 400,
+    'MIN_RECENT_TURNS': 2,
+    'MAX_RECENT_TURNS': 12,
+    'CONTEXT_SHARE': 0.6,
+}
+
+# Old prompt: last five messages, whatever their length
+UNBUDGETED_TURNS = 5
+
+CHUNK_SEPARATOR = "\n...\n"
+
+def get_prompt_budget_config():
+    return {**DEFAULTS, **getattr(settings, 'AI_PROMPT_BUDGET', {})}
+
+
+def estimate_tokens(text):
+    """Token count of ``text`` with the shared estimator (AI_TOKENIZER)."""
+    return get_token_estimator().count(text)
+
+
+def truncate_to_tokens(text, max_tokens, keep='start'):
+    """Cut ``text`` to at most ``max_tokens``, keeping its start or its end."""
+    if max_tokens <= 0:
+        return ""
+    estimator = get_token_estimator()
+    if estimator.count(text) <= max_tokens:
+        return text
+    marker = " ..." if keep == 'start' else "... "
+    kept = estimator.truncate(text, max_tokens - estimator.count(marker), keep)
+    # Re-joining can merge tokens differently; trim until it fits
+    while kept and estimator.count(kept + marker) > max_tokens:
+        kept = estimator.truncate(kept, estimator.count(kept) - 1, keep)
+    if not kept:
+        return ""
+    return kept + marker if keep == 'start' else marker + kept
+
+
+def format_turn(message):
+    return f"{'Student' if message['role'] == 'user' else 'Tutor'}: {message['content']}"
+
+
+@dataclass
+class AssembledPrompt:
+    prompt: str
+    usage: Dict[str, int] = field(default_factory=dict)
+
+
+def _fit_context(document_context, budget):
+    """Keep whole retrieved chunks, best first, while they fit."""
+    if not document_context or estimate_tokens(document_context) <= budget:
+        return document_context or ""
+    chunks = document_context.split(CHUNK_SEPARATOR)
+    kept = chunks[0]
+    if estimate_tokens(kept) > budget:
+        return truncate_to_tokens(kept, budget)
+    for chunk in chunks[1:]:
+        candidate = kept + CHUNK_SEPARATOR + chunk
+        if estimate_tokens(candidate) > budget:
+            break
+        kept = candidate
+    return kept
+
+
+def assemble_chat_prompt(
+    message: str,
+    system_prompt: Optional[str] = None,
+    summary: Optional[str] = None,
+    history: Optional[List[Dict]] = None,
+    document_context: str = "",
+    config: Optional[Dict] = None,
+) -> AssembledPrompt:
+    config = config or get_prompt_budget_config()
+    history = [turn for turn in (history or []) if turn.get('content')][-config['MAX_RECENT_TURNS']:]
+
+    system_tokens = estimate_tokens(system_prompt)
+    message_line = f"Student: {message}\nTutor:"
+    message_tokens = estimate_tokens(message_line)
+    available = max(0, config['MAX_PROMPT_TOKENS'] - system_tokens - message_tokens)
+
+    summary_text = truncate_to_tokens(summary or "", min(config['SUMMARY_MAX_TOKENS'], available), keep='end')
+    summary_block = f"SUMMARY OF THE CONVERSATION SO FAR:\n{summary_text}\n" if summary_text else ""
+    summary_tokens = estimate_tokens(summary_block)
+    available -= summary_tokens
+
+    # Context may take CONTEXT_SHARE, but never the room of the last MIN_RECENT_TURNS
+    context_tokens = estimate_tokens(document_context)
+    reserved = sum(estimate_tokens(format_turn(turn)) for turn in history[-config['MIN_RECENT_TURNS']:])
+    context_cap = max(0, min(context_tokens, int(available * config['CONTEXT_SHARE']), available - reserved))
+    history_budget = available - context_cap
+
+    turns, history_tokens = [], 0
+    for turn in reversed(history):
+        line = format_turn(turn)
+        tokens = estimate_tokens(line)
+        if history_tokens + tokens > history_budget:
+            if len(turns) < config['MIN_RECENT_TURNS']:
+                line = truncate_to_tokens(line, max(0, history_budget - history_tokens), keep='end')
+                tokens = estimate_tokens(line)
+                if line:
+                    turns.append(line)
+                    history_tokens += tokens
+            break
+        turns.append(line)
+        history_tokens += tokens
+    turns.reverse()
+
+    context = _fit_context(document_context, available - history_tokens)
+    history_block = "\n".join(turns)
+
+    prompt = "\n".join(part for part in (context, summary_block, history_block, message_line) if part)
+    unbudgeted = (
+        system_tokens + context_tokens + message_tokens
+        + sum(estimate_tokens(format_turn(turn)) for turn in history[-UNBUDGETED_TURNS:])
+    )
+    return AssembledPrompt(prompt=prompt, usage={
+        'system': system_tokens,
+        'summary': summary_tokens,
+        'history': history_tokens,
+        'history_turns': len(turns),
+        'context': estimate_tokens(context),
+        'message': message_tokens,
+        'total': system_tokens + estimate_tokens(prompt),
+        'unbudgeted': unbudgeted,
+    })
@@ -234,6 +234,26 @@ Remember: Your goal is to support the *whole* student—their well-being is as i
 Student: {user_message}
 
 Tutor:"""
+
+    @staticmethod
+    def get_conversation_summary_prompt(previous_summary, transcript):
+        """Prompt for folding older chat turns into the session's rolling summary."""
+        return f"""Update the running notes of a tutoring conversation between a student and their tutor.
+
+Current notes:
+{previous_summary or "(none yet)"}
+
+New conversation turns:
+{transcript}
+
+Rewrite the notes so they cover everything above. Keep:
+- what the student is studying and asked about
+- what was explained, worked examples and answers given
+- misconceptions, difficulties and how the student is feeling
+- anything the tutor promised to follow up on
+
+Write at most 200 words of plain sentences, in the third person. Output only the notes."""
+
     @staticmethod
     def get_study_plan_prompt(exam_type, subjects, days_available, difficulty_level, daily_hours, weekly_days):
         """Generates a detailed study plan prompt."""
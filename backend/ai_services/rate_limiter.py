@@ -0,0 +1,353 @@
+"""
+Shared rate limiter for chat messages, AI endpoints and provider quotas.
+
+Every check-and-consume is one atomic Redis call: a Lua script reads the
+limiter's state, decides, and writes the new state back, so concurrent
+Daphne / gunicorn / Django-Q processes can never both take the last unit.
+Redis' own clock (TIME) is used, so process clock skew does not matter.
+
+Two algorithms are available:
+
+    sliding_window  limit per period, counted over a sliding window that
+                    is interpolated from the current and previous fixed
+                    windows (two counters per key, no per-request log)
+    token_bucket    refills limit/period tokens per second up to ``burst``;
+                    used for outbound provider quotas, where short bursts
+                    are fine but the sustained rate is capped
+
+If Redis cannot be reached, limiting falls back to a per-process copy of
+the same algorithms for RETRY_SECONDS before Redis is tried again. Limits
+stay roughly enforced rather than switched off.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'ratelimit'
+
+DEFAULTS = {
+    'BACKEND': 'redis',
+    'REDIS_URL': None,
+    'RETRY_SECONDS': 30,
+    'SOCKET_TIMEOUT': 0.5,
+    'PROVIDER_QUOTAS': {},
+}
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+# KEYS[1]: state hash. ARGV: limit, period_ms, cost
+SLIDING_WINDOW_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local window = math.floor(now / period)
+
+local state = redis.call('HMGET', KEYS[1], 'window', 'current', 'previous')
+local last = tonumber(state[1])
+local current = tonumber(state[2]) or 0
+local previous = tonumber(state[3]) or 0
+if last == nil or last < window - 1 then
+    current, previous = 0, 0
+elseif last == window - 1 then
+    current, previous = 0, current
+end
+
+local elapsed = (now % period) / period
+local used = previous * (1 - elapsed) + current
+local allowed = 0
+local retry = 0
+if used + cost <= limit then
+    allowed = 1
+    current = current + cost
+    used = used + cost
+elseif previous > 0 and current + cost <= limit then
+    retry = math.ceil(((1 - (limit - current - cost) / previous) - elapsed) * period)
+else
+    retry = math.ceil((1 - elapsed) * period)
+end
+
+redis.call('HSET', KEYS[1], 'window', window, 'current', current, 'previous', previous)
+redis.call('PEXPIRE', KEYS[1], period * 2)
+return {allowed, math.max(0, math.floor(limit - used)), retry}
+"""
+
+# KEYS[1]: state hash. ARGV: capacity, tokens per ms, cost
+TOKEN_BUCKET_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+
+local allowed = 0
+local retry = 0
+if tokens >= cost then
+    allowed = 1
+    tokens = tokens - cost
+else
+    retry = math.ceil((cost - tokens) / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate) + 1000)
+return {allowed, math.floor(tokens), retry}
+"""
+
+
+def get_rate_limit_config():
+    config = {**DEFAULTS, **getattr(settings, 'AI_RATE_LIMIT', {})}
+    if not config['REDIS_URL']:
+        config['REDIS_URL'] = getattr(settings, 'REDIS_URL', 'redis://localhost:6379/0')
+    return config
+
+
+def parse_rate(rate):
+    """``'50/h'`` or ``'30/minute'`` -> (50, 3600). None -> (None, None)."""
+    if rate is None:
+        return None, None
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0].lower()]
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+
+    @classmethod
+    def unlimited(cls):
+        return cls(allowed=True, limit=-1, remaining=-1, retry_after=0.0)
+
+
+class LocalBackend:
+    """In-process implementation of both scripts, used without Redis."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = {}
+
+    def _now_ms(self):
+        return time.time() * 1000
+
+    def sliding_window(self, key, limit, period_ms, cost):
+        now = self._now_ms()
+        window = int(now // period_ms)
+        with self._lock:
+            last, current, previous = self._state.get(key, (None, 0, 0))
+            if last is None or last < window - 1:
+                current, previous = 0, 0
+            elif last == window - 1:
+                current, previous = 0, current
+
+            elapsed = (now % period_ms) / period_ms
+            used = previous * (1 - elapsed) + current
+            allowed, retry = False, 0
+            if used + cost <= limit:
+                allowed = True
+                current += cost
+                used += cost
+            elif previous > 0 and current + cost <= limit:
+                retry = math.ceil(((1 - (limit - current - cost) / previous) - elapsed) * period_ms)
+            else:
+                retry = math.ceil((1 - elapsed) * period_ms)
+            self._state[key] = (window, current, previous)
+        return allowed, max(0, math.floor(limit - used)), retry
+
+    def token_bucket(self, key, capacity, rate_per_ms, cost):
+        now = self._now_ms()
+        with self._lock:
+            tokens, updated = self._state.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0, now - updated) * rate_per_ms)
+            allowed, retry = False, 0
+            if tokens >= cost:
+                allowed = True
+                tokens -= cost
+            else:
+                retry = math.ceil((cost - tokens) / rate_per_ms)
+            self._state[key] = (tokens, now)
+        return allowed, math.floor(tokens), retry
+
+    def clear(self):
+        with self._lock:
+            self._state.clear()
+
+
+class RedisBackend:
+    """
+    Runs the Lua scripts with EVALSHA (loading them on first use).
+
+    Sync calls share one connection pool; async calls use a redis.asyncio
+    client per event loop, so the consumer never leaves the loop to rate
+    limit.
+    """
+
+    def __init__(self, config):
+        import redis
+
+        self.config = config
+        self.client = redis.Redis.from_url(
+            config['REDIS_URL'],
+            socket_timeout=config['SOCKET_TIMEOUT'],
+            socket_connect_timeout=config['SOCKET_TIMEOUT'],
+        )
+        self._scripts = {
+            'sliding_window': self.client.register_script(SLIDING_WINDOW_SCRIPT),
+            'token_bucket': self.client.register_script(TOKEN_BUCKET_SCRIPT),
+        }
+        self._lock = threading.Lock()
+        # event loop -> (redis.asyncio client, scripts)
+        self._loop_clients = {}
+
+    def _async_scripts(self):
+        import redis.asyncio
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for stale in [l for l in self._loop_clients if l.is_closed()]:
+                del self._loop_clients[stale]
+            if loop not in self._loop_clients:
+                client = redis.asyncio.Redis.from_url(
+                    self.config['REDIS_URL'],
+                    socket_timeout=self.config['SOCKET_TIMEOUT'],
+                    socket_connect_timeout=self.config['SOCKET_TIMEOUT'],
+                )
+                self._loop_clients[loop] = {
+                    'sliding_window': client.register_script(SLIDING_WINDOW_SCRIPT),
+                    'token_bucket': client.register_script(TOKEN_BUCKET_SCRIPT),
+                }
+            return self._loop_clients[loop]
+
+    def run(self, algorithm, key, *args):
+        allowed, remaining, retry = self._scripts[algorithm](keys=[key], args=args)
+        return bool(allowed), int(remaining), int(retry)
+
+    async def arun(self, algorithm, key, *args):
+        allowed, remaining, retry = await self._async_scripts()[algorithm](keys=[key], args=args)
+        return bool(allowed), int(remaining), int(retry)
+
+
+class RateLimitBackend:
+    """Redis when reachable, the local backend while it is not."""
+
+    def __init__(self, config=None):
+        self.config = config or get_rate_limit_config()
+        self.local = LocalBackend()
+        self.redis = RedisBackend(self.config) if self.config['BACKEND'] == 'redis' else None
+        self._redis_down_until = 0.0
+
+    def _use_redis(self):
+        return self.redis is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, error):
+        logger.warning(f"Rate limiter cannot reach Redis, limiting per process: {error}")
+        self._redis_down_until = time.monotonic() + self.config['RETRY_SECONDS']
+
+    def run(self, algorithm, key, *args):
+        if self._use_redis():
+            try:
+                return self.redis.run(algorithm, key, *args)
+            except Exception as e:
+                self._redis_failed(e)
+        return getattr(self.local, algorithm)(key, *args)
+
+    async def arun(self, algorithm, key, *args):
+        if self._use_redis():
+            try:
+                return await self.redis.arun(algorithm, key, *args)
+            except Exception as e:
+                self._redis_failed(e)
+        return getattr(self.local, algorithm)(key, *args)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_rate_limit_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = RateLimitBackend()
+    return _backend
+
+
+def reset_rate_limit_backend():
+    """Forget the shared backend (tests and settings changes)."""
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+class RateLimit:
+    """
+    ``limit`` units per ``period`` seconds for each identity under ``name``.
+
+    hit() checks and consumes in one step and returns a RateLimitResult;
+    ahit() does the same without leaving the event loop.
+    """
+
+    def __init__(self, name, limit, period, algorithm='sliding_window', burst=None, backend=None):
+        if algorithm not in ('sliding_window', 'token_bucket'):
+            raise ValueError(f"Unknown rate limit algorithm: {algorithm}")
+        self.name = name
+        self.limit = limit
+        self.period = period
+        self.algorithm = algorithm
+        self.burst = burst or limit
+        self._backend = backend
+
+    @classmethod
+    def from_rate(cls, name, rate, **kwargs):
+        """Build from a ``'<count>/<s|m|h|d>'`` string; None means unlimited."""
+        limit, period = parse_rate(rate)
+        return None if limit is None else cls(name, limit, period, **kwargs)
+
+    @property
+    def backend(self):
+        return self._backend or get_rate_limit_backend()
+
+    def _key(self, identity):
+        return f"{KEY_PREFIX}:{self.name}:{identity}"
+
+    def _args(self, cost):
+        if self.algorithm == 'token_bucket':
+            return self.burst, self.limit / (self.period * 1000), cost
+        return self.limit, self.period * 1000, cost
+
+    def _result(self, outcome):
+        allowed, remaining, retry_ms = outcome
+        return RateLimitResult(
+            allowed=allowed,
+            limit=self.limit,
+            remaining=remaining,
+            retry_after=retry_ms / 1000,
+        )
+
+    def hit(self, identity, cost=1):
+        return self._result(self.backend.run(self.algorithm, self._key(identity), *self._args(cost)))
+
+    async def ahit(self, identity, cost=1):
+        return self._result(await self.backend.arun(self.algorithm, self._key(identity), *self._args(cost)))
+
+
+def get_provider_quota(name):
+    """Token bucket for outbound calls to provider ``name``, or None if unlimited."""
+    rate = get_rate_limit_config()['PROVIDER_QUOTAS'].get(name.lower())
+    return RateLimit.from_rate(f"provider:{name.lower()}", rate, algorithm='token_bucket')
@@ -0,0 +1,219 @@
+"""
+Process-wide registry of AI provider clients.
+
+Provider wrappers (GroqClient, MistralClient, ...) are built lazily, once per
+process, on top of shared keep-alive HTTP connection pools instead of being
+re-created (with fresh TLS handshakes) for every AIRouter. Async SDK handles
+are cached per event loop, since httpx async pools cannot be shared between
+loops (async_to_sync spins up its own loop per call outside the ASGI server).
+Each loop's AsyncClient is closed by a finalizer that loop.shutdown_asyncgens()
+runs before the loop closes (asyncio.run and async_to_sync both call it);
+entries for loops that have since closed are dropped on the next lookup, and
+any sockets a loop closed without that step left open are closed then.
+"""
+import asyncio
+import importlib
+import logging
+import socket
+import threading
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Priority order used by AIRouter
+PROVIDERS = [
+    ("Groq", "ai_services.groq_client.GroqClient"),
+    ("Mistral", "ai_services.mistral_client.MistralClient"),
+    ("Cohere", "ai_services.cohere_client.CohereClient"),
+    ("HuggingFace", "ai_services.huggingface_client.HuggingFaceClient"),
+]
+
+DEFAULTS = {
+    'HTTP2': True,
+    'HTTP_MAX_CONNECTIONS': 100,
+    'HTTP_MAX_KEEPALIVE': 20,
+    'HTTP_KEEPALIVE_EXPIRY': 60,
+    'HTTP_TIMEOUT': 60,
+}
+
+
+def get_http_config():
+    return {**DEFAULTS, **getattr(settings, 'AI_HTTP', {})}
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def _close_with_loop(client):
+    """Parked on a loop so shutdown_asyncgens() acloses ``client`` while the loop still runs."""
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+def _close_sockets(client):
+    """Best effort for a client whose loop closed first: aclose() can no longer run."""
+    pool = getattr(client._transport, '_pool', None)
+    for connection in list(getattr(pool, 'connections', [])):
+        stream = getattr(getattr(connection, '_connection', None), '_network_stream', None)
+        sock = stream.get_extra_info('socket') if stream is not None else None
+        if sock is not None:
+            try:
+                # asyncio only exposes a TransportSocket; the transport frees the fd when collected
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class ClientRegistry:
+    """Lazily creates each provider client once and shares HTTP pools between them."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._providers = {}
+        self._http_client = None
+        self._session = None
+        # event loop -> {'http': httpx.AsyncClient, 'finalizer': _close_with_loop(...), <handle key>: sdk client}
+        self._loop_handles = {}
+
+    # ------------------------------------------------------------------
+    # HTTP pools
+    # ------------------------------------------------------------------
+
+    def _http_options(self):
+        config = get_http_config()
+        http2 = config['HTTP2'] and _http2_available()
+        return {
+            'http2': http2,
+            'limits': httpx.Limits(
+                max_connections=config['HTTP_MAX_CONNECTIONS'],
+                max_keepalive_connections=config['HTTP_MAX_KEEPALIVE'],
+                keepalive_expiry=config['HTTP_KEEPALIVE_EXPIRY'],
+            ),
+            'timeout': httpx.Timeout(config['HTTP_TIMEOUT'], connect=10),
+        }
+
+    def http_client(self):
+        """Shared sync httpx client (keep-alive, HTTP/2 when ``h2`` is installed)."""
+        if self._http_client is None:
+            with self._lock:
+                if self._http_client is None:
+                    self._http_client = httpx.Client(**self._http_options())
+        return self._http_client
+
+    def requests_session(self):
+        """Shared ``requests`` session for providers called over plain HTTP."""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    config = get_http_config()
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=10,
+                        pool_maxsize=config['HTTP_MAX_KEEPALIVE'],
+                    )
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    def _handles_for(self, loop):
+        # Caller holds self._lock
+        for stale in [l for l in self._loop_handles if l.is_closed()]:
+            handles = self._loop_handles.pop(stale)
+            if handles['finalizer'].ag_frame is not None:
+                # The loop closed without shutdown_asyncgens()
+                _close_sockets(handles['http'])
+        handles = self._loop_handles.get(loop)
+        if handles is None:
+            client = httpx.AsyncClient(**self._http_options())
+            finalizer = _close_with_loop(client)
+            try:
+                # Step to the yield on this loop, which registers it for shutdown_asyncgens()
+                finalizer.asend(None).send(None)
+            except StopIteration:
+                pass
+            handles = {'http': client, 'finalizer': finalizer}
+            self._loop_handles[loop] = handles
+        return handles
+
+    def async_http_client(self):
+        """httpx.AsyncClient bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            return self._handles_for(loop)['http']
+
+    def async_handle(self, key, factory):
+        """
+        Return the async SDK client ``key`` for the running event loop, building
+        it with ``factory(async_http_client)`` on first use. Outside an event
+        loop a fresh, uncached handle is returned.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return factory(httpx.AsyncClient(**self._http_options()))
+
+        with self._lock:
+            handles = self._handles_for(loop)
+            if key not in handles:
+                handles[key] = factory(handles['http'])
+            return handles[key]
+
+    # ------------------------------------------------------------------
+    # Providers
+    # ------------------------------------------------------------------
+
+    def get(self, name):
+        """Return the shared provider wrapper for ``name``."""
+        client = self._providers.get(name)
+        if client is None:
+            with self._lock:
+                client = self._providers.get(name)
+                if client is None:
+                    path = dict(PROVIDERS)[name]
+                    module_path, class_name = path.rsplit('.', 1)
+                    client_class = getattr(importlib.import_module(module_path), class_name)
+                    client = client_class(registry=self)
+                    self._providers[name] = client
+        return client
+
+    def providers(self):
+        """All provider wrappers in priority order."""
+        return [(name, self.get(name)) for name, _ in PROVIDERS]
+
+    def close(self):
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+            self._providers.clear()
+            self._loop_handles.clear()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry():
+    """Return the process-wide client registry."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ClientRegistry()
+    return _registry
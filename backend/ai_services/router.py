@@ -1,244 +1,497 @@
-
+import asyncio
 import logging
 import re
-from .groq_client import GroqClient
-from .mistral_client import MistralClient
-from .cohere_client import CohereClient
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from .huggingface_client import HuggingFaceClient
+from .cache import get_ai_cache
+from django.conf import settings
+
+from .circuit_breaker import OPEN, get_breaker, get_router_config
+from .prompt_budget import assemble_chat_prompt, format_turn
+from .prompts import PromptTemplates
+from .rate_limiter import get_provider_quota
+from .registry import get_client_registry
 
 logger = logging.getLogger(__name__)
 
+# Batched embeddings for document ingestion (generate_embeddings)
+EMBEDDING_DEFAULTS = {
+    'EMBEDDING_CONCURRENCY': 4,
+    'EMBEDDING_RETRIES': 2,
+    'EMBEDDING_RETRY_BACKOFF': 1.0,
+    # Longest wait for the provider quota to refill when a batch costs more than its burst
+    'EMBEDDING_QUOTA_WAIT': 30,
+}
+
+
+def get_embedding_config():
+    return {**EMBEDDING_DEFAULTS, **getattr(settings, 'AI_EMBEDDINGS', {})}
+
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+
+def _get_hedge_executor():
+    """Shared thread pool used to race providers in hedged mode."""
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_executor_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(
+                    max_workers=get_router_config().get('HEDGE_MAX_WORKERS', 8),
+                    thread_name_prefix='ai-hedge',
+                )
+    return _hedge_executor
+
+
 class AIRouter:
-    def __init__(self):
-        # Initialize clients in priority order
-        self.clients = [
-            ("Groq", GroqClient()),
-            ("Mistral", MistralClient()),
-            ("Cohere", CohereClient()),
-            ("HuggingFace", HuggingFaceClient())
+    def __init__(self, registry=None):
+        # Provider clients in priority order, shared process-wide
+        self.registry = registry or get_client_registry()
+        self.clients = self.registry.providers()
+        self.cache = get_ai_cache()
+        self.hedging = get_router_config().get('HEDGING', False)
+
+    def _model_signature(self):
+        """Identifies the provider/model chain so cached responses are scoped to it."""
+        return ",".join(f"{name}:{getattr(client, 'model', '')}" for name, client in self.clients)
+
+    def _question_prompt(self, topic, difficulty, count, q_type, additional_context):
+        return {
+            'topic': topic,
+            'difficulty': difficulty,
+            'count': count,
+            'q_type': q_type,
+            'context': additional_context,
+        }
+
+    # ------------------------------------------------------------------
+    # Provider dispatch
+    # ------------------------------------------------------------------
+
+    def _is_configured(self, client, use_async=False):
+        # Groq, Mistral, Cohere set self.client = None if the key is missing
+        if hasattr(client, 'client') and client.client is None:
+            return False
+        if use_async and hasattr(client, 'async_client') and client.async_client is None:
+            return False
+        # HuggingFace check
+        if isinstance(client, HuggingFaceClient) and not client.api_key:
+            return False
+        return True
+
+    def _supporting(self, method, use_async=False):
+        return [
+            (name, client) for name, client in self.clients
+            if hasattr(client, method) and self._is_configured(client, use_async)
         ]
 
-    def generate_questions(self, topic, difficulty, count=5, q_type="MCQ", additional_context=""):
-        errors = []
-        
-        for name, client in self.clients:
-            try:
-                # Skip clients that weren't initialized properly (e.g. missing API key)
-                # Assuming clients might be None or have internal checks
-                if hasattr(client, 'client') and client.client is None:
-                     # Check specific to how we implemented clients. 
-                     # Groq, Mistral, Cohere set self.client = None if key missing
-                     continue
-                
-                # HuggingFace check
-                if isinstance(client, HuggingFaceClient) and not client.api_key:
-                    continue
+    def _candidates(self, method):
+        """
+        Configured providers supporting ``method`` whose circuit breaker is not
+        open. A half-open provider is included; breaker.call() lets only its
+        single probe through.
+        """
+        candidates = []
+        for name, client in self._supporting(method):
+            if get_breaker(name).state() == OPEN:
+                logger.info(f"Skipping {name}: circuit breaker open")
+                continue
+            candidates.append((name, client))
+        return candidates
 
-                logger.info(f"Attempting question generation with {name}...")
-                return client.generate_questions(topic, difficulty, count, q_type, additional_context)
-                
-            except Exception as e:
-                logger.warning(f"{name} failed: {e}")
-                errors.append(f"{name}: {str(e)}")
+    async def _acandidates(self, method):
+        """Async :meth:`_candidates`; reads breaker state with the async cache API."""
+        candidates = []
+        for name, client in self._supporting(method, use_async=True):
+            if await get_breaker(name).astate() == OPEN:
+                logger.info(f"Skipping {name}: circuit breaker open")
                 continue
-        
-        # If we get here, all clients failed
-        error_msg = f"All AI providers failed. Errors: {'; '.join(errors)}"
+            candidates.append((name, client))
+        return candidates
+
+    @staticmethod
+    def _take_quota(name, calls=1, max_wait=0):
+        """
+        Consume ``calls`` from the provider's outbound quota (AI_RATE_LIMIT['PROVIDER_QUOTAS']).
+
+        The bucket never holds more than ``burst`` tokens, so larger costs are
+        taken in burst-sized hits. Once the first hit is allowed, a refused one
+        waits for the bucket to refill, up to ``max_wait`` seconds in total.
+        """
+        quota = get_provider_quota(name)
+        if quota is None:
+            return True
+        remaining, waited = calls, 0.0
+        while remaining > 0:
+            cost = min(remaining, quota.burst)
+            result = quota.hit('calls', cost=cost)
+            if result.allowed:
+                remaining -= cost
+                continue
+            if remaining == calls or waited + result.retry_after > max_wait:
+                logger.info(f"Skipping {name}: outbound quota exhausted")
+                return False
+            time.sleep(result.retry_after)
+            waited += result.retry_after
+        return True
+
+    @staticmethod
+    async def _atake_quota(name):
+        quota = get_provider_quota(name)
+        if quota is None or (await quota.ahit('calls')).allowed:
+            return True
+        logger.info(f"Skipping {name}: outbound quota exhausted")
+        return False
+
+    @staticmethod
+    def _call_client(client, method, args, kwargs, accept):
+        result = getattr(client, method)(*args, **kwargs)
+        if accept is not None and not accept(result):
+            raise ValueError("Empty response")
+        return result
+
+    @staticmethod
+    async def _acall_client(client, method, args, kwargs, accept):
+        result = await getattr(client, method)(*args, **kwargs)
+        if accept is not None and not accept(result):
+            raise ValueError("Empty response")
+        return result
+
+    def _all_failed(self, label, errors):
+        error_msg = f"All AI providers failed {label}. Errors: {'; '.join(errors) or 'no provider available'}"
         logger.error(error_msg)
-        raise Exception(error_msg)
+        return Exception(error_msg)
+
+    def _dispatch(self, label, method, *args, accept=None, hedge=True, **kwargs):
+        """
+        Calls ``method`` on healthy providers in priority order until one succeeds.
+
+        With AI_ROUTER['HEDGING'] enabled, a second provider is fired once the
+        current one has been running longer than its p95 latency and whichever
+        answers first wins.
+        """
+        candidates = self._candidates(method)
+        if hedge and self.hedging and len(candidates) > 1:
+            return self._dispatch_hedged(label, method, candidates, args, kwargs, accept)
 
-    async def generate_questions_async(self, topic, difficulty, count=5, q_type="MCQ", additional_context=""):
         errors = []
-        
-        for name, client in self.clients:
+        for name, client in candidates:
+            if not self._take_quota(name):
+                errors.append(f"{name}: quota exhausted")
+                continue
             try:
-                # Check if client supports async generation
-                if not hasattr(client, 'generate_questions_async'):
-                    continue
+                logger.info(f"Attempting {label} with {name}...")
+                return get_breaker(name).call(self._call_client, client, method, args, kwargs, accept)
+            except Exception as e:
+                logger.warning(f"{name} failed {label}: {e}")
+                errors.append(f"{name}: {str(e)}")
+        raise self._all_failed(label, errors)
+
+    def _dispatch_hedged(self, label, method, candidates, args, kwargs, accept):
+        executor = _get_hedge_executor()
+        queue = list(candidates)
+        pending = {}
+        errors = []
 
-                if hasattr(client, 'async_client') and client.async_client is None:
-                     continue
-                
-                # HuggingFace check
-                if isinstance(client, HuggingFaceClient) and not client.api_key:
+        def launch():
+            while queue:
+                name, client = queue.pop(0)
+                if not self._take_quota(name):
+                    errors.append(f"{name}: quota exhausted")
                     continue
+                logger.info(f"Attempting {label} with {name}...")
+                future = executor.submit(
+                    get_breaker(name).call, self._call_client, client, method, args, kwargs, accept
+                )
+                pending[future] = name
+                return name
+            return None
 
-                logger.info(f"Attempting async question generation with {name}...")
-                return await client.generate_questions_async(topic, difficulty, count, q_type, additional_context)
-                
-            except Exception as e:
-                logger.warning(f"{name} failed async: {e}")
-                errors.append(f"{name}: {str(e)}")
+        current = launch()
+        while pending:
+            timeout = get_breaker(current).hedge_delay() if queue else None
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                logger.info(f"{current} exceeded hedge delay for {label}; hedging with {queue[0][0]}")
+                current = launch() or current
                 continue
-        
-        # If we get here, all clients failed
-        error_msg = f"All AI providers failed async generation. Errors: {'; '.join(errors)}"
-        logger.error(error_msg)
-        raise Exception(error_msg)
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    logger.warning(f"{name} failed {label}: {e}")
+                    errors.append(f"{name}: {str(e)}")
+            if not pending and queue:
+                current = launch()
+        raise self._all_failed(label, errors)
+
+    async def _adispatch(self, label, method, *args, accept=None, hedge=True, **kwargs):
+        """Async counterpart of :meth:`_dispatch`."""
+        candidates = await self._acandidates(method)
+        if hedge and self.hedging and len(candidates) > 1:
+            return await self._adispatch_hedged(label, method, candidates, args, kwargs, accept)
 
-    def generate_topics(self, subject):
         errors = []
-        for name, client in self.clients:
+        for name, client in candidates:
+            if not await self._atake_quota(name):
+                errors.append(f"{name}: quota exhausted")
+                continue
             try:
-                if hasattr(client, 'client') and client.client is None:
+                logger.info(f"Attempting {label} with {name}...")
+                return await get_breaker(name).acall(self._acall_client, client, method, args, kwargs, accept)
+            except Exception as e:
+                logger.warning(f"{name} failed {label}: {e}")
+                errors.append(f"{name}: {str(e)}")
+        raise self._all_failed(label, errors)
+
+    async def _adispatch_hedged(self, label, method, candidates, args, kwargs, accept):
+        queue = list(candidates)
+        pending = {}
+        errors = []
+
+        async def launch():
+            while queue:
+                name, client = queue.pop(0)
+                if not await self._atake_quota(name):
+                    errors.append(f"{name}: quota exhausted")
                     continue
-                
-                # HuggingFace check
-                if isinstance(client, HuggingFaceClient) and not client.api_key:
+                logger.info(f"Attempting {label} with {name}...")
+                task = asyncio.ensure_future(
+                    get_breaker(name).acall(self._acall_client, client, method, args, kwargs, accept)
+                )
+                pending[task] = name
+                return name
+            return None
+
+        current = await launch()
+        try:
+            while pending:
+                timeout = get_breaker(current).hedge_delay() if queue else None
+                done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.info(f"{current} exceeded hedge delay for {label}; hedging with {queue[0][0]}")
+                    current = await launch() or current
                     continue
+                for task in done:
+                    name = pending.pop(task)
+                    try:
+                        return task.result()
+                    except Exception as e:
+                        logger.warning(f"{name} failed {label}: {e}")
+                        errors.append(f"{name}: {str(e)}")
+                if not pending and queue:
+                    current = await launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise self._all_failed(label, errors)
 
-                logger.info(f"Attempting topic generation for '{subject}' with {name}...")
-                # Ensure the client has the method before calling
-                if hasattr(client, 'generate_topics'):
-                    return client.generate_topics(subject)
-                else:
-                    logger.warning(f"{name} client does not support topic generation.")
-                
-            except Exception as e:
-                logger.warning(f"{name} failed to generate topics: {e}")
-                errors.append(f"{name}: {str(e)}")
-                continue
+    def provider_health(self):
+        """Breaker state and latency percentiles for each provider."""
+        return [get_breaker(name).snapshot() for name, _ in self.clients]
 
-        error_msg = f"All AI providers failed to generate topics. Errors: {'; '.join(errors)}"
-        logger.error(error_msg)
-        raise Exception(error_msg)
+    def generate_questions(self, topic, difficulty, count=5, q_type="MCQ", additional_context="", use_cache=True):
+        """
+        ``use_cache=False`` always asks a provider. Exam top-ups need it: their
+        prompts repeat between exams, and a replayed batch adds no new questions.
+        """
+        if not use_cache:
+            return self._generate_questions(topic, difficulty, count, q_type, additional_context)
+        return self.cache.fetch(
+            'generate_questions',
+            self._question_prompt(topic, difficulty, count, q_type, additional_context),
+            lambda: self._generate_questions(topic, difficulty, count, q_type, additional_context),
+            model=self._model_signature(),
+            temperature=0.7,
+        )
+
+    def _generate_questions(self, topic, difficulty, count=5, q_type="MCQ", additional_context=""):
+        return self._dispatch(
+            "question generation", "generate_questions",
+            topic, difficulty, count, q_type, additional_context,
+        )
+
+    async def generate_questions_async(self, topic, difficulty, count=5, q_type="MCQ", additional_context="",
+                                       use_cache=True):
+        if not use_cache:
+            return await self._generate_questions_async(topic, difficulty, count, q_type, additional_context)
+        return await self.cache.afetch(
+            'generate_questions',
+            self._question_prompt(topic, difficulty, count, q_type, additional_context),
+            lambda: self._generate_questions_async(topic, difficulty, count, q_type, additional_context),
+            model=self._model_signature(),
+            temperature=0.7,
+        )
+
+    async def _generate_questions_async(self, topic, difficulty, count=5, q_type="MCQ", additional_context=""):
+        return await self._adispatch(
+            "async question generation", "generate_questions_async",
+            topic, difficulty, count, q_type, additional_context,
+        )
+
+    def generate_topics(self, subject):
+        return self.cache.fetch(
+            'generate_topics',
+            {'subject': subject},
+            lambda: self._generate_topics(subject),
+            model=self._model_signature(),
+            temperature=0.7,
+        )
+
+    def _generate_topics(self, subject):
+        return self._dispatch(f"topic generation for '{subject}'", "generate_topics", subject)
 
     def generate_study_plan(self, exam_type, subjects, days_available, difficulty_level, daily_hours, weekly_days):
         """Generate a study plan using AI providers."""
-        errors = []
-        
-        prompt = f"""Create a structured study plan with the following requirements:
-Exam Type: {exam_type}
-Subjects: {', '.join(subjects)}
-Days Available: {days_available}
-Daily Study Hours: {daily_hours}
-Weekly Study Days: {weekly_days}
-Difficulty Level: {difficulty_level}
-
-Return a JSON response with:
-- topic_sequence: list of topics to study in order with estimated hours each
-- revision_schedule: recommended revision topics
-- study_pace: recommended daily schedule structure
-"""
-        
-        for name, client in self.clients:
-            try:
-                if hasattr(client, 'client') and client.client is None:
-                    continue
-                
-                # HuggingFace check
-                if isinstance(client, HuggingFaceClient) and not client.api_key:
-                    continue
+        return self.cache.fetch(
+            'generate_study_plan',
+            {
+                'exam_type': exam_type,
+                'subjects': list(subjects),
+                'days_available': days_available,
+                'difficulty_level': difficulty_level,
+                'daily_hours': daily_hours,
+                'weekly_days': weekly_days,
+            },
+            lambda: self._generate_study_plan(exam_type, subjects, days_available, difficulty_level, daily_hours, weekly_days),
+            model=self._model_signature(),
+            temperature=0.7,
+        )
 
-                logger.info(f"Attempting study plan generation with {name}...")
-                # Use generate_questions with study plan context as fallback
-                if hasattr(client, 'generate_study_plan'):
-                    return client.generate_study_plan(exam_type, subjects, days_available, difficulty_level, daily_hours, weekly_days)
-                else:
-                    # Fallback to generating a high-level response
-                    logger.debug(f"{name} client does not support direct study plan generation, using fallback.")
-                    continue
-                
-            except Exception as e:
-                logger.warning(f"{name} failed to generate study plan: {e}")
-                errors.append(f"{name}: {str(e)}")
-                continue
-        
-        logger.warning(f"AI-based study plan generation failed. Using template-based approach. Errors: {'; '.join(errors)}")
-        return None  # Return None to trigger template-based generation
+    def _generate_study_plan(self, exam_type, subjects, days_available, difficulty_level, daily_hours, weekly_days):
+        try:
+            return self._dispatch(
+                "study plan generation", "generate_study_plan",
+                exam_type, subjects, days_available, difficulty_level, daily_hours, weekly_days,
+            )
+        except Exception as e:
+            logger.warning(f"AI-based study plan generation failed. Using template-based approach. {e}")
+            return None  # Return None to trigger template-based generation
+
+    def _grading_prompt(self, question_text, user_answer, model_answer, subject, exam_type):
+        return {
+            'question': question_text,
+            'answer': user_answer,
+            'model_answer': model_answer,
+            'subject': subject,
+            'exam_type': exam_type,
+        }
 
     def grade_theory_question(self, question_text, user_answer, model_answer, subject, exam_type):
         """Grades a theory/essay question response."""
-        errors = []
-        for name, client in self.clients:
-            try:
-                if hasattr(client, 'client') and client.client is None:
-                    continue
-                
-                if hasattr(client, 'grade_theory_question'):
-                    logger.info(f"Attempting theory grading with {name}...")
-                    return client.grade_theory_question(question_text, user_answer, model_answer, subject, exam_type)
-            except Exception as e:
-                logger.warning(f"{name} failed to grade theory: {e}")
-                errors.append(f"{name}: {str(e)}")
-                continue
-        raise Exception(f"All AI providers failed theory grading. Errors: {'; '.join(errors)}")
+        return self.cache.fetch(
+            'grade_theory',
+            self._grading_prompt(question_text, user_answer, model_answer, subject, exam_type),
+            lambda: self._grade_theory_question(question_text, user_answer, model_answer, subject, exam_type),
+            model=self._model_signature(),
+            temperature=0.3,
+        )
+
+    def _grade_theory_question(self, question_text, user_answer, model_answer, subject, exam_type):
+        return self._dispatch(
+            "theory grading", "grade_theory_question",
+            question_text, user_answer, model_answer, subject, exam_type,
+        )
 
     async def grade_theory_question_async(self, question_text, user_answer, model_answer, subject, exam_type):
         """Grades a theory/essay question response asynchronously."""
-        errors = []
-        for name, client in self.clients:
-            try:
-                # Assuming AsyncGroq, etc. handle this
-                if hasattr(client, 'grade_theory_question_async'):
-                    logger.info(f"Attempting async theory grading with {name}...")
-                    return await client.grade_theory_question_async(question_text, user_answer, model_answer, subject, exam_type)
-            except Exception as e:
-                logger.warning(f"{name} failed async theory grade: {e}")
-                errors.append(f"{name}: {str(e)}")
-                continue
-        
-        # Fallback to sync if async failed or not implemented
-        return self.grade_theory_question(question_text, user_answer, model_answer, subject, exam_type)
-    def generate_chat_response(self, message, conversation_history=None, system_prompt=None, context=None):
-        """Generate a chat response using AI providers with conversation context."""
-        errors = []
-        
-        for name, client in self.clients:
-            try:
-                if hasattr(client, 'client') and client.client is None:
-                    continue
-                
-                # HuggingFace check
-                if isinstance(client, HuggingFaceClient) and not client.api_key:
-                    continue
+        return await self.cache.afetch(
+            'grade_theory',
+            self._grading_prompt(question_text, user_answer, model_answer, subject, exam_type),
+            lambda: self._grade_theory_question_async(question_text, user_answer, model_answer, subject, exam_type),
+            model=self._model_signature(),
+            temperature=0.3,
+        )
 
-                logger.info(f"Attempting chat response generation with {name}...")
-                
-                # Check for active document context
-                document_context = ""
-                active_document_id = (context or {}).get('active_document_id')
-                
-                if active_document_id:
-                    # Use RAG to get relevant context
-                    document_context = self._get_document_context(active_document_id, message)
-
-                # Build the prompt with conversation history
-                if conversation_history:
-                    # Format history for context
-                    history_context = "\n".join([
-                        f"{'Student' if msg['role'] == 'user' else 'Tutor'}: {msg['content']}"
-                        for msg in conversation_history[-5:]  # Last 5 messages
-                    ])
-                    full_message = f"{document_context}\n{history_context}\nStudent: {message}\nTutor:"
-                else:
-                    full_message = f"{document_context}\nStudent: {message}\nTutor:"
-                
-                # Use the base generate_response method
-                if hasattr(client, 'generate_response'):
-                    # Extract image_data from context if available
-                    image_data = (context or {}).get('image_data')
-                    
-                    response = client.generate_response(
-                        prompt=full_message,
-                        system_prompt=system_prompt,
-                        temperature=0.7,
-                        max_tokens=1024,
-                        image_data=image_data
-                    )
-                    if response:
-                        # Validate and fix math formatting before returning
-                        validated_response = self._validate_and_fix_math_formatting(response)
-                        return validated_response
-                
-            except Exception as e:
-                logger.warning(f"{name} failed to generate chat response: {e}")
-                errors.append(f"{name}: {str(e)}")
-                continue
-        
-        error_msg = f"All AI providers failed to generate chat response. Errors: {'; '.join(errors)}"
-        logger.error(error_msg)
-        raise Exception(error_msg)
+    async def _grade_theory_question_async(self, question_text, user_answer, model_answer, subject, exam_type):
+        from asgiref.sync import sync_to_async
+
+        try:
+            return await self._adispatch(
+                "async theory grading", "grade_theory_question_async",
+                question_text, user_answer, model_answer, subject, exam_type,
+            )
+        except Exception as e:
+            logger.warning(f"Async theory grading failed, falling back to sync: {e}")
+
+        # Fallback to sync if async failed or not implemented (providers without an
+        # async client); in a worker thread so concurrent gradings keep running
+        return await sync_to_async(self._grade_theory_question, thread_sensitive=False)(
+            question_text, user_answer, model_answer, subject, exam_type
+        )
+
+    def _build_chat_prompt(self, message, conversation_history=None, context=None, system_prompt=None):
+        """
+        Builds the provider-agnostic chat prompt: document context, the rolling
+        summary (``context['conversation_summary']``) and recent history, fitted
+        to AI_PROMPT_BUDGET by assemble_chat_prompt. Returns an AssembledPrompt.
+        """
+        context = context or {}
+        document_context = ""
+        active_document_id = context.get('active_document_id')
+
+        if context.get('user_id') and (context.get('document_ids') or context.get('search_library')):
+            # Multi-document RAG over the user's library (optionally restricted)
+            document_context = self._get_library_context(
+                context['user_id'], message, document_ids=context.get('document_ids') or None
+            )
+        elif active_document_id:
+            # Use RAG to get relevant context
+            document_context = self._get_document_context(active_document_id, message)
+
+        assembled = assemble_chat_prompt(
+            message,
+            system_prompt=system_prompt,
+            summary=context.get('conversation_summary'),
+            history=conversation_history,
+            document_context=document_context,
+        )
+        usage = assembled.usage
+        logger.info(
+            f"Chat prompt: {usage['total']} tokens (unbudgeted {usage['unbudgeted']}; "
+            f"system {usage['system']}, summary {usage['summary']}, "
+            f"history {usage['history']} in {usage['history_turns']} turns, context {usage['context']})"
+        )
+        return assembled
+
+    def summarize_conversation(self, previous_summary, turns, max_tokens=400):
+        """Fold ``turns`` (oldest first) into ``previous_summary``; returns the new summary."""
+        transcript = "\n".join(format_turn(turn) for turn in turns)
+        return self._dispatch(
+            "conversation summary", "generate_response",
+            prompt=PromptTemplates.get_conversation_summary_prompt(previous_summary, transcript),
+            system_prompt="You maintain concise running notes of a tutoring conversation.",
+            temperature=0.2,
+            max_tokens=max_tokens,
+            accept=bool,
+        ).strip()
+
+    def generate_chat_response(self, message, conversation_history=None, system_prompt=None, context=None,
+                               prompt_usage=None):
+        """
+        Generate a chat response using AI providers with conversation context.
+        If given, ``prompt_usage`` (a dict) receives the prompt's token usage.
+        """
+        assembled = self._build_chat_prompt(message, conversation_history, context, system_prompt)
+        if prompt_usage is not None:
+            prompt_usage.update(assembled.usage)
+
+        response = self._dispatch(
+            "chat response generation", "generate_response",
+            prompt=assembled.prompt,
+            system_prompt=system_prompt,
+            temperature=0.7,
+            max_tokens=1024,
+            image_data=(context or {}).get('image_data'),
+            accept=bool,
+        )
+        # Validate and fix math formatting before returning
+        return self._validate_and_fix_math_formatting(response)
 
     def _validate_and_fix_math_formatting(self, response_text):
         """
@@ -252,115 +505,219 @@ Return a JSON response with:
         # Just return as-is since the AI is instructed to use ÷ and / symbols
         return response_text
 
-    def stream_chat_response(self, message, conversation_history=None, system_prompt=None, context=None):
+    def stream_chat_response(self, message, conversation_history=None, system_prompt=None, context=None,
+                             prompt_usage=None):
         """
         Streams a chat response using AI providers with conversation context.
-        Yields chunks of text.
+        Yields chunks of text. ``prompt_usage`` as in generate_chat_response.
         """
         errors = []
-        
-        for name, client in self.clients:
-            try:
-                if hasattr(client, 'client') and client.client is None:
-                    continue
-                
-                # HuggingFace check
-                if isinstance(client, HuggingFaceClient) and not client.api_key:
-                    continue
+        assembled = self._build_chat_prompt(message, conversation_history, context, system_prompt)
+        if prompt_usage is not None:
+            prompt_usage.update(assembled.usage)
+        full_message = assembled.prompt
 
+        for name, client in self._candidates('generate_response'):
+            if not self._take_quota(name):
+                errors.append(f"{name}: quota exhausted")
+                continue
+            breaker = get_breaker(name)
+            if not breaker.allow_request():
+                errors.append(f"{name}: circuit breaker open")
+                continue
+            start = time.monotonic()
+            try:
                 logger.info(f"Attempting streaming chat response generation with {name}...")
-                
-                # Check for active document context
-                document_context = ""
-                active_document_id = (context or {}).get('active_document_id')
-                
-                if active_document_id:
-                     # Use RAG to get relevant context
-                    document_context = self._get_document_context(active_document_id, message)
-
-                # Build the prompt with conversation history
-                if conversation_history:
-                    history_context = "\n".join([
-                        f"{'Student' if msg['role'] == 'user' else 'Tutor'}: {msg['content']}"
-                        for msg in conversation_history[-5:]
-                    ])
-                    full_message = f"{document_context}\n{history_context}\nStudent: {message}\nTutor:"
-                else:
-                    full_message = f"{document_context}\nStudent: {message}\nTutor:"
-                
+
                 # Check if client supports streaming
                 if hasattr(client, 'stream_response'):
-                    # Extract image_data from context if available
-                    image_data = (context or {}).get('image_data')
-                    
+                    first_chunk_latency = None
                     for chunk in client.stream_response(
                         prompt=full_message,
                         system_prompt=system_prompt,
                         temperature=0.7,
                         max_tokens=1024,
-                        image_data=image_data
+                        image_data=(context or {}).get('image_data')
                     ):
+                        if first_chunk_latency is None:
+                            first_chunk_latency = time.monotonic() - start
                         yield chunk
+                    breaker.record_success(first_chunk_latency)
                     return  # Success, stop trying other clients
-                
+
                 # Fallback to non-streaming if streaming not supported but client works
-                elif hasattr(client, 'generate_response'):
-                    logger.info(f"{name} does not support streaming, falling back to full response.")
-                    response = client.generate_response(
-                        prompt=full_message,
-                        system_prompt=system_prompt,
-                        temperature=0.7,
-                        max_tokens=1024
-                    )
-                    if response:
-                        yield response  # Yield full response as one chunk
-                        return
-                
+                logger.info(f"{name} does not support streaming, falling back to full response.")
+                response = client.generate_response(
+                    prompt=full_message,
+                    system_prompt=system_prompt,
+                    temperature=0.7,
+                    max_tokens=1024
+                )
+                breaker.record_success(time.monotonic() - start)
+                if response:
+                    yield response  # Yield full response as one chunk
+                    return
+
             except Exception as e:
+                breaker.record_failure(time.monotonic() - start)
                 logger.warning(f"{name} failed to stream chat response: {e}")
                 errors.append(f"{name}: {str(e)}")
                 continue
-        
+
         error_msg = f"All AI providers failed to stream chat response. Errors: {'; '.join(errors)}"
         logger.error(error_msg)
-        # Don't raise exception here as it breaks the generator pattern easily, 
+        # Don't raise exception here as it breaks the generator pattern easily,
         # or yield an error message? Better to raise so caller knows.
         raise Exception(error_msg)
 
-    def generate_embedding(self, text):
+    async def astream_chat_response(self, message, conversation_history=None, system_prompt=None, context=None,
+                                    prompt_usage=None):
         """
-        Generate vector embedding for text using available clients.
-        Prioritizes clients that support embedding (Cohere, Mistral).
+        Async generator counterpart of :meth:`stream_chat_response`.
+
+        Providers with ``astream_response`` are iterated on the event loop, so
+        a streaming reply holds no worker thread. Others fall back to one
+        ``generate_response`` call off the loop. Once a provider has produced
+        text, a later failure is raised rather than retried on the next
+        provider, so the client never receives the answer twice.
         """
+        from asgiref.sync import sync_to_async
+
         errors = []
-        for name, client in self.clients:
+        # Document retrieval queries the database
+        assembled = await sync_to_async(self._build_chat_prompt)(message, conversation_history, context, system_prompt)
+        if prompt_usage is not None:
+            prompt_usage.update(assembled.usage)
+        request = {
+            'prompt': assembled.prompt,
+            'system_prompt': system_prompt,
+            'temperature': 0.7,
+            'max_tokens': 1024,
+        }
+
+        for name, client in await self._acandidates('generate_response'):
+            if not await self._atake_quota(name):
+                errors.append(f"{name}: quota exhausted")
+                continue
+            breaker = get_breaker(name)
+            if not await breaker.aallow_request():
+                errors.append(f"{name}: circuit breaker open")
+                continue
+            start = time.monotonic()
+            first_chunk_latency = None
             try:
-                if hasattr(client, 'client') and client.client is None:
-                    continue
-                
-                # Check if client supports embedding
-                if not hasattr(client, 'generate_embedding'):
-                    continue
+                logger.info(f"Attempting async streaming chat response generation with {name}...")
+
+                if hasattr(client, 'astream_response'):
+                    async for chunk in client.astream_response(image_data=(context or {}).get('image_data'), **request):
+                        if first_chunk_latency is None:
+                            first_chunk_latency = time.monotonic() - start
+                        yield chunk
+                    await breaker.arecord_success(first_chunk_latency)
+                    return
+
+                logger.info(f"{name} does not support async streaming, falling back to full response.")
+                response = await sync_to_async(client.generate_response, thread_sensitive=False)(**request)
+                await breaker.arecord_success(time.monotonic() - start)
+                if response:
+                    yield response
+                    return
 
-                logger.info(f"Attempting embedding generation with {name}...")
-                return client.generate_embedding(text)
-                
             except Exception as e:
-                logger.warning(f"{name} failed to generate embedding: {e}")
+                await breaker.arecord_failure(time.monotonic() - start)
+                logger.warning(f"{name} failed to stream chat response: {e}")
+                if first_chunk_latency is not None:
+                    raise
                 errors.append(f"{name}: {str(e)}")
+
+        raise self._all_failed("to stream chat response", errors)
+
+    def generate_embedding(self, text):
+        """
+        Generate vector embedding for text using available clients.
+        Prioritizes clients that support embedding (Cohere, Mistral).
+        """
+        # Never hedged: the query and stored chunk vectors must come from the
+        # same provider's embedding space whenever possible.
+        return self._dispatch("embedding generation", "generate_embedding", text, hedge=False)
+
+    def generate_embeddings(self, texts):
+        """
+        Generate embeddings for many texts with as few round trips as possible.
+
+        Texts are packed into the provider's maximum batch size and the batches
+        are sent concurrently (bounded by AI_EMBEDDINGS['EMBEDDING_CONCURRENCY']).
+        Only failed batches are retried. All vectors come from one provider so
+        they share an embedding space; texts that still fail after the retries
+        come back as None.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+
+        config = get_embedding_config()
+        errors = []
+        for name, client in self._candidates('generate_embeddings'):
+            size = max(1, getattr(client, 'EMBEDDING_BATCH_SIZE', 1))
+            pending = {start: texts[start:start + size] for start in range(0, len(texts), size)}
+            if not self._take_quota(name, calls=len(pending), max_wait=config['EMBEDDING_QUOTA_WAIT']):
+                errors.append(f"{name}: quota exhausted")
                 continue
+            results = [None] * len(texts)
+            embedded = 0
 
-        error_msg = f"All AI providers failed to generate embedding. Errors: {'; '.join(errors)}"
-        logger.error(error_msg)
-        raise Exception(error_msg)
+            for attempt in range(config['EMBEDDING_RETRIES'] + 1):
+                if attempt:
+                    if get_breaker(name).is_open():
+                        break
+                    time.sleep(config['EMBEDDING_RETRY_BACKOFF'] * 2 ** (attempt - 1))
+                    logger.info(f"Retrying {len(pending)} failed embedding batches with {name}")
+                failed = self._embed_batches(name, client, pending, results, errors)
+                embedded += len(pending) - len(failed)
+                pending = failed
+                if not pending:
+                    break
+
+            if embedded:
+                if pending:
+                    missing = sum(len(batch) for batch in pending.values())
+                    logger.error(f"{name} could not embed {missing}/{len(texts)} texts")
+                return results
+
+        raise self._all_failed("embedding generation", errors)
+
+    def _embed_batches(self, name, client, batches, results, errors):
+        """Embed ``batches`` ({offset: texts}) concurrently into ``results``; returns failed batches."""
+        breaker = get_breaker(name)
+        failed = {}
+        workers = min(len(batches), get_embedding_config()['EMBEDDING_CONCURRENCY'])
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ai-embed') as executor:
+            futures = {
+                executor.submit(
+                    breaker.call, self._call_client, client, 'generate_embeddings', (batch,), {},
+                    lambda vectors, n=len(batch): vectors is not None and len(vectors) == n,
+                ): start
+                for start, batch in batches.items()
+            }
+            for future in as_completed(futures):
+                start = futures[future]
+                try:
+                    vectors = future.result()
+                except Exception as e:
+                    logger.warning(f"{name} failed embedding batch at offset {start}: {e}")
+                    errors.append(f"{name}: {str(e)}")
+                    failed[start] = batches[start]
+                    continue
+                results[start:start + len(vectors)] = vectors
+        return failed
 
     def _get_document_context(self, document_id, query, k=3):
         """
         Retrieves relevant document chunks using vector similarity.
         """
         try:
-            from apps.study_tools.models import Document, DocumentChunk
-            import numpy as np
+            from apps.study_tools.models import Document
+            from apps.study_tools.services.vector_store import get_vector_store
 
             # Get document and check existence
             try:
@@ -373,40 +730,15 @@ Return a JSON response with:
                 logger.warning(f"Document {document_id} has no chunks. Returning first 5000 chars.")
                 return f"\n\nCONTEXT FROM DOCUMENT '{doc.title}':\n{doc.content[:5000] if doc.content else ''}\n\nINSTRUCTION: Answer based on the context above."
 
-            # Generate query embedding
+            # Generate query embedding and rank the document's chunks
             query_embedding = self.generate_embedding(query)
-            
-            chunks = list(doc.chunks.all().values('id', 'content', 'embedding', 'chunk_index'))
-            
-            if not chunks:
+            top_chunks = get_vector_store().search(document_id, query_embedding, k=k)
+
+            if not top_chunks:
                  return ""
 
-            # Calculate cosine similarity
-            # Sim(A, B) = dot(A, B) / (norm(A) * norm(B))
-            
-            query_vec = np.array(query_embedding)
-            query_norm = np.linalg.norm(query_vec)
-            
-            scored_chunks = []
-            for chunk in chunks:
-                chunk_vec = np.array(chunk['embedding'])
-                chunk_norm = np.linalg.norm(chunk_vec)
-                
-                if chunk_norm == 0 or query_norm == 0:
-                    similarity = 0
-                else:
-                    similarity = np.dot(query_vec, chunk_vec) / (query_norm * chunk_norm)
-                
-                scored_chunks.append((similarity, chunk))
-            
-            # Sort by similarity desc
-            scored_chunks.sort(key=lambda x: x[0], reverse=True)
-            
-            # Take top K
-            top_chunks = scored_chunks[:k]
-            
             # Format context
-            context_text = "\n...\n".join([c[1]['content'] for c in top_chunks])
+            context_text = "\n...\n".join([c['content'] for c in top_chunks])
             
             logger.info(f"Retrieved {len(top_chunks)} chunks for document {document_id}")
             
@@ -414,4 +746,43 @@ Return a JSON response with:
 
         except Exception as e:
             logger.error(f"Error retrieving document context: {e}")
-            return ""
\ No newline at end of file
+            return ""
+
+
+    def _get_library_context(self, user_id, query, k=5, document_ids=None):
+        """
+        Retrieves relevant chunks from all of a user's documents (or the given
+        subset) through the per-user library index.
+        """
+        try:
+            from apps.study_tools.services.library_index import get_library_index
+
+            query_embedding = self.generate_embedding(query)
+            top_chunks = get_library_index().search(user_id, query_embedding, k=k, document_ids=document_ids)
+            if not top_chunks:
+                return ""
+
+            context_text = "\n...\n".join(
+                f"[{c['document_title']}] {c['content']}" for c in top_chunks
+            )
+            logger.info(f"Retrieved {len(top_chunks)} library chunks for user {user_id}")
+
+            return f"\n\nCONTEXT FROM YOUR DOCUMENTS:\n{context_text}\n\nINSTRUCTION: Answer based on the context above."
+
+        except Exception as e:
+            logger.error(f"Error retrieving library context: {e}")
+            return ""
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_ai_router():
+    """Return the process-wide AIRouter (stateless, safe to share across threads)."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = AIRouter()
+    return _router
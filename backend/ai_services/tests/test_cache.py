@@ -0,0 +1,66 @@
+from django.test import SimpleTestCase, override_settings
+
+from ai_services.cache import AIResponseCache, CachedProviderFailure
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "ai-cache-tests"}
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AIResponseCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = AIResponseCache()
+        self.cache.backend.clear()
+        self.calls = 0
+
+    def _producer(self, value):
+        def produce():
+            self.calls += 1
+            return value
+        return produce
+
+    def test_key_is_normalized(self):
+        a = self.cache.make_key("generate_questions", {"topic": "Cells  ", "count": 5}, "m", 0.7)
+        b = self.cache.make_key("generate_questions", {"count": 5, "topic": " Cells"}, "m", 0.7)
+        c = self.cache.make_key("generate_questions", {"count": 5, "topic": "Cells"}, "m", 0.3)
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+
+    def test_hit_after_miss(self):
+        first = self.cache.fetch("generate_topics", {"subject": "Biology"}, self._producer({"topics": [1]}))
+        second = self.cache.fetch("generate_topics", {"subject": "Biology"}, self._producer({"topics": [2]}))
+        self.assertEqual(first, second)
+        self.assertEqual(self.calls, 1)
+        stats = self.cache.stats()["generate_topics"]
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["local_hits"], 1)
+
+    def test_shared_backend_hit(self):
+        self.cache.fetch("generate_topics", {"subject": "Physics"}, self._producer(["a"]))
+        self.cache.clear_local()
+        self.assertEqual(self.cache.fetch("generate_topics", {"subject": "Physics"}, self._producer(["b"])), ["a"])
+        self.assertEqual(self.cache.stats()["generate_topics"]["hits"], 1)
+
+    def test_none_is_not_cached(self):
+        self.cache.fetch("generate_study_plan", {"x": 1}, self._producer(None))
+        self.cache.fetch("generate_study_plan", {"x": 1}, self._producer(None))
+        self.assertEqual(self.calls, 2)
+
+    def test_failures_are_negatively_cached(self):
+        def failing():
+            self.calls += 1
+            raise Exception("All AI providers failed")
+
+        with self.assertRaises(Exception):
+            self.cache.fetch("grade_theory", {"q": 1}, failing)
+        with self.assertRaises(CachedProviderFailure):
+            self.cache.fetch("grade_theory", {"q": 1}, failing)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.cache.stats()["grade_theory"]["negative_hits"], 1)
+
+    def test_cached_values_are_copies(self):
+        value = self.cache.fetch("generate_questions", {"t": 1}, self._producer({"questions": []}))
+        value["questions"].append("mutated")
+        again = self.cache.fetch("generate_questions", {"t": 1}, self._producer(None))
+        self.assertEqual(again, {"questions": []})
@@ -0,0 +1,90 @@
+from django.test import SimpleTestCase
+
+from ai_services.prompt_budget import (
+    CHUNK_SEPARATOR,
+    DEFAULTS,
+    assemble_chat_prompt,
+    estimate_tokens,
+    truncate_to_tokens,
+)
+from ai_services.tokens import get_token_estimator
+
+
+def turns(count, words=40):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"turn{i} " + "word " * words}
+        for i in range(count)
+    ]
+
+
+class PromptBudgetTest(SimpleTestCase):
+    def config(self, **overrides):
+        return {**DEFAULTS, **overrides}
+
+    def test_estimate_and_truncate(self):
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("Hello, world"), 3)
+        text = "one two three four five six seven eight"
+        start = truncate_to_tokens(text, 6)
+        self.assertTrue(start.startswith("one two") and start.endswith("..."))
+        self.assertLessEqual(estimate_tokens(start), 6)
+        end = truncate_to_tokens(text, 8, keep='end')
+        self.assertTrue(end.startswith("... ") and end.endswith(" seven eight"))
+        self.assertLessEqual(estimate_tokens(end), 8)
+        self.assertEqual(truncate_to_tokens(text, 100), text)
+
+    def test_shares_the_chunking_estimator(self):
+        from apps.study_tools.services.chunking import get_chunker
+
+        self.assertIs(get_chunker().estimator, get_token_estimator())
+        text = "Photosynthesis converts light energy into chemical energy."
+        self.assertEqual(estimate_tokens(text), get_token_estimator().count(text))
+
+    def test_small_conversation_is_sent_whole(self):
+        history = turns(4, words=5)
+        assembled = assemble_chat_prompt("Why?", system_prompt="Be kind.", history=history, config=self.config())
+
+        for turn in history:
+            self.assertIn(turn["content"], assembled.prompt)
+        self.assertTrue(assembled.prompt.endswith("Student: Why?\nTutor:"))
+        self.assertEqual(assembled.usage["history_turns"], 4)
+
+    def test_budget_is_respected_and_recent_turns_kept(self):
+        context = CHUNK_SEPARATOR.join(f"chunk{i} " + "fact " * 200 for i in range(5))
+        assembled = assemble_chat_prompt(
+            "And then?",
+            system_prompt="You are a tutor.",
+            summary="We covered cells. " * 20,
+            history=turns(12, words=100),
+            document_context=context,
+            config=self.config(MAX_PROMPT_TOKENS=800),
+        )
+        usage = assembled.usage
+
+        self.assertLessEqual(usage["total"], 800)
+        self.assertGreater(usage["unbudgeted"], usage["total"])
+        # The last turns survive; older ones and trailing chunks go first
+        self.assertIn("turn11", assembled.prompt)
+        self.assertIn("turn10", assembled.prompt)
+        self.assertNotIn("turn0 ", assembled.prompt)
+        self.assertIn("chunk0", assembled.prompt)
+        self.assertNotIn("chunk4", assembled.prompt)
+        self.assertIn("SUMMARY OF THE CONVERSATION SO FAR", assembled.prompt)
+
+    def test_context_chunks_are_dropped_whole(self):
+        context = CHUNK_SEPARATOR.join(f"chunk{i} " + "fact " * 50 for i in range(4))
+        assembled = assemble_chat_prompt(
+            "Explain", document_context=context, config=self.config(MAX_PROMPT_TOKENS=150, CONTEXT_SHARE=1.0),
+        )
+
+        self.assertIn("chunk0", assembled.prompt)
+        self.assertNotIn("chunk2", assembled.prompt)
+        kept = assembled.prompt.split("\nStudent:")[0]
+        for chunk in kept.split(CHUNK_SEPARATOR):
+            self.assertTrue(chunk.rstrip().endswith("fact"))
+
+    def test_summary_is_capped(self):
+        assembled = assemble_chat_prompt(
+            "Next", summary="note " * 1000, config=self.config(SUMMARY_MAX_TOKENS=50),
+        )
+        self.assertLessEqual(assembled.usage["summary"], 60)
@@ -0,0 +1,149 @@
+import asyncio
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from ai_services.circuit_breaker import reset_breakers
+from ai_services.rate_limiter import (
+    LocalBackend,
+    RateLimit,
+    RateLimitBackend,
+    get_provider_quota,
+    get_rate_limit_config,
+    parse_rate,
+    reset_rate_limit_backend,
+)
+from ai_services.router import AIRouter
+
+from .test_router import LOCMEM_CACHES, FakeClient
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now * 1000
+
+
+class RateLimitTest(SimpleTestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.local = LocalBackend()
+        self.local._now_ms = self.clock
+        self.backend = mock.Mock(
+            run=lambda algorithm, key, *args: getattr(self.local, algorithm)(key, *args)
+        )
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate("50/h"), (50, 3600))
+        self.assertEqual(parse_rate("30/minute"), (30, 60))
+        self.assertEqual(parse_rate(None), (None, None))
+
+    def test_sliding_window_consumes_until_limit(self):
+        limit = RateLimit("chat", 3, 60, backend=self.backend)
+        results = [limit.hit(7) for _ in range(4)]
+
+        self.assertEqual([r.allowed for r in results], [True, True, True, False])
+        self.assertEqual([r.remaining for r in results[:3]], [2, 1, 0])
+        self.assertEqual(results[3].retry_after, 60)
+        # Other identities have their own window
+        self.assertTrue(limit.hit(8).allowed)
+
+    def test_sliding_window_weights_previous_window(self):
+        limit = RateLimit("chat", 3, 60, backend=self.backend)
+        for _ in range(3):
+            limit.hit(1)
+
+        # Half way through the next window, the previous 3 count as 1.5
+        self.clock.now = 90
+        self.assertTrue(limit.hit(1).allowed)
+        denied = limit.hit(1)
+        self.assertFalse(denied.allowed)
+        # 3 * (1 - e) + 1 + 1 <= 3 once e >= 2/3 of the window, i.e. at t=100
+        self.assertAlmostEqual(denied.retry_after, 10, places=2)
+
+        self.clock.now = 100
+        self.assertTrue(limit.hit(1).allowed)
+
+    def test_token_bucket_refills(self):
+        limit = RateLimit("provider:groq", 60, 60, algorithm="token_bucket", burst=2, backend=self.backend)
+        self.assertEqual([limit.hit("calls").allowed for _ in range(3)], [True, True, False])
+        self.assertEqual(limit.hit("calls").retry_after, 1)
+
+        self.clock.now = 1
+        self.assertTrue(limit.hit("calls").allowed)
+        self.assertFalse(limit.hit("calls").allowed)
+
+    def test_concurrent_hits_never_exceed_limit(self):
+        limit = RateLimit("chat", 25, 60, backend=RateLimitBackend({**get_rate_limit_config(), "BACKEND": "local"}))
+        allowed = []
+
+        def worker():
+            for _ in range(10):
+                allowed.append(limit.hit(1).allowed)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sum(allowed), 25)
+
+
+class RateLimitBackendTest(SimpleTestCase):
+    def test_falls_back_to_local_while_redis_is_down(self):
+        backend = RateLimitBackend({
+            **get_rate_limit_config(), "BACKEND": "redis", "REDIS_URL": "redis://127.0.0.1:1/0",
+        })
+        limit = RateLimit("chat", 2, 60, backend=backend)
+
+        with self.assertLogs("ai_services.rate_limiter", "WARNING"):
+            self.assertTrue(limit.hit(1).allowed)
+        with mock.patch.object(backend.redis, "run") as redis_run:
+            self.assertTrue(limit.hit(1).allowed)
+            self.assertFalse(limit.hit(1).allowed)
+        redis_run.assert_not_called()
+
+    def test_async_hit(self):
+        limit = RateLimit("chat", 1, 60, backend=RateLimitBackend({**get_rate_limit_config(), "BACKEND": "local"}))
+
+        async def run():
+            return [(await limit.ahit(1)).allowed for _ in range(2)]
+
+        self.assertEqual(asyncio.run(run()), [True, False])
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    AI_CACHE={"ENABLED": False},
+    AI_ROUTER={"CONSECUTIVE_FAILURES": 5, "STATE_REFRESH_SECONDS": 0},
+    AI_RATE_LIMIT={"BACKEND": "local", "PROVIDER_QUOTAS": {"a": "1/m"}},
+)
+class ProviderQuotaTest(SimpleTestCase):
+    def setUp(self):
+        reset_breakers()
+        reset_rate_limit_backend()
+
+    def tearDown(self):
+        reset_breakers()
+        reset_rate_limit_backend()
+
+    def test_exhausted_provider_is_skipped_without_tripping_breaker(self):
+        first, second = FakeClient(answer=["Cells"]), FakeClient(answer=["Genetics"])
+        router = AIRouter()
+        router.clients = [("A", first), ("B", second)]
+
+        self.assertEqual(router.generate_topics("Biology"), ["Cells"])
+        self.assertEqual(router.generate_topics("Chemistry"), ["Genetics"])
+        self.assertEqual((first.calls, second.calls), (1, 1))
+        self.assertEqual(router.provider_health()[0]["window_failures"], 0)
+
+    @override_settings(AI_RATE_LIMIT={"BACKEND": "local", "PROVIDER_QUOTAS": {"a": "20/s"}})
+    def test_costs_above_burst_are_charged_in_full(self):
+        self.assertFalse(AIRouter._take_quota("A", calls=30))
+        reset_rate_limit_backend()
+
+        self.assertTrue(AIRouter._take_quota("A", calls=30, max_wait=5))
+        self.assertFalse(get_provider_quota("A").hit("calls").allowed)
@@ -0,0 +1,57 @@
+import asyncio
+import threading
+
+from django.test import SimpleTestCase, override_settings
+
+from ai_services.registry import ClientRegistry
+
+
+@override_settings(GROQ_API_KEY="test-key", COHERE_API_KEY="test-key")
+class ClientRegistryTest(SimpleTestCase):
+    def setUp(self):
+        self.registry = ClientRegistry()
+
+    def tearDown(self):
+        self.registry.close()
+
+    def test_providers_are_built_once(self):
+        first = self.registry.providers()
+        second = self.registry.providers()
+        self.assertEqual([name for name, _ in first], ["Groq", "Mistral", "Cohere", "HuggingFace"])
+        for (_, a), (_, b) in zip(first, second):
+            self.assertIs(a, b)
+
+    def test_concurrent_lookups_share_one_client(self):
+        seen = []
+        threads = [threading.Thread(target=lambda: seen.append(self.registry.get("Groq"))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len({id(client) for client in seen}), 1)
+
+    def test_sync_clients_share_http_pool(self):
+        groq = self.registry.get("Groq")
+        cohere = self.registry.get("Cohere")
+        self.assertIs(groq.client._client, self.registry.http_client())
+        self.assertIsNotNone(cohere.client)
+
+    def test_async_handles_are_per_event_loop(self):
+        groq = self.registry.get("Groq")
+
+        async def handles():
+            return groq.async_client, groq.async_client
+
+        a1, a2 = asyncio.run(handles())
+        b1, _ = asyncio.run(handles())
+        self.assertIs(a1, a2)
+        self.assertIsNot(a1, b1)
+        # The first loop is closed, so its handles are dropped on the next lookup
+        self.assertEqual(len(self.registry._loop_handles), 1)
+
+    def test_async_http_client_is_closed_with_its_loop(self):
+        async def client():
+            return self.registry.async_http_client()
+
+        http = asyncio.run(client())
+        self.assertTrue(http.is_closed)
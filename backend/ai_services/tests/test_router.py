@@ -0,0 +1,311 @@
+import asyncio
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from ai_services.cache import AIResponseCache
+from ai_services.circuit_breaker import CircuitBreaker, get_breaker, reset_breakers
+from ai_services.router import AIRouter
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "ai-router-tests"}
+}
+
+
+class FakeClient:
+    def __init__(self, answer=None, delay=0.0, error=None):
+        self.client = object()
+        self.model = "fake"
+        self.answer = answer
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def generate_topics(self, subject):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.answer
+
+    async def generate_questions_async(self, *args):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.answer
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    AI_CACHE={"ENABLED": False},
+    AI_ROUTER={"CONSECUTIVE_FAILURES": 2, "COOLDOWN_SECONDS": 60, "STATE_REFRESH_SECONDS": 0},
+)
+class AIRouterDispatchTest(SimpleTestCase):
+    def setUp(self):
+        reset_breakers()
+        self.router = AIRouter()
+        self.router.cache = AIResponseCache()
+
+    def tearDown(self):
+        reset_breakers()
+
+    def test_falls_back_in_priority_order(self):
+        broken = FakeClient(error=RuntimeError("down"))
+        healthy = FakeClient(answer={"topics": ["Cells"]})
+        self.router.clients = [("A", broken), ("B", healthy)]
+        self.assertEqual(self.router.generate_topics("Biology"), {"topics": ["Cells"]})
+
+    def test_breaker_skips_tripped_provider(self):
+        broken = FakeClient(error=RuntimeError("down"))
+        healthy = FakeClient(answer=["ok"])
+        self.router.clients = [("A", broken), ("B", healthy)]
+
+        for _ in range(3):
+            self.router.generate_topics("Biology")
+
+        self.assertTrue(get_breaker("A").is_open())
+        self.assertEqual(broken.calls, 2)
+        self.assertEqual(healthy.calls, 3)
+
+    def test_all_failed_message(self):
+        self.router.clients = [("A", FakeClient(error=RuntimeError("down")))]
+        with self.assertRaisesMessage(Exception, "All AI providers failed"):
+            self.router.generate_topics("Biology")
+
+    def test_hedged_request_takes_fastest_answer(self):
+        self.router.hedging = True
+        slow = FakeClient(answer="slow", delay=0.5)
+        fast = FakeClient(answer="fast")
+        self.router.clients = [("Slow", slow), ("Fast", fast)]
+        get_breaker("Slow").config = {**get_breaker("Slow").config, "HEDGE_DEFAULT_DELAY": 0.05}
+
+        started = time.monotonic()
+        self.assertEqual(self.router.generate_topics("Biology"), "fast")
+        self.assertLess(time.monotonic() - started, 0.4)
+
+    def test_async_hedged_request_takes_fastest_answer(self):
+        self.router.hedging = True
+        slow = FakeClient(answer="slow", delay=0.5)
+        fast = FakeClient(answer="fast")
+        self.router.clients = [("Slow", slow), ("Fast", fast)]
+        get_breaker("Slow").config = {**get_breaker("Slow").config, "HEDGE_DEFAULT_DELAY": 0.05}
+
+        result = asyncio.run(self.router.generate_questions_async("Cells", "EASY"))
+        self.assertEqual(result, "fast")
+
+    def test_sync_grading_fallback_runs_off_the_event_loop(self):
+        class SyncGrader:
+            client = object()
+            async_client = None
+            model = "fake"
+
+            def grade_theory_question(self, *args):
+                time.sleep(0.3)
+                return {"score": 5}
+
+        self.router.clients = [("Sync", SyncGrader())]
+
+        async def grade_all():
+            return await asyncio.gather(*[
+                self.router.grade_theory_question_async(f"Q{i}", "answer", "model", "Biology", "WAEC")
+                for i in range(3)
+            ])
+
+        started = time.monotonic()
+        self.assertEqual(asyncio.run(grade_all()), [{"score": 5}] * 3)
+        # Three gradings overlap instead of blocking the loop one after another
+        self.assertLess(time.monotonic() - started, 0.8)
+
+
+class AsyncOnlyCache:
+    """Cache that fails the test on any blocking call."""
+
+    ASYNC_METHODS = {"aget", "aget_many", "aset", "aadd", "aincr", "adelete_many"}
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def __getattr__(self, name):
+        if name not in self.ASYNC_METHODS:
+            raise AssertionError(f"blocking cache call {name}() on the event loop")
+        return getattr(self.cache, name)
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    AI_CACHE={"ENABLED": False},
+    AI_ROUTER={"CONSECUTIVE_FAILURES": 2, "COOLDOWN_SECONDS": 60, "STATE_REFRESH_SECONDS": 0},
+)
+class CircuitBreakerTest(SimpleTestCase):
+    def setUp(self):
+        reset_breakers()
+
+    def tearDown(self):
+        reset_breakers()
+
+    def cool_down(self, *breakers):
+        shared = caches["default"]
+        for breaker in breakers:
+            breaker._open_until = time.time() - 1
+        shared.set(breakers[0]._open_key(), time.time() - 1)
+
+    def test_half_open_lets_one_probe_through(self):
+        breaker, other_process = CircuitBreaker("A"), CircuitBreaker("A")
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state(), "open")
+        self.assertFalse(other_process.allow_request())
+
+        self.cool_down(breaker, other_process)
+        self.assertEqual(breaker.state(), "half_open")
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+        self.assertFalse(other_process.allow_request())
+
+        # A failed probe re-opens; a successful one closes everywhere
+        breaker.record_failure()
+        self.assertEqual(breaker.state(), "open")
+        self.cool_down(breaker, other_process)
+        self.assertTrue(other_process.allow_request())
+        other_process.record_success(0.1)
+        self.assertEqual(other_process.state(), "closed")
+        self.assertEqual(breaker.state(), "closed")
+        self.assertTrue(breaker.allow_request())
+        self.assertTrue(breaker.allow_request())
+
+    def test_async_dispatch_uses_async_cache_api(self):
+        router = AIRouter()
+        router.cache = AIResponseCache()
+        router.clients = [("A", FakeClient(error=RuntimeError("down"))), ("B", FakeClient(answer="ok"))]
+
+        async def dispatch():
+            return [await router.generate_questions_async("Cells", "EASY") for _ in range(3)]
+
+        with mock.patch.object(CircuitBreaker, "backend", AsyncOnlyCache(caches["default"])):
+            self.assertEqual(asyncio.run(dispatch()), ["ok"] * 3)
+            self.assertEqual(asyncio.run(get_breaker("A").astate()), "open")
+
+
+class FakeStreamer:
+    def __init__(self, chunks=(), fail_after=None):
+        self.client = object()
+        self.model = "fake-stream"
+        self.chunks = list(chunks)
+        self.fail_after = fail_after
+
+    def generate_response(self, **kwargs):
+        return "".join(self.chunks)
+
+    async def astream_response(self, **kwargs):
+        for i, chunk in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise RuntimeError("stream dropped")
+            await asyncio.sleep(0)
+            yield chunk
+        if self.fail_after is not None and self.fail_after >= len(self.chunks):
+            raise RuntimeError("stream dropped")
+
+
+class FakeNonStreamer:
+    def __init__(self, answer):
+        self.client = object()
+        self.model = "fake"
+        self.answer = answer
+
+    def generate_response(self, **kwargs):
+        return self.answer
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    AI_ROUTER={"CONSECUTIVE_FAILURES": 5, "STATE_REFRESH_SECONDS": 0},
+)
+class AIRouterAsyncStreamTest(SimpleTestCase):
+    def setUp(self):
+        reset_breakers()
+        self.router = AIRouter()
+
+    def tearDown(self):
+        reset_breakers()
+
+    def collect(self):
+        async def run():
+            return [chunk async for chunk in self.router.astream_chat_response("Hi", system_prompt="Be kind")]
+        return asyncio.run(run())
+
+    def test_streams_on_the_loop_and_falls_back_before_first_chunk(self):
+        self.router.clients = [("A", FakeStreamer(["x"], fail_after=0)), ("B", FakeStreamer(["Hel", "lo"]))]
+        self.assertEqual(self.collect(), ["Hel", "lo"])
+
+    def test_non_streaming_provider_returns_one_chunk(self):
+        self.router.clients = [("A", FakeNonStreamer("Hello"))]
+        self.assertEqual(self.collect(), ["Hello"])
+
+    def test_failure_after_output_is_not_retried_elsewhere(self):
+        backup = FakeStreamer(["again"])
+        self.router.clients = [("A", FakeStreamer(["Hel", "lo"], fail_after=1)), ("B", backup)]
+
+        async def run():
+            received = []
+            with self.assertRaises(RuntimeError):
+                async for chunk in self.router.astream_chat_response("Hi"):
+                    received.append(chunk)
+            return received
+
+        self.assertEqual(asyncio.run(run()), ["Hel"])
+
+    def test_all_failed(self):
+        self.router.clients = [("A", FakeStreamer(["x"], fail_after=0))]
+        with self.assertRaisesMessage(Exception, "All AI providers failed to stream chat response"):
+            self.collect()
+
+
+class FakeEmbedder:
+    EMBEDDING_BATCH_SIZE = 2
+
+    def __init__(self, flaky_text=None, error=None):
+        self.client = object()
+        self.model = "fake-embed"
+        self.flaky_text = flaky_text
+        self.error = error
+        self.batches = []
+
+    def generate_embeddings(self, texts):
+        self.batches.append(list(texts))
+        if self.error:
+            raise self.error
+        if self.flaky_text in texts:
+            self.flaky_text = None
+            raise RuntimeError("timeout")
+        return [[float(len(text))] for text in texts]
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    AI_ROUTER={"CONSECUTIVE_FAILURES": 5, "STATE_REFRESH_SECONDS": 0},
+    AI_EMBEDDINGS={"EMBEDDING_RETRY_BACKOFF": 0},
+)
+class AIRouterEmbeddingsTest(SimpleTestCase):
+    def setUp(self):
+        reset_breakers()
+        self.router = AIRouter()
+
+    def tearDown(self):
+        reset_breakers()
+
+    def test_batches_and_retries_only_failed_batch(self):
+        embedder = FakeEmbedder(flaky_text="ccc")
+        self.router.clients = [("A", embedder)]
+
+        vectors = self.router.generate_embeddings(["a", "bb", "ccc", "dddd", "eeeee"])
+
+        self.assertEqual(vectors, [[1.0], [2.0], [3.0], [4.0], [5.0]])
+        self.assertEqual(len(embedder.batches), 4)
+        self.assertEqual(embedder.batches[-1], ["ccc", "dddd"])
+
+    def test_falls_back_when_provider_embeds_nothing(self):
+        self.router.clients = [("A", FakeEmbedder(error=RuntimeError("down"))), ("B", FakeEmbedder())]
+        self.assertEqual(self.router.generate_embeddings(["a", "bb"]), [[1.0], [2.0]])
@@ -0,0 +1,87 @@
+"""
+Token counting shared by prompt budgeting (prompt_budget.py) and document
+chunking (apps/study_tools/services/chunking.py), so a "200-token chunk"
+and a "6000-token prompt" are measured the same way.
+
+Counts use the tiktoken encoding AI_TOKENIZER['ENCODING'] when tiktoken is
+installed and otherwise CHARS_PER_TOKEN (about 4 for the Mistral/Cohere/
+Llama tokenizers on English text). None of the providers publish a
+tiktoken encoding, so ENCODING should be the closest match for the model
+the prompts are sized for; cl100k_base is within a few percent of them.
+"""
+import math
+import re
+import threading
+
+from django.conf import settings
+
+DEFAULTS = {
+    'ENCODING': 'cl100k_base',
+    'CHARS_PER_TOKEN': 4.0,
+}
+
+_WORD_START = re.compile(r'(?<=\s)\S')
+
+
+def get_tokenizer_config():
+    return {**DEFAULTS, **getattr(settings, 'AI_TOKENIZER', {})}
+
+
+class TokenEstimator:
+    """Counts (and cuts) text in tokens of one encoding."""
+
+    def __init__(self, chars_per_token=4.0, encoding='cl100k_base'):
+        self.chars_per_token = chars_per_token
+        try:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding(encoding)
+        except Exception:
+            self._encoding = None
+
+    def count(self, text):
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def truncate(self, text, max_tokens, keep='start'):
+        """The longest start (or end) of ``text`` that fits in ``max_tokens``."""
+        if max_tokens <= 0 or not text:
+            return ""
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text, disallowed_special=())
+            if len(tokens) <= max_tokens:
+                return text
+            kept = tokens[:max_tokens] if keep == 'start' else tokens[-max_tokens:]
+            return self._encoding.decode(kept).strip()
+
+        limit = int(max_tokens * self.chars_per_token)
+        if len(text) <= limit:
+            return text
+        # Cut on a word boundary when there is one
+        if keep == 'start':
+            space = text.rfind(' ', 0, limit + 1)
+            return text[:space].rstrip() if space > 0 else text[:limit]
+        cut = text[-limit:]
+        if text[-limit - 1].isspace():
+            return cut
+        start = _WORD_START.search(cut)
+        return cut[start.start():] if start else cut
+
+
+_estimators = {}
+_estimators_lock = threading.Lock()
+
+
+def get_token_estimator():
+    """Return the process-wide TokenEstimator configured by AI_TOKENIZER."""
+    config = get_tokenizer_config()
+    key = (config['ENCODING'], config['CHARS_PER_TOKEN'])
+    estimator = _estimators.get(key)
+    if estimator is None:
+        with _estimators_lock:
+            estimator = _estimators.get(key)
+            if estimator is None:
+                estimator = _estimators[key] = TokenEstimator(config['CHARS_PER_TOKEN'], config['ENCODING'])
+    return estimator
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class AiTutorConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.ai_tutor'
+    verbose_name = 'AI Tutor'
+
+    def ready(self):
+        import apps.ai_tutor.signals  # noqa
@@ -1,6 +1,7 @@
 """
 WebSocket consumer for real-time chat with AI tutor.
 """
+import asyncio
 import json
 import logging
 from channels.generic.websocket import AsyncWebsocketConsumer
@@ -17,6 +18,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
         self.session_id = self.scope['url_route']['kwargs']['session_id']
         self.user = self.scope.get('user')
         self.session = None
+        # Replies run as tasks so chat_ack frames are received while streaming
+        self.replies = set()
+        self.reply_lock = asyncio.Lock()
+        self.stream = None
         
         # Authenticate user
         if not self.user or self.user.is_anonymous:
@@ -48,6 +53,8 @@ class ChatConsumer(AsyncWebsocketConsumer):
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection."""
         logger.info(f"WebSocket disconnected: {close_code}")
+        for task in getattr(self, 'replies', ()):
+            task.cancel()
     
     async def receive(self, text_data):
         """Handle incoming WebSocket messages."""
@@ -56,7 +63,11 @@ class ChatConsumer(AsyncWebsocketConsumer):
             message_type = data.get('type')
             
             if message_type == 'chat_message':
-                await self.handle_chat_message(data)
+                task = asyncio.create_task(self.reply(data))
+                self.replies.add(task)
+                task.add_done_callback(self.replies.discard)
+            elif message_type == 'chat_ack':
+                self.handle_ack(data)
             else:
                 await self.send_error(f"Unknown message type: {message_type}")
         
@@ -66,10 +77,32 @@ class ChatConsumer(AsyncWebsocketConsumer):
             logger.error(f"Error handling message: {e}")
             await self.send_error("An error occurred processing your message")
     
+    async def reply(self, data):
+        """Handle chat messages one at a time, in the order received."""
+        async with self.reply_lock:
+            try:
+                await self.handle_chat_message(data)
+            except Exception as e:
+                logger.error(f"Error handling message: {e}")
+                await self.send_error("An error occurred processing your message")
+
+    def handle_ack(self, data):
+        """Pass the client's acknowledgement of a chat_chunk frame to the active stream."""
+        if self.stream is None:
+            return
+        message_id, delivery = self.stream
+        try:
+            seq = int(data.get('seq'))
+        except (TypeError, ValueError):
+            return
+        if data.get('message_id') == message_id:
+            delivery.ack(seq)
+
     async def handle_chat_message(self, data):
         """Handle a chat message from the user."""
         # Lazy imports to avoid AppRegistryNotReady
         from .services import ChatService, RateLimiter, ModerationService
+        from .services.stream_delivery import SlowClientError, StreamDelivery
         
         message = data.get('message', '').strip()
         image_data = data.get('image_data') # Base64 string
@@ -89,27 +122,18 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 await self.send_error(f"Message not allowed: {reason}")
                 return
         
-        # Check rate limit
-        is_allowed, remaining = await database_sync_to_async(
-            RateLimiter.check_rate_limit
-        )(self.user)
+        # Check and consume the rate limit in one atomic call, on the loop
+        rate_limit = await RateLimiter.aconsume(self.user)
         
-        if not is_allowed:
-            reset_time = await database_sync_to_async(
-                RateLimiter.get_reset_time
-            )(self.user)
+        if not rate_limit.allowed:
+            reset_time = RateLimiter.get_reset_time(rate_limit)
             await self.send_error(
                 f"Rate limit exceeded. Try again after {reset_time.strftime('%H:%M')}"
             )
             return
         
-        # Increment rate limit counter
-        await database_sync_to_async(
-            RateLimiter.increment_count
-        )(self.user)
-        
         # Save user message
-        user_message = await self.save_message('user', message, image_data)
+        user_message = await self.save_message('user', message, image_data, audit=True)
         
         # Send user message confirmation
         await self.send(text_data=json.dumps({
@@ -127,6 +151,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         }))
         
         # Generate AI response with streaming
+        client_closed = False
         try:
             chat_service = ChatService()
             
@@ -147,43 +172,37 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'timestamp': ai_message.timestamp.isoformat()
             }))
             
-            full_response = ""
-            
             # Add image_data to context for AI router
             if image_data:
                 # Pass full data URI for correct mime type handling
                 context['image_data'] = image_data
             
-            # Create iterator in sync context
-            iterator = await database_sync_to_async(
-                chat_service.stream_ai_response
-            )(self.session, message, context)
+            # Deltas are coalesced into frames; see services/stream_delivery.py
+            delivery = StreamDelivery(
+                lambda delta, seq, ack: self.send_chunk(ai_message, delta, seq, ack)
+            )
+            self.stream = (str(ai_message.id), delivery)
+            prompt_usage = {}
+            try:
+                async with delivery:
+                    # Chunks arrive on the event loop; no worker thread is held while streaming
+                    async for chunk in chat_service.astream_ai_response(
+                        self.session, message, context, prompt_usage=prompt_usage
+                    ):
+                        await delivery.write(chunk)
+            except SlowClientError as e:
+                logger.warning(f"Closing slow chat client for session {self.session_id}: {e}")
+                await self.save_stream_result(ai_message, delivery, prompt_usage)
+                client_closed = True
+                await self.close(code=1013)
+                return
+            finally:
+                self.stream = None
             
-            def get_next_chunk(it):
-                try:
-                    return next(it)
-                except StopIteration:
-                    return None # Sentinel value
+            full_response = delivery.text
             
-            # Iterate through chunks
-            while True:
-                # Get next chunk in thread
-                chunk = await database_sync_to_async(get_next_chunk)(iterator)
-                
-                if chunk is None:
-                    break
-                    
-                full_response += chunk
-                
-                # Send chunk
-                await self.send(text_data=json.dumps({
-                    'type': 'chat_chunk',
-                    'message_id': str(ai_message.id),
-                    'delta': chunk
-                }))
-            
-            # Update message details in DB
-            await self.update_message_content(ai_message, full_response)
+            # Update message details in DB and refresh the rolling summary
+            await self.save_stream_result(ai_message, delivery, prompt_usage)
             
             # Send final message to ensure consistency
             await self.send(text_data=json.dumps({
@@ -200,10 +219,11 @@ class ChatConsumer(AsyncWebsocketConsumer):
         
         finally:
             # Stop typing indicator
-            await self.send(text_data=json.dumps({
-                'type': 'typing',
-                'is_typing': False
-            }))
+            if not client_closed:
+                await self.send(text_data=json.dumps({
+                    'type': 'typing',
+                    'is_typing': False
+                }))
             
     async def send_error(self, message):
         """Send an error message to the client."""
@@ -212,11 +232,46 @@ class ChatConsumer(AsyncWebsocketConsumer):
             'message': message
         }))
 
+    async def send_chunk(self, message, delta, seq, ack=False):
+        """
+        Send one coalesced chat_chunk frame; returns its size in bytes.
+
+        Frames with ``ack`` set ask the client to reply with
+        {"type": "chat_ack", "message_id": ..., "seq": ...}.
+        """
+        payload = {
+            'type': 'chat_chunk',
+            'message_id': str(message.id),
+            'delta': delta,
+            'seq': seq,
+        }
+        if ack:
+            payload['ack'] = True
+        frame = json.dumps(payload)
+        await self.send(text_data=frame)
+        return len(frame.encode('utf-8'))
+
     @database_sync_to_async
-    def update_message_content(self, message, content):
-        """Update message content."""
-        message.content = content
-        message.save(update_fields=['content'])
+    def save_stream_result(self, message, delivery, prompt_usage=None):
+        """Store the streamed reply with its delivery metrics and prompt token usage."""
+        from .services.conversation_memory import schedule_summary_update
+        
+        metrics = delivery.metrics.as_dict()
+        logger.info(
+            f"Streamed message {message.id}: {metrics['deltas']} deltas in {metrics['frames']} frames, "
+            f"{metrics['bytes_per_frame']} bytes/frame, {metrics['stalls']} stalls"
+        )
+        message.content = delivery.text
+        message.metadata = {**message.metadata, 'delivery': metrics}
+        if prompt_usage:
+            message.metadata['prompt_tokens'] = prompt_usage
+        message.save(update_fields=['content', 'metadata'])
+        
+        if message.content:
+            try:
+                schedule_summary_update(self.session.id)
+            except Exception as e:
+                logger.warning(f"Could not queue summary update for session {self.session.id}: {e}")
     
     @database_sync_to_async
     def get_session(self):
@@ -234,9 +289,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
             return None
     
     @database_sync_to_async
-    def save_message(self, role, content, image_data=None):
-        """Save a message to the database."""
+    def save_message(self, role, content, image_data=None, audit=False):
+        """Save a message to the database (and to the rate limit audit log if ``audit``)."""
         from .models import ChatMessage
+        from .services import RateLimiter
         import base64
         from django.core.files.base import ContentFile
         import uuid
@@ -267,4 +323,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         # Update session timestamp
         self.session.save(update_fields=['updated_at'])
         
+        if audit:
+            RateLimiter.increment_count(self.user)
+        
         return message
@@ -2,28 +2,20 @@
 Chat service for managing chat sessions and AI interactions.
 """
 from typing import List, Dict, Optional
-from datetime import timedelta
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from ..models import ChatSession, ChatMessage
-from ai_services.router import AIRouter
-
-# Import models for context injection
-try:
-    from apps.quiz.models import QuizAttempt, AnswerAttempt
-    from apps.study_plans.models import StudyPlanItem, StudyProgress
-except ImportError:
-    # Models might not be available in all environments
-    QuizAttempt = None
-    AnswerAttempt = None
-    StudyPlanItem = None
-    StudyProgress = None
+from ai_services.router import get_ai_router
+from ai_services.prompt_budget import get_prompt_budget_config
+from .conversation_memory import summary_state
+from .learner_snapshot import get_learner_snapshot
 
 
 class ChatService:
     """Service class for chat operations."""
     
     def __init__(self):
-        self.ai_router = AIRouter()
+        self.ai_router = get_ai_router()
     
     def create_session(self, user, subject=None, exam_type=None, title=None, 
                       tone='casual', detail_level='detailed', 
@@ -77,110 +69,111 @@ class ChatService:
         
         return message
     
-    def get_conversation_history(self, session: ChatSession, limit: int = 10) -> List[Dict]:
+    def get_conversation_history(self, session: ChatSession, limit: int = 10, after: str = None) -> List[Dict]:
         """
         Get recent conversation history for context.
         Returns a list of message dicts suitable for AI context.
+        Only messages after ``after`` (the summary's ``through`` timestamp)
+        are returned; empty placeholders are skipped.
         """
-        messages = session.messages.order_by('-timestamp')[:limit]
+        messages = session.messages.exclude(content='')
+        if after:
+            messages = messages.filter(timestamp__gt=parse_datetime(after))
+        messages = messages.order_by('-timestamp').values('role', 'content')[:limit]
         
         # Reverse to get chronological order
-        messages = reversed(messages)
-        
-        return [
-            {
-                'role': msg.role,
-                'content': msg.content
-            }
-            for msg in messages
-        ]
+        return list(reversed(messages))
     
     def generate_ai_response(
         self,
         session: ChatSession,
         user_message: str,
-        context: Dict = None
+        context: Dict = None,
+        prompt_usage: Dict = None
     ) -> str:
         """
         Generate an AI response based on the user message and conversation history.
         """
-        # Get conversation history
-        history = self.get_conversation_history(session, limit=10)
-        
-        # Build context for AI
-        # Use session data or user profile as fallback
-        subject = context.get('subject') or session.subject or 'General Studies'
-        
-        # Get exam type from session or user profile
-        exam_type = context.get('exam_type') or session.exam_type
-        if not exam_type and session.user.exam_targets:
-            # If user has exam targets, use them formatted nicely, otherwise generic
-            exam_type = ", ".join(session.user.exam_targets) if isinstance(session.user.exam_targets, list) else str(session.user.exam_targets)
-        
-        if not exam_type:
-            exam_type = "school exams"
-        
-        # Create system prompt with enhanced user context
-        user_name = session.user.first_name or "Student"
-        enhanced_context = self._build_enhanced_context(session)
-        system_prompt = self._build_system_prompt_with_context(subject, exam_type, enhanced_context, session)
-        
-        # Build conversation context
-        conversation_context = self._build_conversation_context(history, user_message)
+        request = self._prepare_stream(session, context, user_message)
         
         # Generate response using AI router
         try:
-            response = self.ai_router.generate_chat_response(
-                message=user_message,
-                conversation_history=history,
-                system_prompt=system_prompt,
-                context=context or {}
-            )
-            return response
+            return self.ai_router.generate_chat_response(message=user_message, prompt_usage=prompt_usage, **request)
         except Exception as e:
             # Fallback response if AI fails
+            user_name = self._build_enhanced_context(session)['user_name']
             return f"I apologize, {user_name}, but I'm having trouble generating a response right now. Please try again. Error: {str(e)}"
     
     def stream_ai_response(
         self,
         session: ChatSession,
         user_message: str,
-        context: Dict = None
+        context: Dict = None,
+        prompt_usage: Dict = None
     ):
         """
         Stream an AI response based on the user message and conversation history.
-        Yields chunks of text.
+        Yields chunks of text. ``prompt_usage``, if given, receives the
+        prompt's token counts (see ai_services/prompt_budget.py).
         """
-        # Get conversation history
-        history = self.get_conversation_history(session, limit=10)
+        request = self._prepare_stream(session, context, user_message)
         
-        # Build context for AI
-        subject = context.get('subject') or session.subject or 'General Studies'
-        exam_type = context.get('exam_type') or session.exam_type
+        # Generate response using AI router
+        try:
+            for chunk in self.ai_router.stream_chat_response(message=user_message, prompt_usage=prompt_usage, **request):
+                yield chunk
+        except Exception as e:
+            # Fallback response if AI fails
+            error_msg = f"Error streaming response: {str(e)}"
+            yield error_msg
+    
+    def _prepare_stream(self, session: ChatSession, context: Dict = None, user_message: str = None) -> Dict:
+        """History, summary and system prompt for a streamed reply (database work only)."""
+        summary = summary_state(session.pk)
+        history = self.get_conversation_history(
+            session, limit=get_prompt_budget_config()['MAX_RECENT_TURNS'], after=summary.get('through')
+        )
+        # The consumer saves the new message before replying; it is sent separately
+        if history and history[-1] == {'role': 'user', 'content': user_message}:
+            history.pop()
+        context = context or {}
         
-        if not exam_type and session.user.exam_targets:
-            exam_type = ", ".join(session.user.exam_targets) if isinstance(session.user.exam_targets, list) else str(session.user.exam_targets)
+        enhanced_context = self._build_enhanced_context(session)
+        subject = context.get('subject') or session.subject or 'General Studies'
+        exam_type = context.get('exam_type') or session.exam_type or ", ".join(enhanced_context['exam_targets'])
         
         if not exam_type:
             exam_type = "school exams"
         
-        # Create system prompt with enhanced user context
-        enhanced_context = self._build_enhanced_context(session)
-        system_prompt = self._build_system_prompt_with_context(subject, exam_type, enhanced_context, session)
+        return {
+            'conversation_history': history,
+            'system_prompt': self._build_system_prompt_with_context(subject, exam_type, enhanced_context, session),
+            'context': {**context, 'user_id': session.user_id, 'conversation_summary': summary.get('text')},
+        }
+    
+    async def astream_ai_response(
+        self,
+        session: ChatSession,
+        user_message: str,
+        context: Dict = None,
+        prompt_usage: Dict = None
+    ):
+        """
+        Async generator counterpart of stream_ai_response for the WebSocket
+        consumer: the database work runs in one sync_to_async call, then the
+        chunks are streamed on the event loop.
+        """
+        from channels.db import database_sync_to_async
         
-        # Generate response using AI router
         try:
-            for chunk in self.ai_router.stream_chat_response(
-                message=user_message,
-                conversation_history=history,
-                system_prompt=system_prompt,
-                context=context or {}
+            request = await database_sync_to_async(self._prepare_stream)(session, context, user_message)
+            async for chunk in self.ai_router.astream_chat_response(
+                message=user_message, prompt_usage=prompt_usage, **request
             ):
                 yield chunk
         except Exception as e:
             # Fallback response if AI fails
-            error_msg = f"Error streaming response: {str(e)}"
-            yield error_msg
+            yield f"Error streaming response: {str(e)}"
     
     def _build_system_prompt(self, subject: str, exam_type: str, user_name: str) -> str:
         """Build the system prompt for the AI tutor."""
@@ -366,115 +359,8 @@ Important Guidelines for Interaction:
 
     
     def _build_enhanced_context(self, session: ChatSession) -> Dict:
-        """Build enhanced context from user's study data."""
-        user = session.user
-        
-        context = {
-            'user_name': user.first_name or 'Student',
-            'exam_targets': self._get_exam_targets(user),
-            'weak_topics': self._get_weak_topics(user),
-            'recent_topics': self._get_recent_study_topics(user),
-            'upcoming_tasks': self._get_upcoming_tasks(user),
-        }
-        
-        return context
-    
-    def _get_exam_targets(self, user) -> List[str]:
-        """Get user's target exams."""
-        try:
-            targets = user.exam_targets.all()
-            return [str(target.exam) for target in targets] if targets.exists() else []
-        except:
-            return []
-    
-    def _get_weak_topics(self, user, threshold=0.60) -> List[str]:
-        """Get topics where user performs below threshold accuracy."""
-        try:
-            # Get all answer attempts for this user
-            attempts = AnswerAttempt.objects.filter(
-                quiz_attempt__user=user,
-                quiz_attempt__completed_at__isnull=False
-            ).select_related('question')
-            
-            if not attempts.exists():
-                return []
-            
-            # Group by topic and calculate accuracy
-            topic_stats = {}
-            for attempt in attempts:
-                topic = attempt.question.topic
-                if topic not in topic_stats:
-                    topic_stats[topic] = {'correct': 0, 'total': 0}
-                
-                topic_stats[topic]['total'] += 1
-                if attempt.is_correct:
-                    topic_stats[topic]['correct'] += 1
-            
-            # Find weak topics (below threshold)
-            weak_topics = []
-            for topic, stats in topic_stats.items():
-                accuracy = stats['correct'] / stats['total'] if stats['total'] > 0 else 0
-                if accuracy < threshold and stats['total'] >= 3:  # At least 3 attempts
-                    weak_topics.append(str(topic))
-            
-            return weak_topics[:5]  # Limit to top 5 weak topics
-        except Exception as e:
-            print(f"Error getting weak topics: {e}")
-            return []
-    
-    def _get_recent_study_topics(self, user, days=7) -> List[str]:
-        """Get topics studied in the last N days."""
-        try:
-            cutoff_date = timezone.now() - timedelta(days=days)
-            
-            # Get recent quiz attempts
-            recent_attempts = QuizAttempt.objects.filter(
-                user=user,
-                started_at__gte=cutoff_date
-            ).select_related('quiz').order_by('-started_at')
-            
-            topics = set()
-            for attempt in recent_attempts[:10]:  # Last 10 attempts
-                if attempt.quiz.topic:
-                    topics.add(str(attempt.quiz.topic))
-            
-            return list(topics)[:5]  # Limit to 5 topics
-        except Exception as e:
-            print(f"Error getting recent topics: {e}")
-            return []
-    
-    def _get_upcoming_tasks(self, user, limit=3) -> List[str]:
-        """Get upcoming study plan tasks."""
-        try:
-            # Get incomplete study plan items
-            upcoming = StudyPlanItem.objects.filter(
-                study_plan__user=user,
-                completed=False
-            ).order_by('order')[:limit]
-            
-            tasks = []
-            for item in upcoming:
-                if item.topic:
-                    tasks.append(f"{item.topic.name}")
-                elif item.description:
-                    tasks.append(item.description[:50])  # First 50 chars
-            
-            return tasks
-        except Exception as e:
-            print(f"Error getting upcoming tasks: {e}")
-            return []
-    
-    def _build_conversation_context(self, history: List[Dict], current_message: str) -> str:
-        """Build a text representation of the conversation for context."""
-        context_parts = []
-        
-        for msg in history[-5:]:  # Last 5 messages for context
-            role = "Student" if msg['role'] == 'user' else "Tutor"
-            context_parts.append(f"{role}: {msg['content']}")
-        
-        context_parts.append(f"Student: {current_message}")
-        
-        return "\n".join(context_parts)
+        """Build enhanced context from user's study data (see learner_snapshot.py)."""
+        return get_learner_snapshot(session.user_id)
     
     def get_suggested_questions(self, user, subject: str = None) -> List[str]:
         """Generate suggested questions based on user's context."""
@@ -0,0 +1,89 @@
+"""
+Rolling conversation summary for long tutor sessions.
+
+ChatSession.metadata['summary'] holds running notes of the conversation:
+
+    text        the summary itself
+    through     timestamp of the last message folded into it
+    turns       how many messages it covers
+    tokens      estimated size of ``text``
+    updated_at
+
+After every assistant turn the consumer queues update_conversation_summary
+on the Django-Q cluster. Once at least MIN_NEW_TURNS messages older than
+the KEEP_RECENT_TURNS most recent are not yet covered, they are folded into
+the notes with one LLM call. Prompts then carry the summary plus only the
+messages after ``through``, so nothing is sent twice and nothing falls off
+the end (see ai_services/prompt_budget.py).
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django_q.tasks import async_task
+
+from ai_services.prompt_budget import estimate_tokens, get_prompt_budget_config
+from ai_services.router import get_ai_router
+
+from ..models import ChatSession
+
+logger = logging.getLogger(__name__)
+
+TASK_GROUP = 'chat-summary'
+
+DEFAULTS = {
+    'KEEP_RECENT_TURNS': 6,
+    'MIN_NEW_TURNS': 4,
+}
+
+
+def get_memory_config():
+    return {**DEFAULTS, **getattr(settings, 'CHAT_MEMORY', {})}
+
+
+def summary_state(session_id):
+    """The session's current summary entry (read fresh, not from a cached instance)."""
+    metadata = ChatSession.objects.filter(pk=session_id).values_list('metadata', flat=True).first()
+    return (metadata or {}).get('summary') or {}
+
+
+def schedule_summary_update(session_id):
+    async_task('apps.ai_tutor.tasks.update_conversation_summary', str(session_id), group=TASK_GROUP)
+
+
+def update_conversation_summary(session_id):
+    """Fold messages that have left the recent window into the summary; returns it if updated."""
+    config = get_memory_config()
+    state = summary_state(session_id)
+    through = state.get('through')
+
+    messages = ChatSession.objects.get(pk=session_id).messages.exclude(content='')
+    if through:
+        messages = messages.filter(timestamp__gt=parse_datetime(through))
+    rows = list(messages.order_by('timestamp', 'id').values('role', 'content', 'timestamp'))
+    older = rows[:max(0, len(rows) - config['KEEP_RECENT_TURNS'])]
+    if len(older) < config['MIN_NEW_TURNS']:
+        return None
+
+    text = get_ai_router().summarize_conversation(
+        state.get('text', ''), older, max_tokens=get_prompt_budget_config()['SUMMARY_MAX_TOKENS'],
+    )
+
+    with transaction.atomic():
+        session = ChatSession.objects.select_for_update().get(pk=session_id)
+        current = session.metadata.get('summary') or {}
+        if current.get('through') != through:
+            # Another run folded these turns first
+            return None
+        session.metadata['summary'] = {
+            'text': text,
+            'through': older[-1]['timestamp'].isoformat(),
+            'turns': current.get('turns', 0) + len(older),
+            'tokens': estimate_tokens(text),
+            'updated_at': timezone.now().isoformat(),
+        }
+        session.save(update_fields=['metadata'])
+    logger.info(f"Summarised {len(older)} messages of chat session {session_id} ({estimate_tokens(text)} tokens)")
+    return text
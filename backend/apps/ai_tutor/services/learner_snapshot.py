@@ -0,0 +1,158 @@
+"""
+Per-user learner snapshot used to personalise tutor system prompts.
+
+The snapshot is split into sections, each computed with a single
+aggregate query and cached under its own key:
+
+    profile      first name and exam targets             (User)
+    weak_topics  quiz topics under WEAK_THRESHOLD accuracy,
+                 then low TopicMastery scores            (quizzes, exams)
+    recent       topics of quizzes started recently      (quizzes)
+    tasks        next pending tasks of active plans      (study plans)
+
+get_learner_snapshot() fetches all sections with one get_many and only
+recomputes the missing ones. The signal handlers in apps/ai_tutor/signals.py
+drop just the sections an event affects, after the transaction commits.
+TIMEOUT bounds how long time-based data such as "recent" can go stale.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Max, Q
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'learner_snapshot'
+SECTIONS = ('profile', 'weak_topics', 'recent', 'tasks')
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 60 * 60 * 6,
+    'WEAK_THRESHOLD': 0.60,
+    'MIN_ATTEMPTS': 3,
+    'RECENT_DAYS': 7,
+    'TOPIC_LIMIT': 5,
+    'TASK_LIMIT': 3,
+}
+
+
+def get_snapshot_config():
+    return {**DEFAULTS, **getattr(settings, 'LEARNER_SNAPSHOT', {})}
+
+
+def _profile(user_id, config):
+    first_name, exam_targets = get_user_model().objects.filter(pk=user_id).values_list(
+        'first_name', 'exam_targets'
+    ).first() or ('', [])
+    if not isinstance(exam_targets, list):
+        exam_targets = [str(exam_targets)] if exam_targets else []
+    return {'user_name': first_name or 'Student', 'exam_targets': [str(target) for target in exam_targets]}
+
+
+def _weak_topics(user_id, config):
+    from apps.analytics.models import TopicMastery
+    from apps.quiz.models import AnswerAttempt
+
+    limit = config['TOPIC_LIMIT']
+    rows = AnswerAttempt.objects.filter(
+        quiz_attempt__user_id=user_id,
+        quiz_attempt__completed_at__isnull=False,
+        question__topic__isnull=False,
+    ).values('question__topic__name').annotate(
+        total=Count('id'),
+        correct=Count('id', filter=Q(is_correct=True)),
+    ).annotate(
+        accuracy=Cast(F('correct'), FloatField()) / F('total'),
+    ).filter(
+        total__gte=config['MIN_ATTEMPTS'], accuracy__lt=config['WEAK_THRESHOLD'],
+    ).order_by('accuracy', '-total').values_list('question__topic__name', flat=True)[:limit]
+    topics = list(rows)
+
+    # Mastery also moves with mock exam results
+    if len(topics) < limit:
+        low_mastery = TopicMastery.objects.filter(
+            user_id=user_id, mastery_score__lt=config['WEAK_THRESHOLD'] * 100,
+        ).exclude(topic__in=topics).order_by('mastery_score').values_list('topic', flat=True)
+        topics += list(low_mastery[:limit - len(topics)])
+    return topics
+
+
+def _recent(user_id, config):
+    from apps.quiz.models import QuizAttempt
+
+    cutoff = timezone.now() - timedelta(days=config['RECENT_DAYS'])
+    return list(
+        QuizAttempt.objects.filter(user_id=user_id, started_at__gte=cutoff).exclude(quiz__topic='')
+        .values('quiz__topic').annotate(last_started=Max('started_at'))
+        .order_by('-last_started').values_list('quiz__topic', flat=True)[:config['TOPIC_LIMIT']]
+    )
+
+
+def _tasks(user_id, config):
+    from apps.study_plans.models import StudyTask
+
+    return list(
+        StudyTask.objects.filter(
+            study_plan__user_id=user_id,
+            study_plan__status='active',
+            status__in=['pending', 'in_progress', 'revisit'],
+        ).order_by('scheduled_start_date', 'id').values_list('topic__name', flat=True)[:config['TASK_LIMIT']]
+    )
+
+
+BUILDERS = {
+    'profile': _profile,
+    'weak_topics': _weak_topics,
+    'recent': _recent,
+    'tasks': _tasks,
+}
+
+
+def _cache_key(user_id, section):
+    return f"{KEY_PREFIX}:{user_id}:{section}"
+
+
+def get_learner_snapshot(user_id):
+    """
+    Prompt context for ``user_id``: user_name, exam_targets, weak_topics,
+    recent_topics and upcoming_tasks. One cache read when warm.
+    """
+    config = get_snapshot_config()
+    cache = caches[config['CACHE_ALIAS']]
+    keys = {section: _cache_key(user_id, section) for section in SECTIONS}
+    cached = cache.get_many(keys.values())
+
+    sections, missing = {}, {}
+    for section, key in keys.items():
+        if key in cached:
+            sections[section] = cached[key]
+            continue
+        try:
+            sections[section] = missing[key] = BUILDERS[section](user_id, config)
+        except Exception as e:
+            logger.warning(f"Could not build {section} snapshot for user {user_id}: {e}")
+            sections[section] = {} if section == 'profile' else []
+    if missing:
+        cache.set_many(missing, config['TIMEOUT'])
+
+    profile = sections['profile']
+    return {
+        'user_name': profile.get('user_name', 'Student'),
+        'exam_targets': profile.get('exam_targets', []),
+        'weak_topics': sections['weak_topics'],
+        'recent_topics': sections['recent'],
+        'upcoming_tasks': sections['tasks'],
+    }
+
+
+def invalidate_learner_snapshot(user_id, *sections):
+    """Drop ``sections`` (all by default) of a user's snapshot once the transaction commits."""
+    keys = [_cache_key(user_id, section) for section in (sections or SECTIONS)]
+    alias = get_snapshot_config()['CACHE_ALIAS']
+    transaction.on_commit(lambda: caches[alias].delete_many(keys))
@@ -3,42 +3,55 @@ Rate limiting service for chat messages.
 """
 from django.utils import timezone
 from django.conf import settings
+
+from ai_services.rate_limiter import RateLimit, RateLimitResult
+
 from ..models import ChatRateLimit
 
 
 class RateLimiter:
-    """Service for managing chat rate limits."""
-    
+    """
+    Service for managing chat rate limits.
+
+    Limits are enforced by the shared sliding-window limiter in
+    ai_services/rate_limiter.py: one atomic Redis call checks and consumes
+    a message. ChatRateLimit rows are only an audit log of messages per
+    hour and are never read to decide.
+    """
+
+    PERIOD = 60 * 60
+
     @staticmethod
-    def check_rate_limit(user) -> tuple[bool, int]:
-        """
-        Check if user has exceeded rate limit.
-        Returns (is_allowed, remaining_messages)
-        """
-        # Get or create rate limit record
-        rate_limit, created = ChatRateLimit.objects.get_or_create(
-            user=user,
-            defaults={'message_count': 0, 'window_start': timezone.now()}
-        )
-        
-        # Reset if needed
-        rate_limit.reset_if_needed()
-        
-        # Get limit based on user subscription
+    def _rate_limit(user):
         limit = RateLimiter._get_user_limit(user)
-        
-        # Check if rate limited
         if limit is None:  # Unlimited for premium users
-            return True, -1  # -1 indicates unlimited
-        
-        is_allowed = rate_limit.message_count < limit
-        remaining = max(0, limit - rate_limit.message_count)
-        
-        return is_allowed, remaining
+            return None
+        return RateLimit('chat', limit, RateLimiter.PERIOD)
+
+    @staticmethod
+    def consume(user) -> RateLimitResult:
+        """Check the user's limit and count one message if allowed."""
+        rate_limit = RateLimiter._rate_limit(user)
+        if rate_limit is None:
+            return RateLimitResult.unlimited()
+        return rate_limit.hit(user.pk)
+
+    @staticmethod
+    async def aconsume(user) -> RateLimitResult:
+        """:meth:`consume` for the WebSocket consumer; no database access."""
+        rate_limit = RateLimiter._rate_limit(user)
+        if rate_limit is None:
+            return RateLimitResult.unlimited()
+        return await rate_limit.ahit(user.pk)
+
+    @staticmethod
+    def get_reset_time(result: RateLimitResult) -> timezone.datetime:
+        """When the next message will be allowed."""
+        return timezone.now() + timezone.timedelta(seconds=result.retry_after)
     
     @staticmethod
     def increment_count(user):
-        """Increment the message count for a user."""
+        """Add a message to the user's audit row."""
         rate_limit, created = ChatRateLimit.objects.get_or_create(
             user=user,
             defaults={'message_count': 0, 'window_start': timezone.now()}
@@ -60,12 +73,3 @@ class RateLimiter:
         # Free users get limited messages
         chat_limits = getattr(settings, 'CHAT_RATE_LIMITS', {})
         return chat_limits.get('free', {}).get('messages_per_hour', 50)
-    
-    @staticmethod
-    def get_reset_time(user) -> timezone.datetime:
-        """Get the time when the rate limit will reset."""
-        try:
-            rate_limit = ChatRateLimit.objects.get(user=user)
-            return rate_limit.window_start + timezone.timedelta(hours=1)
-        except ChatRateLimit.DoesNotExist:
-            return timezone.now() + timezone.timedelta(hours=1)
@@ -0,0 +1,246 @@
+"""
+Coalesced delivery of streamed tutor replies over the WebSocket.
+
+Providers emit a delta every few milliseconds, often only a word long.
+Sending each one as its own ``chat_chunk`` frame costs a JSON encode and a
+WebSocket frame per word. StreamDelivery buffers deltas and lets a writer
+task send them as one frame per time/size budget: at most every
+FLUSH_INTERVAL_MS, or sooner once FLUSH_BYTES are waiting. The first delta
+goes out straight away so time-to-first-token is unchanged.
+
+A WebSocket send() only queues the frame in the server's transport, so
+it says nothing about how fast the client reads. Instead every frame
+carries a sequence number, every ACK_EVERY_FRAMES-th asks the client to
+acknowledge it, and the writer does not run more than MAX_UNACKED_FRAMES
+ahead of the last acknowledgement. While it waits, deltas accumulate
+until MAX_PENDING_BYTES, after which write() blocks and the provider
+stream is no longer read. A client that stays blocked for
+MAX_STALL_SECONDS gets SlowClientError.
+
+Each reply's frame count, bytes per frame and stall time are logged and
+saved in ChatMessage.metadata['delivery'] so the budget can be tuned.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'FLUSH_INTERVAL_MS': 30,
+    'FLUSH_BYTES': 256,
+    'MAX_PENDING_BYTES': 64 * 1024,
+    'MAX_STALL_SECONDS': 10.0,
+    # Flow control; MAX_UNACKED_FRAMES 0 turns acknowledgements off
+    'MAX_UNACKED_FRAMES': 32,
+    'ACK_EVERY_FRAMES': 8,
+}
+
+
+def get_streaming_config():
+    return {**DEFAULTS, **getattr(settings, 'CHAT_STREAMING', {})}
+
+
+class SlowClientError(Exception):
+    """The client did not read the stream within MAX_STALL_SECONDS."""
+
+
+@dataclass
+class DeliveryMetrics:
+    deltas: int = 0
+    frames: int = 0
+    bytes: int = 0
+    max_frame_bytes: int = 0
+    send_seconds: float = 0.0
+    stalls: int = 0
+    stall_seconds: float = 0.0
+    ack_waits: int = 0
+    ack_wait_seconds: float = 0.0
+
+    @property
+    def bytes_per_frame(self):
+        return self.bytes / self.frames if self.frames else 0.0
+
+    def as_dict(self):
+        return {
+            **asdict(self),
+            'bytes_per_frame': round(self.bytes_per_frame, 1),
+            'send_seconds': round(self.send_seconds, 4),
+            'stall_seconds': round(self.stall_seconds, 4),
+            'ack_wait_seconds': round(self.ack_wait_seconds, 4),
+        }
+
+
+class StreamDelivery:
+    """
+    Buffers reply deltas and sends them as coalesced frames.
+
+    ``send_frame`` is an async callable taking the text of one frame, its
+    sequence number (from 1) and whether the client should acknowledge it,
+    and returning the number of bytes sent. Acknowledgements are passed to
+    ack(). Use as an async context manager, or call start() and close()
+    explicitly::
+
+        async with StreamDelivery(send_frame) as delivery:
+            async for chunk in stream:
+                await delivery.write(chunk)
+        text = delivery.text
+    """
+
+    def __init__(self, send_frame, config=None):
+        config = config or get_streaming_config()
+        self._send_frame = send_frame
+        self.interval = config['FLUSH_INTERVAL_MS'] / 1000
+        self.flush_bytes = config['FLUSH_BYTES']
+        self.max_pending_bytes = config['MAX_PENDING_BYTES']
+        self.max_stall = config['MAX_STALL_SECONDS']
+        self.window = config['MAX_UNACKED_FRAMES']
+        self.ack_every = max(1, min(config['ACK_EVERY_FRAMES'], self.window or 1))
+        self.metrics = DeliveryMetrics()
+
+        self._parts = []
+        self._pending = []
+        self._pending_bytes = 0
+        self._closed = False
+        self._error = None
+        self._writer = None
+        self._ready = asyncio.Event()
+        self._full = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._acked = 0
+        self._ack = asyncio.Event()
+
+    @property
+    def text(self):
+        """Everything written so far, sent or not."""
+        return ''.join(self._parts)
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.close()
+        else:
+            await self.abort()
+
+    def start(self):
+        self._writer = asyncio.create_task(self._run())
+
+    def ack(self, seq):
+        """Record the client's acknowledgement of frame ``seq`` (and all before it)."""
+        if seq > self._acked:
+            self._acked = seq
+            self._ack.set()
+
+    async def _await_ack(self, seq):
+        """Wait until frame ``seq`` is within MAX_UNACKED_FRAMES of the last ack."""
+        if not self.window or seq - self._acked <= self.window:
+            return True
+        self.metrics.ack_waits += 1
+        started = time.monotonic()
+        try:
+            while seq - self._acked > self.window:
+                self._ack.clear()
+                remaining = self.max_stall - (time.monotonic() - started)
+                await asyncio.wait_for(self._ack.wait(), max(remaining, 0))
+            return True
+        except asyncio.TimeoutError:
+            self._error = SlowClientError(
+                f"Client has not acknowledged frame {self._acked + 1} after {self.max_stall}s"
+            )
+            self._space.set()
+            return False
+        finally:
+            self.metrics.ack_wait_seconds += time.monotonic() - started
+
+    async def write(self, delta):
+        """Queue a delta; blocks while the client is MAX_PENDING_BYTES behind."""
+        if self._error is not None:
+            raise self._error
+        if not delta:
+            return
+        self._parts.append(delta)
+        self._pending.append(delta)
+        self._pending_bytes += len(delta.encode('utf-8'))
+        self.metrics.deltas += 1
+        self._ready.set()
+        if self._pending_bytes >= self.flush_bytes:
+            self._full.set()
+
+        if self._pending_bytes >= self.max_pending_bytes:
+            self._space.clear()
+            self.metrics.stalls += 1
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(self._space.wait(), self.max_stall)
+            except asyncio.TimeoutError:
+                self._error = SlowClientError(
+                    f"Client is {self._pending_bytes} bytes behind after {self.max_stall}s"
+                )
+            finally:
+                self.metrics.stall_seconds += time.monotonic() - started
+            if self._error is not None:
+                raise self._error
+
+    async def close(self):
+        """Send whatever is still buffered and stop the writer."""
+        self._closed = True
+        self._ready.set()
+        self._full.set()
+        if self._writer is not None:
+            await self._writer
+        if self._error is not None:
+            raise self._error
+
+    async def abort(self):
+        """Stop the writer and drop anything still buffered."""
+        self._closed = True
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    async def _run(self):
+        while True:
+            await self._ready.wait()
+            # The first frame goes out at once; later ones wait for a budget
+            if self.metrics.frames and not self._full.is_set():
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+
+            seq = self.metrics.frames + 1
+            if self._pending and not await self._await_ack(seq):
+                return
+
+            frame = ''.join(self._pending)
+            self._pending.clear()
+            self._pending_bytes = 0
+            self._ready.clear()
+            self._full.clear()
+            self._space.set()
+
+            if frame:
+                started = time.monotonic()
+                try:
+                    sent = await self._send_frame(frame, seq, bool(self.window) and seq % self.ack_every == 0)
+                except Exception as e:
+                    self._error = e
+                    self._space.set()
+                    return
+                self.metrics.send_seconds += time.monotonic() - started
+                self.metrics.frames += 1
+                self.metrics.bytes += sent
+                self.metrics.max_frame_bytes = max(self.metrics.max_frame_bytes, sent)
+
+            if self._closed and not self._pending:
+                return
@@ -0,0 +1,57 @@
+"""
+Incremental invalidation of the learner snapshot (services/learner_snapshot.py).
+
+Each handler drops only the snapshot sections its event can change.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.analytics.models import TopicMastery
+from apps.quiz.models import QuizAttempt
+from apps.study_plans.models import StudyPlan, StudyTask
+
+from .services.learner_snapshot import invalidate_learner_snapshot
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_snapshot_profile(sender, instance, **kwargs):
+    invalidate_learner_snapshot(instance.pk, 'profile')
+
+
+@receiver(post_save, sender=QuizAttempt)
+def invalidate_snapshot_on_quiz(sender, instance, created, **kwargs):
+    """A new attempt changes recent topics; a completed one changes accuracy."""
+    if instance.completed_at:
+        invalidate_learner_snapshot(instance.user_id, 'weak_topics', 'recent')
+    elif created:
+        invalidate_learner_snapshot(instance.user_id, 'recent')
+
+
+@receiver(post_delete, sender=QuizAttempt)
+def invalidate_snapshot_on_quiz_delete(sender, instance, **kwargs):
+    invalidate_learner_snapshot(instance.user_id, 'weak_topics', 'recent')
+
+
+@receiver(post_save, sender=TopicMastery)
+@receiver(post_delete, sender=TopicMastery)
+def invalidate_snapshot_on_mastery(sender, instance, **kwargs):
+    # Quiz completions and the exam submission "effects" stage both update mastery
+    invalidate_learner_snapshot(instance.user_id, 'weak_topics')
+
+
+@receiver(post_save, sender=StudyPlan)
+@receiver(post_delete, sender=StudyPlan)
+def invalidate_snapshot_on_plan(sender, instance, **kwargs):
+    invalidate_learner_snapshot(instance.user_id, 'tasks')
+
+
+@receiver(post_save, sender=StudyTask)
+@receiver(post_delete, sender=StudyTask)
+def invalidate_snapshot_on_task(sender, instance, **kwargs):
+    try:
+        user_id = instance.study_plan.user_id
+    except StudyPlan.DoesNotExist:
+        # Deleted along with its plan, whose own handler covers it
+        return
+    invalidate_learner_snapshot(user_id, 'tasks')
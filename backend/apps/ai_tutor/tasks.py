@@ -0,0 +1,6 @@
+from .services.conversation_memory import update_conversation_summary as run_summary_update
+
+
+def update_conversation_summary(session_id):
+    """Django-Q entry point for the rolling chat summary (see services/conversation_memory.py)."""
+    return run_summary_update(session_id)
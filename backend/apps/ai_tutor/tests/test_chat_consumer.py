@@ -0,0 +1,127 @@
+import asyncio
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from apps.ai_tutor.consumers import ChatConsumer
+from apps.ai_tutor.models import ChatMessage, ChatSession
+
+
+class FakeRouter:
+    def __init__(self):
+        self.requests = []
+
+    async def astream_chat_response(self, message, conversation_history=None, system_prompt=None, context=None,
+                                    prompt_usage=None):
+        self.requests.append({"message": message, "history": conversation_history, "context": context})
+        if prompt_usage is not None:
+            prompt_usage.update({"total": 120, "unbudgeted": 150})
+        for chunk in ("Photo", "synthesis ", "uses light."):
+            yield chunk
+
+
+class LongRouter:
+    async def astream_chat_response(self, message, conversation_history=None, system_prompt=None, context=None,
+                                    prompt_usage=None):
+        for i in range(30):
+            await asyncio.sleep(0.002)
+            yield f"word{i} "
+
+
+class ChatConsumerStreamingTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="tutee@example.com", password="pass12345")
+        self.session = ChatSession.objects.create(user=self.user, subject="Biology")
+
+    def test_streams_router_chunks_natively(self):
+        router = FakeRouter()
+
+        async def converse():
+            communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), f"/ws/chat/{self.session.id}/")
+            communicator.scope["user"] = self.user
+            communicator.scope["url_route"] = {"kwargs": {"session_id": self.session.id}}
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            await communicator.receive_json_from()
+
+            await communicator.send_json_to({"type": "chat_message", "message": "What is photosynthesis?"})
+            events = []
+            while not events or events[-1] != {"type": "typing", "is_typing": False} or \
+                    not any(e["type"] == "chat_message" for e in events):
+                events.append(await communicator.receive_json_from(timeout=5))
+            await communicator.disconnect()
+            return events
+
+        with mock.patch("apps.ai_tutor.services.chat_service.get_ai_router", return_value=router), \
+                mock.patch("apps.ai_tutor.services.conversation_memory.async_task") as async_task:
+            events = async_to_sync(converse)()
+
+        deltas = [e["delta"] for e in events if e["type"] == "chat_chunk"]
+        # Deltas arriving back to back are coalesced into frames
+        self.assertEqual("".join(deltas), "Photosynthesis uses light.")
+        self.assertLessEqual(len(deltas), 3)
+        final = next(e for e in events if e["type"] == "chat_message")
+        self.assertEqual(final["message"], "Photosynthesis uses light.")
+        self.assertEqual(router.requests[0]["context"]["user_id"], self.user.id)
+        saved = ChatMessage.objects.get(id=final["message_id"])
+        self.assertEqual(saved.content, "Photosynthesis uses light.")
+        self.assertEqual(saved.metadata["delivery"]["deltas"], 3)
+        self.assertEqual(saved.metadata["delivery"]["frames"], len(deltas))
+        self.assertEqual(saved.metadata["prompt_tokens"], {"total": 120, "unbudgeted": 150})
+        # The current message is not repeated as history
+        self.assertEqual(router.requests[0]["history"], [])
+        async_task.assert_called_once_with(
+            "apps.ai_tutor.tasks.update_conversation_summary", str(self.session.id), group="chat-summary"
+        )
+
+    @override_settings(CHAT_STREAMING={"FLUSH_INTERVAL_MS": 1, "FLUSH_BYTES": 8, "MAX_PENDING_BYTES": 32,
+                                       "MAX_STALL_SECONDS": 5, "MAX_UNACKED_FRAMES": 2, "ACK_EVERY_FRAMES": 1})
+    def test_stream_waits_for_client_acks(self):
+        async def converse():
+            communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), f"/ws/chat/{self.session.id}/")
+            communicator.scope["user"] = self.user
+            communicator.scope["url_route"] = {"kwargs": {"session_id": self.session.id}}
+            await communicator.connect()
+            await communicator.receive_json_from()
+
+            await communicator.send_json_to({"type": "chat_message", "message": "Count"})
+            chunks = []
+            while True:
+                event = await communicator.receive_json_from(timeout=5)
+                if event["type"] == "chat_message":
+                    break
+                if event["type"] == "chat_chunk":
+                    chunks.append(event)
+                    # A slow reader: ack late
+                    await asyncio.sleep(0.01)
+                    await communicator.send_json_to(
+                        {"type": "chat_ack", "message_id": event["message_id"], "seq": event["seq"]}
+                    )
+            await communicator.disconnect()
+            return chunks, event
+
+        with mock.patch("apps.ai_tutor.services.chat_service.get_ai_router", return_value=LongRouter()), \
+                mock.patch("apps.ai_tutor.services.conversation_memory.async_task"):
+            chunks, final = async_to_sync(converse)()
+
+        expected = "".join(f"word{i} " for i in range(30))
+        self.assertEqual("".join(c["delta"] for c in chunks), expected)
+        self.assertEqual([c["seq"] for c in chunks], list(range(1, len(chunks) + 1)))
+        self.assertTrue(all(c.get("ack") for c in chunks))
+        delivery = ChatMessage.objects.get(id=final["message_id"]).metadata["delivery"]
+        self.assertGreater(delivery["ack_waits"], 0)
+
+    def test_chunk_size_is_counted_in_bytes(self):
+        consumer = ChatConsumer()
+        frames = []
+
+        async def send(text_data):
+            frames.append(text_data)
+
+        consumer.send = send
+        message = ChatMessage(session=self.session, role="assistant", content="")
+        sent = async_to_sync(consumer.send_chunk)(message, "Ω = 2πf", 1)
+        self.assertEqual(sent, len(frames[0].encode("utf-8")))
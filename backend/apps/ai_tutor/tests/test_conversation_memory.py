@@ -0,0 +1,67 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.ai_tutor.models import ChatMessage, ChatSession
+from apps.ai_tutor.services.chat_service import ChatService
+from apps.ai_tutor.services.conversation_memory import summary_state, update_conversation_summary
+
+
+@override_settings(CHAT_MEMORY={'KEEP_RECENT_TURNS': 2, 'MIN_NEW_TURNS': 2})
+class ConversationMemoryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="memory@example.com", password="pass12345")
+        self.session = ChatSession.objects.create(user=self.user, subject="Physics")
+        self.router = mock.Mock()
+        self.router.summarize_conversation.side_effect = lambda previous, turns, max_tokens: (
+            f"{previous} covered {len(turns)}".strip()
+        )
+        patcher = mock.patch(
+            "apps.ai_tutor.services.conversation_memory.get_ai_router", return_value=self.router
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.start = timezone.now() - timedelta(hours=1)
+
+    def add_messages(self, count, offset=0):
+        for i in range(offset, offset + count):
+            message = ChatMessage.objects.create(
+                session=self.session, role="user" if i % 2 == 0 else "assistant", content=f"message {i}"
+            )
+            ChatMessage.objects.filter(pk=message.pk).update(timestamp=self.start + timedelta(minutes=i))
+
+    def test_folds_messages_older_than_recent_window(self):
+        self.add_messages(6)
+
+        self.assertEqual(update_conversation_summary(self.session.id), "covered 4")
+        turns = self.router.summarize_conversation.call_args.args[1]
+        self.assertEqual([t["content"] for t in turns], [f"message {i}" for i in range(4)])
+        state = summary_state(self.session.id)
+        self.assertEqual(state["turns"], 4)
+        self.assertEqual(state["through"], (self.start + timedelta(minutes=3)).isoformat())
+
+        # Nothing new has left the recent window
+        self.assertIsNone(update_conversation_summary(self.session.id))
+
+        self.add_messages(2, offset=6)
+        self.assertEqual(update_conversation_summary(self.session.id), "covered 4 covered 2")
+        self.assertEqual(summary_state(self.session.id)["turns"], 6)
+
+    def test_prompt_uses_summary_and_unsummarized_history(self):
+        self.add_messages(6)
+        update_conversation_summary(self.session.id)
+        current = ChatMessage.objects.create(session=self.session, role="user", content="What next?")
+
+        service = ChatService()
+        prepared = service._prepare_stream(self.session, {}, current.content)
+
+        # Summarised messages and the message being answered are left out
+        self.assertEqual(
+            [turn["content"] for turn in prepared["conversation_history"]], ["message 4", "message 5"]
+        )
+        self.assertEqual(prepared["context"]["conversation_summary"], "covered 4")
@@ -0,0 +1,92 @@
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.ai_tutor.models import ChatSession
+from apps.ai_tutor.services.chat_service import ChatService
+from apps.ai_tutor.services.learner_snapshot import get_learner_snapshot
+from apps.content.models import Subject, Topic
+from apps.questions.models import Question
+from apps.quiz.models import AnswerAttempt, Quiz, QuizAttempt
+from apps.study_plans.models import StudyPlan, StudyTask
+
+
+class LearnerSnapshotTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="learner@example.com", password="pass12345", first_name="Ada", exam_targets=["jamb"]
+        )
+        self.subject = Subject.objects.create(name="Biology", category="STEM", description="Biology")
+        self.cells, self.genetics = [
+            Topic.objects.create(subject=self.subject, name=name, difficulty="MEDIUM", estimated_hours=1, description=name)
+            for name in ("Cells", "Genetics")
+        ]
+        self.plan = StudyPlan.objects.create(
+            user=self.user, name="JAMB plan", exam_date=date.today() + timedelta(days=60), status="active"
+        )
+        StudyTask.objects.create(
+            study_plan=self.plan, subject=self.subject, topic=self.genetics,
+            scheduled_start_date=date.today(), scheduled_end_date=date.today(),
+        )
+
+    def take_quiz(self, topic, results):
+        quiz = Quiz.objects.create(title=topic.name, topic=topic.name, created_by=self.user)
+        attempt = QuizAttempt.objects.create(user=self.user, quiz=quiz, total_questions=len(results))
+        for correct in results:
+            question = Question.objects.create(subject=self.subject, topic=topic, content=f"{topic.name}?")
+            AnswerAttempt.objects.create(quiz_attempt=attempt, question=question, is_correct=correct)
+        attempt.status, attempt.completed_at = "COMPLETED", timezone.now()
+        attempt.correct_answers = sum(results)
+        attempt.save()
+
+    def test_aggregates_and_serves_from_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.take_quiz(self.cells, [True, False, False, False])
+            self.take_quiz(self.genetics, [True, True, True])
+        cache.clear()
+
+        snapshot = get_learner_snapshot(self.user.id)
+        self.assertEqual(snapshot["user_name"], "Ada")
+        self.assertEqual(snapshot["exam_targets"], ["jamb"])
+        self.assertEqual(snapshot["weak_topics"], ["Cells"])
+        self.assertCountEqual(snapshot["recent_topics"], ["Cells", "Genetics"])
+        self.assertEqual(snapshot["upcoming_tasks"], ["Genetics"])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_learner_snapshot(self.user.id), snapshot)
+
+    def test_events_invalidate_only_their_sections(self):
+        get_learner_snapshot(self.user.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.take_quiz(self.cells, [False, False, False])
+        # Weak topics (answers, then mastery) and recent topics are rebuilt
+        with self.assertNumQueries(3):
+            snapshot = get_learner_snapshot(self.user.id)
+        self.assertEqual(snapshot["weak_topics"], ["Cells"])
+        self.assertEqual(snapshot["recent_topics"], ["Cells"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StudyTask.objects.filter(study_plan=self.plan).get().delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_learner_snapshot(self.user.id)["upcoming_tasks"], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = "Adaeze"
+            self.user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_learner_snapshot(self.user.id)["user_name"], "Adaeze")
+
+    def test_tutor_prompt_uses_snapshot(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.take_quiz(self.cells, [False, False, False])
+        session = ChatSession.objects.create(user=self.user, subject="Biology")
+
+        request = ChatService.__new__(ChatService)._prepare_stream(session)
+        self.assertIn("helping Ada prepare for jamb", request["system_prompt"])
+        self.assertIn("Weak areas (needs extra practice): Cells", request["system_prompt"])
+        self.assertIn("Upcoming study tasks: Genetics", request["system_prompt"])
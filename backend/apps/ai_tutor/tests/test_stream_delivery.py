@@ -0,0 +1,106 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from apps.ai_tutor.services.stream_delivery import SlowClientError, StreamDelivery
+
+CONFIG = {'FLUSH_INTERVAL_MS': 20, 'FLUSH_BYTES': 64, 'MAX_PENDING_BYTES': 256, 'MAX_STALL_SECONDS': 0.2,
+          'MAX_UNACKED_FRAMES': 0, 'ACK_EVERY_FRAMES': 1}
+
+
+class Client:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.frames = []
+
+    async def send(self, frame, seq, ack):
+        await asyncio.sleep(self.delay)
+        self.frames.append(frame)
+        return len(frame)
+
+
+class AckingClient:
+    """Sends return at once (like a transport write); acks arrive ``delay`` later."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.delivery = None
+        self.frames = []
+        self.ahead = 0
+
+    async def send(self, frame, seq, ack):
+        self.frames.append(frame)
+        self.ahead = max(self.ahead, seq - self.delivery._acked)
+        if ack:
+            asyncio.get_running_loop().call_later(self.delay, self.delivery.ack, seq)
+        return len(frame)
+
+
+class StreamDeliveryTest(SimpleTestCase):
+    def deliver(self, deltas, client, config=CONFIG, pause=0.0):
+        async def run():
+            delivery = StreamDelivery(client.send, config)
+            async with delivery:
+                for delta in deltas:
+                    await delivery.write(delta)
+                    await asyncio.sleep(pause)
+            return delivery
+        return asyncio.run(run())
+
+    def test_coalesces_fast_deltas_into_few_frames(self):
+        client = Client()
+        deltas = [f"w{i} " for i in range(200)]
+        delivery = self.deliver(deltas, client)
+
+        self.assertEqual("".join(client.frames), "".join(deltas))
+        self.assertEqual(delivery.text, "".join(deltas))
+        # First delta goes out alone, the rest in 64-byte budgets
+        self.assertEqual(client.frames[0], "w0 ")
+        self.assertLess(len(client.frames), 25)
+        self.assertEqual(delivery.metrics.deltas, 200)
+        self.assertEqual(delivery.metrics.frames, len(client.frames))
+        self.assertEqual(delivery.metrics.bytes, sum(len(f) for f in client.frames))
+
+    def test_time_budget_flushes_slow_streams(self):
+        client = Client()
+        self.deliver(["a", "b", "c"], client, pause=0.05)
+        self.assertEqual(client.frames, ["a", "b", "c"])
+
+    def test_slow_client_applies_backpressure(self):
+        client = Client(delay=0.05)
+        delivery = self.deliver(["x" * 100] * 20, client, config={**CONFIG, 'MAX_STALL_SECONDS': 5})
+
+        self.assertEqual(len("".join(client.frames)), 2000)
+        self.assertGreater(delivery.metrics.stalls, 0)
+        self.assertLessEqual(delivery.metrics.max_frame_bytes, CONFIG['MAX_PENDING_BYTES'] + 100)
+
+    def test_stalled_client_raises(self):
+        client = Client(delay=1.0)
+        with self.assertRaises(SlowClientError):
+            self.deliver(["x" * 100] * 20, client)
+
+    def test_slow_sender_holds_the_stream_until_acked(self):
+        config = {**CONFIG, 'FLUSH_BYTES': 10, 'MAX_PENDING_BYTES': 40, 'MAX_STALL_SECONDS': 5,
+                  'MAX_UNACKED_FRAMES': 4, 'ACK_EVERY_FRAMES': 2}
+        client = AckingClient(delay=0.05)
+
+        async def run():
+            delivery = StreamDelivery(client.send, config)
+            client.delivery = delivery
+            async with delivery:
+                for _ in range(40):
+                    await delivery.write("x" * 10)
+            return delivery
+
+        delivery = asyncio.run(run())
+        self.assertEqual(len("".join(client.frames)), 400)
+        self.assertLessEqual(client.ahead, 4)
+        self.assertGreater(delivery.metrics.ack_waits, 0)
+        self.assertGreater(delivery.metrics.stalls, 0)
+
+    def test_client_that_never_acks_raises(self):
+        config = {**CONFIG, 'FLUSH_BYTES': 10, 'MAX_PENDING_BYTES': 40, 'MAX_UNACKED_FRAMES': 2, 'ACK_EVERY_FRAMES': 1}
+        client = Client()
+        with self.assertRaises(SlowClientError):
+            self.deliver(["x" * 10] * 40, client, config=config)
+        self.assertEqual(len(client.frames), 2)
@@ -70,5 +70,50 @@ class AnalyticsService:
         progress.total_quizzes_taken += 1
         progress.save()
 
+    @staticmethod
+    def record_exam_completion(result):
+        """
+        Streak, points, progress, study session and mastery for a graded mock exam.
+
+        Runs once per ExamResult as the "effects" stage of the exam submission
+        pipeline (apps.exams.services.exam_submission), not on post_save.
+        """
+        from apps.analytics.models import StudySession
+        from apps.gamification.services.gamification_service import GamificationService
+
+        attempt = result.attempt
+        user = attempt.user
+        GamificationService.update_streak(user)
+
+        # Award points: 10 per correct answer + 200 bonus for completion
+        points = result.correct_answers * 10 + 200
+        GamificationService.award_points(user, points, f"Mock Exam: {attempt.mock_exam.title}")
+
+        progress, _ = ProgressTracker.objects.get_or_create(user=user)
+        progress.total_mock_exams_taken += 1
+
+        if attempt.completed_at and attempt.started_at:
+            delta = attempt.completed_at - attempt.started_at
+            progress.total_study_minutes += int(delta.total_seconds() / 60)
+
+        progress.save()
+
+        # Create StudySession
+        if attempt.completed_at:
+            StudySession.objects.get_or_create(
+                user=user,
+                start_time=attempt.started_at or attempt.completed_at - timedelta(minutes=60),
+                end_time=attempt.completed_at,
+                defaults={
+                    'subject': attempt.mock_exam.subject.name,
+                    'questions_answered': attempt.attempted_questions,
+                    'correct_count': result.correct_answers
+                }
+            )
+
+        # Update mastery for the exam subject
+        subject_name = attempt.mock_exam.subject.name
+        AnalyticsService.update_quiz_stats(user, subject_name, result.percentage, subject=subject_name)
+
 
 __all__ = ['AnalyticsService']
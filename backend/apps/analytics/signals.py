@@ -2,7 +2,6 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils import timezone
 from apps.quiz.models import QuizAttempt, AnswerAttempt
-from apps.exams.models import ExamResult
 from apps.ai_tutor.models import ChatMessage
 from apps.study_plans.models import StudyTask
 from .models import ProgressTracker, TopicMastery, StudySession
@@ -68,48 +67,6 @@ def update_analytics_on_quiz_completion(sender, instance, created, **kwargs):
         
         AnalyticsService.update_quiz_stats(user, instance.quiz.topic, score_percentage, subject=subject_name)
 
-@receiver(post_save, sender=ExamResult)
-def update_analytics_on_exam_completion(sender, instance, created, **kwargs):
-    """
-    Updates progress tracker and topic mastery when a mock exam is completed.
-    """
-    if not created:
-        return
-    
-    user = instance.attempt.user
-    GamificationService.update_streak(user)
-    
-    # Award points: 10 per correct answer + 200 bonus for completion
-    points = instance.correct_answers * 10 + 200
-    GamificationService.award_points(user, points, f"Mock Exam: {instance.attempt.mock_exam.title}")
-
-    progress, _ = ProgressTracker.objects.get_or_create(user=user)
-    progress.total_mock_exams_taken += 1
-    
-    attempt = instance.attempt
-    if attempt.completed_at and attempt.started_at:
-        delta = attempt.completed_at - attempt.started_at
-        progress.total_study_minutes += int(delta.total_seconds() / 60)
-    
-    progress.save()
-    
-    # Create StudySession
-    if attempt.completed_at:
-        StudySession.objects.get_or_create(
-            user=user,
-            start_time=attempt.started_at or attempt.completed_at - timedelta(minutes=60),
-            end_time=attempt.completed_at,
-            defaults={
-                'subject': attempt.mock_exam.subject.name,
-                'questions_answered': attempt.attempted_questions,
-                'correct_count': instance.correct_answers
-            }
-        )
-    
-    # Update mastery for the exam subject
-    subject_name = attempt.mock_exam.subject.name
-    AnalyticsService.update_quiz_stats(user, subject_name, instance.percentage, subject=subject_name)
-
 @receiver(post_save, sender=ChatMessage)
 def update_analytics_on_tutor_message(sender, instance, created, **kwargs):
     """
@@ -1,13 +1,13 @@
 import logging
 from django.db import transaction
-from ai_services.router import AIRouter
+from ai_services.router import get_ai_router
 from apps.content.models import Subject, Topic
 
 logger = logging.getLogger(__name__)
 
 class TopicGenerationService:
     def __init__(self):
-        self.ai_router = AIRouter()
+        self.ai_router = get_ai_router()
 
     def get_or_generate_topics(self, subject_name):
         """
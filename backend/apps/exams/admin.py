@@ -1,6 +1,8 @@
 
 from django.contrib import admin
-from .models import MockExam, MockExamQuestion, ExamAttempt, ExamResult
+from .services.adaptive_exam import invalidate_item_bank
+from .services.answer_key import invalidate_answer_key
+from .models import MockExam, MockExamQuestion, ExamAttempt, ExamResult, ExamGenerationJob, ExamSubmissionJob, ExamStatistics
 
 class MockExamQuestionInline(admin.TabularInline):
 	model = MockExamQuestion
@@ -8,9 +10,15 @@ class MockExamQuestionInline(admin.TabularInline):
 
 @admin.register(MockExam)
 class MockExamAdmin(admin.ModelAdmin):
-	list_display = ("title", "exam_type", "subject", "creator", "duration_minutes", "created_at")
+	list_display = ("title", "exam_type", "subject", "mode", "creator", "duration_minutes", "created_at")
 	inlines = [MockExamQuestionInline]
 
+	def save_related(self, request, form, formsets, change):
+		super().save_related(request, form, formsets, change)
+		# Graders cache the exam's questions; drop it after edits here
+		invalidate_answer_key(form.instance.pk)
+		invalidate_item_bank(form.instance.pk)
+
 @admin.register(ExamAttempt)
 class ExamAttemptAdmin(admin.ModelAdmin):
 	list_display = ("user", "mock_exam", "started_at", "completed_at", "is_submitted", "score")
@@ -20,3 +28,21 @@ class ExamAttemptAdmin(admin.ModelAdmin):
 class ExamResultAdmin(admin.ModelAdmin):
 	list_display = ("attempt", "total_score", "percentage", "passed", "generated_at")
 	search_fields = ("attempt__user__username", "attempt__mock_exam__title")
+
+@admin.register(ExamGenerationJob)
+class ExamGenerationJobAdmin(admin.ModelAdmin):
+	list_display = ("id", "user", "status", "mock_exam", "created_at", "updated_at")
+	list_filter = ("status",)
+	search_fields = ("user__email",)
+
+@admin.register(ExamSubmissionJob)
+class ExamSubmissionJobAdmin(admin.ModelAdmin):
+	list_display = ("id", "attempt", "status", "result", "created_at", "updated_at")
+	list_filter = ("status",)
+	search_fields = ("attempt__user__email",)
+
+@admin.register(ExamStatistics)
+class ExamStatisticsAdmin(admin.ModelAdmin):
+	list_display = ("mock_exam", "attempt_count", "passed_count", "mean_percentage", "updated_at")
+	search_fields = ("mock_exam__title",)
+	readonly_fields = ("histogram", "question_stats")
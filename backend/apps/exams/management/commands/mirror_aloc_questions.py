@@ -0,0 +1,74 @@
+"""
+Pre-harvest ALOC past questions into the local question bank.
+
+Run it from cron or a deploy step for the subjects and years students take,
+e.g.::
+
+	python manage.py mirror_aloc_questions --subject biology --subject physics \
+		--year 2010-2020 --exam-format JAMB --target 60
+
+Each subject/year is harvested until ``--target`` new questions arrive or
+ALOC starts repeating itself, then stored under the exam type past-question
+exams filter on, so exam creation serves them from the cache.
+"""
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.exams.services.aloc_client import AlocClient, general_topic, upsert_aloc_questions
+from apps.exams.services.exam_generator import get_or_create_subject, get_past_exam_type
+from apps.questions.models import Question
+
+
+def parse_years(values):
+	years = []
+	for value in values:
+		first, _, last = str(value).partition('-')
+		try:
+			start, end = int(first), int(last or first)
+		except ValueError:
+			raise CommandError(f"Invalid year or range: {value}")
+		years.extend(range(min(start, end), max(start, end) + 1))
+	return sorted(set(years))
+
+
+class Command(BaseCommand):
+	help = 'Harvest ALOC past questions for subjects/years into the local question bank'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--subject', action='append', required=True, help='Subject name (repeatable)')
+		parser.add_argument('--year', action='append', default=[], help='Year or range like 2010-2020 (repeatable)')
+		parser.add_argument('--exam-format', default='JAMB', help='Exam format, e.g. JAMB or WAEC')
+		parser.add_argument('--target', type=int, default=60, help='New questions to collect per subject/year')
+		parser.add_argument('--max-requests', type=int, default=None, help='Request budget per subject/year')
+
+	def handle(self, *args, **options):
+		client = AlocClient()
+		if not client.configured:
+			raise CommandError('ALOC_BASE_URL and ALOC_ACCESS_TOKEN must be set')
+
+		exam_type = get_past_exam_type(options['exam_format'])
+		years = parse_years(options['year']) or [None]
+		total = 0
+		for subject_name in options['subject']:
+			subject = get_or_create_subject(subject_name)
+			topic = general_topic(subject)
+			for year in years:
+				# Questions already mirrored count as duplicates, so reruns only add new ones
+				known = Question.objects.filter(subject=subject, metadata__source='ALOC')
+				if year is not None:
+					known = known.filter(metadata__year__in=[year, str(year)])
+				known_ids = [value for value in known.values_list('metadata__external_id', flat=True) if value is not None]
+
+				harvest = async_to_sync(client.harvest)(
+					subject.name, options['exam_format'], year,
+					target=options['target'], max_requests=options['max_requests'], known_ids=known_ids,
+				)
+				stored = upsert_aloc_questions(harvest.items, subject, exam_type=exam_type, topic=topic, year=year)
+				total += len(stored)
+				self.stdout.write(
+					f"{subject.name} {year or 'all years'}: stored {len(stored)} "
+					f"({harvest.requests} requests, {harvest.duplicates} duplicates, "
+					f"{harvest.throttled} throttled; stopped: {harvest.stopped})"
+				)
+
+		self.stdout.write(self.style.SUCCESS(f"Mirrored {total} ALOC questions"))
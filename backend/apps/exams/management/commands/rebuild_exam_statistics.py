@@ -0,0 +1,31 @@
+"""
+Recompute materialized exam statistics from stored results.
+
+Statistics are normally updated as each submission finishes; run this after
+importing or deleting results, or to backfill exams graded before the
+statistics existed::
+
+	python manage.py rebuild_exam_statistics            # every exam with results
+	python manage.py rebuild_exam_statistics --exam 12 --exam 15
+"""
+from django.core.management.base import BaseCommand
+
+from apps.exams.models import ExamResult
+from apps.exams.services.exam_statistics import rebuild_exam_statistics
+
+
+class Command(BaseCommand):
+	help = 'Recompute ExamStatistics rows from stored exam results'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--exam', action='append', type=int, default=[], help='MockExam id (repeatable)')
+
+	def handle(self, *args, **options):
+		exam_ids = options['exam'] or sorted(set(
+			ExamResult.objects.values_list('attempt__mock_exam_id', flat=True)
+		))
+		for exam_id in exam_ids:
+			stats = rebuild_exam_statistics(exam_id)
+			self.stdout.write(f"Exam {exam_id}: {stats.attempt_count} results")
+
+		self.stdout.write(self.style.SUCCESS(f"Rebuilt statistics for {len(exam_ids)} exams"))
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-17 03:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0002_examgenerationjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examattempt',
+            name='grading',
+            field=models.JSONField(blank=True, default=dict, help_text='Grading progress: phase, theory_total, theory_graded, breakdown'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.3 on 2026-10-17 03:33
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0003_attempt_grading'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamSubmissionJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='queued', max_length=20)),
+                ('stages', models.JSONField(blank=True, default=dict, help_text='Completed stage -> ISO timestamp')),
+                ('error_message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submission_jobs', to='exams.examattempt')),
+                ('result', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submission_jobs', to='exams.examresult')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['attempt', 'status'], name='exams_exams_attempt_dcc8fd_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.3 on 2026-10-17 03:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0004_examsubmissionjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('passed_count', models.PositiveIntegerField(default=0)),
+                ('mean_percentage', models.FloatField(default=0.0)),
+                ('m2_percentage', models.FloatField(default=0.0, help_text='Welford sum of squared deviations of percentage')),
+                ('score_sum', models.FloatField(default=0.0)),
+                ('min_score', models.FloatField(blank=True, null=True)),
+                ('max_score', models.FloatField(blank=True, null=True)),
+                ('time_taken_sum', models.PositiveBigIntegerField(default=0)),
+                ('histogram', models.JSONField(blank=True, default=list, help_text='Attempt counts per 10% percentage band')),
+                ('question_stats', models.JSONField(blank=True, default=dict, help_text='Question id -> {attempts, correct, percentage_sum, correct_percentage_sum}')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('mock_exam', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='exams.mockexam')),
+            ],
+            options={
+                'verbose_name_plural': 'exam statistics',
+            },
+        ),
+    ]
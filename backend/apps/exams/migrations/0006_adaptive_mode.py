@@ -0,0 +1,23 @@
+# Generated by Django 5.0.3 on 2026-10-17 03:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0005_examstatistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examattempt',
+            name='adaptive',
+            field=models.JSONField(blank=True, default=dict, help_text='Adaptive exam state: ability, se, administered, current'),
+        ),
+        migrations.AddField(
+            model_name='mockexam',
+            name='mode',
+            field=models.CharField(choices=[('fixed', 'Fixed'), ('adaptive', 'Adaptive')], default='fixed', max_length=10),
+        ),
+    ]
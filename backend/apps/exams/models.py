@@ -1,3 +1,4 @@
+import uuid
 
 from django.db import models
 from django.conf import settings
@@ -5,10 +6,45 @@ from apps.content.models import Subject, ExamType
 from apps.questions.models import Question
 from django.utils import timezone
 
+class MockExamQuerySet(models.QuerySet):
+	def with_stats(self):
+		"""
+		Annotate question_count, attempt_count and average_score with
+		correlated subqueries, so listing exams costs one query instead of
+		three per exam.
+		"""
+		from django.db.models import Avg, Count, FloatField, IntegerField, OuterRef, Subquery
+		from django.db.models.functions import Coalesce
+
+		def per_exam(queryset, aggregate, output_field):
+			return Subquery(
+				queryset.filter(mock_exam=OuterRef('pk')).order_by().values('mock_exam')
+				.annotate(value=aggregate).values('value'),
+				output_field=output_field,
+			)
+
+		return self.annotate(
+			question_count=Coalesce(per_exam(MockExamQuestion.objects.all(), Count('id'), IntegerField()), 0),
+			attempt_count=Coalesce(per_exam(ExamAttempt.objects.all(), Count('id'), IntegerField()), 0),
+			average_score=Coalesce(per_exam(
+				ExamAttempt.objects.filter(is_submitted=True, auto_graded=True), Avg('score'), FloatField()
+			), 0.0),
+		)
+
+
 class MockExam(models.Model):
 	"""
 	Represents a generated mock exam (e.g., JAMB format).
+
+	An ``adaptive`` exam serves its questions one at a time, each picked
+	for the candidate's current ability (services/adaptive_exam.py); its
+	MockExamQuestions are the item bank rather than a fixed paper.
 	"""
+	MODE_CHOICES = [
+		('fixed', 'Fixed'),
+		('adaptive', 'Adaptive'),
+	]
+
 	title = models.CharField(max_length=255)
 	description = models.TextField(blank=True, help_text="Exam description and instructions")
 	exam_type = models.ForeignKey(ExamType, on_delete=models.CASCADE)
@@ -20,9 +56,12 @@ class MockExam(models.Model):
 	passing_score = models.PositiveIntegerField(default=40, help_text="Percentage required to pass")
 	is_active = models.BooleanField(default=True)
 	is_public = models.BooleanField(default=True)
+	mode = models.CharField(max_length=10, choices=MODE_CHOICES, default='fixed')
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
 
+	objects = MockExamQuerySet.as_manager()
+
 	class Meta:
 		ordering = ['-created_at']
 		indexes = [
@@ -83,6 +122,8 @@ class ExamAttempt(models.Model):
 	raw_responses = models.JSONField(default=dict, blank=True, help_text="User answers by question id")
 	auto_graded = models.BooleanField(default=False)
 	attempted_questions = models.PositiveIntegerField(default=0, help_text="Count of answered questions")
+	grading = models.JSONField(default=dict, blank=True, help_text="Grading progress: phase, theory_total, theory_graded, breakdown")
+	adaptive = models.JSONField(default=dict, blank=True, help_text="Adaptive exam state: ability, se, administered, current")
 	ip_address = models.GenericIPAddressField(null=True, blank=True)
 	user_agent = models.TextField(blank=True)
 
@@ -151,3 +192,127 @@ class ExamResult(models.Model):
 			return 'D'
 		else:
 			return 'F'
+
+class ExamGenerationJob(models.Model):
+	"""
+	Background generation of a MockExam (see services/exam_jobs.py).
+	Progress is mirrored to the user's notifications WebSocket group.
+	"""
+	STATUS_CHOICES = [
+		('queued', 'Queued'),
+		('running', 'Running'),
+		('completed', 'Completed'),
+		('failed', 'Failed'),
+	]
+
+	id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+	user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='exam_generation_jobs')
+	params = models.JSONField(default=dict, help_text="Arguments for generate_mock_exam_by_subject_name")
+	status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+	progress = models.JSONField(default=dict, blank=True, help_text="Latest progress event: stage, done, total, message")
+	mock_exam = models.ForeignKey(MockExam, on_delete=models.SET_NULL, null=True, blank=True, related_name='generation_jobs')
+	error_message = models.TextField(blank=True)
+	created_at = models.DateTimeField(auto_now_add=True)
+	updated_at = models.DateTimeField(auto_now=True)
+
+	class Meta:
+		ordering = ['-created_at']
+		indexes = [
+			models.Index(fields=['user', 'status']),
+		]
+
+	def __str__(self):
+		return f"Exam generation {self.id} ({self.status})"
+
+class ExamSubmissionJob(models.Model):
+	"""
+	Receipt for a submitted ExamAttempt. Grading, analysis and the
+	analytics/gamification effects run in the background as idempotent
+	stages (see services/exam_submission.py); each completed stage is
+	recorded in ``stages`` so a retried job resumes where it stopped.
+	"""
+	STATUS_CHOICES = [
+		('queued', 'Queued'),
+		('running', 'Running'),
+		('completed', 'Completed'),
+		('failed', 'Failed'),
+	]
+
+	id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+	attempt = models.ForeignKey(ExamAttempt, on_delete=models.CASCADE, related_name='submission_jobs')
+	status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+	stages = models.JSONField(default=dict, blank=True, help_text="Completed stage -> ISO timestamp")
+	result = models.ForeignKey(ExamResult, on_delete=models.SET_NULL, null=True, blank=True, related_name='submission_jobs')
+	error_message = models.TextField(blank=True)
+	created_at = models.DateTimeField(auto_now_add=True)
+	updated_at = models.DateTimeField(auto_now=True)
+
+	class Meta:
+		ordering = ['-created_at']
+		indexes = [
+			models.Index(fields=['attempt', 'status']),
+		]
+
+	def __str__(self):
+		return f"Exam submission {self.id} ({self.status})"
+
+class ExamStatistics(models.Model):
+	"""
+	Running aggregates over a MockExam's finalized results, updated one
+	result at a time (see services/exam_statistics.py) so the stats endpoint
+	reads a single row instead of scanning every attempt.
+	"""
+	HISTOGRAM_BUCKETS = 10
+
+	mock_exam = models.OneToOneField(MockExam, on_delete=models.CASCADE, related_name='statistics')
+	attempt_count = models.PositiveIntegerField(default=0)
+	passed_count = models.PositiveIntegerField(default=0)
+	mean_percentage = models.FloatField(default=0.0)
+	m2_percentage = models.FloatField(default=0.0, help_text="Welford sum of squared deviations of percentage")
+	score_sum = models.FloatField(default=0.0)
+	min_score = models.FloatField(null=True, blank=True)
+	max_score = models.FloatField(null=True, blank=True)
+	time_taken_sum = models.PositiveBigIntegerField(default=0)
+	histogram = models.JSONField(default=list, blank=True, help_text="Attempt counts per 10% percentage band")
+	question_stats = models.JSONField(default=dict, blank=True, help_text="Question id -> {attempts, correct, percentage_sum, correct_percentage_sum}")
+	updated_at = models.DateTimeField(auto_now=True)
+
+	class Meta:
+		verbose_name_plural = 'exam statistics'
+
+	def __str__(self):
+		return f"Statistics for {self.mock_exam_id} ({self.attempt_count} attempts)"
+
+	@property
+	def variance_percentage(self):
+		"""Population variance of the attempt percentages."""
+		return self.m2_percentage / self.attempt_count if self.attempt_count else 0.0
+
+	def add_result(self, percentage, score, time_taken_seconds, passed, correct_by_question):
+		"""
+		Fold one result in. ``correct_by_question`` maps question id to
+		whether the attempt got it right.
+		"""
+		self.attempt_count += 1
+		self.passed_count += int(bool(passed))
+		delta = percentage - self.mean_percentage
+		self.mean_percentage += delta / self.attempt_count
+		self.m2_percentage += delta * (percentage - self.mean_percentage)
+		self.score_sum += score
+		self.min_score = score if self.min_score is None else min(self.min_score, score)
+		self.max_score = score if self.max_score is None else max(self.max_score, score)
+		self.time_taken_sum += time_taken_seconds or 0
+
+		histogram = list(self.histogram) or [0] * self.HISTOGRAM_BUCKETS
+		histogram[min(max(int(percentage // 10), 0), self.HISTOGRAM_BUCKETS - 1)] += 1
+		self.histogram = histogram
+
+		for question_id, is_correct in correct_by_question.items():
+			entry = self.question_stats.setdefault(
+				str(question_id), {'attempts': 0, 'correct': 0, 'percentage_sum': 0.0, 'correct_percentage_sum': 0.0}
+			)
+			entry['attempts'] += 1
+			entry['percentage_sum'] += percentage
+			if is_correct:
+				entry['correct'] += 1
+				entry['correct_percentage_sum'] += percentage
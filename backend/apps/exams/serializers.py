@@ -1,6 +1,6 @@
 
 from rest_framework import serializers
-from .models import MockExam, ExamAttempt, ExamResult
+from .models import MockExam, ExamAttempt, ExamResult, ExamGenerationJob, ExamSubmissionJob
 from apps.questions.models import Question, Answer
 from apps.content.models import Topic
 
@@ -45,20 +45,33 @@ class MockExamSerializer(serializers.ModelSerializer):
 		fields = [
 			"id", "title", "description", "exam_type", "subject",
 			"created_by", "duration_minutes", "total_marks",
-			"passing_score", "is_active", "is_public",
+			"passing_score", "is_active", "is_public", "mode",
 			"question_count", "attempt_count", "average_score",
 			"created_at", "updated_at"
 		]
 		read_only_fields = ["created_at", "updated_at"]
 	
+	# Querysets annotated with MockExam.objects.with_stats() skip the per-exam queries
+
 	def get_question_count(self, obj):
-		return obj.get_question_count()
+		count = getattr(obj, 'question_count', None)
+		return count if count is not None else obj.get_question_count()
 	
 	def get_attempt_count(self, obj):
-		return obj.get_attempt_count()
+		count = getattr(obj, 'attempt_count', None)
+		return count if count is not None else obj.get_attempt_count()
 	
 	def get_average_score(self, obj):
-		return obj.get_average_score()
+		score = getattr(obj, 'average_score', None)
+		return score if score is not None else obj.get_average_score()
+
+class ExamGenerationJobSerializer(serializers.ModelSerializer):
+	mock_exam = MockExamSerializer(read_only=True)
+
+	class Meta:
+		model = ExamGenerationJob
+		fields = ["id", "status", "progress", "error_message", "mock_exam", "created_at", "updated_at"]
+		read_only_fields = fields
 
 class MockExamDetailSerializer(MockExamSerializer):
 	questions = QuestionDetailSerializer(many=True, read_only=True)
@@ -83,12 +96,12 @@ class ExamAttemptSerializer(serializers.ModelSerializer):
 			"id", "user_name", "mock_exam", "mock_exam_id", "started_at",
 			"completed_at", "time_taken_seconds", "is_submitted", "status",
 			"score", "percentage", "raw_responses", "auto_graded",
-			"attempted_questions", "remaining_time_seconds",
+			"attempted_questions", "grading", "remaining_time_seconds",
 			"is_time_expired", "ip_address", "user_agent"
 		]
 		read_only_fields = [
 			"user_name", "started_at", "completed_at", "score",
-			"percentage", "auto_graded", "attempted_questions",
+			"percentage", "auto_graded", "attempted_questions", "grading",
 			"status", "ip_address", "user_agent"
 		]
 	
@@ -129,6 +142,15 @@ class ExamResultSerializer(serializers.ModelSerializer):
 	def get_percentage_display(self, obj):
 		return f"{obj.percentage:.1f}%"
 
+class ExamSubmissionJobSerializer(serializers.ModelSerializer):
+	attempt = ExamAttemptSerializer(read_only=True)
+	result = ExamResultSerializer(read_only=True)
+
+	class Meta:
+		model = ExamSubmissionJob
+		fields = ["id", "status", "stages", "error_message", "attempt", "result", "created_at", "updated_at"]
+		read_only_fields = fields
+
 class ExamSubmissionSerializer(serializers.Serializer):
 	"""Serializer for exam submission."""
 	raw_responses = serializers.JSONField(
@@ -0,0 +1,296 @@
+"""
+Computerized adaptive testing for ``mode='adaptive'`` mock exams.
+
+An adaptive exam's MockExamQuestions are an item bank. Questions are served
+one at a time. After each answer the candidate's ability is re-estimated
+(EAP on a fixed grid, with the calibrated ability from LearnerAbility as
+the prior mean), and the next question is the unused item with the most
+Fisher information at that ability. The exam stops once the ability's
+standard error reaches TARGET_SE (after at least MIN_ITEMS), at MAX_ITEMS,
+or when the bank runs out. This usually reaches the precision of a fixed
+paper with about half the questions.
+
+Item parameters come from QuestionCalibration (see
+apps/questions/services/difficulty_calibrator.py). Uncalibrated questions
+fall back to their EASY/MEDIUM/HARD label. Only objective questions enter
+the bank, because each answer has to be scored on the spot.
+
+ItemBank is built once per exam and cached like the answer key. It
+includes, for every grid point, the CANDIDATES most informative items in
+order. Picking the next question is therefore a walk down one precomputed
+list, falling back to a vectorized argmax only when the whole list has
+been used.
+
+The bank may be rebuilt while an attempt is running (questions edited or
+removed). The key and parameters of the question being asked, and of every
+question already answered, are therefore kept in ExamAttempt.adaptive, so
+scoring and the ability estimate never depend on the current bank.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from apps.questions.models import Question
+from apps.questions.services.difficulty_calibrator import get_item_parameters, get_learner_ability
+
+from ..models import ExamAttempt
+from .answer_key import get_answer_key
+from .exam_grader import THEORY_TYPES
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'adaptive_bank'
+
+DEFAULTS = {
+	'MIN_ITEMS': 10,
+	'MAX_ITEMS': 30,
+	'TARGET_SE': 0.3,
+	'CANDIDATES': 10,
+	'GRID_MIN': -4.0,
+	'GRID_MAX': 4.0,
+	'GRID_POINTS': 81,
+	'CACHE_ALIAS': 'default',
+	'TIMEOUT': 60 * 60,
+}
+
+# Item difficulty (logits) assumed for questions without a calibration
+LABEL_DIFFICULTY = {'EASY': -1.0, 'MEDIUM': 0.0, 'HARD': 1.0}
+
+
+def get_adaptive_config():
+	return {**DEFAULTS, **getattr(settings, 'ADAPTIVE_EXAM', {})}
+
+
+def _probability(theta, discrimination, difficulty):
+	return 1.0 / (1.0 + np.exp(-discrimination * (theta - difficulty)))
+
+
+@dataclass(frozen=True)
+class ItemBank:
+	"""IRT parameters of an adaptive exam's objective questions plus the candidate table."""
+	mock_exam_id: int
+	question_ids: np.ndarray
+	correct_answer_ids: Tuple[str, ...]
+	discrimination: np.ndarray
+	difficulty: np.ndarray
+	grid: np.ndarray
+	ranked: np.ndarray
+	index: Dict[int, int]
+
+	def __len__(self):
+		return len(self.question_ids)
+
+	@classmethod
+	def load(cls, mock_exam_id, config=None):
+		config = config or get_adaptive_config()
+		keyed = [
+			q for q in get_answer_key(mock_exam_id)
+			if q.question_type not in THEORY_TYPES and q.correct_answer_id is not None
+		]
+		parameters = get_item_parameters([q.id for q in keyed])
+		discrimination = np.array([parameters.get(q.id, (1.0, None))[0] for q in keyed], dtype=np.float64)
+		difficulty = np.array([
+			parameters[q.id][1] if q.id in parameters else LABEL_DIFFICULTY.get(q.difficulty, 0.0)
+			for q in keyed
+		], dtype=np.float64)
+
+		grid = np.linspace(config['GRID_MIN'], config['GRID_MAX'], config['GRID_POINTS'])
+		p = _probability(grid[None, :], discrimination[:, None], difficulty[:, None])
+		information = discrimination[:, None] ** 2 * p * (1 - p)
+		# Most informative items first at every grid point
+		ranked = np.argsort(-information, axis=0, kind='stable')[:config['CANDIDATES']].T
+
+		return cls(
+			mock_exam_id=mock_exam_id,
+			question_ids=np.array([q.id for q in keyed], dtype=np.int64),
+			correct_answer_ids=tuple(str(q.correct_answer_id) for q in keyed),
+			discrimination=discrimination,
+			difficulty=difficulty,
+			grid=grid,
+			ranked=ranked.astype(np.int32),
+			index={q.id: i for i, q in enumerate(keyed)},
+		)
+
+	def estimate(self, items, correct, prior_mean=0.0):
+		"""EAP ability and its standard error from answered item indices."""
+		items = np.asarray(items, dtype=np.int64)
+		return self.estimate_from(self.discrimination[items], self.difficulty[items], correct, prior_mean)
+
+	def estimate_from(self, discrimination, difficulty, correct, prior_mean=0.0):
+		"""EAP ability and its standard error from the parameters of the answered items."""
+		log_posterior = -0.5 * (self.grid - prior_mean) ** 2
+		if len(correct):
+			discrimination = np.asarray(discrimination, dtype=np.float64)[:, None]
+			difficulty = np.asarray(difficulty, dtype=np.float64)[:, None]
+			y = np.asarray(correct, dtype=np.float64)[:, None]
+			p = _probability(self.grid[None, :], discrimination, difficulty)
+			log_posterior = log_posterior + (y * np.log(p) + (1 - y) * np.log1p(-p)).sum(axis=0)
+		weights = np.exp(log_posterior - log_posterior.max())
+		weights /= weights.sum()
+		theta = float(weights @ self.grid)
+		se = float(np.sqrt(weights @ (self.grid - theta) ** 2))
+		return theta, se
+
+	def select(self, theta, used):
+		"""Index of the most informative unused item at ``theta``, or None."""
+		point = int(np.abs(self.grid - theta).argmin())
+		for item in self.ranked[point]:
+			if int(item) not in used:
+				return int(item)
+		if len(used) >= len(self):
+			return None
+		p = _probability(theta, self.discrimination, self.difficulty)
+		information = self.discrimination ** 2 * p * (1 - p)
+		information[list(used)] = -1
+		return int(information.argmax())
+
+	def expected_percentage(self, theta):
+		"""Expected percent correct over the whole bank at ``theta``."""
+		if not len(self):
+			return 0.0
+		return float(_probability(theta, self.discrimination, self.difficulty).mean() * 100)
+
+
+def _cache_key(mock_exam_id):
+	return f"{KEY_PREFIX}:{mock_exam_id}"
+
+
+def get_item_bank(mock_exam_id):
+	"""The cached item bank of an adaptive exam, building it on first use."""
+	config = get_adaptive_config()
+	cache = caches[config['CACHE_ALIAS']]
+	bank = cache.get(_cache_key(mock_exam_id))
+	if bank is None:
+		bank = ItemBank.load(mock_exam_id, config)
+		if len(bank):
+			cache.set(_cache_key(mock_exam_id), bank, config['TIMEOUT'])
+	return bank
+
+
+def invalidate_item_bank(mock_exam_id):
+	caches[get_adaptive_config()['CACHE_ALIAS']].delete(_cache_key(mock_exam_id))
+
+
+def administered_question_ids(attempt):
+	"""Question ids served in an adaptive attempt, or None for a fixed exam."""
+	if not attempt.adaptive:
+		return None
+	return set(attempt.adaptive.get('administered', []))
+
+
+def _max_items(bank, config):
+	return min(config['MAX_ITEMS'], len(bank))
+
+
+def _serve(state, bank, item):
+	"""Make bank item ``item`` (or None) the current question, keeping its key and parameters."""
+	if item is None:
+		state.update({'current': None, 'current_item': None})
+		return
+	state.update({
+		'current': int(bank.question_ids[item]),
+		'current_item': {
+			'answer_id': bank.correct_answer_ids[item],
+			'discrimination': float(bank.discrimination[item]),
+			'difficulty': float(bank.difficulty[item]),
+		},
+	})
+
+
+def start_adaptive_attempt(attempt):
+	"""Initialise the adaptive state of a new attempt and pick its first question."""
+	config = get_adaptive_config()
+	bank = get_item_bank(attempt.mock_exam_id)
+	if not len(bank):
+		raise ValueError('This adaptive exam has no objective questions')
+	prior = get_learner_ability(attempt.user)
+	theta, se = bank.estimate([], [], prior)
+	attempt.adaptive = {
+		'prior': prior,
+		'ability': theta,
+		'se': se,
+		'administered': [],
+		'correct': [],
+		# (discrimination, difficulty) of each administered question
+		'parameters': [],
+		'max_items': _max_items(bank, config),
+		'finished': False,
+		'percentage': bank.expected_percentage(theta),
+	}
+	_serve(attempt.adaptive, bank, bank.select(theta, set()))
+	ExamAttempt.objects.filter(pk=attempt.pk).update(adaptive=attempt.adaptive)
+	return attempt.adaptive
+
+
+def answer_adaptive_question(attempt, question_id, answer_id):
+	"""
+	Record the answer to the attempt's current question and choose the next.
+
+	Raises ValueError if the attempt is not in progress or ``question_id``
+	is not the question being asked.
+	"""
+	config = get_adaptive_config()
+	bank = get_item_bank(attempt.mock_exam_id)
+	with transaction.atomic():
+		attempt = ExamAttempt.objects.select_for_update().get(pk=attempt.pk)
+		state = attempt.adaptive
+		if attempt.status != 'IN_PROGRESS' or not state or state.get('finished'):
+			raise ValueError('This adaptive exam is not in progress')
+		if state.get('current') != question_id:
+			raise ValueError('Answer the current question first')
+
+		# Scored from the snapshot taken when the question was served, not the (possibly rebuilt) bank
+		served = state.get('current_item')
+		if not served:
+			raise ValueError('This question is no longer part of the exam')
+		state['administered'].append(question_id)
+		state['correct'].append(int(str(answer_id) == served['answer_id']))
+		state['parameters'].append([served['discrimination'], served['difficulty']])
+		attempt.raw_responses[str(question_id)] = answer_id
+
+		discrimination, difficulty = zip(*state['parameters'])
+		theta, se = bank.estimate_from(discrimination, difficulty, state['correct'], state.get('prior', 0.0))
+		used = {bank.index[qid] for qid in state['administered'] if qid in bank.index}
+		answered = len(state['administered'])
+		done = answered >= state['max_items'] or (answered >= config['MIN_ITEMS'] and se <= config['TARGET_SE'])
+		following = None if done else bank.select(theta, used)
+		_serve(state, bank, following)
+		state.update({
+			'ability': theta,
+			'se': se,
+			'finished': following is None,
+			'percentage': bank.expected_percentage(theta),
+		})
+		attempt.attempted_questions = answered
+		attempt.save(update_fields=['adaptive', 'raw_responses', 'attempted_questions'])
+	return attempt
+
+
+def question_payload(question_id):
+	"""The question as shown to the candidate (no answer key)."""
+	if question_id is None:
+		return None
+	question = Question.objects.prefetch_related('answers').get(pk=question_id)
+	return {
+		'id': question.id,
+		'content': question.content,
+		'question_type': question.question_type,
+		'answers': [{'id': answer.id, 'content': answer.content} for answer in question.answers.all()],
+	}
+
+
+def adaptive_progress(attempt):
+	"""Client view of an adaptive attempt: progress and the current question."""
+	state = attempt.adaptive or {}
+	return {
+		'attempt_id': attempt.id,
+		'answered': len(state.get('administered', [])),
+		'max_items': state.get('max_items'),
+		'finished': bool(state.get('finished')),
+		'question': question_payload(state.get('current')),
+	}
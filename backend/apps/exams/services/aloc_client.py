@@ -0,0 +1,337 @@
+"""
+Async harvester for the ALOC past-questions API.
+
+ALOC's ``/q`` endpoint returns one random question per request, so filling
+an exam takes many small requests and returns plenty of repeats.
+AlocClient.harvest() sends them over one pooled httpx.AsyncClient (keep-alive
+connections, no TLS handshake per request), de-duplicates on ALOC's question
+id as responses arrive, and stops at the target, at the request budget, or
+when a run of duplicates shows the subject/year is exhausted.
+
+Each access token has its own AIMD concurrency limit. The limit grows by one
+after a window of clean responses and halves on 429, 5xx or timeouts, so a
+throttled key backs off without stalling the others. Learned limits are kept
+per process, so the next harvest starts where the last one settled.
+
+upsert_aloc_questions() writes a harvest in one transaction through
+QuestionGenerationService.bulk_create_questions. The mirror_aloc_questions
+command uses both to pre-harvest subjects and years into the local bank, so
+exam creation normally finds its past questions without calling ALOC.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+
+import httpx
+from django.conf import settings
+from django.db import transaction
+
+from apps.questions.models import Question, Topic
+from apps.questions.services.question_generator import QuestionGenerationService
+from apps.questions.services.question_pool import get_question_pool
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+	'INITIAL_CONCURRENCY': 2,
+	'MAX_CONCURRENCY': 8,
+	'SATURATION_STREAK': 25,
+	'REQUEST_BUDGET_FACTOR': 4,
+	'LIVE_FETCH': True,
+	'LIVE_FETCH_SECONDS': 15,
+}
+
+# Exam formats whose ALOC ``type`` differs from the lowercased name
+ALOC_EXAM_TYPES = {
+	'JAMB': 'utme',
+	'UTME': 'utme',
+	'WAEC': 'wassce',
+	'WASSCE': 'wassce',
+	'POST-UTME': 'post-utme',
+}
+
+# token -> concurrency limit the last harvest settled on
+_learned_limits = {}
+
+
+def get_aloc_config():
+	config = {**DEFAULTS, **getattr(settings, 'ALOC_CLIENT', {})}
+	config['TOKENS'] = [
+		token for token in (
+			getattr(settings, 'ALOC_ACCESS_TOKEN', None),
+			getattr(settings, 'ALOC_ACCESS_TOKEN_SECONDARY', None),
+		) if token
+	]
+	config['BASE_URL'] = getattr(settings, 'ALOC_BASE_URL', None)
+	config['TIMEOUT'] = getattr(settings, 'ALOC_TIMEOUT', 60)
+	return config
+
+
+def aloc_exam_type(exam_format):
+	if not exam_format:
+		return None
+	return ALOC_EXAM_TYPES.get(exam_format.upper(), exam_format.lower())
+
+
+class AdaptiveLimit:
+	"""AIMD concurrency limit for one access token."""
+
+	def __init__(self, token, initial, maximum):
+		self.token = token
+		self.maximum = maximum
+		self.limit = max(1, min(initial, maximum))
+		self.in_flight = 0
+		self.disabled = False
+		self._clean = 0
+		self._cond = asyncio.Condition()
+
+	async def acquire(self):
+		async with self._cond:
+			await self._cond.wait_for(lambda: self.in_flight < self.limit)
+			self.in_flight += 1
+
+	async def release(self, outcome=None):
+		"""``outcome`` is 'ok', 'throttled' or None (no signal either way)."""
+		async with self._cond:
+			self.in_flight -= 1
+			if outcome == 'ok':
+				self._clean += 1
+				if self._clean >= self.limit and self.limit < self.maximum:
+					self.limit += 1
+					self._clean = 0
+			elif outcome == 'throttled':
+				self.limit = max(1, self.limit // 2)
+				self._clean = 0
+			self._cond.notify_all()
+
+
+@dataclass
+class Harvest:
+	"""Unique ALOC items in arrival order plus counters for logging."""
+	items: list = field(default_factory=list)
+	requests: int = 0
+	duplicates: int = 0
+	throttled: int = 0
+	errors: int = 0
+	stopped: str = ''
+	limits: dict = field(default_factory=dict)
+
+
+class AlocClient:
+	"""Concurrent, de-duplicating ALOC fetcher; see the module docstring."""
+
+	def __init__(self, tokens=None, base_url=None, timeout=None, transport=None, config=None):
+		self.config = config or get_aloc_config()
+		self.tokens = list(tokens if tokens is not None else self.config['TOKENS'])
+		self.base_url = (base_url or self.config['BASE_URL'] or '').rstrip('/')
+		self.timeout = timeout or self.config['TIMEOUT']
+		self.transport = transport
+
+	@property
+	def configured(self):
+		return bool(self.base_url and self.tokens)
+
+	def _client(self):
+		max_connections = len(self.tokens) * self.config['MAX_CONCURRENCY']
+		return httpx.AsyncClient(
+			base_url=self.base_url,
+			timeout=httpx.Timeout(self.timeout, connect=10),
+			limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+			transport=self.transport,
+		)
+
+	async def harvest(self, subject, exam_format=None, year=None, target=40, max_requests=None,
+					  known_ids=(), time_budget=None, on_progress=None):
+		"""
+		Collect up to ``target`` distinct questions for a subject/format/year.
+
+		``known_ids`` are ALOC ids the caller already has; they count as
+		duplicates. ``time_budget`` (seconds) bounds the whole harvest, and
+		whatever arrived before it ran out is returned. ``on_progress`` is an
+		async callable receiving the number of distinct items so far.
+		"""
+		result = Harvest()
+		if not self.configured or target <= 0:
+			result.stopped = 'not configured' if not self.configured else 'target reached'
+			return result
+
+		params = {'subject': subject.lower()}
+		if aloc_exam_type(exam_format):
+			params['type'] = aloc_exam_type(exam_format)
+		if year:
+			params['year'] = str(year)
+
+		if max_requests is None:
+			max_requests = int(target * self.config['REQUEST_BUDGET_FACTOR']) + 10
+		seen = {str(external_id) for external_id in known_ids}
+		state = {'streak': 0}
+		lanes = [
+			AdaptiveLimit(token, _learned_limits.get(token, self.config['INITIAL_CONCURRENCY']), self.config['MAX_CONCURRENCY'])
+			for token in self.tokens
+		]
+
+		def finished():
+			if len(result.items) >= target:
+				result.stopped = result.stopped or 'target reached'
+			elif state['streak'] >= self.config['SATURATION_STREAK']:
+				result.stopped = result.stopped or 'exhausted'
+			elif result.requests >= max_requests:
+				result.stopped = result.stopped or 'request budget'
+			return bool(result.stopped)
+
+		async def accept(payload):
+			items = payload.get('data') if isinstance(payload, dict) else None
+			if isinstance(items, dict):
+				items = [items]
+			for item in items or []:
+				if not isinstance(item, dict) or not item.get('question'):
+					continue
+				key = str(item.get('id') or item['question'])
+				if key in seen:
+					result.duplicates += 1
+					state['streak'] += 1
+					continue
+				seen.add(key)
+				state['streak'] = 0
+				if len(result.items) < target:
+					result.items.append(item)
+					if on_progress is not None:
+						await on_progress(len(result.items))
+
+		async def worker(client, lane):
+			while not lane.disabled and not finished():
+				await lane.acquire()
+				if lane.disabled or finished():
+					await lane.release()
+					return
+				result.requests += 1
+				outcome = None
+				try:
+					response = await client.get('/q', params=params, headers={'AccessToken': lane.token})
+					if response.status_code == 429 or response.status_code >= 500:
+						result.throttled += 1
+						outcome = 'throttled'
+					elif response.status_code in (401, 403):
+						logger.warning(f"ALOC rejected access token ...{lane.token[-4:]} ({response.status_code})")
+						result.errors += 1
+						lane.disabled = True
+					elif response.status_code != 200:
+						result.errors += 1
+					else:
+						outcome = 'ok'
+						await accept(response.json())
+				except httpx.TimeoutException:
+					result.throttled += 1
+					outcome = 'throttled'
+				except (httpx.HTTPError, ValueError) as e:
+					logger.warning(f"ALOC request failed: {e}")
+					result.errors += 1
+				finally:
+					await lane.release(outcome)
+
+		async with self._client() as client:
+			workers = [
+				asyncio.ensure_future(worker(client, lane))
+				for lane in lanes for _ in range(lane.maximum)
+			]
+			try:
+				await asyncio.wait_for(asyncio.gather(*workers), time_budget)
+			except asyncio.TimeoutError:
+				result.stopped = result.stopped or 'time budget'
+
+		if not result.stopped:
+			result.stopped = 'no usable token' if all(lane.disabled for lane in lanes) else 'finished'
+		for lane in lanes:
+			result.limits[lane.token] = lane.limit
+			if not lane.disabled:
+				_learned_limits[lane.token] = lane.limit
+		logger.info(
+			f"ALOC harvest {params}: {len(result.items)} new of {result.requests} requests "
+			f"({result.duplicates} duplicates, {result.throttled} throttled, {result.errors} errors), stopped: {result.stopped}"
+		)
+		return result
+
+
+def general_topic(subject):
+	"""The subject's first topic, creating the auto-generated 'General' one if it has none."""
+	topic = Topic.objects.filter(subject=subject).first()
+	if topic is None:
+		topic = Topic.objects.create(
+			subject=subject,
+			name='General',
+			difficulty='BEGINNER',
+			order=0,
+			estimated_hours=1.0,
+			description='Auto-generated topic',
+			learning_objectives=[]
+		)
+	return topic
+
+
+def _payload(item, year=None):
+	"""ALOC item -> QuestionPayloadValidator item; options keep their letter order."""
+	options = item.get('option') or {}
+	letters = sorted(letter for letter, text in options.items() if str(text or '').strip())
+	answer = str(item.get('answer') or '').strip().lower()
+	return {
+		'content': item.get('question'),
+		'options': [options[letter] for letter in letters],
+		'correct_answer_index': letters.index(answer) if answer in letters else None,
+		'explanation': item.get('solution') or '',
+		'metadata': {
+			'source': 'ALOC',
+			'year': year or item.get('examyear'),
+			'external_id': item.get('id'),
+		},
+	}
+
+
+def upsert_aloc_questions(items, subject, exam_type=None, topic=None, year=None):
+	"""
+	Store harvested ALOC items for ``subject`` in one transaction.
+
+	Questions already stored (by ALOC id, then by text) are reused rather
+	than duplicated; reused rows missing the exam type or ALOC metadata are
+	updated so the question pool files them with the mirrored year. Returns
+	the questions in item order.
+	"""
+	payloads = [_payload(item, year) for item in items]
+	external_ids = [p['metadata']['external_id'] for p in payloads if p['metadata']['external_id'] is not None]
+	by_external_id = {}
+	if external_ids:
+		for question in Question.objects.filter(
+			subject=subject, metadata__source='ALOC', metadata__external_id__in=external_ids
+		).order_by('id'):
+			by_external_id.setdefault(str(question.metadata.get('external_id')), question)
+
+	fresh = [p for p in payloads if str(p['metadata']['external_id']) not in by_external_id]
+	metadata_by_content = {str(p['content']).strip(): p['metadata'] for p in payloads}
+
+	with transaction.atomic():
+		stored = QuestionGenerationService.bulk_create_questions(
+			fresh, subject=subject, topic=topic, exam_type=exam_type,
+			existing='reuse', answer_types=('MCQ',),
+		) if fresh else []
+		stored_by_content = {q.content: q for q in stored}
+
+		questions, picked, changed = [], set(), []
+		for p in payloads:
+			question = by_external_id.get(str(p['metadata']['external_id'])) or stored_by_content.get(str(p['content']).strip())
+			if question is None or question.id in picked:
+				continue
+			questions.append(question)
+			picked.add(question.id)
+			# Stored values win; only fill in what the row is missing
+			metadata = {
+				**metadata_by_content.get(question.content, {}),
+				**{key: value for key, value in question.metadata.items() if value not in (None, '')},
+			}
+			if (exam_type is not None and question.exam_type_id is None) or metadata != question.metadata:
+				question.exam_type_id = question.exam_type_id or getattr(exam_type, 'id', None)
+				question.metadata = metadata
+				changed.append(question)
+
+		if changed:
+			Question.objects.bulk_update(changed, ['exam_type', 'metadata'])
+			transaction.on_commit(lambda: get_question_pool().invalidate(subject.id))
+	return questions
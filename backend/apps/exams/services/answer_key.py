@@ -0,0 +1,117 @@
+"""
+Per-exam answer key shared by grading and analysis.
+
+A MockExam's questions and correct answers never change after the exam is
+generated, so ExamAnswerKey loads them once (two queries: the ordered
+questions with their topics, then the correct answers) and caches the
+result per exam. auto_grade_exam and analyze_exam_result both read from it
+instead of each re-querying mockexamquestion_set and the Answer table.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from django.core.cache import caches
+from django.conf import settings
+
+from apps.questions.models import Answer
+
+from ..models import MockExamQuestion
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'exam_answer_key'
+
+DEFAULTS = {
+	'CACHE_ALIAS': 'default',
+	'TIMEOUT': 60 * 60 * 24,
+}
+
+
+def get_answer_key_config():
+	return {**DEFAULTS, **getattr(settings, 'EXAM_ANSWER_KEY', {})}
+
+
+@dataclass(frozen=True)
+class KeyedQuestion:
+	id: int
+	content: str
+	question_type: str
+	difficulty: str
+	guidance: str
+	subject_id: int
+	topic_id: Optional[int]
+	topic_name: Optional[str]
+	correct_answer_id: Optional[int] = None
+	correct_answer_text: Optional[str] = None
+	correct_answer_explanation: Optional[str] = None
+	# Every correct answer, for multi-answer questions (e.g. flashcard backs)
+	correct_answer_texts: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class ExamAnswerKey:
+	"""Questions of one exam in exam order, each with its correct answer."""
+	mock_exam_id: int
+	questions: Tuple[KeyedQuestion, ...]
+
+	def __len__(self):
+		return len(self.questions)
+
+	def __iter__(self):
+		return iter(self.questions)
+
+	@classmethod
+	def load(cls, mock_exam_id):
+		rows = MockExamQuestion.objects.filter(mock_exam_id=mock_exam_id).order_by('order', 'id').values_list(
+			'question_id', 'question__content', 'question__question_type', 'question__difficulty',
+			'question__guidance', 'question__subject_id', 'question__topic_id', 'question__topic__name',
+		)
+		rows = list(rows)
+		correct, texts = {}, {}
+		for answer_id, question_id, content, explanation in Answer.objects.filter(
+			question_id__in=[row[0] for row in rows], is_correct=True
+		).order_by('id').values_list('id', 'question_id', 'content', 'explanation'):
+			# Same pick as the old {question_id: answer} dict: the last correct answer wins
+			correct[question_id] = (answer_id, content, explanation)
+			texts.setdefault(question_id, []).append(content)
+
+		questions = []
+		for question_id, content, question_type, difficulty, guidance, subject_id, topic_id, topic_name in rows:
+			answer_id, answer_text, explanation = correct.get(question_id, (None, None, None))
+			questions.append(KeyedQuestion(
+				id=question_id,
+				content=content,
+				question_type=question_type,
+				difficulty=difficulty,
+				guidance=guidance,
+				subject_id=subject_id,
+				topic_id=topic_id,
+				topic_name=topic_name,
+				correct_answer_id=answer_id,
+				correct_answer_text=answer_text,
+				correct_answer_explanation=explanation,
+				correct_answer_texts=tuple(texts.get(question_id, ())),
+			))
+		return cls(mock_exam_id=mock_exam_id, questions=tuple(questions))
+
+
+def _cache_key(mock_exam_id):
+	return f"{KEY_PREFIX}:{mock_exam_id}"
+
+
+def get_answer_key(mock_exam_id):
+	"""The cached answer key of an exam, loading it on first use."""
+	config = get_answer_key_config()
+	cache = caches[config['CACHE_ALIAS']]
+	key = cache.get(_cache_key(mock_exam_id))
+	if key is None:
+		key = ExamAnswerKey.load(mock_exam_id)
+		if key.questions:
+			cache.set(_cache_key(mock_exam_id), key, config['TIMEOUT'])
+	return key
+
+
+def invalidate_answer_key(mock_exam_id):
+	"""Drop a cached key, e.g. after correcting an answer in the admin."""
+	caches[get_answer_key_config()['CACHE_ALIAS']].delete(_cache_key(mock_exam_id))
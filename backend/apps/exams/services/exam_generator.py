@@ -1,19 +1,89 @@
 
-from apps.questions.models import Question
 from apps.exams.models import MockExam, MockExamQuestion
 from apps.content.models import Subject, ExamType
 import random
 import logging
-from ai_services.router import AIRouter
-from apps.questions.models import Answer, Topic
+from ai_services.router import get_ai_router
+from apps.questions.models import Topic
+from apps.questions.services.question_generator import QuestionGenerationService
+from apps.questions.services.question_pool import get_question_pool
+from .aloc_client import AlocClient, general_topic, get_aloc_config, upsert_aloc_questions
+from .exam_jobs import GenerationProgress
 from apps.content.models import ExamBoard, ExamType, Country
 from django.db import transaction
 from django.utils.text import slugify
-import requests
-from django.conf import settings
+from asgiref.sync import async_to_sync, sync_to_async
 
 logger = logging.getLogger(__name__)
 
+def _difficulty_weights(difficulty_distribution):
+	"""Normalise a {"EASY": 20, "MEDIUM": 60, "HARD": 20} request field; None if unusable."""
+	if not isinstance(difficulty_distribution, dict):
+		return None
+	weights = {}
+	for level, weight in difficulty_distribution.items():
+		try:
+			weights[str(level).upper()] = max(float(weight), 0.0)
+		except (TypeError, ValueError):
+			continue
+	return weights if any(weights.values()) else None
+
+
+def get_or_create_subject(subject_name):
+	subject = Subject.objects.filter(name__iexact=subject_name).first()
+	if not subject:
+		subject = Subject.objects.create(
+			name=subject_name,
+			category='VOCATIONAL',
+			description=f'Auto-created subject for {subject_name}',
+			aliases=[subject_name]
+		)
+	return subject
+
+
+def get_past_exam_type(exam_format, year=None, num_questions=60, duration_minutes=120):
+	"""ExamType that past questions of ``exam_format`` are filed under, created on first use."""
+	exam_type = ExamType.objects.filter(name__icontains=exam_format).first()
+	if not exam_type:
+		format_country_map = {
+			'JAMB': {'code': 'NG', 'country': 'Nigeria', 'board': 'JAMB', 'region': 'Africa', 'currency': 'NGN'},
+			'WAEC': {'code': 'NG', 'country': 'Nigeria', 'board': 'WAEC', 'region': 'Africa', 'currency': 'NGN'},
+			'NABTEB': {'code': 'NG', 'country': 'Nigeria', 'board': 'NABTEB', 'region': 'Africa', 'currency': 'NGN'},
+			'NECO': {'code': 'NG', 'country': 'Nigeria', 'board': 'NECO', 'region': 'Africa', 'currency': 'NGN'},
+			'IGCSE': {'code': 'GB', 'country': 'United Kingdom', 'board': 'Cambridge', 'region': 'Europe', 'currency': 'GBP'},
+			'SAT': {'code': 'US', 'country': 'United States', 'board': 'College Board', 'region': 'Americas', 'currency': 'USD'},
+			'IELTS': {'code': 'GB', 'country': 'United Kingdom', 'board': 'British Council', 'region': 'Europe', 'currency': 'GBP'},
+			'TOEFL': {'code': 'US', 'country': 'United States', 'board': 'ETS', 'region': 'Americas', 'currency': 'USD'},
+			'GRE': {'code': 'US', 'country': 'United States', 'board': 'ETS', 'region': 'Americas', 'currency': 'USD'},
+			'OTHER': {'code': 'XX', 'country': 'International', 'board': exam_format.upper(), 'region': 'Global', 'currency': 'USD'},
+		}
+		key = exam_format.upper()
+		mapped = format_country_map.get(key, format_country_map['OTHER'])
+
+		country, _ = Country.objects.get_or_create(
+			code=mapped['code'],
+			defaults={'name': mapped['country'], 'region': mapped['region'], 'currency': mapped['currency']}
+		)
+
+		board, _ = ExamBoard.objects.get_or_create(
+			name=mapped['board'],
+			defaults={'full_name': f"{mapped['board']} Board", 'country': country, 'is_international': (mapped['code'] == 'XX')}
+		)
+
+		exam_type = ExamType.objects.create(
+			name=exam_format.upper(),
+			full_name=f"{exam_format.upper()} Past Exam",
+			exam_board=board,
+			level='SENIOR',
+			duration_minutes=duration_minutes,
+			passing_score=int(0.4 * num_questions),
+			max_score=num_questions,
+			description=f"Past exam questions from {exam_format} ({year})",
+			exam_format={"format": exam_format},
+		)
+	return exam_type
+
+
 def generate_jamb_mock_exam(
 	subject_id, 
 	exam_type_id, 
@@ -38,7 +108,9 @@ def generate_mock_exam_by_subject_name(
 	difficulty_distribution=None,
 	year: int = None,
 	force_ai: bool = False,
-	mode: str = 'ai_generated'
+	mode: str = 'ai_generated',
+	progress=None,
+	exam_mode: str = 'fixed'
 ):
 	"""
 	Generate a mock exam with two modes:
@@ -54,21 +126,20 @@ def generate_mock_exam_by_subject_name(
 	  - Strategy: DB (cache) -> AI generation
 	  
 	All questions fetched/generated are saved to DB, so subsequent requests reuse cached data.
+	
+	``exam_mode='adaptive'`` makes the questions the item bank of an
+	adaptive exam (see services/adaptive_exam.py).
+	
+	``progress`` receives stage updates and the final exam (see services/exam_jobs.py).
 	"""
-	ai = AIRouter()
+	ai = get_ai_router()
+	progress = progress or GenerationProgress()
 
 	# Normalize inputs
 	mode = mode or 'ai_generated'
 	
 	# Find or create subject
-	subject = Subject.objects.filter(name__iexact=subject_name).first()
-	if not subject:
-		subject = Subject.objects.create(
-			name=subject_name,
-			category='VOCATIONAL',
-			description=f'Auto-created subject for {subject_name}',
-			aliases=[subject_name]
-		)
+	subject = get_or_create_subject(subject_name)
 
 	# ================== PAST QUESTIONS MODE ==================
 	if mode == 'past_questions':
@@ -82,199 +153,55 @@ def generate_mock_exam_by_subject_name(
 		duration_minutes = duration_minutes or 120
 		
 		# Create or get ExamType/ExamBoard for the format
-		exam_type = ExamType.objects.filter(name__icontains=exam_format).first()
-		if not exam_type:
-			format_country_map = {
-				'JAMB': {'code': 'NG', 'country': 'Nigeria', 'board': 'JAMB', 'region': 'Africa', 'currency': 'NGN'},
-				'WAEC': {'code': 'NG', 'country': 'Nigeria', 'board': 'WAEC', 'region': 'Africa', 'currency': 'NGN'},
-				'NABTEB': {'code': 'NG', 'country': 'Nigeria', 'board': 'NABTEB', 'region': 'Africa', 'currency': 'NGN'},
-				'NECO': {'code': 'NG', 'country': 'Nigeria', 'board': 'NECO', 'region': 'Africa', 'currency': 'NGN'},
-				'IGCSE': {'code': 'GB', 'country': 'United Kingdom', 'board': 'Cambridge', 'region': 'Europe', 'currency': 'GBP'},
-				'SAT': {'code': 'US', 'country': 'United States', 'board': 'College Board', 'region': 'Americas', 'currency': 'USD'},
-				'IELTS': {'code': 'GB', 'country': 'United Kingdom', 'board': 'British Council', 'region': 'Europe', 'currency': 'GBP'},
-				'TOEFL': {'code': 'US', 'country': 'United States', 'board': 'ETS', 'region': 'Americas', 'currency': 'USD'},
-				'GRE': {'code': 'US', 'country': 'United States', 'board': 'ETS', 'region': 'Americas', 'currency': 'USD'},
-				'OTHER': {'code': 'XX', 'country': 'International', 'board': exam_format.upper(), 'region': 'Global', 'currency': 'USD'},
-			}
-			key = exam_format.upper()
-			mapped = format_country_map.get(key, format_country_map['OTHER'])
-
-			country, _ = Country.objects.get_or_create(
-				code=mapped['code'],
-				defaults={'name': mapped['country'], 'region': mapped['region'], 'currency': mapped['currency']}
-			)
-
-			board, _ = ExamBoard.objects.get_or_create(
-				name=mapped['board'],
-				defaults={'full_name': f"{mapped['board']} Board", 'country': country, 'is_international': (mapped['code'] == 'XX')}
-			)
-
-			exam_type = ExamType.objects.create(
-				name=exam_format.upper(),
-				full_name=f"{exam_format.upper()} Past Exam",
-				exam_board=board,
-				level='SENIOR',
-				duration_minutes=duration_minutes,
-				passing_score=int(0.4 * num_questions),
-				max_score=num_questions,
-				description=f"Past exam questions from {exam_format} ({year})",
-				exam_format={"format": exam_format},
-			)
+		exam_type = get_past_exam_type(exam_format, year, num_questions, duration_minutes)
 		
 		# Step 1: Check DB cache for past questions from this year and exam board
 		selected_questions = []
-		db_questions = Question.objects.filter(
-			subject=subject,
-			question_type='MCQ',
-			exam_type=exam_type,
-			metadata__year=year
-		)
-		available = db_questions.count()
+		pool = get_question_pool()
+		pool_filters = {'question_type': 'MCQ', 'exam_type': exam_type.id, 'year': year}
+		available = pool.count(subject.id, **pool_filters)
 		
 		if available >= num_questions:
 			# Enough cached questions
-			selected_questions = random.sample(list(db_questions), num_questions)
+			selected_questions = pool.sample(subject.id, num_questions, **pool_filters)
 		else:
 			# Use whatever cached questions exist first
 			if available > 0:
-				selected_questions = list(db_questions)
+				selected_questions = pool.sample(subject.id, available, **pool_filters)
+			progress.update('cache', len(selected_questions), num_questions, f"Found {len(selected_questions)} saved past questions")
 			
 			remaining = num_questions - len(selected_questions)
 			
-			# Step 2: Try ALOC API for past exam questions
-			try:
-				import concurrent.futures
-				
-				# Get API tokens (primary and secondary)
-				tokens = []
-				primary_token = getattr(settings, 'ALOC_ACCESS_TOKEN', None)
-				if primary_token:
-					tokens.append(primary_token)
-				
-				secondary_token = getattr(settings, 'ALOC_ACCESS_TOKEN_SECONDARY', None)
-				if secondary_token:
-					tokens.append(secondary_token)
-				
-				base = getattr(settings, 'ALOC_BASE_URL', None)
-				
-				if base and tokens and remaining > 0:
-					# Convert exam format to ALOC type parameter
-					aloc_type = exam_format.lower() if exam_format else None
-					# Convert subject name to lowercase
-					aloc_subject = subject.name.lower() if subject.name else None
-					
-					params = {
-						'subject': aloc_subject,
-					}
-					if aloc_type:
-						params['type'] = aloc_type
-					if year:
-						params['year'] = str(year)
-
-					target_fetch = remaining + 5 
-					max_workers = 10 # Reasonable concurrency limit
-					
-					logger.info(f"Starting parallel fetch for {target_fetch} questions using {len(tokens)} keys...")
-					
-					fetched_count = 0
-					
-					# Ensure a topic exists
-					topic = Topic.objects.filter(subject=subject).first()
-					if not topic:
-						topic = Topic.objects.create(
-							subject=subject,
-							name='General',
-							difficulty='BEGINNER',
-							order=0,
-							estimated_hours=1.0,
-							description='Auto-generated topic',
-							learning_objectives=[]
-						)
+			# Step 2: Top up from the live ALOC API. Past questions are normally
+			# pre-harvested with the mirror_aloc_questions command, so this is a
+			# time-boxed fallback (ALOC_CLIENT['LIVE_FETCH'] turns it off).
+			aloc_config = get_aloc_config()
+			client = AlocClient(config=aloc_config)
+			if remaining > 0 and aloc_config['LIVE_FETCH'] and client.configured:
+				cached_count = len(selected_questions)
+
+				async def report(fetched):
+					await sync_to_async(progress.update)(
+						'aloc', cached_count + fetched, num_questions,
+						f"Fetched {cached_count + fetched}/{num_questions} from ALOC"
+					)
 
-					def fetch_single_question(idx):
-						# Round-robin key selection
-						token = tokens[idx % len(tokens)]
-						headers = {'AccessToken': token}
-						try:
-							resp = requests.get(f"{base.rstrip('/')}/q", params=params, headers=headers, timeout=10)
-							if resp.status_code == 200:
-								try:
-									return resp.json()
-								except Exception:
-									logger.warning(f"ALOC API returned invalid JSON: {resp.text[:200]}...")
-									return None
-						except Exception as e:
-							logger.warning(f"Request {idx} failed: {e}")
-						return None
-
-					with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-						# Submit tasks
-						futures = [executor.submit(fetch_single_question, i) for i in range(target_fetch)]
-						
-						for future in concurrent.futures.as_completed(futures):
-							if len(selected_questions) >= num_questions:
-								break
-								
-							data = future.result()
-							if not data:
-								continue
-								
-							# API returns { ..., "data": { "id": ..., "question": ... } }
-							item = data.get('data')
-							
-							if item and isinstance(item, dict):
-								q_text = item.get('question')
-								if not q_text:
-									continue
-									
-								q_meta = {
-									'source': 'ALOC', 
-									'year': year, 
-									'external_id': item.get('id')
-								}
-								
-								try:
-									with transaction.atomic():
-										question_obj, created = Question.objects.get_or_create(
-											content=q_text,
-											subject=subject,
-											defaults={
-												'topic': topic,
-												'question_type': 'MCQ',
-												'difficulty': 'MEDIUM',
-												'guidance': item.get('answer', ''),
-												'metadata': q_meta
-											}
-										)
-										
-										if created:
-											opts_data = item.get('option', {})
-											correct_letter = str(item.get('answer', '')).lower()
-											
-											for letter, opt_text in opts_data.items():
-												if not opt_text: continue
-												is_correct = (letter.lower() == correct_letter)
-												Answer.objects.create(
-													question=question_obj,
-													content=opt_text,
-													is_correct=is_correct,
-													explanation=''
-												)
-									
-									if question_obj not in selected_questions:
-										selected_questions.append(question_obj)
-										fetched_count += 1
-										
-								except Exception as db_err:
-									logger.error(f"Error saving fetched question: {db_err}")
-							
-					logger.info(f"Parallel fetch completed. Got {fetched_count} unique questions. Total selected: {len(selected_questions)}")
-
-				else:
-					logger.warning(f"ALOC not configured or insufficient remaining.")
-							
-			except Exception as e:
-				logger.warning(f"ALOC API error (will try with cached questions): {e}")
+				try:
+					harvest = async_to_sync(client.harvest)(
+						subject.name, exam_format, year, target=remaining,
+						known_ids=[q.metadata.get('external_id') for q in selected_questions if q.metadata.get('external_id')],
+						time_budget=aloc_config['LIVE_FETCH_SECONDS'],
+						on_progress=report,
+					)
+					fetched = upsert_aloc_questions(
+						harvest.items, subject, exam_type=exam_type, topic=general_topic(subject), year=year
+					)
+					selected_ids = {q.id for q in selected_questions}
+					selected_questions += [q for q in fetched if q.id not in selected_ids][:remaining]
+				except Exception as e:
+					logger.warning(f"ALOC API error (will try with cached questions): {e}")
+			else:
+				logger.warning(f"ALOC live fetch disabled or not configured; {remaining} past questions missing.")
 		
 		# If still not enough questions, try AI as fallback (Hybrid Mode)
 		if len(selected_questions) < num_questions:
@@ -289,6 +216,7 @@ def generate_mock_exam_by_subject_name(
 				# Request in batches of 20 to ensure completion and quality
 				batch_size = min(current_missing, 20)
 				logger.info(f"AI Fallback Batch {fallback_retries+1}: Requesting {batch_size} questions...")
+				progress.update('ai', fallback_retries + 1, MAX_FALLBACK_RETRIES, f"AI batch {fallback_retries + 1}: generating {batch_size} questions")
 				
 				try:
 					# Reuse AI generation logic for objective questions
@@ -299,7 +227,8 @@ def generate_mock_exam_by_subject_name(
 						difficulty=difficulty,
 						count=batch_size,
 						q_type='MCQ',
-						additional_context=batch_context
+						additional_context=batch_context,
+						use_cache=False,
 					)
 					items = generated.get('questions', generated) if isinstance(generated, dict) else generated
 					if not isinstance(items, list):
@@ -315,61 +244,23 @@ def generate_mock_exam_by_subject_name(
 							description='Auto-generated topic'
 						)
 
+					batch = QuestionGenerationService.bulk_create_questions(
+						items,
+						subject=subject,
+						topic=topic_fallback,
+						exam_type=exam_type,
+						difficulty=difficulty,
+						question_type='MCQ',
+						metadata={'source': 'AI_FALLBACK', 'original_mode': 'past_questions', 'year': year},
+						existing='reuse',
+						answer_types=('MCQ',),
+					)
 					batch_added = 0
-					for q_data in items:
-						try:
-							# Check for duplicates based on content
-							content = q_data.get('content', 'No content provided')
-							if Question.objects.filter(subject=subject, content=content).exists():
-								# If duplicate, verify if it's already in our selection
-								existing_q = Question.objects.filter(subject=subject, content=content).first()
-								if existing_q not in selected_questions:
-									selected_questions.append(existing_q)
-									batch_added += 1
-								continue
-
-							q = Question.objects.create(
-								subject=subject,
-								topic=topic_fallback,
-								exam_type=exam_type,
-								content=content,
-								question_type='MCQ',
-								difficulty=q_data.get('difficulty', difficulty),
-								guidance=q_data.get('explanation', ''),
-								metadata={'source': 'AI_FALLBACK', 'original_mode': 'past_questions', 'year': year},
-							)
-
-							options = q_data.get('options', [])
-							correct = q_data.get('correct_answer')
-							correct_idx = q_data.get('correct_answer_index')
-							
-							for idx, opt in enumerate(options):
-								is_correct = False
-								# 1. Primary check: correct_answer_index
-								if correct_idx is not None:
-									try:
-										is_correct = (idx == int(correct_idx))
-									except (ValueError, TypeError):
-										pass
-								
-								# 2. Secondary check: correct_answer (string or int matching index)
-								if not is_correct and correct is not None:
-									if isinstance(correct, int) and 0 <= correct < len(options):
-										is_correct = (idx == correct)
-									elif isinstance(correct, str):
-										is_correct = (opt.strip().lower() == correct.strip().lower())
-								
-								Answer.objects.create(
-									question=q,
-									content=opt,
-									is_correct=is_correct,
-									explanation=(q_data.get('explanation') if is_correct else '')
-								)
-
+					for q in batch:
+						# Questions already stored for the subject are reused, once
+						if q not in selected_questions:
 							selected_questions.append(q)
 							batch_added += 1
-						except Exception as q_err:
-							logger.error(f"Failed to save AI fallback question: {q_err}")
 					
 					logger.info(f"AI Fallback Batch {fallback_retries+1}: Added {batch_added} questions.")
 					if batch_added == 0:
@@ -413,38 +304,16 @@ def generate_mock_exam_by_subject_name(
 							learning_objectives=[]
 						)
 
-					for q_data in items:
-						q = Question.objects.create(
-							subject=subject,
-							topic=topic,
-							exam_type=exam_type,
-							content=q_data.get('content', 'No content provided'),
-							question_type=q_data.get('type', 'MCQ'),
-							difficulty=q_data.get('difficulty', difficulty),
-							guidance=q_data.get('explanation', ''),
-							metadata={'source': 'AI', 'fallback_from_past_questions': True, 'year': year},
-						)
-
-						if q.question_type == 'MCQ':
-							options = q_data.get('options', [])
-							correct = q_data.get('correct_answer')
-							for opt in options:
-								is_correct = False
-								try:
-									if isinstance(correct, int):
-										is_correct = (options.index(opt) == int(correct))
-								except Exception:
-									is_correct = False
-								if isinstance(correct, str):
-									is_correct = (opt.strip() == correct.strip())
-								Answer.objects.create(
-									question=q,
-									content=opt,
-									is_correct=is_correct,
-									explanation=(q_data.get('explanation') if is_correct else '')
-								)
-
-						selected_questions.append(q)
+					selected_questions.extend(QuestionGenerationService.bulk_create_questions(
+						items,
+						subject=subject,
+						topic=topic,
+						exam_type=exam_type,
+						difficulty=difficulty,
+						metadata={'source': 'AI', 'fallback_from_past_questions': True, 'year': year},
+						trust_payload=True,
+						answer_types=('MCQ',),
+					))
 				except Exception as e:
 					logger.error(f"AI fallback generation failed: {e}")
 					raise ValueError(f'Could not find past questions for {subject.name} ({year}) and AI generation failed. Please try a different year or use a different exam format.')
@@ -452,6 +321,7 @@ def generate_mock_exam_by_subject_name(
 		# ALOC doesn't provide them reliably, so we use AI to generate them if needed.
 		if mode == 'past_questions' and exam_format.upper() in ['WAEC', 'NECO', 'JAMB']:
 			theory_count = 4 # Standardize on 4 theory questions for now
+			progress.update('theory', 0, theory_count, f"Generating {theory_count} theory questions")
 			logger.info(f"Generating {theory_count} theory questions via AI for {subject.name} ({exam_format})")
 			
 			try:
@@ -468,36 +338,25 @@ def generate_mock_exam_by_subject_name(
 				if isinstance(t_items, list):
 					topic = Topic.objects.filter(subject=subject).first()
 					
-					for t_data in t_items:
-						try:
-							q_content = t_data.get('content') or t_data.get('question')
-							if not q_content: continue
-
-							# Check duplication
-							if Question.objects.filter(content=q_content, subject=subject).exists():
-								q = Question.objects.filter(content=q_content, subject=subject).first()
-							else:
-								q = Question.objects.create(
-									subject=subject,
-									topic=topic,
-									exam_type=exam_type,
-									content=q_content,
-									question_type='THEORY', # Explicitly set as THEORY
-									difficulty='HARD',
-									guidance=t_data.get('answer', '') or t_data.get('explanation', ''),
-									metadata={'source': 'AI_THEORY_FALLBACK', 'year': year}
-								)
-								# Theory doesn't have options/answers in the same way, but we store the model answer in guidance
-							
-							selected_questions.append(q)
-						except Exception as t_err:
-							logger.error(f"Failed to save theory question: {t_err}")
+					# Theory model answers live in guidance; no Answer rows are stored
+					selected_questions.extend(QuestionGenerationService.bulk_create_questions(
+						t_items,
+						subject=subject,
+						topic=topic,
+						exam_type=exam_type,
+						difficulty='HARD',
+						question_type='THEORY',
+						metadata={'source': 'AI_THEORY_FALLBACK', 'year': year},
+						existing='reuse',
+						answer_types=('MCQ',),
+					))
 
 			except Exception as ai_err:
 				logger.warning(f"Failed to generate theory questions: {ai_err}")
 
 		# Shuffle questions to avoid predictable patterns
 		random.shuffle(selected_questions)
+		progress.update('saving', message="Assembling exam")
 
 		# Create MockExam for past questions
 		with transaction.atomic():
@@ -512,11 +371,15 @@ def generate_mock_exam_by_subject_name(
 				creator=creator,
 				duration_minutes=duration_minutes,
 				total_marks=num_questions,
-				passing_score=pass_score
+				passing_score=pass_score,
+				mode=exam_mode
 			)
 			
-			for idx, question in enumerate(selected_questions):
-				MockExamQuestion.objects.create(mock_exam=mock_exam, question=question, order=idx + 1)
+			MockExamQuestion.objects.bulk_create([
+				MockExamQuestion(mock_exam=mock_exam, question=question, order=idx + 1)
+				for idx, question in enumerate(selected_questions)
+			])
+			progress.finalize(mock_exam)
 		
 		logger.info(f"Created past exam {mock_exam.id} with {len(selected_questions)} questions from {year} for {subject.name}")
 		return mock_exam
@@ -585,26 +448,28 @@ def generate_mock_exam_by_subject_name(
 				exam_format={"format": exam_format},
 			)
 
-	# Start selecting questions from DB cache
-	qs = Question.objects.filter(subject=subject, question_type='MCQ')
+	# Start selecting questions from DB cache (stratified by difficulty_distribution when given)
+	pool = get_question_pool()
+	pool_filters = {'question_type': 'MCQ'}
 	if exam_type:
-		qs = qs.filter(exam_type=exam_type)
+		pool_filters['exam_type'] = exam_type.id
+	difficulty_weights = _difficulty_weights(difficulty_distribution)
 
 	selected_questions = []
-	available = qs.count()
+	available = pool.count(subject.id, **pool_filters)
 	if available >= num_questions and not use_ai:
-		selected_questions = random.sample(list(qs), num_questions)
+		selected_questions = pool.sample(subject.id, num_questions, difficulty_weights, **pool_filters)
 	else:
-		# Use whatever cached questions we have first
+		# Use whatever cached questions we have first (never more than the exam needs)
 		if available > 0:
-			selected_questions = list(qs)
+			selected_questions = pool.sample(subject.id, min(available, num_questions), difficulty_weights, **pool_filters)
 
 		remaining = num_questions - len(selected_questions)
+		progress.update('cache', len(selected_questions), num_questions, f"Found {len(selected_questions)} saved questions")
 
 		# Generate missing questions using AI (Parallelized)
 		if remaining > 0:
 			import asyncio
-			from asgiref.sync import async_to_sync
 			
 			batch_size = 10
 			# Calculate number of batches needed
@@ -614,33 +479,37 @@ def generate_mock_exam_by_subject_name(
 			
 			generated_items = []
 			
+			# Specialized context detection
+			sub_name_upper = subject.name.upper()
+			q_type_to_use = 'MCQ'
+			module_context = ""
+			
+			if "LISTENING" in sub_name_upper:
+				module_context = "This is a LISTENING module. Generate a natural audio transcript and questions based on it."
+			elif "READING" in sub_name_upper:
+				module_context = "This is a READING module. Generate a comprehension passage and questions based on it."
+			elif "WRITING" in sub_name_upper:
+				q_type_to_use = 'THEORY'
+				module_context = "This is a WRITING module. Generate an essay prompt/task."
+			elif "SPEAKING" in sub_name_upper:
+				q_type_to_use = 'THEORY'
+				module_context = "This is a SPEAKING module. Generate a proficiency cue for a interview/monologue."
+
+			completed_batches = 0
+
 			async def fetch_batch_async(batch_idx):
+				nonlocal completed_batches
 				try:
-					# Specialized context detection
-					sub_name_upper = subject.name.upper()
-					q_type_to_use = 'MCQ'
-					module_context = ""
-					
-					if "LISTENING" in sub_name_upper:
-						module_context = "This is a LISTENING module. Generate a natural audio transcript and questions based on it."
-					elif "READING" in sub_name_upper:
-						module_context = "This is a READING module. Generate a comprehension passage and questions based on it."
-					elif "WRITING" in sub_name_upper:
-						q_type_to_use = 'THEORY'
-						module_context = "This is a WRITING module. Generate an essay prompt/task."
-					elif "SPEAKING" in sub_name_upper:
-						q_type_to_use = 'THEORY'
-						module_context = "This is a SPEAKING module. Generate a proficiency cue for a interview/monologue."
-
 					batch_context = f"Exam type: {exam_format or 'General'}. {module_context} Batch {batch_idx+1}."
-					current_ai = AIRouter()
+					current_ai = get_ai_router()
 					
 					generated = await current_ai.generate_questions_async(
 						topic=subject.name,
 						difficulty=difficulty,
 						count=batch_size,
 						q_type=q_type_to_use,
-						additional_context=batch_context
+						additional_context=batch_context,
+						use_cache=False,
 					)
 					
 					items = generated.get('questions', generated) if isinstance(generated, dict) else generated
@@ -650,6 +519,11 @@ def generate_mock_exam_by_subject_name(
 				except Exception as e:
 					logger.error(f"Async Batch {batch_idx+1} failed: {e}")
 					return []
+				finally:
+					completed_batches += 1
+					await sync_to_async(progress.update)(
+						'ai', completed_batches, num_batches, f"AI batch {completed_batches}/{num_batches}"
+					)
 
 			async def run_all_batches():
 				tasks = [fetch_batch_async(i) for i in range(num_batches)]
@@ -684,62 +558,25 @@ def generate_mock_exam_by_subject_name(
 					learning_objectives=[]
 				)
 
-			for q_data in generated_items:
-				# Stop if we have enough
-				if len(selected_questions) >= num_questions:
-					break
-					
-				try:
-					# Deduplication check
-					content = q_data.get('content', 'No content provided')
-					if Question.objects.filter(subject=subject, content=content).exists():
-						continue
-						
-					q = Question.objects.create(
-						subject=subject,
-						topic=topic,
-						exam_type=exam_type,
-						content=content,
-						question_type=q_data.get('type', 'MCQ'),
-						difficulty=q_data.get('difficulty', difficulty),
-						guidance=q_data.get('explanation', ''),
-						metadata=q_data.get('metadata', {}),
-					)
-
-					if q.question_type == 'MCQ':
-						options = q_data.get('options', [])
-						correct = q_data.get('correct_answer')
-						correct_idx = q_data.get('correct_answer_index')
-						
-						for idx, opt in enumerate(options):
-							is_correct = False
-							# 1. Primary check: correct_answer_index
-							if correct_idx is not None:
-								try:
-									is_correct = (idx == int(correct_idx))
-								except (ValueError, TypeError):
-									pass
-							
-							# 2. Secondary check: correct_answer (string or int matching index)
-							if not is_correct and correct is not None:
-								if isinstance(correct, int) and 0 <= correct < len(options):
-									is_correct = (idx == correct)
-								elif isinstance(correct, str):
-									is_correct = (opt.strip().lower() == correct.strip().lower())
-
-							Answer.objects.create(
-								question=q,
-								content=opt,
-								is_correct=is_correct,
-								explanation=(q_data.get('explanation') if is_correct else '')
-							)
-
-					selected_questions.append(q)
-				except Exception as e:
-					logger.warning(f"Failed to save generated question: {e}")
-					continue
+			try:
+				# Questions already stored for the subject are skipped (deduplication)
+				selected_questions.extend(QuestionGenerationService.bulk_create_questions(
+					generated_items,
+					subject=subject,
+					topic=topic,
+					exam_type=exam_type,
+					difficulty=difficulty,
+					question_type=q_type_to_use,
+					existing='skip',
+					trust_payload=True,
+					answer_types=('MCQ',),
+					limit=num_questions - len(selected_questions),
+				))
+			except Exception as e:
+				logger.warning(f"Failed to save generated questions: {e}")
 
 	# Finalize: shuffle and trim
+	progress.update('saving', message="Assembling exam")
 	random.shuffle(selected_questions)
 	selected_questions = selected_questions[:num_questions]
 
@@ -760,11 +597,15 @@ def generate_mock_exam_by_subject_name(
 			creator=creator,
 			duration_minutes=duration_minutes,
 			total_marks=len(selected_questions),
-			passing_score=pass_score
+			passing_score=pass_score,
+			mode=exam_mode
 		)
 
-		for idx, question in enumerate(selected_questions):
-			MockExamQuestion.objects.create(mock_exam=mock_exam, question=question, order=idx + 1)
+		MockExamQuestion.objects.bulk_create([
+			MockExamQuestion(mock_exam=mock_exam, question=question, order=idx + 1)
+			for idx, question in enumerate(selected_questions)
+		])
+		progress.finalize(mock_exam)
 
 	logger.info(f"Created mock exam {mock_exam.id} with {len(selected_questions)} questions (subject: {subject.name})")
 	return mock_exam
@@ -1,16 +1,26 @@
 
 from apps.exams.models import ExamAttempt, MockExam, ExamResult
-from apps.questions.models import Question, Answer
+from .answer_key import get_answer_key
 from django.utils import timezone
 import logging
 import asyncio
-from asgiref.sync import async_to_sync
-from ai_services.router import AIRouter
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from ai_services.router import get_ai_router
 from ai_services.prompts import PromptTemplates
-from apps.study_tools.services.srs_service import SRSService
 
 logger = logging.getLogger(__name__)
 
+THEORY_TYPES = ('THEORY', 'ESSAY', 'essay')
+
+GRADING_DEFAULTS = {
+	# Theory answers graded by the LLM at the same time, and per-answer timeout (s)
+	'THEORY_CONCURRENCY': 4,
+	'THEORY_TIMEOUT': 90,
+	# Bound on the whole theory phase (s); keep it well under EXAM_SUBMISSION['TASK_TIMEOUT']
+	'THEORY_PHASE_TIMEOUT': 300,
+}
+
 def validate_exam_timer(attempt: ExamAttempt, time_taken_seconds: int = None):
 	"""
 	Validates if the exam was submitted within allowed time.
@@ -37,10 +47,65 @@ def validate_exam_timer(attempt: ExamAttempt, time_taken_seconds: int = None):
 	}
 
 
+def get_grading_config():
+	return {**GRADING_DEFAULTS, **getattr(settings, 'EXAM_GRADING', {})}
+
+
+def _theory_breakdown(question, user_answer, ai_response=None):
+	"""Breakdown entry for a theory answer; ``is_correct`` stays None until graded."""
+	entry = {
+		'question_id': question.id,
+		'question_text': question.content[:100],
+		'topic': question.topic_name,
+		'difficulty': question.difficulty,
+		'user_answer_text': user_answer,
+		'is_correct': None,
+		'explanation': question.guidance or "Model answer provided in detailed review."
+	}
+	if ai_response is not None:
+		ai_score = ai_response.get('score', 0)
+		ai_feedback = ai_response.get('feedback', {})
+		entry.update({
+			'is_correct': float(ai_score) / 10.0 >= 0.5,
+			'score': ai_score,
+			'critique': ai_feedback.get('critique'),
+			'accuracy': ai_feedback.get('accuracy'),
+			'completeness': ai_feedback.get('completeness'),
+			'clarity': ai_feedback.get('clarity'),
+			'improvement_tips': ai_response.get('improvement_tips', []),
+		})
+	return entry
+
+
+def _save_partial(attempt, tally, breakdown, total_questions, theory_total, theory_done):
+	"""Persist the running score and breakdown so clients can render them mid-grading."""
+	percentage = (tally['score'] / total_questions * 100) if total_questions > 0 else 0
+	attempt.grading = {
+		'phase': 'theory' if theory_done < theory_total else 'complete',
+		'theory_total': theory_total,
+		'theory_graded': theory_done,
+		'counts': {key: tally[key] for key in ('correct', 'incorrect', 'unanswered')},
+		'breakdown': breakdown,
+	}
+	ExamAttempt.objects.filter(pk=attempt.pk).update(
+		score=tally['score'],
+		percentage=percentage,
+		attempted_questions=tally['attempted'],
+		grading=attempt.grading,
+	)
+
+
 def auto_grade_exam(attempt: ExamAttempt):
 	"""
 	Grades the exam attempt based on raw_responses.
 	Calculates score, percentage, and detailed breakdown.
+
+	Grading runs in two phases. Objective questions are scored first and
+	persisted on ``attempt.grading`` (phase "theory") so the client can show
+	them straight away. Theory answers are then graded concurrently, at most
+	EXAM_GRADING['THEORY_CONCURRENCY'] LLM calls at a time, and each grade is
+	persisted as it lands. Answers not graded within THEORY_PHASE_TIMEOUT
+	are left pending for review, so the task finishes inside its timeout.
 	
 	Args:
 		attempt: ExamAttempt instance to grade
@@ -61,48 +126,34 @@ def auto_grade_exam(attempt: ExamAttempt):
 		}
 	
 	responses = attempt.raw_responses
-	total_score = 0
 	breakdown = {}
-	attempted_questions = 0
-	correct_count = 0
-	incorrect_count = 0
-	unanswered_count = 0
+	tally = {'score': 0, 'attempted': 0, 'correct': 0, 'incorrect': 0, 'unanswered': 0}
+	# (qid, question, answer text) awaiting AI grading
+	theory_answers = []
 	
 	try:
-		# Bulk fetch questions with optimizations
-		mock_questions = attempt.mock_exam.mockexamquestion_set.select_related(
-			'question', 'question__topic'
-		).all()
-		
-		# Get all question IDs
-		question_ids = [mq.question.id for mq in mock_questions]
-		
-		# Bulk fetch all correct answers
-		correct_answers = Answer.objects.filter(
-			question_id__in=question_ids,
-			is_correct=True
-		).select_related('question')
+		# Questions and correct answers come from the exam's cached answer key
+		answer_key = get_answer_key(attempt.mock_exam_id)
+		if attempt.adaptive:
+			# Adaptive attempts are graded on the questions they were served
+			administered = set(attempt.adaptive.get('administered', []))
+			answer_key = [question for question in answer_key if question.id in administered]
 		
-		# Map question_id -> correct_answer
-		correct_answer_map = {
-			str(a.question.id): a for a in correct_answers
-		}
-		
-		for mq in mock_questions:
-			qid = str(mq.question.id)
-			question = mq.question
+		# Phase 1: deterministic scoring; theory answers are only collected
+		for question in answer_key:
+			qid = str(question.id)
 			
 			# Get user's answer
 			user_answer_id = responses.get(qid)
 			
 			# Handle Theory/Essay questions
-			if question.question_type in ['THEORY', 'ESSAY', 'THEORY', 'essay']:
+			if question.question_type in THEORY_TYPES:
 				if not user_answer_id:
-					unanswered_count += 1
+					tally['unanswered'] += 1
 					breakdown[qid] = {
 						'question_id': qid,
 						'question_text': question.content[:100],
-						'topic': question.topic.name if question.topic else None,
+						'topic': question.topic_name,
 						'difficulty': question.difficulty,
 						'user_answer_text': None,
 						'is_correct': False,
@@ -110,108 +161,66 @@ def auto_grade_exam(attempt: ExamAttempt):
 					}
 					continue
 
-				attempted_questions += 1
-				
-				# We'll collect these for AI grading after the loop or grade here
-				# For efficiency, let's just use the router here (using async_to_sync)
-				try:
-					ai = AIRouter()
-					
-					# Call dedicated theory grading method
-					ai_response = async_to_sync(ai.grade_theory_question_async)(
-						question_text=question.content,
-						user_answer=user_answer_id,
-						model_answer=question.guidance or "Model answer provided in detailed review.",
-						subject=attempt.mock_exam.subject.name,
-						exam_type=attempt.mock_exam.exam_type.name
-					)
-					
-					ai_score = ai_response.get('score', 0)
-					ai_feedback = ai_response.get('feedback', {})
-					
-					# Normalize score to 1.0 max (if 0-10)
-					normalized_score = float(ai_score) / 10.0
-					total_score += normalized_score
-					
-					is_graded_correct = normalized_score >= 0.5
-					if is_graded_correct:
-						correct_count += 1
-					else:
-						incorrect_count += 1
-
-					breakdown[qid] = {
-						'question_id': question.id,
-						'question_text': question.content[:100],
-						'topic': question.topic.name if question.topic else None,
-						'difficulty': question.difficulty,
-						'user_answer_text': user_answer_id,
-						'is_correct': is_graded_correct,
-						'score': ai_score,
-						'critique': ai_feedback.get('critique'),
-						'accuracy': ai_feedback.get('accuracy'),
-						'completeness': ai_feedback.get('completeness'),
-						'clarity': ai_feedback.get('clarity'),
-						'improvement_tips': ai_response.get('improvement_tips', []),
-						'explanation': question.guidance or "Model answer provided in detailed review."
-					}
-				except Exception as ai_err:
-					logger.error(f"AI grading failed for question {qid}: {ai_err}")
-					# Fallback to manual/pending
-					breakdown[qid] = {
-						'question_id': question.id,
-						'question_text': question.content[:100],
-						'topic': question.topic.name if question.topic else None,
-						'difficulty': question.difficulty,
-						'user_answer_text': user_answer_id,
-						'is_correct': None, # Pending
-						'explanation': question.guidance or "Model answer provided in detailed review."
-					}
+				tally['attempted'] += 1
+				breakdown[qid] = _theory_breakdown(question, user_answer_id)
+				theory_answers.append((qid, question, user_answer_id))
 				continue
 
-			# Get correct answer from map
-			correct_answer = correct_answer_map.get(qid)
-			
 			# Determine if answer is correct
 			is_correct = False
-			if user_answer_id and correct_answer:
-				is_correct = str(correct_answer.id) == str(user_answer_id)
+			if user_answer_id and question.correct_answer_id:
+				is_correct = str(question.correct_answer_id) == str(user_answer_id)
 			
 			# Record attempt
 			if user_answer_id:
-				attempted_questions += 1
+				tally['attempted'] += 1
 				if is_correct:
-					correct_count += 1
-					total_score += 1
+					tally['correct'] += 1
+					tally['score'] += 1
 				else:
-					incorrect_count += 1
-					SRSService.auto_generate_from_mistake(attempt.user, type('obj', (object,), {'is_correct': False, 'question': question}))
+					tally['incorrect'] += 1
 			else:
-				unanswered_count += 1
+				tally['unanswered'] += 1
 			
 			# Add to breakdown
 			breakdown[qid] = {
 				'question_id': question.id,
 				'question_text': question.content[:100],
-				'topic': question.topic.name if question.topic else None,
+				'topic': question.topic_name,
 				'difficulty': question.difficulty,
 				'user_answer_id': user_answer_id,
-				'correct_answer_id': correct_answer.id if correct_answer else None,
-				'correct_answer_text': correct_answer.content if correct_answer else None,
+				'correct_answer_id': question.correct_answer_id,
+				'correct_answer_text': question.correct_answer_text,
 				'is_correct': is_correct,
-				'explanation': correct_answer.explanation if correct_answer else None
+				'explanation': question.correct_answer_explanation
 			}
 	except Exception as e:
 		logger.error(f"Error grading attempt {attempt.id}: {str(e)}")
 		raise ValueError(f"Error during grading: {str(e)}")
 	
+	total_questions = len(answer_key)
+	_save_partial(attempt, tally, breakdown, total_questions, len(theory_answers), 0)
+
+	# Phase 2: theory answers graded concurrently
+	if theory_answers:
+		mock_exam = attempt.mock_exam
+		context = {
+			'subject': mock_exam.subject.name,
+			'exam_type': mock_exam.exam_type.name if mock_exam.exam_type else '',
+		}
+		async_to_sync(_grade_theory_answers)(attempt, theory_answers, breakdown, tally, total_questions, context)
+	
 	# Calculate percentage
-	total_questions = len(mock_questions)
+	total_score = tally['score']
 	percentage = (total_score / total_questions * 100) if total_questions > 0 else 0
+	if attempt.adaptive:
+		# Items differ in difficulty per candidate; report the expected score over the bank
+		percentage = attempt.adaptive.get('percentage', percentage)
 	
 	# Update attempt
 	attempt.score = total_score
 	attempt.percentage = percentage
-	attempt.attempted_questions = attempted_questions
+	attempt.attempted_questions = tally['attempted']
 	attempt.auto_graded = True
 	attempt.status = 'GRADED'
 	attempt.save()
@@ -219,18 +228,70 @@ def auto_grade_exam(attempt: ExamAttempt):
 	logger.info(
 		f"Graded attempt {attempt.id}: "
 		f"Score: {total_score}/{total_questions} ({percentage:.1f}%), "
-		f"Attempted: {attempted_questions}, Correct: {correct_count}, "
-		f"Incorrect: {incorrect_count}, Unanswered: {unanswered_count}"
+		f"Attempted: {tally['attempted']}, Correct: {tally['correct']}, "
+		f"Incorrect: {tally['incorrect']}, Unanswered: {tally['unanswered']}, "
+		f"Theory graded: {len(theory_answers)}"
 	)
 	
 	return {
 		'score': total_score,
 		'percentage': percentage,
 		'breakdown': breakdown,
-		'attempted_questions': attempted_questions,
-		'correct_count': correct_count,
-		'incorrect_count': incorrect_count,
-		'unanswered_count': unanswered_count
+		'attempted_questions': tally['attempted'],
+		'correct_count': tally['correct'],
+		'incorrect_count': tally['incorrect'],
+		'unanswered_count': tally['unanswered']
+	}
+
+
+async def _grade_theory_answers(attempt, theory_answers, breakdown, tally, total_questions, context):
+	"""Grade theory answers with bounded concurrency, persisting each grade as it arrives."""
+	config = get_grading_config()
+	semaphore = asyncio.Semaphore(config['THEORY_CONCURRENCY'])
+	ai = get_ai_router()
+	loop = asyncio.get_running_loop()
+	deadline = loop.time() + config['THEORY_PHASE_TIMEOUT']
+	done = 0
+
+	async def grade(qid, question, user_answer):
+		nonlocal done
+		try:
+			async with semaphore:
+				remaining = min(config['THEORY_TIMEOUT'], deadline - loop.time())
+				if remaining <= 0:
+					raise asyncio.TimeoutError('theory grading phase timed out')
+				ai_response = await asyncio.wait_for(ai.grade_theory_question_async(
+					question_text=question.content,
+					user_answer=user_answer,
+					model_answer=question.guidance or "Model answer provided in detailed review.",
+					subject=context['subject'],
+					exam_type=context['exam_type']
+				), remaining)
+			entry = _theory_breakdown(question, user_answer, ai_response)
+			tally['score'] += float(entry['score']) / 10.0
+			tally['correct' if entry['is_correct'] else 'incorrect'] += 1
+			breakdown[qid] = entry
+		except Exception as ai_err:
+			# Left pending (is_correct None) for manual review
+			logger.error(f"AI grading failed for question {qid}: {ai_err}")
+		done += 1
+		await sync_to_async(_save_partial)(attempt, tally, breakdown, total_questions, len(theory_answers), done)
+
+	await asyncio.gather(*(grade(*item) for item in theory_answers))
+
+
+def grading_result_from_attempt(attempt: ExamAttempt):
+	"""Rebuild auto_grade_exam()'s return value from a graded attempt's persisted state."""
+	grading = attempt.grading or {}
+	counts = grading.get('counts', {})
+	return {
+		'score': attempt.score,
+		'percentage': attempt.percentage,
+		'breakdown': grading.get('breakdown', {}),
+		'attempted_questions': attempt.attempted_questions,
+		'correct_count': counts.get('correct', 0),
+		'incorrect_count': counts.get('incorrect', 0),
+		'unanswered_count': counts.get('unanswered', 0)
 	}
 
 
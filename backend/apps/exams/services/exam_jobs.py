@@ -0,0 +1,150 @@
+"""
+Background mock-exam generation.
+
+create_exam enqueues an ExamGenerationJob and returns its id straight away;
+run_generation_job() runs generate_mock_exam_by_subject_name on the
+Django-Q cluster and reports progress ("Fetched 34/60 questions from
+ALOC", "AI batch 2/3") to the user's notifications WebSocket group as
+``exam_generation`` events. The exam, its questions and the job's
+completed state are written in one transaction.
+
+Progress updates refresh the job's updated_at. A 'running' job without one
+for STALE_AFTER_SECONDS lost its worker: expire_stale_job() (called when
+the job is polled) marks it failed, and a redelivered task takes it over.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django_q.tasks import async_task
+
+from ..models import ExamGenerationJob
+
+logger = logging.getLogger(__name__)
+
+TASK_GROUP = 'exam-generation'
+# Minimum seconds between persisted progress rows; every event is still pushed
+PROGRESS_SAVE_INTERVAL = 1.0
+
+DEFAULTS = {
+	'STALE_AFTER_SECONDS': 600,
+}
+
+
+def get_generation_config():
+	return {**DEFAULTS, **getattr(settings, 'EXAM_GENERATION', {})}
+
+
+def _stale():
+	cutoff = timezone.now() - timedelta(seconds=get_generation_config()['STALE_AFTER_SECONDS'])
+	return Q(status='running', updated_at__lt=cutoff)
+
+
+class GenerationProgress:
+	"""No-op progress sink used by synchronous callers of the generator."""
+
+	def update(self, stage, done=None, total=None, message=''):
+		pass
+
+	def finalize(self, mock_exam):
+		"""Called inside the transaction that creates the exam."""
+		pass
+
+
+class JobProgress(GenerationProgress):
+	"""Persists progress on the job and pushes it over the user's WebSocket group."""
+
+	def __init__(self, job):
+		self.job = job
+		self._saved_at = 0.0
+
+	def update(self, stage, done=None, total=None, message=''):
+		event = {'stage': stage, 'done': done, 'total': total, 'message': message}
+		self.job.progress = event
+		now = time.monotonic()
+		if now - self._saved_at >= PROGRESS_SAVE_INTERVAL:
+			self._saved_at = now
+			ExamGenerationJob.objects.filter(id=self.job.id).update(progress=event, updated_at=timezone.now())
+		push_job_event(self.job, event)
+
+	def finalize(self, mock_exam):
+		self.job.mock_exam = mock_exam
+		self.job.status = 'completed'
+		self.job.progress = {'stage': 'completed', 'done': None, 'total': None, 'message': f"Created {mock_exam.title}"}
+		self.job.save(update_fields=['mock_exam', 'status', 'progress', 'updated_at'])
+
+
+def push_job_event(job, progress=None):
+	"""Send a job snapshot to ``user_<id>_notifications``; never fails the job."""
+	payload = {
+		'job_id': str(job.id),
+		'status': job.status,
+		'progress': progress if progress is not None else job.progress,
+		'mock_exam_id': job.mock_exam_id,
+		'error': job.error_message or None,
+	}
+	try:
+		async_to_sync(get_channel_layer().group_send)(
+			f"user_{job.user_id}_notifications",
+			{'type': 'exam_generation', 'job': payload},
+		)
+	except Exception as e:
+		logger.warning(f"Could not push progress for exam generation job {job.id}: {e}")
+
+
+def enqueue_generation_job(user, **params):
+	job = ExamGenerationJob.objects.create(user=user, params=params)
+	async_task('apps.exams.tasks.generate_mock_exam_job', str(job.id), group=TASK_GROUP)
+	return job
+
+
+def expire_stale_job(job):
+	"""Mark ``job`` failed if its worker died; returns the (refreshed) job."""
+	if job.status == 'running' and ExamGenerationJob.objects.filter(_stale(), id=job.id).update(
+		status='failed', error_message='Exam generation timed out. Please try again.', updated_at=timezone.now()
+	):
+		job.refresh_from_db()
+		logger.warning(f"Exam generation job {job.id} stalled; marked failed")
+		push_job_event(job)
+	return job
+
+
+def run_generation_job(job_id):
+	from .exam_generator import generate_mock_exam_by_subject_name
+	from apps.notifications.services import NotificationService
+
+	# Claim the job so a duplicate delivery cannot run it twice (unless its worker died)
+	claimed = ExamGenerationJob.objects.filter(Q(status='queued') | _stale(), id=job_id).update(
+		status='running', updated_at=timezone.now()
+	)
+	if not claimed:
+		logger.info(f"Exam generation job {job_id} already claimed")
+		return None
+
+	job = ExamGenerationJob.objects.select_related('user').get(id=job_id)
+	progress = JobProgress(job)
+	progress.update('started', message="Preparing exam")
+	try:
+		mock_exam = generate_mock_exam_by_subject_name(creator=job.user, progress=progress, **job.params)
+	except Exception as e:
+		logger.error(f"Exam generation job {job_id} failed: {e}")
+		job.status = 'failed'
+		# ValueErrors carry user-facing reasons (no questions, bad year, ...)
+		job.error_message = str(e) if isinstance(e, ValueError) else 'An unexpected error occurred'
+		job.save(update_fields=['status', 'error_message', 'updated_at'])
+		push_job_event(job)
+		return None
+
+	push_job_event(job)
+	try:
+		NotificationService.create_notification(
+			job.user, "Mock exam ready", f"{mock_exam.title} is ready to start.", notification_type='exam_update'
+		)
+	except Exception as e:
+		logger.warning(f"Could not send exam-ready notification for job {job_id}: {e}")
+	return mock_exam.id
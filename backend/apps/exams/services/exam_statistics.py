@@ -0,0 +1,109 @@
+"""
+Materialized per-exam statistics.
+
+get_exam_statistics() used to aggregate over every attempt of an exam on
+each request, which got slower the more popular an exam was. Each finalized
+result is now folded into the exam's ExamStatistics row instead: attempt and
+pass counts, a 10-band percentage histogram, the mean and variance of the
+percentage (Welford's update, so no pass over old attempts is needed) and
+per-question counts.
+
+From the per-question counts the summary derives each question's difficulty
+index (share of attempts that got it right) and its discrimination index,
+the point-biserial correlation between getting the question right and the
+attempt's percentage.
+
+record_exam_result() runs in the submission pipeline's ``effects`` stage,
+which commits at most once per result. rebuild_exam_statistics() recomputes
+a row from stored results (see the rebuild_exam_statistics command).
+"""
+import logging
+import math
+
+from django.db import transaction
+
+from ..models import ExamResult, ExamStatistics
+
+logger = logging.getLogger(__name__)
+
+
+def _correct_by_question(detailed_breakdown):
+	questions = (detailed_breakdown or {}).get('questions') or {}
+	return {qid: bool(entry.get('is_correct')) for qid, entry in questions.items()}
+
+
+def _locked_statistics(mock_exam_id):
+	stats, _ = ExamStatistics.objects.select_for_update().get_or_create(mock_exam_id=mock_exam_id)
+	return stats
+
+
+def record_exam_result(result):
+	"""Fold one finalized ExamResult into its exam's statistics."""
+	attempt = result.attempt
+	with transaction.atomic():
+		stats = _locked_statistics(attempt.mock_exam_id)
+		stats.add_result(
+			result.percentage, result.total_score, attempt.time_taken_seconds,
+			result.passed, _correct_by_question(result.detailed_breakdown),
+		)
+		stats.save()
+	return stats
+
+
+def rebuild_exam_statistics(mock_exam_id):
+	"""Recompute an exam's statistics from all of its stored results."""
+	rows = ExamResult.objects.filter(attempt__mock_exam_id=mock_exam_id).order_by('id').values_list(
+		'percentage', 'total_score', 'attempt__time_taken_seconds', 'passed', 'detailed_breakdown'
+	)
+	with transaction.atomic():
+		stats = _locked_statistics(mock_exam_id)
+		fresh = ExamStatistics(id=stats.id, mock_exam_id=mock_exam_id)
+		for percentage, score, time_taken_seconds, passed, detailed_breakdown in rows.iterator(chunk_size=500):
+			fresh.add_result(percentage, score, time_taken_seconds, passed, _correct_by_question(detailed_breakdown))
+		fresh.save()
+	logger.info(f"Rebuilt statistics for exam {mock_exam_id}: {fresh.attempt_count} results")
+	return fresh
+
+
+def _question_summary(question_id, entry, std):
+	attempts, correct = entry['attempts'], entry['correct']
+	p = correct / attempts if attempts else None
+	discrimination = None
+	if p is not None and 0 < p < 1 and std > 0:
+		mean_correct = entry['correct_percentage_sum'] / correct
+		mean_incorrect = (entry['percentage_sum'] - entry['correct_percentage_sum']) / (attempts - correct)
+		discrimination = round((mean_correct - mean_incorrect) / std * math.sqrt(p * (1 - p)), 3)
+	return {
+		'question_id': int(question_id),
+		'attempts': attempts,
+		'correct': correct,
+		'difficulty_index': round(p, 3) if p is not None else None,
+		'discrimination_index': discrimination,
+	}
+
+
+def summarize_statistics(stats):
+	"""API payload for an ExamStatistics row; keeps the old aggregate keys."""
+	n = stats.attempt_count
+	std = math.sqrt(stats.variance_percentage)
+	histogram = stats.histogram or [0] * ExamStatistics.HISTOGRAM_BUCKETS
+	return {
+		'total_attempts': n,
+		'avg_score': stats.score_sum / n if n else None,
+		'avg_percentage': stats.mean_percentage if n else None,
+		'max_score': stats.max_score,
+		'min_score': stats.min_score,
+		'avg_time': stats.time_taken_sum / n if n else None,
+		'passed_count': stats.passed_count,
+		'failed_count': n - stats.passed_count,
+		'pass_rate': stats.passed_count / n * 100 if n else 0,
+		'std_percentage': round(std, 3) if n else None,
+		'histogram': [
+			{'range': f"{band * 10}-{band * 10 + 10}", 'count': count}
+			for band, count in enumerate(histogram)
+		],
+		'questions': [
+			_question_summary(question_id, entry, std)
+			for question_id, entry in stats.question_stats.items()
+		],
+	}
@@ -0,0 +1,200 @@
+"""
+Deferred exam submission.
+
+ExamSubmitView stores the answers, marks the attempt submitted and returns
+an ExamSubmissionJob (the receipt) straight away. process_submission()
+then runs on the Django-Q cluster in three stages:
+
+	grade    auto_grade_exam (objective scores first, then theory answers)
+	analyze  analyze_exam_result -> ExamResult
+	effects  flashcards for mistakes, exam statistics, streak, points,
+	         progress, mastery
+
+Each completed stage is recorded on the job, so a redelivered or retried
+job skips what already ran. ``effects`` is recorded in the same transaction
+as its writes, so points are never awarded twice. Stage changes are pushed
+to the user's notifications WebSocket group as ``exam_submission`` events
+and the job can be polled at submissions/<id>/.
+
+A job left 'queued' or 'running' by a dead worker for STALE_AFTER_SECONDS
+counts as failed: a retry or a redelivered task takes it over, and polling
+it (requeue_stale_submission) re-queues it from its last completed stage.
+"""
+import logging
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django_q.tasks import async_task
+
+from apps.analytics.services import AnalyticsService
+from apps.study_tools.services.srs_service import SRSService
+
+from ..models import ExamAttempt, ExamSubmissionJob
+from .answer_key import get_answer_key
+from .exam_grader import auto_grade_exam, grading_result_from_attempt
+from .exam_statistics import record_exam_result
+from .result_analyzer import analyze_exam_result
+
+logger = logging.getLogger(__name__)
+
+TASK_GROUP = 'exam-submission'
+STAGES = ('grade', 'analyze', 'effects')
+
+DEFAULTS = {
+	# Per-task timeout: above EXAM_GRADING['THEORY_PHASE_TIMEOUT'] plus the other
+	# stages, below STALE_AFTER_SECONDS and Q_CLUSTER['retry']
+	'TASK_TIMEOUT': 480,
+	# Longer than TASK_TIMEOUT; stages refresh updated_at as they finish
+	'STALE_AFTER_SECONDS': 600,
+}
+
+
+def get_submission_config():
+	return {**DEFAULTS, **getattr(settings, 'EXAM_SUBMISSION', {})}
+
+
+def _stale():
+	"""Jobs whose worker died: no update for STALE_AFTER_SECONDS while queued or running."""
+	cutoff = timezone.now() - timedelta(seconds=get_submission_config()['STALE_AFTER_SECONDS'])
+	return Q(status__in=['queued', 'running'], updated_at__lt=cutoff)
+
+
+def push_submission_event(job, stage=None):
+	"""Send a job snapshot to ``user_<id>_notifications``; never fails the job."""
+	attempt = job.attempt
+	payload = {
+		'submission_id': str(job.id),
+		'attempt_id': attempt.id,
+		'status': job.status,
+		'stage': stage,
+		'stages': [name for name in STAGES if name in job.stages],
+		'score': attempt.score if 'grade' in job.stages else None,
+		'percentage': attempt.percentage if 'grade' in job.stages else None,
+		'result_id': job.result_id,
+		'error': job.error_message or None,
+	}
+	try:
+		async_to_sync(get_channel_layer().group_send)(
+			f"user_{attempt.user_id}_notifications",
+			{'type': 'exam_submission', 'submission': payload},
+		)
+	except Exception as e:
+		logger.warning(f"Could not push progress for exam submission {job.id}: {e}")
+
+
+def _enqueue(job):
+	async_task(
+		'apps.exams.tasks.process_exam_submission', str(job.id),
+		group=TASK_GROUP, timeout=get_submission_config()['TASK_TIMEOUT'],
+	)
+
+
+def submit_exam(attempt, raw_responses, time_taken_seconds):
+	"""
+	Record the answers and enqueue grading; returns the receipt.
+
+	Submitting an attempt that is already submitted returns its existing
+	receipt (re-queued if it had failed) instead of grading twice.
+	"""
+	with transaction.atomic():
+		attempt = ExamAttempt.objects.select_for_update().get(pk=attempt.pk)
+		job = attempt.submission_jobs.order_by('-created_at').first() if attempt.status == 'SUBMITTED' else None
+		if job is not None:
+			return retry_submission(job)
+
+		attempt.raw_responses = raw_responses
+		attempt.time_taken_seconds = time_taken_seconds
+		attempt.mark_submitted()
+		job = ExamSubmissionJob.objects.create(attempt=attempt)
+		transaction.on_commit(lambda: _enqueue(job))
+	return job
+
+
+def retry_submission(job):
+	"""Re-queue a failed or stale job; it resumes after its last completed stage."""
+	with transaction.atomic():
+		if ExamSubmissionJob.objects.filter(Q(status='failed') | _stale(), id=job.id).update(
+			status='queued', error_message='', updated_at=timezone.now()
+		):
+			job.status, job.error_message = 'queued', ''
+			transaction.on_commit(lambda: _enqueue(job))
+	return job
+
+
+def requeue_stale_submission(job):
+	"""Re-queue ``job`` if its worker died; returns the (refreshed) job."""
+	if job.status in ('queued', 'running') and ExamSubmissionJob.objects.filter(_stale(), id=job.id).exists():
+		logger.warning(f"Exam submission {job.id} stalled; re-queueing")
+		retry_submission(job)
+		job.refresh_from_db()
+	return job
+
+
+def _complete_stage(job, stage):
+	job.stages[stage] = timezone.now().isoformat()
+	job.save(update_fields=['stages', 'result', 'updated_at'])
+	transaction.on_commit(lambda: push_submission_event(job, stage))
+
+
+def apply_exam_effects(result, grading_result):
+	"""Flashcards for wrong objective answers, exam statistics, then analytics and gamification."""
+	attempt = result.attempt
+	breakdown = grading_result.get('breakdown', {})
+	mistakes = [
+		question for question in get_answer_key(attempt.mock_exam_id)
+		if breakdown.get(str(question.id), {}).get('is_correct') is False
+		and breakdown[str(question.id)].get('user_answer_id')
+	]
+	SRSService.generate_from_mistakes(attempt.user, mistakes)
+	record_exam_result(result)
+	AnalyticsService.record_exam_completion(result)
+
+
+def process_submission(job_id):
+	# Claim the job so a duplicate delivery cannot run it twice (unless its worker died)
+	claimed = ExamSubmissionJob.objects.filter(Q(status='queued') | _stale(), id=job_id).update(
+		status='running', updated_at=timezone.now()
+	)
+	if not claimed:
+		logger.info(f"Exam submission {job_id} already claimed")
+		return None
+
+	job = ExamSubmissionJob.objects.select_related(
+		'attempt__user', 'attempt__mock_exam', 'result'
+	).get(id=job_id)
+	attempt = job.attempt
+	push_submission_event(job)
+	try:
+		if 'grade' not in job.stages:
+			grading_result = auto_grade_exam(attempt)
+			_complete_stage(job, 'grade')
+		else:
+			grading_result = grading_result_from_attempt(attempt)
+
+		if 'analyze' not in job.stages:
+			job.result = analyze_exam_result(attempt, grading_result)
+			_complete_stage(job, 'analyze')
+
+		with transaction.atomic():
+			stages = ExamSubmissionJob.objects.select_for_update().values_list('stages', flat=True).get(id=job.id)
+			if 'effects' not in stages:
+				apply_exam_effects(job.result, grading_result)
+				_complete_stage(job, 'effects')
+	except Exception as e:
+		logger.error(f"Exam submission {job_id} failed: {e}")
+		job.status = 'failed'
+		job.error_message = 'Processing failed; retry to resume from the last completed stage'
+		job.save(update_fields=['status', 'error_message', 'updated_at'])
+		push_submission_event(job)
+		return None
+
+	job.status = 'completed'
+	job.save(update_fields=['status', 'updated_at'])
+	push_submission_event(job)
+	logger.info(f"Exam submission {job_id} completed: attempt {attempt.id}, {attempt.percentage:.1f}%")
+	return job.result_id
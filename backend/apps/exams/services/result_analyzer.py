@@ -1,10 +1,12 @@
 
-from apps.exams.models import ExamAttempt, ExamResult
+from apps.exams.models import ExamAttempt, ExamResult, ExamStatistics
 from apps.content.models import Topic
 from apps.questions.models import Question
 import logging
 from ai_services.router import AIRouter
-from apps.questions.models import Answer
+from .adaptive_exam import administered_question_ids
+from .answer_key import get_answer_key
+from .exam_statistics import summarize_statistics
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +28,11 @@ def analyze_exam_result(attempt: ExamAttempt, grading_result: dict):
 	incorrect_count = grading_result.get('incorrect_count', 0)
 	unanswered_count = grading_result.get('unanswered_count', 0)
 	
-	num_questions = attempt.mock_exam.mockexamquestion_set.count()
+	answer_key = get_answer_key(attempt.mock_exam_id)
+	administered = administered_question_ids(attempt)
+	if administered is not None:
+		answer_key = [q for q in answer_key if q.id in administered]
+	num_questions = len(answer_key)
 	passing_score = attempt.mock_exam.passing_score or 40
 	passed = percentage >= passing_score
 	
@@ -35,29 +41,8 @@ def analyze_exam_result(attempt: ExamAttempt, grading_result: dict):
 	topic_performance = {}
 	
 	try:
-		# Bulk fetch questions with topics
-		mock_questions = attempt.mock_exam.mockexamquestion_set.select_related(
-			'question', 'question__topic', 'question__subject'
-		).all()
-		
-		# Get all question IDs
-		question_ids = [mq.question.id for mq in mock_questions]
-		
-		# Bulk fetch all correct answers for explanation lookup
-		# We only need answers that have explanations
-		correct_answers = Answer.objects.filter(
-			question_id__in=question_ids,
-			is_correct=True
-		).select_related('question')
-		
-		# Map question_id -> correct_answer
-		correct_answer_map = {
-			str(a.question.id): a for a in correct_answers
-		}
-		
-		for mq in mock_questions:
-			q = mq.question
-			topic = q.topic.name if q.topic else "Uncategorized"
+		for q in answer_key:
+			topic = q.topic_name or "Uncategorized"
 			difficulty = q.difficulty
 			
 			if topic not in topic_stats:
@@ -93,10 +78,9 @@ def analyze_exam_result(attempt: ExamAttempt, grading_result: dict):
 				if q.guidance:
 					explanation = q.guidance
 				else:
-					# Check correct answer explanation from map
-					ans = correct_answer_map.get(qid)
-					if ans and ans.explanation:
-						explanation = ans.explanation
+					# Check correct answer explanation from the answer key
+					if q.correct_answer_explanation:
+						explanation = q.correct_answer_explanation
 			
 			# attach explanation back into breakdown if found
 			if explanation:
@@ -252,37 +236,14 @@ def get_exam_statistics(mock_exam):
 	"""
 	Get overall statistics for a mock exam across all attempts.
 	
+	Reads the exam's materialized ExamStatistics row (one query) rather
+	than aggregating over its attempts.
+	
 	Args:
 		mock_exam: MockExam instance
 	
 	Returns:
 		dict with statistics
 	"""
-	from django.db.models import Avg, Max, Min, Count
-	
-	attempts = mock_exam.examinattempt_set.filter(
-		is_submitted=True,
-		auto_graded=True
-	)
-	
-	stats = attempts.aggregate(
-		total_attempts=Count('id'),
-		avg_score=Avg('score'),
-		avg_percentage=Avg('percentage'),
-		max_score=Max('score'),
-		min_score=Min('score'),
-		avg_time=Avg('time_taken_seconds')
-	)
-	
-	# Count passed vs failed
-	passed_count = attempts.filter(percentage__gte=mock_exam.passing_score or 40).count()
-	failed_count = attempts.count() - passed_count
-	
-	stats['passed_count'] = passed_count
-	stats['failed_count'] = failed_count
-	stats['pass_rate'] = (
-		(passed_count / attempts.count() * 100)
-		if attempts.count() > 0 else 0
-	)
-	
-	return stats
+	stats = ExamStatistics.objects.filter(mock_exam_id=mock_exam.id).first()
+	return summarize_statistics(stats or ExamStatistics(mock_exam_id=mock_exam.id))
@@ -0,0 +1,12 @@
+from .services.exam_jobs import run_generation_job
+from .services.exam_submission import process_submission
+
+
+def generate_mock_exam_job(job_id):
+	"""Django-Q entry point for ExamGenerationJob (see services/exam_jobs.py)."""
+	return run_generation_job(job_id)
+
+
+def process_exam_submission(job_id):
+	"""Django-Q entry point for ExamSubmissionJob (see services/exam_submission.py)."""
+	return process_submission(job_id)
@@ -0,0 +1,58 @@
+import asyncio
+import random
+from collections import Counter
+
+import httpx
+
+
+class FakeAlocServer:
+    """
+    In-process stand-in for the ALOC ``/q`` endpoint, served through
+    httpx.MockTransport. Each request returns one random question from a
+    fixed bank per subject/year. Unknown tokens get 401, and a token with
+    more than ``max_concurrent`` requests in flight gets 429.
+    """
+
+    def __init__(self, tokens=("token-a",), bank_size=30, max_concurrent=None, latency=0.002, seed=0):
+        self.tokens = set(tokens)
+        self.bank_size = bank_size
+        self.max_concurrent = max_concurrent
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.requests = Counter()
+        self.rejected = Counter()
+        self.in_flight = Counter()
+        self.peak = Counter()
+
+    def transport(self):
+        return httpx.MockTransport(self.handle)
+
+    def question(self, subject, year, n):
+        return {
+            "id": int(year or 0) * 1000 + n,
+            "question": f"{subject} {year} question {n}?",
+            "option": {"a": f"Option A{n}", "b": f"Option B{n}", "c": f"Option C{n}", "d": f"Option D{n}", "e": ""},
+            "answer": "abcd"[n % 4],
+            "solution": f"Because of {n}",
+            "examtype": "utme",
+            "examyear": str(year),
+        }
+
+    async def handle(self, request):
+        token = request.headers.get("AccessToken")
+        if token not in self.tokens:
+            return httpx.Response(401, json={"message": "Invalid access token"})
+        self.requests[token] += 1
+        if self.max_concurrent is not None and self.in_flight[token] >= self.max_concurrent:
+            self.rejected[token] += 1
+            return httpx.Response(429, json={"message": "Too many requests"})
+
+        self.in_flight[token] += 1
+        self.peak[token] = max(self.peak[token], self.in_flight[token])
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight[token] -= 1
+        subject, year = request.url.params["subject"], request.url.params.get("year")
+        n = self.rng.randrange(self.bank_size)
+        return httpx.Response(200, json={"subject": subject, "status": 200, "data": self.question(subject, year, n)})
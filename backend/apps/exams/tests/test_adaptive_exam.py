@@ -0,0 +1,128 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.content.models import Subject
+from apps.exams.models import ExamAttempt, ExamResult, MockExam, MockExamQuestion
+from apps.exams.services.adaptive_exam import get_item_bank, invalidate_item_bank
+from apps.exams.services.answer_key import invalidate_answer_key
+from apps.exams.services.exam_generator import get_past_exam_type
+from apps.exams.services.exam_submission import process_submission
+from apps.questions.models import Answer, LearnerAbility, Question, QuestionCalibration
+
+
+class AdaptiveExamTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="cat@example.com", password="pass12345")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        subject = Subject.objects.create(name="Mathematics", category="STEM", description="Maths")
+        self.exam = MockExam.objects.create(
+            title="Adaptive maths", exam_type=get_past_exam_type("JAMB"), subject=subject, mode="adaptive"
+        )
+        self.difficulty, self.right = {}, {}
+        for i in range(60):
+            q = Question.objects.create(subject=subject, content=f"Sum {i}?")
+            self.right[q.id] = Answer.objects.create(question=q, content="Right", is_correct=True).id
+            Answer.objects.create(question=q, content="Wrong", is_correct=False)
+            MockExamQuestion.objects.create(mock_exam=self.exam, question=q, order=i)
+            # Difficulties spread from -3 to 3 logits
+            self.difficulty[q.id] = -3 + 6 * i / 59
+            QuestionCalibration.objects.create(
+                question=q, difficulty=self.difficulty[q.id], discrimination=1.5, responses=100,
+                calibrated_at=timezone.now(),
+            )
+        theory = Question.objects.create(subject=subject, content="Prove it.", question_type="THEORY")
+        MockExamQuestion.objects.create(mock_exam=self.exam, question=theory, order=99)
+
+    def answer(self, progress, ability):
+        """A candidate who gets every question easier than ``ability`` right."""
+        question = progress["question"]
+        answer_id = self.right[question["id"]] if self.difficulty[question["id"]] < ability else question["answers"][0]["id"] + 10**6
+        return self.client.post(f"/api/exams/{self.exam.id}/adaptive/", {
+            "question_id": question["id"], "answer_id": answer_id,
+        }, format="json")
+
+    def test_adaptive_attempt_converges_and_grades_served_questions(self):
+        self.assertEqual(self.client.post(f"/api/exams/{self.exam.id}/start/", {}).status_code, 201)
+        progress = self.client.get(f"/api/exams/{self.exam.id}/adaptive/").data
+        self.assertNotIn("is_correct", progress["question"]["answers"][0])
+        # No calibrated ability yet: the first item sits near the middle of the bank
+        self.assertLess(abs(self.difficulty[progress["question"]["id"]]), 0.3)
+
+        served = []
+        while not progress["finished"]:
+            served.append(progress["question"]["id"])
+            progress = self.answer(progress, ability=1.2).data
+        self.assertLessEqual(len(served), 30)
+        self.assertEqual(len(set(served)), len(served))
+
+        attempt = ExamAttempt.objects.get(user=self.user, mock_exam=self.exam)
+        self.assertAlmostEqual(attempt.adaptive["ability"], 1.2, delta=0.5)
+        self.assertEqual(attempt.attempted_questions, len(served))
+
+        # Later questions cluster around the candidate's ability
+        late = [self.difficulty[qid] for qid in served[-5:]]
+        self.assertLess(abs(sum(late) / len(late) - 1.2), 0.6)
+
+        with mock.patch("apps.exams.services.exam_submission.async_task") as async_task, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/api/exams/{self.exam.id}/submit/", {"time_taken_seconds": 300}, format="json")
+        self.assertEqual(response.status_code, 202)
+        process_submission(async_task.call_args.args[1])
+
+        result = ExamResult.objects.get(attempt=attempt)
+        self.assertEqual(result.correct_answers + result.incorrect_answers, len(served))
+        self.assertEqual(result.unanswered, 0)
+        self.assertAlmostEqual(result.percentage, attempt.adaptive["percentage"])
+
+    def test_selection_uses_precomputed_candidates_and_prior_ability(self):
+        bank = get_item_bank(self.exam.id)
+        self.assertEqual(len(bank), 60)
+        started = time.perf_counter()
+        for _ in range(100):
+            bank.select(0.7, set(range(0, 60, 2)))
+        self.assertLess((time.perf_counter() - started) / 100, 0.002)
+
+        LearnerAbility.objects.create(user=self.user, ability=2.0, calibrated_at=timezone.now())
+        self.client.post(f"/api/exams/{self.exam.id}/start/", {})
+        first = self.client.get(f"/api/exams/{self.exam.id}/adaptive/").data["question"]["id"]
+        self.assertGreater(self.difficulty[first], 1.0)
+
+    def test_rejects_answers_to_other_questions(self):
+        self.client.post(f"/api/exams/{self.exam.id}/start/", {})
+        current = self.client.get(f"/api/exams/{self.exam.id}/adaptive/").data["question"]["id"]
+        other = next(qid for qid in self.right if qid != current)
+        response = self.client.post(f"/api/exams/{self.exam.id}/adaptive/", {
+            "question_id": other, "answer_id": self.right[other],
+        }, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["error"], "Answer the current question first")
+
+    def test_answer_survives_a_rebuilt_bank(self):
+        self.client.post(f"/api/exams/{self.exam.id}/start/", {})
+        progress = self.client.get(f"/api/exams/{self.exam.id}/adaptive/").data
+        progress = self.answer(progress, ability=0.0).data
+        current = progress["question"]["id"]
+
+        # The question being asked leaves the exam and the bank is rebuilt
+        MockExamQuestion.objects.filter(mock_exam=self.exam, question_id=current).delete()
+        invalidate_answer_key(self.exam.id)
+        invalidate_item_bank(self.exam.id)
+        self.assertNotIn(current, get_item_bank(self.exam.id).index)
+
+        response = self.client.post(f"/api/exams/{self.exam.id}/adaptive/", {
+            "question_id": current, "answer_id": self.right[current],
+        }, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["answered"], 2)
+        self.assertNotEqual(response.data["question"]["id"], current)
+        attempt = ExamAttempt.objects.get(user=self.user, mock_exam=self.exam)
+        self.assertEqual(attempt.adaptive["correct"][-1], 1)
+        self.assertEqual(len(attempt.adaptive["parameters"]), 2)
@@ -0,0 +1,126 @@
+from functools import partial
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from apps.content.models import Subject
+from apps.exams.services import aloc_client
+from apps.exams.services.aloc_client import AlocClient, upsert_aloc_questions
+from apps.exams.services.exam_generator import generate_mock_exam_by_subject_name
+from apps.questions.models import Answer, Question
+
+from .fake_aloc import FakeAlocServer
+
+CONFIG = {
+    "INITIAL_CONCURRENCY": 2,
+    "MAX_CONCURRENCY": 6,
+    "SATURATION_STREAK": 25,
+    "REQUEST_BUDGET_FACTOR": 4,
+    "LIVE_FETCH": True,
+    "LIVE_FETCH_SECONDS": 15,
+    "TOKENS": ["token-a"],
+    "BASE_URL": "https://aloc.test/api/v2",
+    "TIMEOUT": 5,
+}
+
+
+class AlocClientTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        aloc_client._learned_limits.clear()
+
+    def harvest(self, server, tokens=("token-a",), **kwargs):
+        client = AlocClient(tokens=tokens, transport=server.transport(), config=CONFIG)
+        return async_to_sync(client.harvest)("Biology", "JAMB", 2015, **kwargs)
+
+    def test_harvest_dedupes_and_stops_when_subject_is_exhausted(self):
+        server = FakeAlocServer(bank_size=12)
+        result = self.harvest(server, target=40, known_ids=[2015000])
+
+        ids = [item["id"] for item in result.items]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), {2015000 + n for n in range(1, 12)})
+        self.assertEqual(result.stopped, "exhausted")
+        self.assertGreater(result.duplicates, 0)
+
+    def test_concurrency_adapts_per_token(self):
+        server = FakeAlocServer(tokens=("token-a", "token-b"), bank_size=500, max_concurrent=3)
+        result = self.harvest(server, tokens=("token-a", "token-b", "revoked"), target=80)
+
+        self.assertEqual(len(result.items), 80)
+        self.assertEqual(result.stopped, "target reached")
+        # Both live keys grew past their start and backed off after 429s
+        self.assertTrue(server.rejected["token-a"] and server.rejected["token-b"])
+        self.assertTrue(all(2 <= result.limits[token] <= 4 for token in ("token-a", "token-b")), result.limits)
+        self.assertNotIn("revoked", aloc_client._learned_limits)
+        self.assertEqual(aloc_client._learned_limits["token-a"], result.limits["token-a"])
+
+    def test_upsert_reuses_and_backfills_existing_rows(self):
+        subject = Subject.objects.create(name="Biology", category="STEM", description="Biology")
+        server = FakeAlocServer()
+        items = [server.question("biology", 2015, n) for n in (1, 2, 3)]
+        legacy = Question.objects.create(subject=subject, content=items[0]["question"], metadata={})
+
+        questions = upsert_aloc_questions(items + items[:1], subject, year=2015)
+
+        self.assertEqual([q.content for q in questions], [item["question"] for item in items])
+        self.assertEqual(questions[0].id, legacy.id)
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.metadata, {"source": "ALOC", "year": 2015, "external_id": 2015001})
+        # Option "e" is empty, answer "c" -> third option
+        self.assertEqual(
+            list(Answer.objects.filter(question=questions[1]).values_list("content", "is_correct")),
+            [("Option A2", False), ("Option B2", False), ("Option C2", True), ("Option D2", False)],
+        )
+
+        again = upsert_aloc_questions(items, subject, year=2015)
+        self.assertEqual([q.id for q in again], [q.id for q in questions])
+        self.assertEqual(Question.objects.filter(subject=subject).count(), 3)
+
+
+@override_settings(ALOC_ACCESS_TOKEN="token-a", ALOC_BASE_URL="https://aloc.test/api/v2")
+class MirrorAlocQuestionsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        aloc_client._learned_limits.clear()
+        self.server = FakeAlocServer(bank_size=40)
+
+    def mirror(self, *args):
+        out = StringIO()
+        with mock.patch(
+            "apps.exams.management.commands.mirror_aloc_questions.AlocClient",
+            partial(AlocClient, transport=self.server.transport()),
+        ), self.captureOnCommitCallbacks(execute=True):
+            call_command("mirror_aloc_questions", "--subject", "Chemistry", *args, stdout=out)
+        return out.getvalue()
+
+    def test_mirror_then_create_exam_without_calling_aloc(self):
+        output = self.mirror("--year", "2014-2015", "--target", "30")
+        self.assertIn("Mirrored 60 ALOC questions", output)
+        self.assertEqual(Question.objects.filter(metadata__year=2015).count(), 30)
+
+        # A rerun only adds what is new
+        self.mirror("--year", "2015", "--target", "30")
+        external_ids = list(Question.objects.filter(metadata__year=2015).values_list("metadata__external_id", flat=True))
+        self.assertGreater(len(external_ids), 30)
+        self.assertEqual(len(external_ids), len(set(external_ids)))
+
+        requests_before = sum(self.server.requests.values())
+        # Past-paper exams still ask the AI for theory questions; keep that offline
+        router = mock.Mock()
+        router.generate_questions.return_value = {"questions": []}
+        with override_settings(ALOC_CLIENT={"LIVE_FETCH": False}), mock.patch(
+            "apps.exams.services.exam_generator.get_ai_router", return_value=router
+        ):
+            exam = generate_mock_exam_by_subject_name(
+                "Chemistry", exam_format="JAMB", num_questions=25, year=2015, mode="past_questions"
+            )
+        self.assertEqual(sum(self.server.requests.values()), requests_before)
+        router.generate_questions.assert_called_once()
+        self.assertEqual(router.generate_questions.call_args.kwargs["q_type"], "THEORY")
+        self.assertEqual(exam.questions.count(), 25)
+        self.assertTrue(all(q.metadata["source"] == "ALOC" for q in exam.questions.all()))
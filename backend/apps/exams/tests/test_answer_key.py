@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.content.models import Subject, Topic
+from apps.exams.models import ExamAttempt, MockExam, MockExamQuestion
+from apps.exams.services.answer_key import get_answer_key
+from apps.exams.services.exam_generator import get_past_exam_type
+from apps.exams.services.exam_grader import auto_grade_exam
+from apps.exams.services.result_analyzer import analyze_exam_result
+from apps.questions.models import Answer, Question
+
+
+class ExamAnswerKeyTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="keyed@example.com", password="pass12345")
+        self.subject = Subject.objects.create(name="Economics", category="SOCIAL", description="Economics")
+        self.exam_type = get_past_exam_type("JAMB")
+        self.topic = Topic.objects.create(
+            subject=self.subject, name="Demand", difficulty="BEGINNER", estimated_hours=1, description="Demand"
+        )
+
+    def make_exam(self, n=5):
+        exam = MockExam.objects.create(title="Econ", exam_type=self.exam_type, subject=self.subject, creator=self.user)
+        correct = {}
+        for i in range(n):
+            q = Question.objects.create(subject=self.subject, topic=self.topic, content=f"Econ {exam.id}.{i}?")
+            correct[str(q.id)] = Answer.objects.create(question=q, content="Yes", is_correct=True, explanation="Law").id
+            Answer.objects.create(question=q, content="No", is_correct=False)
+            MockExamQuestion.objects.create(mock_exam=exam, question=q, order=n - i)
+        return exam, correct
+
+    def test_grading_and_analysis_share_the_cached_key(self):
+        exam, correct = self.make_exam()
+        key = get_answer_key(exam.id)
+        self.assertEqual([q.correct_answer_id for q in key], list(reversed(correct.values())))
+        self.assertEqual({q.topic_name for q in key}, {"Demand"})
+
+        attempt = ExamAttempt.objects.create(user=self.user, mock_exam=exam, raw_responses=correct)
+        with CaptureQueriesContext(connection) as queries:
+            result = analyze_exam_result(attempt, auto_grade_exam(attempt))
+        tables = " ".join(q["sql"] for q in queries.captured_queries)
+        self.assertNotIn("questions_answer", tables)
+        self.assertNotIn("exams_mockexamquestion", tables)
+        self.assertEqual(result.percentage, 100)
+        self.assertEqual(result.detailed_breakdown["topics"]["Demand"]["correct"], 5)
+
+    def test_list_annotates_counts_in_one_query(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        exam, correct = self.make_exam(3)
+        ExamAttempt.objects.create(user=self.user, mock_exam=exam, is_submitted=True, auto_graded=True, score=2)
+        ExamAttempt.objects.create(user=self.user, mock_exam=exam, is_submitted=True, auto_graded=True, score=3)
+
+        with CaptureQueriesContext(connection) as one:
+            client.get("/api/exams/")
+        for _ in range(4):
+            self.make_exam(2)
+        with CaptureQueriesContext(connection) as five:
+            response = client.get("/api/exams/")
+
+        self.assertEqual(len(one), len(five))
+        listed = {row["id"]: row for row in response.data["results"]}
+        self.assertEqual(
+            (listed[exam.id]["question_count"], listed[exam.id]["attempt_count"], listed[exam.id]["average_score"]),
+            (3, 2, 2.5),
+        )
@@ -0,0 +1,60 @@
+import itertools
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from ai_services.cache import AIResponseCache
+from ai_services.circuit_breaker import reset_breakers
+from ai_services.router import AIRouter
+from apps.content.models import Subject
+from apps.exams.models import MockExamQuestion
+from apps.exams.services.exam_generator import generate_mock_exam_by_subject_name, get_past_exam_type
+from apps.questions.models import Question
+
+
+class FreshQuestionsClient:
+    """Provider that writes new questions on every call."""
+
+    model = "fake"
+
+    def __init__(self):
+        self.client = object()
+        self.serial = itertools.count()
+
+    async def generate_questions_async(self, topic, difficulty, count, q_type, additional_context=""):
+        return [
+            {"content": f"{topic} question {next(self.serial)}?", "options": ["Yes", "No"], "correct_answer": "Yes"}
+            for _ in range(count)
+        ]
+
+
+@override_settings(AI_CACHE={"ENABLED": True})
+class ExamTopUpTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_breakers()
+        self.user = get_user_model().objects.create_user(email="topup@example.com", password="pass12345")
+        subject = Subject.objects.create(name="Biology", category="STEM", description="Biology")
+        exam_type = get_past_exam_type("JAMB")
+        for i in range(60):
+            Question.objects.create(subject=subject, exam_type=exam_type, content=f"Stored question {i}?")
+        self.router = AIRouter()
+        self.router.clients = [("Fake", FreshQuestionsClient())]
+        self.router.cache = AIResponseCache()
+
+    def tearDown(self):
+        reset_breakers()
+
+    def test_top_up_batches_are_not_replayed_from_cache(self):
+        counts = []
+        with mock.patch("apps.exams.services.exam_generator.get_ai_router", return_value=self.router):
+            # on_commit does not run in TestCase, so the second exam sees the
+            # same pool of 60, as one generated alongside the first would
+            for _ in range(2):
+                exam = generate_mock_exam_by_subject_name("Biology", exam_format="JAMB", num_questions=80,
+                                                          creator=self.user)
+                counts.append(MockExamQuestion.objects.filter(mock_exam=exam).count())
+
+        self.assertEqual(counts, [80, 80])
@@ -0,0 +1,94 @@
+import asyncio
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from apps.content.models import Subject
+from apps.exams.models import ExamAttempt, MockExam, MockExamQuestion
+from apps.exams.services.exam_generator import get_past_exam_type
+from apps.exams.services.exam_grader import auto_grade_exam
+from apps.questions.models import Answer, Question
+
+
+class FakeGradingRouter:
+    def __init__(self, attempt_id):
+        self.attempt_id = attempt_id
+        self.in_flight = 0
+        self.peak = 0
+        self.snapshots = []
+
+    async def grade_theory_question_async(self, question_text, user_answer, model_answer, subject, exam_type):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            # What a client polling the attempt would see right now
+            self.snapshots.append(await sync_to_async(
+                lambda: ExamAttempt.objects.values("score", "grading").get(id=self.attempt_id)
+            )())
+            await asyncio.sleep(0.02)
+            if user_answer == "fail":
+                raise RuntimeError("provider down")
+            return {"score": 8 if user_answer == "good" else 2, "feedback": {"critique": "ok"}}
+        finally:
+            self.in_flight -= 1
+
+
+@override_settings(EXAM_GRADING={"THEORY_CONCURRENCY": 2, "THEORY_TIMEOUT": 5})
+class TwoPhaseGradingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(email="grader@example.com", password="pass12345")
+        subject = Subject.objects.create(name="Literature", category="ARTS", description="Literature")
+        exam = MockExam.objects.create(title="Lit", exam_type=get_past_exam_type("WAEC"), subject=subject)
+        responses = {}
+        for i in range(3):
+            q = Question.objects.create(subject=subject, content=f"Objective {i}?")
+            right = Answer.objects.create(question=q, content="Right", is_correct=True)
+            wrong = Answer.objects.create(question=q, content="Wrong", is_correct=False)
+            MockExamQuestion.objects.create(mock_exam=exam, question=q, order=i)
+            responses[str(q.id)] = right.id if i < 2 else wrong.id
+        for i, text in enumerate(["good", "good", "bad", "fail", "good"]):
+            q = Question.objects.create(subject=subject, content=f"Essay {i}?", question_type="THEORY")
+            MockExamQuestion.objects.create(mock_exam=exam, question=q, order=10 + i)
+            responses[str(q.id)] = text
+        self.attempt = ExamAttempt.objects.create(user=user, mock_exam=exam, raw_responses=responses)
+
+    def test_objective_results_persist_before_theory_grades(self):
+        router = FakeGradingRouter(self.attempt.id)
+        with mock.patch("apps.exams.services.exam_grader.get_ai_router", return_value=router):
+            result = auto_grade_exam(self.attempt)
+
+        self.assertEqual(router.peak, 2)
+        first = router.snapshots[0]
+        self.assertEqual(first["score"], 2)
+        self.assertEqual(first["grading"]["phase"], "theory")
+        self.assertEqual(first["grading"]["theory_graded"], 0)
+
+        # 2 objective + 3 * 0.8 + 0.2; the failed essay stays pending
+        self.assertAlmostEqual(result["score"], 4.6)
+        self.assertEqual((result["correct_count"], result["incorrect_count"]), (5, 2))
+        pending = [entry for entry in result["breakdown"].values() if entry["is_correct"] is None]
+        self.assertEqual([entry["user_answer_text"] for entry in pending], ["fail"])
+
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.status, "GRADED")
+        self.assertEqual(self.attempt.grading["phase"], "complete")
+        self.assertEqual(self.attempt.grading["theory_graded"], 5)
+
+    @override_settings(EXAM_GRADING={"THEORY_CONCURRENCY": 1, "THEORY_TIMEOUT": 5, "THEORY_PHASE_TIMEOUT": 0.05})
+    def test_theory_phase_is_bounded(self):
+        router = FakeGradingRouter(self.attempt.id)
+        with mock.patch("apps.exams.services.exam_grader.get_ai_router", return_value=router):
+            result = auto_grade_exam(self.attempt)
+
+        # One essay at a time, 20ms each: the rest are left pending once the phase runs out
+        graded = [e for e in result["breakdown"].values() if "score" in e]
+        pending = [e for e in result["breakdown"].values() if e["is_correct"] is None]
+        self.assertLess(len(graded), 5)
+        self.assertEqual(len(graded) + len(pending), 5)
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.status, "GRADED")
+        self.assertEqual(self.attempt.grading["theory_graded"], 5)
@@ -0,0 +1,108 @@
+import asyncio
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.exams.models import ExamGenerationJob, MockExamQuestion
+from apps.exams.services.exam_jobs import run_generation_job
+
+
+class FakeRouter:
+    async def generate_questions_async(self, topic, difficulty, count, q_type, additional_context="", use_cache=True):
+        batch = additional_context.rsplit("Batch ", 1)[-1]
+        return [
+            {"content": f"{topic} batch {batch} question {i}?", "options": ["Yes", "No"], "correct_answer": "Yes"}
+            for i in range(count)
+        ]
+
+
+class ExamGenerationJobTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="candidate@example.com", password="pass12345")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _receive_all(self, channel):
+        layer = get_channel_layer()
+
+        async def drain():
+            events = []
+            while True:
+                try:
+                    events.append(await asyncio.wait_for(layer.receive(channel), 0.1))
+                except asyncio.TimeoutError:
+                    return events
+
+        return async_to_sync(drain)()
+
+    @mock.patch("apps.exams.services.exam_jobs.async_task")
+    def test_create_exam_returns_job_and_job_streams_progress(self, async_task):
+        response = self.client.post("/api/exams/create_exam/", {
+            "subject_name": "Biology", "exam_format": "JAMB", "num_questions": 15,
+        }, format="json")
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data["id"]
+        async_task.assert_called_once_with("apps.exams.tasks.generate_mock_exam_job", job_id, group="exam-generation")
+
+        channel = "test-exam-progress"
+        async_to_sync(get_channel_layer().group_add)(f"user_{self.user.id}_notifications", channel)
+        with mock.patch("apps.exams.services.exam_generator.get_ai_router", return_value=FakeRouter()):
+            mock_exam_id = run_generation_job(job_id)
+
+        job = ExamGenerationJob.objects.get(id=job_id)
+        self.assertEqual(job.status, "completed")
+        self.assertEqual(job.mock_exam_id, mock_exam_id)
+        self.assertEqual(MockExamQuestion.objects.filter(mock_exam_id=mock_exam_id).count(), 15)
+
+        events = self._receive_all(channel)
+        job_events = [e["job"] for e in events if e["type"] == "exam_generation"]
+        messages = [e["progress"]["message"] for e in job_events]
+        self.assertIn("AI batch 2/2", messages)
+        self.assertEqual(job_events[-1]["status"], "completed")
+        self.assertTrue(any(e["type"] == "send_notification" for e in events))
+
+        # Duplicate delivery is a no-op
+        self.assertIsNone(run_generation_job(job_id))
+
+        status = self.client.get(f"/api/exams/jobs/{job_id}/")
+        self.assertEqual(status.data["status"], "completed")
+        self.assertEqual(status.data["mock_exam"]["id"], mock_exam_id)
+
+    @mock.patch("apps.exams.services.exam_jobs.async_task")
+    def test_failed_generation_marks_job_failed(self, async_task):
+        job = ExamGenerationJob.objects.create(user=self.user, params={"subject_name": "Biology", "mode": "past_questions"})
+        run_generation_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.error_message, "year is required for past_questions mode")
+
+    def test_stalled_job_is_failed_when_polled(self):
+        job = ExamGenerationJob.objects.create(user=self.user, params={"subject_name": "Biology"}, status="running")
+
+        status = self.client.get(f"/api/exams/jobs/{job.id}/")
+        self.assertEqual(status.data["status"], "running")
+
+        ExamGenerationJob.objects.filter(id=job.id).update(updated_at=timezone.now() - timedelta(hours=1))
+        status = self.client.get(f"/api/exams/jobs/{job.id}/")
+        self.assertEqual(status.data["status"], "failed")
+        self.assertIn("timed out", status.data["error_message"])
+
+    def test_redelivered_task_takes_over_stalled_job(self):
+        job = ExamGenerationJob.objects.create(
+            user=self.user, params={"subject_name": "Biology", "exam_format": "JAMB", "num_questions": 5},
+            status="running",
+        )
+        with mock.patch("apps.exams.services.exam_generator.get_ai_router", return_value=FakeRouter()):
+            self.assertIsNone(run_generation_job(job.id))
+            ExamGenerationJob.objects.filter(id=job.id).update(updated_at=timezone.now() - timedelta(hours=1))
+            self.assertIsNotNone(run_generation_job(job.id))
+        job.refresh_from_db()
+        self.assertEqual(job.status, "completed")
@@ -0,0 +1,88 @@
+import statistics
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.content.models import Subject
+from apps.exams.models import ExamAttempt, ExamResult, ExamStatistics, MockExam
+from apps.exams.services.exam_generator import get_past_exam_type
+from apps.exams.services.exam_statistics import record_exam_result
+
+# Rows of (question 1..4 correct?) per attempt
+ANSWERS = [
+    (True, True, True, True),
+    (True, True, False, True),
+    (True, False, False, False),
+    (False, False, True, False),
+    (True, True, True, False),
+]
+
+
+class ExamStatisticsTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="stats@example.com", password="pass12345")
+        subject = Subject.objects.create(name="Physics", category="STEM", description="Physics")
+        self.exam = MockExam.objects.create(
+            title="Physics", exam_type=get_past_exam_type("JAMB"), subject=subject, creator=self.user, passing_score=50
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_result(self, row, time_taken=600):
+        correct = sum(row)
+        percentage = correct / len(row) * 100
+        attempt = ExamAttempt.objects.create(
+            user=self.user, mock_exam=self.exam, time_taken_seconds=time_taken,
+            is_submitted=True, auto_graded=True, score=correct, percentage=percentage,
+        )
+        return ExamResult.objects.create(
+            attempt=attempt, total_score=correct, percentage=percentage, passed=percentage >= 50,
+            detailed_breakdown={"questions": {str(i + 1): {"is_correct": c} for i, c in enumerate(row)}},
+        )
+
+    def test_incremental_statistics_match_a_full_recompute(self):
+        for row in ANSWERS:
+            record_exam_result(self.add_result(row))
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(f"/api/exams/{self.exam.id}/stats/").data
+        self.assertLessEqual(len(queries), 3)
+
+        percentages = [sum(row) * 25 for row in ANSWERS]
+        self.assertEqual(data["total_attempts"], 5)
+        self.assertAlmostEqual(data["avg_percentage"], statistics.mean(percentages))
+        self.assertAlmostEqual(data["std_percentage"], statistics.pstdev(percentages), places=3)
+        self.assertEqual((data["min_score"], data["max_score"]), (1, 4))
+        self.assertEqual(data["avg_time"], 600)
+        self.assertEqual((data["passed_count"], data["failed_count"]), (3, 2))
+        self.assertEqual([band["count"] for band in data["histogram"]], [0, 0, 2, 0, 0, 0, 0, 2, 0, 1])
+
+        q1, _, q3, q4 = data["questions"]
+        self.assertEqual(q1["difficulty_index"], 0.8)
+        # Point-biserial against a direct computation for question 4
+        item = [1 if row[3] else 0 for row in ANSWERS]
+        mean_x, mean_y = statistics.mean(item), statistics.mean(percentages)
+        cov = statistics.mean([(x - mean_x) * (y - mean_y) for x, y in zip(item, percentages)])
+        expected = cov / (statistics.pstdev(item) * statistics.pstdev(percentages))
+        self.assertAlmostEqual(q4["discrimination_index"], expected, places=3)
+        self.assertLess(q3["discrimination_index"], q4["discrimination_index"])
+
+        incremental = ExamStatistics.objects.get(mock_exam=self.exam)
+        ExamStatistics.objects.filter(pk=incremental.pk).update(attempt_count=0, question_stats={})
+        call_command("rebuild_exam_statistics", "--exam", str(self.exam.id), stdout=StringIO())
+        rebuilt = ExamStatistics.objects.get(mock_exam=self.exam)
+        self.assertEqual(rebuilt.attempt_count, 5)
+        self.assertAlmostEqual(rebuilt.m2_percentage, incremental.m2_percentage)
+        self.assertEqual(rebuilt.question_stats, incremental.question_stats)
+        self.assertEqual(rebuilt.histogram, incremental.histogram)
+
+    def test_exam_without_results(self):
+        data = self.client.get(f"/api/exams/{self.exam.id}/stats/").data
+        self.assertEqual(data["total_attempts"], 0)
+        self.assertIsNone(data["avg_percentage"])
+        self.assertEqual(data["questions"], [])
@@ -0,0 +1,165 @@
+import asyncio
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.analytics.models import ProgressTracker
+from apps.content.models import Subject
+from apps.exams.models import ExamAttempt, ExamSubmissionJob, MockExam, MockExamQuestion
+from apps.exams.services.exam_generator import get_past_exam_type
+from apps.exams.services.exam_submission import process_submission
+from apps.gamification.models import GamificationProfile
+from apps.questions.models import Answer, Question
+from apps.study_tools.models import Flashcard
+
+
+class ExamSubmissionPipelineTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="submitter@example.com", password="pass12345")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        subject = Subject.objects.create(name="Geography", category="ARTS", description="Geography")
+        self.exam = MockExam.objects.create(title="Geo", exam_type=get_past_exam_type("JAMB"), subject=subject)
+        self.responses = {}
+        for i in range(4):
+            q = Question.objects.create(subject=subject, content=f"Capital {i}?")
+            right = Answer.objects.create(question=q, content="Right", is_correct=True)
+            wrong = Answer.objects.create(question=q, content="Wrong", is_correct=False)
+            MockExamQuestion.objects.create(mock_exam=self.exam, question=q, order=i)
+            self.responses[str(q.id)] = right.id if i else wrong.id
+        self.attempt = ExamAttempt.objects.create(user=self.user, mock_exam=self.exam)
+
+    def submit(self):
+        with mock.patch("apps.exams.services.exam_submission.async_task") as async_task, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/api/exams/{self.exam.id}/submit/", {
+                "raw_responses": self.responses, "time_taken_seconds": 600,
+            }, format="json")
+        return response, async_task
+
+    def _receive_all(self, channel):
+        layer = get_channel_layer()
+
+        async def drain():
+            events = []
+            while True:
+                try:
+                    events.append(await asyncio.wait_for(layer.receive(channel), 0.1))
+                except asyncio.TimeoutError:
+                    return events
+
+        return async_to_sync(drain)()
+
+    def test_submit_returns_receipt_and_stages_run_in_background(self):
+        response, async_task = self.submit()
+        self.assertEqual(response.status_code, 202)
+        submission_id = response.data["submission"]["id"]
+        self.assertIsNone(response.data["submission"]["result"])
+        async_task.assert_called_once_with(
+            "apps.exams.tasks.process_exam_submission", submission_id, group="exam-submission", timeout=480
+        )
+        # Nothing graded on the request path
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.status, "SUBMITTED")
+        self.assertFalse(GamificationProfile.objects.filter(user=self.user).exists())
+
+        # A double-click returns the same receipt
+        again, _ = self.submit()
+        self.assertEqual(again.data["submission"]["id"], submission_id)
+
+        channel = "test-exam-submission"
+        async_to_sync(get_channel_layer().group_add)(f"user_{self.user.id}_notifications", channel)
+        with self.captureOnCommitCallbacks(execute=True):
+            result_id = process_submission(submission_id)
+        self.assertIsNone(process_submission(submission_id))
+
+        status = self.client.get(f"/api/exams/submissions/{submission_id}/")
+        self.assertEqual(status.data["status"], "completed")
+        self.assertEqual(list(status.data["stages"]), ["grade", "analyze", "effects"])
+        self.assertEqual(status.data["result"]["id"], result_id)
+        self.assertEqual(status.data["attempt"]["percentage"], 75)
+
+        events = [e["submission"] for e in self._receive_all(channel) if e["type"] == "exam_submission"]
+        self.assertEqual([e["stage"] for e in events if e["stage"]], ["grade", "analyze", "effects"])
+        self.assertEqual(events[-1]["status"], "completed")
+
+        self.assertEqual(ProgressTracker.objects.get(user=self.user).total_mock_exams_taken, 1)
+        self.assertEqual(GamificationProfile.objects.get(user=self.user).total_points_earned, 230)
+        self.assertEqual(Flashcard.objects.filter(user=self.user, source_type="exam_mistake").count(), 1)
+
+    def test_failed_effects_resume_without_regrading(self):
+        response, _ = self.submit()
+        submission_id = response.data["submission"]["id"]
+
+        with mock.patch(
+            "apps.analytics.services.AnalyticsService.record_exam_completion", side_effect=RuntimeError("db blip")
+        ):
+            self.assertIsNone(process_submission(submission_id))
+        job = ExamSubmissionJob.objects.get(id=submission_id)
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(list(job.stages), ["grade", "analyze"])
+        # The effects transaction rolled back, flashcards included
+        self.assertFalse(Flashcard.objects.filter(user=self.user).exists())
+
+        with mock.patch("apps.exams.services.exam_submission.async_task") as async_task, \
+                self.captureOnCommitCallbacks(execute=True):
+            retry = self.client.post(f"/api/exams/submissions/{submission_id}/")
+        self.assertEqual(retry.data["status"], "queued")
+        async_task.assert_called_once()
+
+        with mock.patch("apps.exams.services.exam_submission.auto_grade_exam") as regrade:
+            process_submission(submission_id)
+        regrade.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual(job.status, "completed")
+        self.assertEqual(GamificationProfile.objects.get(user=self.user).total_points_earned, 230)
+
+    def test_running_job_of_dead_worker_is_taken_over(self):
+        response, _ = self.submit()
+        submission_id = response.data["submission"]["id"]
+        ExamSubmissionJob.objects.filter(id=submission_id).update(status="running")
+
+        # A live worker's job is left alone
+        self.assertIsNone(process_submission(submission_id))
+        with mock.patch("apps.exams.services.exam_submission.async_task") as async_task:
+            retry = self.client.post(f"/api/exams/submissions/{submission_id}/")
+        self.assertEqual(retry.data["status"], "running")
+        async_task.assert_not_called()
+
+        ExamSubmissionJob.objects.filter(id=submission_id).update(updated_at=timezone.now() - timedelta(hours=1))
+        with mock.patch("apps.exams.services.exam_submission.async_task") as async_task, \
+                self.captureOnCommitCallbacks(execute=True):
+            retry = self.client.post(f"/api/exams/submissions/{submission_id}/")
+        self.assertEqual(retry.data["status"], "queued")
+        async_task.assert_called_once()
+
+        # A redelivered task takes over a stale job as well
+        ExamSubmissionJob.objects.filter(id=submission_id).update(
+            status="running", updated_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertIsNotNone(process_submission(submission_id))
+        self.assertEqual(ExamSubmissionJob.objects.get(id=submission_id).status, "completed")
+
+    def test_polling_requeues_a_stalled_submission(self):
+        response, _ = self.submit()
+        submission_id = response.data["submission"]["id"]
+        ExamSubmissionJob.objects.filter(id=submission_id).update(status="running")
+
+        with mock.patch("apps.exams.services.exam_submission.async_task") as async_task:
+            self.assertEqual(self.client.get(f"/api/exams/submissions/{submission_id}/").data["status"], "running")
+        async_task.assert_not_called()
+
+        ExamSubmissionJob.objects.filter(id=submission_id).update(updated_at=timezone.now() - timedelta(hours=1))
+        with mock.patch("apps.exams.services.exam_submission.async_task") as async_task, \
+                self.captureOnCommitCallbacks(execute=True):
+            polled = self.client.get(f"/api/exams/submissions/{submission_id}/")
+        self.assertEqual(polled.data["status"], "queued")
+        async_task.assert_called_once()
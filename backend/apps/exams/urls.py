@@ -13,8 +13,10 @@ urlpatterns = [
 	
 	# Exam operations - start, submit, result
 	path('<int:exam_id>/start/', views.ExamStartView.as_view(), name='exam-start'),
+	path('<int:exam_id>/adaptive/', views.ExamAdaptiveView.as_view(), name='exam-adaptive'),
 	path('<int:exam_id>/submit/', views.ExamSubmitView.as_view(), name='exam-submit'),
 	path('<int:exam_id>/result/', views.ExamResultView.as_view(), name='exam-result'),
+	path('submissions/<uuid:submission_id>/', views.ExamSubmissionStatusView.as_view(), name='exam-submission-status'),
 	
 	# User's attempts
 	path('my-attempts/', views.MyExamAttemptsView.as_view(), name='my-exam-attempts'),
@@ -8,18 +8,22 @@ from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.db.models import Q
 
-from .models import MockExam, ExamAttempt, ExamResult
+from .models import MockExam, ExamAttempt, ExamResult, ExamGenerationJob, ExamSubmissionJob
 from .serializers import (
 	MockExamSerializer,
 	MockExamDetailSerializer,
 	ExamAttemptSerializer,
 	ExamResultSerializer,
-	ExamSubmissionSerializer
+	ExamSubmissionSerializer,
+	ExamSubmissionJobSerializer,
+	ExamGenerationJobSerializer
 )
+from .services.adaptive_exam import adaptive_progress, answer_adaptive_question, start_adaptive_attempt
 from .services.exam_generator import generate_jamb_mock_exam
-from .services.exam_generator import generate_mock_exam_by_subject_name
-from .services.exam_grader import auto_grade_exam, validate_exam_submission
-from .services.result_analyzer import analyze_exam_result, get_exam_statistics
+from .services.exam_jobs import enqueue_generation_job, expire_stale_job
+from .services.exam_grader import validate_exam_submission
+from .services.exam_submission import requeue_stale_submission, retry_submission, submit_exam
+from .services.result_analyzer import get_exam_statistics
 
 import logging
 
@@ -29,7 +33,10 @@ logger = logging.getLogger(__name__)
 class MockExamViewSet(ModelViewSet):
 	"""ViewSet for managing mock exams."""
 	def get_queryset(self):
-		return MockExam.objects.filter(creator=self.request.user, is_active=True).order_by('-created_at')
+		queryset = MockExam.objects.filter(creator=self.request.user, is_active=True).order_by('-created_at')
+		if self.action == 'list':
+			queryset = queryset.with_stats().select_related('creator')
+		return queryset
 	
 	permission_classes = [permissions.IsAuthenticated]
 	
@@ -106,7 +113,11 @@ class MockExamViewSet(ModelViewSet):
 	@action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
 	def create_exam(self, request):
 		"""
-		Create a mock exam by subject name and mode.
+		Queue generation of a mock exam by subject name and mode.
+		
+		Returns 202 with a job id right away; progress arrives as
+		"exam_generation" events on the notifications WebSocket and can be
+		polled at jobs/<job_id>/.
 		
 		For 'past_questions' mode:
 		{
@@ -125,10 +136,14 @@ class MockExamViewSet(ModelViewSet):
 			"duration_minutes": 60,
 			"difficulty_distribution": {"EASY": 20, "MEDIUM": 60, "HARD": 20}
 		}
+		
+		Either mode accepts "adaptive": true to serve the questions as an
+		adaptive exam (see ExamAdaptiveView).
 		"""
 		try:
 			subject_name = request.data.get('subject_name')
 			mode = request.data.get('mode', 'ai_generated')
+			exam_mode = 'adaptive' if request.data.get('adaptive') else 'fixed'
 			exam_format = request.data.get('exam_format', 'JAMB')
 			
 			if not subject_name:
@@ -142,31 +157,31 @@ class MockExamViewSet(ModelViewSet):
 				if year <= 0:
 					return Response({'error': 'year is required for past_questions mode'}, status=status.HTTP_400_BAD_REQUEST)
 				
-				mock_exam = generate_mock_exam_by_subject_name(
-					subject_name=subject_name,
-					exam_format=exam_format,
-					mode='past_questions',
-					year=year,
-					creator=request.user
-				)
+				params = {
+					'subject_name': subject_name,
+					'exam_format': exam_format,
+					'mode': 'past_questions',
+					'year': year,
+					'exam_mode': exam_mode,
+				}
 			else:
 				# ai_generated mode (default)
 				num_questions = int(request.data.get('num_questions', 60))
 				duration_minutes = int(request.data.get('duration_minutes', 60))
 				difficulty_distribution = request.data.get('difficulty_distribution')
 
-				mock_exam = generate_mock_exam_by_subject_name(
-					subject_name=subject_name,
-					exam_format=exam_format,
-					num_questions=num_questions,
-					duration_minutes=duration_minutes,
-					creator=request.user,
-					difficulty_distribution=difficulty_distribution,
-					mode='ai_generated'
-				)
-
-			serializer = self.get_serializer(mock_exam)
-			return Response(serializer.data, status=status.HTTP_201_CREATED)
+				params = {
+					'subject_name': subject_name,
+					'exam_format': exam_format,
+					'num_questions': num_questions,
+					'duration_minutes': duration_minutes,
+					'difficulty_distribution': difficulty_distribution,
+					'mode': 'ai_generated',
+					'exam_mode': exam_mode,
+				}
+
+			job = enqueue_generation_job(request.user, **params)
+			return Response(ExamGenerationJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 		except ValueError as e:
 			logger.error(f"Error creating exam: {str(e)}")
 			return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -174,6 +189,12 @@ class MockExamViewSet(ModelViewSet):
 			logger.error(f"Unexpected error creating exam: {str(e)}")
 			return Response({'error': 'An unexpected error occurred'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+	@action(detail=False, methods=['get'], url_path=r'jobs/(?P<job_id>[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})')
+	def generation_job(self, request, job_id=None):
+		"""Status of a background exam generation job (and the exam once completed)."""
+		job = get_object_or_404(ExamGenerationJob.objects.select_related('mock_exam'), id=job_id, user=request.user)
+		return Response(ExamGenerationJobSerializer(expire_stale_job(job)).data)
+
 
 class ExamStartView(generics.CreateAPIView):
 	"""Start an exam attempt."""
@@ -228,11 +249,15 @@ class ExamStartView(generics.CreateAPIView):
 				existing.raw_responses = {}
 				existing.auto_graded = False
 				existing.attempted_questions = 0
+				existing.adaptive = {}
 				existing.ip_address = self.get_client_ip(request)
 				existing.user_agent = request.META.get('HTTP_USER_AGENT', '')
 				existing.save()
 				attempt = existing
 			
+			if mock_exam.mode == 'adaptive':
+				start_adaptive_attempt(attempt)
+			
 			logger.info(f"User {request.user.id} started exam {mock_exam.id}, attempt {attempt.id}")
 			serializer = self.get_serializer(attempt)
 			return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -260,7 +285,7 @@ class ExamStartView(generics.CreateAPIView):
 
 
 class ExamSubmitView(generics.UpdateAPIView):
-	"""Submit exam responses and trigger auto-grading."""
+	"""Submit exam responses; grading runs in the background (services/exam_submission.py)."""
 	serializer_class = ExamSubmissionSerializer
 	permission_classes = [permissions.IsAuthenticated]
 	lookup_field = 'pk'
@@ -285,8 +310,8 @@ class ExamSubmitView(generics.UpdateAPIView):
 				status__in=['IN_PROGRESS', 'SUBMITTED']
 			)
 			
-			# Get submission data
-			raw_responses = request.data.get('raw_responses', {})
+			# Get submission data; adaptive answers were recorded as they came in
+			raw_responses = attempt.raw_responses if attempt.adaptive else request.data.get('raw_responses', {})
 			time_taken_seconds = request.data.get('time_taken_seconds', 0)
 			
 			if not raw_responses:
@@ -298,30 +323,22 @@ class ExamSubmitView(generics.UpdateAPIView):
 			# Validate submission (timer and responses)
 			validation = validate_exam_submission(attempt, time_taken_seconds)
 			
-			# Update attempt with submission data
-			attempt.raw_responses = raw_responses
-			attempt.time_taken_seconds = time_taken_seconds
-			attempt.mark_submitted()
-			
-			# Auto-grade the exam
-			grading_result = auto_grade_exam(attempt)
-			
-			# Analyze and generate result
-			result = analyze_exam_result(attempt, grading_result)
+			# Store the answers and hand grading to the background pipeline
+			submission = submit_exam(attempt, raw_responses, time_taken_seconds)
 			
 			logger.info(
-				f"Exam submitted and graded for user {request.user.id}, "
-				f"attempt {attempt.id}: {attempt.percentage:.1f}%"
+				f"Exam submitted for user {request.user.id}, "
+				f"attempt {attempt.id}, submission {submission.id}"
 			)
 			
-			# Return results
+			# Return the receipt; results follow as "exam_submission" WebSocket
+			# events and at submissions/<id>/
 			response_data = {
-				'attempt': ExamAttemptSerializer(attempt).data,
-				'result': ExamResultSerializer(result).data,
+				'submission': ExamSubmissionJobSerializer(submission).data,
 				'validation': validation
 			}
 			
-			return Response(response_data, status=status.HTTP_200_OK)
+			return Response(response_data, status=status.HTTP_202_ACCEPTED)
 		
 		except ExamAttempt.DoesNotExist:
 			return Response(
@@ -340,6 +357,61 @@ class ExamSubmitView(generics.UpdateAPIView):
 		return self.update(request, exam_id=exam_id, *args, **kwargs)
 
 
+class ExamSubmissionStatusView(generics.RetrieveAPIView):
+	"""Status of a submitted exam (GET) and retry of a failed one (POST)."""
+	serializer_class = ExamSubmissionJobSerializer
+	permission_classes = [permissions.IsAuthenticated]
+	lookup_field = 'pk'
+	lookup_url_kwarg = 'submission_id'
+
+	def get_queryset(self):
+		return ExamSubmissionJob.objects.filter(attempt__user=self.request.user).select_related(
+			'attempt__mock_exam', 'result'
+		)
+
+	def retrieve(self, request, *args, **kwargs):
+		return Response(self.get_serializer(requeue_stale_submission(self.get_object())).data)
+
+	def post(self, request, *args, **kwargs):
+		submission = retry_submission(self.get_object())
+		return Response(self.get_serializer(submission).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ExamAdaptiveView(generics.GenericAPIView):
+	"""
+	Question-by-question flow of an adaptive exam (services/adaptive_exam.py).
+
+	GET returns the current question; POST answers it and returns the next:
+	{
+		"question_id": int,
+		"answer_id": int
+	}
+	Once "finished" is true the attempt is submitted through submit/ as usual.
+	"""
+	permission_classes = [permissions.IsAuthenticated]
+
+	def get_attempt(self, exam_id):
+		return get_object_or_404(
+			ExamAttempt.objects.select_related('mock_exam'),
+			user=self.request.user, mock_exam_id=exam_id, mock_exam__mode='adaptive', status='IN_PROGRESS'
+		)
+
+	def get(self, request, exam_id=None):
+		return Response(adaptive_progress(self.get_attempt(exam_id)))
+
+	def post(self, request, exam_id=None):
+		attempt = self.get_attempt(exam_id)
+		try:
+			question_id = int(request.data.get('question_id'))
+		except (TypeError, ValueError):
+			return Response({'error': 'question_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+		try:
+			attempt = answer_adaptive_question(attempt, question_id, request.data.get('answer_id'))
+		except ValueError as e:
+			return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+		return Response(adaptive_progress(attempt))
+
+
 class ExamResultView(generics.RetrieveAPIView):
 	"""Get exam result and detailed analysis."""
 	serializer_class = ExamResultSerializer
@@ -402,7 +474,7 @@ class MockExamCreateView(generics.CreateAPIView):
 
 class MockExamListView(generics.ListAPIView):
 	"""List all available mock exams (legacy endpoint)."""
-	queryset = MockExam.objects.filter(is_active=True, is_public=True).order_by('-created_at')
+	queryset = MockExam.objects.filter(is_active=True, is_public=True).with_stats().select_related('creator').order_by('-created_at')
 	serializer_class = MockExamSerializer
 	permission_classes = [permissions.IsAuthenticated]
 
@@ -444,7 +516,7 @@ class ExplainQuestionView(generics.GenericAPIView):
 		}
 		"""
 		from apps.questions.models import Question
-		from ai_services.router import AIRouter
+		from ai_services.router import get_ai_router
 		
 		try:
 			question = get_object_or_404(Question, pk=question_id)
@@ -457,7 +529,7 @@ class ExplainQuestionView(generics.GenericAPIView):
 			if hasattr(question, 'answers'):
 				options = [f"{a.content} ({'Correct' if a.is_correct else 'Incorrect'})" for a in question.answers.all()]
 			
-			ai = AIRouter()
+			ai = get_ai_router()
 			ai_response = ai.generate_questions(
 				topic=question.topic.name if question.topic else question.subject.name,
 				difficulty=question.difficulty or 'MEDIUM',
@@ -37,3 +37,21 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             "type": "notification",
             "data": notification
         }))
+
+    async def exam_generation(self, event):
+        """
+        Progress of a background mock-exam generation job (apps.exams.services.exam_jobs).
+        """
+        await self.send(text_data=json.dumps({
+            "type": "exam_generation",
+            "data": event["job"]
+        }))
+
+    async def exam_submission(self, event):
+        """
+        Stage updates of a submitted exam (apps.exams.services.exam_submission).
+        """
+        await self.send(text_data=json.dumps({
+            "type": "exam_submission",
+            "data": event["submission"]
+        }))
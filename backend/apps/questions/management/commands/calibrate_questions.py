@@ -0,0 +1,30 @@
+"""
+Fit IRT parameters for the question bank and learner abilities.
+
+    python manage.py calibrate_questions            # model from IRT_CALIBRATION
+    python manage.py calibrate_questions --model 1PL
+
+Schedule it nightly (cron, or a Django-Q schedule for
+``apps.questions.tasks.calibrate_question_bank``).
+"""
+from django.core.management.base import BaseCommand
+
+from apps.questions.services.difficulty_calibrator import MODELS, calibrate_question_bank
+
+
+class Command(BaseCommand):
+    help = 'Fit 1PL/2PL IRT parameters from stored responses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=MODELS, default=None, help='IRT model (default: IRT_CALIBRATION MODEL)')
+
+    def handle(self, *args, **options):
+        summary = calibrate_question_bank(model=options['model'])
+        self.stdout.write(
+            f"{summary['responses']} responses: {summary['iterations']} iterations "
+            f"({'converged' if summary['converged'] else 'not converged'}); "
+            f"collect {summary['collect_seconds']}s, fit {summary['fit_seconds']}s, store {summary['store_seconds']}s"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Calibrated {summary['questions']} questions and {summary['learners']} learners ({summary['model']})"
+        ))
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.3 on 2026-10-17 03:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0002_alter_question_difficulty_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LearnerAbility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('1PL', '1PL (Rasch)'), ('2PL', '2PL')], default='2PL', max_length=3)),
+                ('ability', models.FloatField(help_text='IRT theta (logits)')),
+                ('ability_se', models.FloatField(blank=True, null=True)),
+                ('responses', models.PositiveIntegerField(default=0)),
+                ('calibrated_at', models.DateTimeField()),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='irt_ability', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'learner abilities',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionCalibration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('1PL', '1PL (Rasch)'), ('2PL', '2PL')], default='2PL', max_length=3)),
+                ('difficulty', models.FloatField(db_index=True, help_text='IRT b parameter (logits)')),
+                ('discrimination', models.FloatField(default=1.0, help_text='IRT a parameter; 1.0 under 1PL')),
+                ('difficulty_se', models.FloatField(blank=True, null=True)),
+                ('responses', models.PositiveIntegerField(default=0)),
+                ('p_correct', models.FloatField(default=0.0, help_text='Observed share of correct responses')),
+                ('calibrated_at', models.DateTimeField()),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='calibration', to='questions.question')),
+            ],
+        ),
+    ]
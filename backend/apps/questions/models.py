@@ -63,3 +63,42 @@ class QuestionAttempt(models.Model):
     
     def __str__(self):
         return f"{self.user} - {self.question}"
+
+
+class QuestionCalibration(models.Model):
+    """
+    Fitted IRT parameters of a question (see services/difficulty_calibrator.py).
+    ``difficulty`` is on the same logit scale as LearnerAbility.ability.
+    """
+    MODEL_CHOICES = [
+        ('1PL', '1PL (Rasch)'),
+        ('2PL', '2PL'),
+    ]
+
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='calibration')
+    model = models.CharField(max_length=3, choices=MODEL_CHOICES, default='2PL')
+    difficulty = models.FloatField(db_index=True, help_text="IRT b parameter (logits)")
+    discrimination = models.FloatField(default=1.0, help_text="IRT a parameter; 1.0 under 1PL")
+    difficulty_se = models.FloatField(null=True, blank=True)
+    responses = models.PositiveIntegerField(default=0)
+    p_correct = models.FloatField(default=0.0, help_text="Observed share of correct responses")
+    calibrated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.question_id} {self.model} b={self.difficulty:.2f} a={self.discrimination:.2f}"
+
+
+class LearnerAbility(models.Model):
+    """A user's IRT ability estimate from the last calibration run."""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='irt_ability')
+    model = models.CharField(max_length=3, choices=QuestionCalibration.MODEL_CHOICES, default='2PL')
+    ability = models.FloatField(help_text="IRT theta (logits)")
+    ability_se = models.FloatField(null=True, blank=True)
+    responses = models.PositiveIntegerField(default=0)
+    calibrated_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = 'learner abilities'
+
+    def __str__(self):
+        return f"{self.user_id} theta={self.ability:.2f}"
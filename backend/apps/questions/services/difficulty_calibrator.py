@@ -0,0 +1,347 @@
+"""
+Item response theory calibration of the question bank.
+
+Question.difficulty is the EASY/MEDIUM/HARD label the generator guessed.
+This module fits 1PL (Rasch) or 2PL parameters per question, and an ability
+per user, from every scored response the platform has stored:
+
+    QuestionAttempt      single-question practice
+    AnswerAttempt        quiz answers
+    ExamAttempt          graded exams, scored from raw_responses against the
+                         exam's answer key (unanswered questions are skipped)
+
+Responses are streamed from the database in chunks of CHUNK_SIZE rows and
+packed into typed arrays of 17 bytes per response (two int64 ids and an
+int8 outcome), so no model instances are built. The fit is a joint MAP estimate. Each round takes one
+Newton step for every ability and then one for every item, with
+N(0, 1) / N(0, PRIOR_SD_DIFFICULTY) / N(1, PRIOR_SD_DISCRIMINATION) priors
+keeping all-correct and all-wrong users and items finite. Gradients are
+summed with np.bincount over slices of FIT_CHUNK_SIZE responses, so each
+round is a few vectorized passes over the arrays.
+
+Results are upserted into QuestionCalibration and LearnerAbility. Exam
+assembly and adaptive practice read them with get_item_parameters() and
+get_learner_ability(). Run it with the calibrate_questions command or the
+apps.questions.tasks.calibrate_question_bank task.
+"""
+import logging
+import time
+from array import array
+from dataclasses import dataclass
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import LearnerAbility, QuestionAttempt, QuestionCalibration
+
+logger = logging.getLogger(__name__)
+
+MODELS = ('1PL', '2PL')
+
+DEFAULTS = {
+    'MODEL': '2PL',
+    'CHUNK_SIZE': 5000,
+    'FIT_CHUNK_SIZE': 1_000_000,
+    'MAX_ITERATIONS': 100,
+    'TOLERANCE': 1e-3,
+    'MIN_ITEM_RESPONSES': 5,
+    'MIN_USER_RESPONSES': 3,
+    'PRIOR_SD_DIFFICULTY': 2.0,
+    'PRIOR_SD_DISCRIMINATION': 0.5,
+    'WRITE_BATCH_SIZE': 1000,
+}
+
+# Newton steps are clipped to this many logits per round
+MAX_STEP = 1.0
+MIN_DISCRIMINATION, MAX_DISCRIMINATION = 0.2, 4.0
+
+
+def get_calibration_config():
+    return {**DEFAULTS, **getattr(settings, 'IRT_CALIBRATION', {})}
+
+
+class ResponseLog:
+    """Append-only (user, question, correct) triples in compact typed arrays."""
+
+    def __init__(self):
+        self.users = array('q')
+        self.questions = array('q')
+        self.correct = array('b')
+
+    def __len__(self):
+        return len(self.correct)
+
+    def add(self, user_id, question_id, is_correct):
+        self.users.append(user_id)
+        self.questions.append(question_id)
+        self.correct.append(1 if is_correct else 0)
+
+    def as_arrays(self):
+        return (
+            np.frombuffer(self.users, dtype=np.int64),
+            np.frombuffer(self.questions, dtype=np.int64),
+            np.frombuffer(self.correct, dtype=np.int8),
+        )
+
+
+def _exam_key(mock_exam_id):
+    """question id -> correct answer id for an exam's objective questions."""
+    from apps.exams.services.answer_key import get_answer_key
+    from apps.exams.services.exam_grader import THEORY_TYPES
+
+    return {
+        str(q.id): (q.id, str(q.correct_answer_id))
+        for q in get_answer_key(mock_exam_id)
+        if q.question_type not in THEORY_TYPES and q.correct_answer_id is not None
+    }
+
+
+def collect_responses(chunk_size=None):
+    """Stream every scored response into a ResponseLog."""
+    from apps.exams.models import ExamAttempt
+    from apps.quiz.models import AnswerAttempt
+
+    chunk_size = chunk_size or get_calibration_config()['CHUNK_SIZE']
+    log = ResponseLog()
+
+    for user_id, question_id, is_correct in QuestionAttempt.objects.values_list(
+        'user_id', 'question_id', 'is_correct'
+    ).iterator(chunk_size=chunk_size):
+        log.add(user_id, question_id, is_correct)
+
+    for user_id, question_id, is_correct in AnswerAttempt.objects.values_list(
+        'quiz_attempt__user_id', 'question_id', 'is_correct'
+    ).iterator(chunk_size=chunk_size):
+        log.add(user_id, question_id, is_correct)
+
+    keys = {}
+    for user_id, mock_exam_id, raw_responses in ExamAttempt.objects.filter(auto_graded=True).values_list(
+        'user_id', 'mock_exam_id', 'raw_responses'
+    ).iterator(chunk_size=chunk_size):
+        if mock_exam_id not in keys:
+            keys[mock_exam_id] = _exam_key(mock_exam_id)
+        key = keys[mock_exam_id]
+        for qid, answer in (raw_responses or {}).items():
+            if answer in (None, '') or str(qid) not in key:
+                continue
+            question_id, correct_answer_id = key[str(qid)]
+            log.add(user_id, question_id, str(answer) == correct_answer_id)
+
+    return log
+
+
+@dataclass
+class Calibration:
+    """Fitted parameters; arrays are aligned with ``user_ids``/``question_ids``."""
+    model: str
+    user_ids: np.ndarray
+    ability: np.ndarray
+    ability_se: np.ndarray
+    user_responses: np.ndarray
+    question_ids: np.ndarray
+    difficulty: np.ndarray
+    difficulty_se: np.ndarray
+    discrimination: np.ndarray
+    item_responses: np.ndarray
+    item_correct: np.ndarray
+    iterations: int
+    converged: bool
+
+
+def _logit(p):
+    return np.log(p / (1 - p))
+
+
+def fit_irt(users, questions, correct, model='2PL', config=None):
+    """
+    Fit IRT parameters to response triples (any integer ids).
+
+    Returns a Calibration. Repeated (user, question) pairs count as separate
+    responses.
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown IRT model: {model}")
+    config = config or get_calibration_config()
+    user_ids, u = np.unique(users, return_inverse=True)
+    question_ids, q = np.unique(questions, return_inverse=True)
+    y = np.asarray(correct, dtype=np.float64)
+    n_users, n_items = len(user_ids), len(question_ids)
+    step = max(int(config['FIT_CHUNK_SIZE']), 1)
+    slices = [slice(start, start + step) for start in range(0, len(y), step)]
+
+    user_n = np.bincount(u, minlength=n_users).astype(np.float64)
+    item_n = np.bincount(q, minlength=n_items).astype(np.float64)
+    item_c = np.bincount(q, weights=y, minlength=n_items)
+    user_c = np.bincount(u, weights=y, minlength=n_users)
+
+    # Start from smoothed logits of the observed proportions
+    theta = _logit((user_c + 0.5) / (user_n + 1))
+    b = -_logit((item_c + 0.5) / (item_n + 1))
+    a = np.ones(n_items)
+    var_theta = 1.0
+    var_b = config['PRIOR_SD_DIFFICULTY'] ** 2
+    var_a = config['PRIOR_SD_DISCRIMINATION'] ** 2
+
+    def sums(index, size, terms, count):
+        """Sum ``count`` per-response terms by ``index``, one slice at a time."""
+        totals = [np.zeros(size) for _ in range(count)]
+        for s in slices:
+            for total, values in zip(totals, terms(s)):
+                total += np.bincount(index[s], weights=values, minlength=size)
+        return totals
+
+    def probabilities(s):
+        diff = theta[u[s]] - b[q[s]]
+        return diff, 1.0 / (1.0 + np.exp(-a[q[s]] * diff))
+
+    def ability_terms(s):
+        _, p = probabilities(s)
+        a_s = a[q[s]]
+        return a_s * (y[s] - p), a_s * a_s * p * (1 - p)
+
+    def item_terms(s):
+        diff, p = probabilities(s)
+        a_s, residual, info = a[q[s]], y[s] - p, p * (1 - p)
+        terms = [-a_s * residual, a_s * a_s * info]
+        if model == '2PL':
+            terms += [diff * residual, diff * diff * info]
+        return terms
+
+    iterations, converged = 0, False
+    info_theta = np.full(n_users, 1 / var_theta)
+    info_b = np.full(n_items, 1 / var_b)
+    for iterations in range(1, int(config['MAX_ITERATIONS']) + 1):
+        if not slices:
+            converged = True
+            break
+        grad, info = sums(u, n_users, ability_terms, 2)
+        info_theta = info + 1 / var_theta
+        delta_theta = np.clip((grad - theta / var_theta) / info_theta, -MAX_STEP, MAX_STEP)
+        theta += delta_theta
+
+        item_sums = sums(q, n_items, item_terms, 4 if model == '2PL' else 2)
+        info_b = item_sums[1] + 1 / var_b
+        delta_b = np.clip((item_sums[0] - b / var_b) / info_b, -MAX_STEP, MAX_STEP)
+        b += delta_b
+        change = max(np.abs(delta_theta).max(initial=0), np.abs(delta_b).max(initial=0))
+        if model == '2PL':
+            delta_a = np.clip(
+                (item_sums[2] - (a - 1) / var_a) / (item_sums[3] + 1 / var_a), -MAX_STEP, MAX_STEP
+            )
+            a = np.clip(a + delta_a, MIN_DISCRIMINATION, MAX_DISCRIMINATION)
+            change = max(change, np.abs(delta_a).max(initial=0))
+        if change < config['TOLERANCE']:
+            converged = True
+            break
+
+    return Calibration(
+        model=model,
+        user_ids=user_ids,
+        ability=theta,
+        ability_se=1 / np.sqrt(info_theta),
+        user_responses=user_n.astype(np.int64),
+        question_ids=question_ids,
+        difficulty=b,
+        difficulty_se=1 / np.sqrt(info_b),
+        discrimination=a,
+        item_responses=item_n.astype(np.int64),
+        item_correct=item_c,
+        iterations=iterations,
+        converged=converged,
+    )
+
+
+def _store(calibration, config):
+    now = timezone.now()
+    batch_size = config['WRITE_BATCH_SIZE']
+
+    items = calibration.item_responses >= config['MIN_ITEM_RESPONSES']
+    QuestionCalibration.objects.bulk_create(
+        [
+            QuestionCalibration(
+                question_id=int(question_id),
+                model=calibration.model,
+                difficulty=float(b),
+                discrimination=float(a),
+                difficulty_se=float(se),
+                responses=int(n),
+                p_correct=float(c / n),
+                calibrated_at=now,
+            )
+            for question_id, b, a, se, n, c in zip(
+                calibration.question_ids[items], calibration.difficulty[items],
+                calibration.discrimination[items], calibration.difficulty_se[items],
+                calibration.item_responses[items], calibration.item_correct[items],
+            )
+        ],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['question'],
+        update_fields=['model', 'difficulty', 'discrimination', 'difficulty_se', 'responses', 'p_correct', 'calibrated_at'],
+    )
+
+    users = calibration.user_responses >= config['MIN_USER_RESPONSES']
+    LearnerAbility.objects.bulk_create(
+        [
+            LearnerAbility(
+                user_id=int(user_id),
+                model=calibration.model,
+                ability=float(theta),
+                ability_se=float(se),
+                responses=int(n),
+                calibrated_at=now,
+            )
+            for user_id, theta, se, n in zip(
+                calibration.user_ids[users], calibration.ability[users],
+                calibration.ability_se[users], calibration.user_responses[users],
+            )
+        ],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['model', 'ability', 'ability_se', 'responses', 'calibrated_at'],
+    )
+    return int(items.sum()), int(users.sum())
+
+
+def calibrate_question_bank(model=None, config=None):
+    """Collect, fit and store; returns a summary dict for logs and the command."""
+    config = config or get_calibration_config()
+    model = model or config['MODEL']
+    started = time.monotonic()
+    log = collect_responses(config['CHUNK_SIZE'])
+    collected = time.monotonic()
+    calibration = fit_irt(*log.as_arrays(), model=model, config=config)
+    fitted = time.monotonic()
+    questions, learners = _store(calibration, config)
+
+    summary = {
+        'model': model,
+        'responses': len(log),
+        'questions': questions,
+        'learners': learners,
+        'iterations': calibration.iterations,
+        'converged': calibration.converged,
+        'collect_seconds': round(collected - started, 2),
+        'fit_seconds': round(fitted - collected, 2),
+        'store_seconds': round(time.monotonic() - fitted, 2),
+    }
+    logger.info(f"IRT calibration finished: {summary}")
+    return summary
+
+
+def get_item_parameters(question_ids):
+    """question id -> (discrimination, difficulty) for calibrated questions."""
+    return {
+        question_id: (a, b)
+        for question_id, a, b in QuestionCalibration.objects.filter(question_id__in=question_ids).values_list(
+            'question_id', 'discrimination', 'difficulty'
+        )
+    }
+
+
+def get_learner_ability(user):
+    """The user's calibrated ability, or 0.0 (the population mean) if unknown."""
+    ability = LearnerAbility.objects.filter(user=user).values_list('ability', flat=True).first()
+    return ability if ability is not None else 0.0
@@ -1,14 +1,18 @@
 import logging
 from typing import List
-from ai_services.router import AIRouter
+from django.db import connection, transaction
+from django.db.models import prefetch_related_objects
+from ai_services.router import get_ai_router
 from ..models import Question, Answer
+from .question_pool import get_question_pool
+from .question_validator import QuestionPayloadValidator
 from apps.content.models import Subject, Topic, ExamType
 
 logger = logging.getLogger(__name__)
 
 class QuestionGenerationService:
     def __init__(self):
-        self.ai_router = AIRouter()
+        self.ai_router = get_ai_router()
 
     def generate_questions(self, subject_id: int, topic_id: int, exam_type_id: int, 
                           difficulty: str = "MEDIUM", count: int = 5, question_type: str = "MCQ") -> List[Question]:
@@ -24,20 +28,16 @@ class QuestionGenerationService:
         context = f"Exam Type: {exam_name}. Subject: {subject.name}. Target Audience: Nigerian students."
         
         # Exact-match caching: check if we already have enough questions
-        existing_q_qs = Question.objects.filter(
-            subject=subject,
-            topic=topic,
-            difficulty=difficulty,
-            question_type=question_type
-        )
-        if exam_type:
-            existing_q_qs = existing_q_qs.filter(exam_type=exam_type)
-        else:
-            existing_q_qs = existing_q_qs.filter(exam_type__isnull=True)
-            
-        if existing_q_qs.count() >= count:
+        pool = get_question_pool()
+        pool_filters = {
+            'topic': topic.id,
+            'difficulty': difficulty,
+            'question_type': question_type,
+            'exam_type': exam_type.id if exam_type else None,
+        }
+        if pool.count(subject.id, **pool_filters) >= count:
             logger.info("Serving exact match questions from DB cache.")
-            return list(existing_q_qs.order_by('?')[:count])
+            return pool.sample(subject.id, count, **pool_filters)
         
         
         try:
@@ -49,106 +49,100 @@ class QuestionGenerationService:
                 additional_context=context
             )
             
-            created_questions = []
-            
-            # Handle potential wrapper keys like 'questions' or direct list
-            items = generated_data.get('questions', generated_data) if isinstance(generated_data, dict) else generated_data
-            
-            if not isinstance(items, list):
-                logger.error(f"Unexpected data format from AI: {items}")
-                raise ValueError("AI response format error: expected list of questions")
-
-            for q_data in items:
-                question = self._create_question_from_data(q_data, subject, topic, exam_type, difficulty, question_type)
-                created_questions.append(question)
-                
-            return created_questions
+            return self.bulk_create_questions(
+                generated_data,
+                subject=subject,
+                topic=topic,
+                exam_type=exam_type,
+                difficulty=difficulty,
+                question_type=question_type,
+            )
             
         except Exception as e:
             logger.error(f"Question generation failed: {e}")
             raise
 
-    def _create_question_from_data(self, data, subject, topic, exam_type, difficulty, q_type):
-        question = Question.objects.create(
-            subject=subject,
-            topic=topic,
-            exam_type=exam_type,
-            content=data.get('content', 'No content provided'),
-            question_type=q_type,
+    @staticmethod
+    def bulk_create_questions(payload, subject, topic=None, exam_type=None, difficulty="MEDIUM",
+                              question_type="MCQ", metadata=None, existing="create",
+                              trust_payload=False, answer_types=None, limit=None) -> List[Question]:
+        """
+        Validate an AI payload and persist it in one transaction.
+
+        The whole payload is validated first (see QuestionPayloadValidator),
+        then questions and their answers are written with one bulk_create
+        each instead of an INSERT per row. Returns the saved questions in
+        payload order with ``answers`` prefetched.
+
+        ``metadata`` overrides the per-item metadata. ``existing`` controls
+        questions whose text is already stored for the subject: "create"
+        stores them again, "reuse" returns the stored question and "skip"
+        drops them. ``answer_types`` restricts which question types get Answer
+        rows (quizzes and exams only store MCQ options, so theory model answers
+        are never served as options). ``limit`` caps how many questions are
+        returned.
+        """
+        items = QuestionPayloadValidator.extract_items(payload)
+        validator = QuestionPayloadValidator(
+            question_type=question_type,
             difficulty=difficulty,
-            guidance=data.get('guidance') or data.get('explanation', ''),
-            metadata=data.get('metadata', {})
+            metadata=metadata,
+            trust_payload=trust_payload,
         )
+        valid, _ = validator.validate(items)
 
-        if q_type == 'MCQ':
-            self._create_mcq_answers(question, data)
-        elif q_type == 'THEORY':
-             self._create_theory_answer(question, data)
-        elif q_type == 'TRUE_FALSE':
-            self._create_true_false_answer(question, data)
-        elif q_type == 'FILL_BLANK':
-            self._create_simple_answer(question, data)
-        elif q_type == 'MATCHING':
-             pass # Matching often logic handled via metadata in Question, answers might not be needed in standard way or handled differently
-        elif q_type == 'ORDERING':
-             pass # Ordering sequence stored in metadata
-             
-        return question
+        # Drop duplicates within the payload itself
+        seen, unique = set(), []
+        for item in valid:
+            if item['content'] not in seen:
+                seen.add(item['content'])
+                unique.append(item)
 
-    def _create_mcq_answers(self, question, data):
-        options = data.get('options', [])
-        correct = data.get('correct_answer')
-        correct_idx = data.get('correct_answer_index')
-        explanation = data.get('explanation', '')
-        
-        for idx, option in enumerate(options):
-            is_correct = False
-            
-            # 1. Primary check: correct_answer_index
-            if correct_idx is not None:
-                try:
-                    is_correct = (idx == int(correct_idx))
-                except (ValueError, TypeError):
-                    pass
-            
-            # 2. Secondary check: correct_answer (string or index)
-            if not is_correct and correct is not None:
-                if isinstance(correct, int) and 0 <= correct < len(options):
-                    is_correct = (idx == correct)
-                elif isinstance(correct, str):
-                    norm_option = str(option).strip().lower()
-                    norm_correct = str(correct).strip().lower()
-                    is_correct = (norm_option == norm_correct)
-                    if not is_correct and len(norm_correct) > 3:
-                        if norm_correct in norm_option:
-                            is_correct = True
+        stored = {}
+        if existing != "create" and unique:
+            for question in Question.objects.filter(
+                subject=subject, content__in=[item['content'] for item in unique]
+            ).order_by('id'):
+                stored.setdefault(question.content, question)
 
-            Answer.objects.create(
-                question=question,
-                content=option,
-                is_correct=is_correct,
-                explanation=explanation if is_correct else "" 
-            )
+        # (item, question or None) in payload order; None marks rows to insert
+        plan = []
+        for item in unique:
+            if limit is not None and len(plan) >= limit:
+                break
+            match = stored.get(item['content'])
+            if match is not None and existing == "skip":
+                continue
+            plan.append((item, match))
 
-    def _create_theory_answer(self, question, data):
-        Answer.objects.create(
-            question=question,
-            content=data.get('answer', ''),
-            is_correct=True,
-            explanation=data.get('explanation', '')
-        )
+        new_rows = [(item, Question(
+            subject=subject,
+            topic=topic,
+            exam_type=exam_type,
+            content=item['content'],
+            question_type=item['question_type'],
+            difficulty=item['difficulty'],
+            guidance=item['guidance'],
+            metadata=item['metadata'],
+        )) for item, match in plan if match is None]
 
-    def _create_true_false_answer(self, question, data):
-        correct = str(data.get('correct_answer', 'True')).lower() == 'true'
-        explanation = data.get('explanation', '')
-        
-        Answer.objects.create(question=question, content="True", is_correct=correct, explanation=explanation if correct else "")
-        Answer.objects.create(question=question, content="False", is_correct=not correct, explanation=explanation if not correct else "")
+        with transaction.atomic():
+            if connection.features.can_return_rows_from_bulk_insert:
+                Question.objects.bulk_create([question for _, question in new_rows])
+                # bulk_create sends no post_save, so feed the pools directly
+                created_rows = [question for _, question in new_rows]
+                transaction.on_commit(lambda: get_question_pool().add(created_rows))
+            else:
+                for _, question in new_rows:
+                    question.save()
+            Answer.objects.bulk_create([
+                Answer(question=question, **answer)
+                for item, question in new_rows
+                if answer_types is None or item['question_type'] in answer_types
+                for answer in item['answers']
+            ])
 
-    def _create_simple_answer(self, question, data):
-        Answer.objects.create(
-            question=question,
-            content=data.get('correct_answer', ''),
-            is_correct=True,
-            explanation=data.get('explanation', '')
-        )
+        created = iter(question for _, question in new_rows)
+        questions = [match if match is not None else next(created) for _, match in plan]
+        prefetch_related_objects(questions, 'answers')
+        return questions
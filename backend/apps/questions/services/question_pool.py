@@ -0,0 +1,461 @@
+"""
+Question pools for exam and practice assembly.
+
+Question ids are bucketed by (exam_type, difficulty, question_type, year,
+topic) per subject. Each bucket is stored as a packed int64 array, next to
+a per-subject directory of bucket sizes in the shared Django cache.
+Assembly samples ids from the buckets that match a filter, spread across
+them (and across difficulties when weights are given) without loading any
+Question rows or sorting the table. Only the k sampled rows are fetched.
+
+With Redis (BACKEND 'redis', or 'auto' when the cache alias is a
+RedisCache) buckets are raw strings: a draw of k ids is k GETRANGE calls at
+random 8-byte offsets in one pipeline, and appends use APPEND, so nothing
+transfers a whole bucket. Other caches store the arrays as cache values and
+read the matching buckets whole.
+
+A subject's buckets are built from one ``values_list`` scan the first time
+they are needed. New questions are appended (see signals.py and
+bulk_create_questions). A question that is edited into another bucket (or
+subject), or deleted, has just its old and new buckets re-scanned. A
+contended update drops the subject's directory, and the next read rebuilds
+it.
+"""
+import logging
+import random
+import uuid
+from array import array
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+from ..models import Question
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'qpool'
+DIMENSIONS = ('exam_type', 'difficulty', 'question_type', 'year', 'topic')
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 60 * 60 * 24,
+    'LOCK_TIMEOUT': 10,
+    # auto: raw Redis buckets when CACHE_ALIAS is a RedisCache | redis | cache
+    'BACKEND': 'auto',
+    'REDIS_URL': None,
+}
+
+ID_BYTES = array('q').itemsize
+
+
+def get_pool_config():
+    config = {**DEFAULTS, **getattr(settings, 'QUESTION_POOL', {})}
+    if not config['REDIS_URL']:
+        config['REDIS_URL'] = getattr(settings, 'REDIS_URL', 'redis://localhost:6379/0')
+    return config
+
+
+def _year(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _bucket_of(exam_type_id, difficulty, question_type, year, topic_id):
+    return (exam_type_id, difficulty, question_type, _year(year), topic_id)
+
+
+# Question columns that make up a bucket, in DIMENSIONS order
+BUCKET_COLUMNS = ('exam_type_id', 'difficulty', 'question_type', 'metadata__year', 'topic_id')
+
+
+def question_bucket(question):
+    """The (subject_id, bucket) a Question instance belongs to."""
+    return question.subject_id, _bucket_of(
+        question.exam_type_id, question.difficulty, question.question_type,
+        (question.metadata or {}).get('year'), question.topic_id,
+    )
+
+
+def stored_bucket(question_id):
+    """The (subject_id, bucket) of a question as currently stored, or None."""
+    row = Question.objects.filter(pk=question_id).values_list('subject_id', *BUCKET_COLUMNS).first()
+    return (row[0], _bucket_of(*row[1:])) if row else None
+
+
+class CacheBucketStore:
+    """Buckets as Django cache values; a draw reads each matching bucket whole."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def write(self, buckets, timeout):
+        self.cache.set_many({key: ids.tobytes() for key, ids in buckets.items()}, timeout)
+
+    def append(self, additions, timeout, existing):
+        """Append ids ({key: ids}); False if a bucket in ``existing`` is gone."""
+        stored = self.cache.get_many(list(existing))
+        if len(stored) != len(existing):
+            return False
+        updates = {}
+        for key, ids in additions.items():
+            packed = array('q', stored.get(key, b''))
+            packed.extend(ids)
+            updates[key] = packed.tobytes()
+        self.cache.set_many(updates, timeout)
+        return True
+
+    def draw(self, requests, rng):
+        """
+        ``requests`` maps bucket keys to (size, n); returns {key: up to n
+        distinct ids}. Missing buckets are left out.
+        """
+        stored = self.cache.get_many(list(requests))
+        drawn = {}
+        for key, (size, n) in requests.items():
+            if key in stored:
+                ids = array('q', stored[key])
+                drawn[key] = rng.sample(ids, min(n, len(ids)))
+        return drawn
+
+
+class RedisBucketStore:
+    """Buckets as raw Redis strings; draws and appends never transfer a whole bucket."""
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+
+    def write(self, buckets, timeout):
+        pipe = self.client.pipeline(transaction=False)
+        for key, ids in buckets.items():
+            pipe.set(key, ids.tobytes(), ex=timeout)
+        pipe.execute()
+
+    def append(self, additions, timeout, existing):
+        if existing and self.client.exists(*existing) != len(existing):
+            return False
+        pipe = self.client.pipeline(transaction=False)
+        for key, ids in additions.items():
+            pipe.append(key, array('q', ids).tobytes())
+            pipe.expire(key, timeout)
+        pipe.execute()
+        return True
+
+    def draw(self, requests, rng):
+        pipe = self.client.pipeline(transaction=False)
+        plan = []
+        for key, (size, n) in requests.items():
+            for position in rng.sample(range(size), min(n, size)):
+                pipe.getrange(key, position * ID_BYTES, (position + 1) * ID_BYTES - 1)
+                plan.append(key)
+
+        drawn, missing = {}, set()
+        for key, value in zip(plan, pipe.execute()):
+            if len(value) != ID_BYTES:
+                # Evicted, or shorter than the directory says
+                missing.add(key)
+                continue
+            drawn.setdefault(key, []).extend(array('q', value))
+        return {key: ids for key, ids in drawn.items() if key not in missing}
+
+
+def _largest_remainder(total, weights):
+    """Split ``total`` into integers proportional to ``weights``."""
+    weight_sum = sum(weights)
+    if total <= 0 or weight_sum <= 0:
+        return [0] * len(weights)
+    exact = [total * w / weight_sum for w in weights]
+    shares = [int(x) for x in exact]
+    by_remainder = sorted(range(len(weights)), key=lambda i: exact[i] - shares[i], reverse=True)
+    for i in by_remainder[:total - sum(shares)]:
+        shares[i] += 1
+    return shares
+
+
+class QuestionPoolIndex:
+
+    def __init__(self, config=None):
+        self._config = config
+        self._redis_stores = {}
+
+    @property
+    def config(self):
+        return self._config or get_pool_config()
+
+    @property
+    def cache(self):
+        return caches[self.config['CACHE_ALIAS']]
+
+    @property
+    def store(self):
+        config = self.config
+        cache = self.cache
+        backend = config['BACKEND']
+        if backend == 'auto':
+            backend = 'redis' if isinstance(cache, RedisCache) else 'cache'
+        if backend != 'redis':
+            return CacheBucketStore(cache)
+        url = config['REDIS_URL']
+        if url not in self._redis_stores:
+            self._redis_stores[url] = RedisBucketStore(url)
+        return self._redis_stores[url]
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _directory_key(subject_id):
+        return f"{KEY_PREFIX}:{subject_id}"
+
+    @staticmethod
+    def _bucket_key(subject_id, token, bucket):
+        return f"{KEY_PREFIX}:{subject_id}:{token}:" + ':'.join('-' if v is None else str(v) for v in bucket)
+
+    # ------------------------------------------------------------------
+    # Building and maintenance
+    # ------------------------------------------------------------------
+
+    def _directory(self, subject_id):
+        directory = self.cache.get(self._directory_key(subject_id))
+        return directory if directory is not None else self.rebuild(subject_id)
+
+    @staticmethod
+    def _scan(rows):
+        """Bucket the ids of a Question queryset with a single id/column scan."""
+        buckets = defaultdict(lambda: array('q'))
+        rows = rows.order_by('id').values_list('id', *BUCKET_COLUMNS)
+        for question_id, *columns in rows.iterator(chunk_size=5000):
+            buckets[_bucket_of(*columns)].append(question_id)
+        return buckets
+
+    def rebuild(self, subject_id):
+        """Rebuild every bucket of a subject from a single id/column scan."""
+        buckets = self._scan(Question.objects.filter(subject_id=subject_id))
+
+        token = uuid.uuid4().hex[:8]
+        timeout = self.config['TIMEOUT']
+        self.store.write(
+            {self._bucket_key(subject_id, token, bucket): ids for bucket, ids in buckets.items()}, timeout
+        )
+        directory = {'token': token, 'buckets': {bucket: len(ids) for bucket, ids in buckets.items()}}
+        self.cache.set(self._directory_key(subject_id), directory, timeout)
+        logger.debug(f"Rebuilt question pools for subject {subject_id}: {len(buckets)} buckets")
+        return directory
+
+    def invalidate(self, subject_id):
+        self.cache.delete(self._directory_key(subject_id))
+
+    def _locked(self, subject_id, update):
+        """Run ``update(directory)`` under the subject's lock; contention drops the directory."""
+        lock_key = f"{self._directory_key(subject_id)}:lock"
+        if not self.cache.add(lock_key, 1, self.config['LOCK_TIMEOUT']):
+            # Another writer is updating; let the next read rebuild instead
+            self.invalidate(subject_id)
+            return
+        try:
+            directory = self.cache.get(self._directory_key(subject_id))
+            if directory is not None:
+                # Not built yet otherwise; the first read scans the current rows anyway
+                update(directory)
+        finally:
+            self.cache.delete(lock_key)
+
+    def refresh_buckets(self, located):
+        """Re-scan just the given (subject_id, bucket) pairs, e.g. a moved question's old and new bucket."""
+        by_subject = defaultdict(set)
+        for subject_id, bucket in located:
+            by_subject[subject_id].add(bucket)
+
+        for subject_id, buckets in by_subject.items():
+            def update(directory, subject_id=subject_id, buckets=buckets):
+                scanned = {}
+                for bucket in buckets:
+                    exam_type_id, difficulty, question_type, _, topic_id = bucket
+                    rows = self._scan(Question.objects.filter(
+                        subject_id=subject_id, exam_type_id=exam_type_id, difficulty=difficulty,
+                        question_type=question_type, topic_id=topic_id,
+                    ))
+                    # Year lives in JSON (int or string), so it is matched after the scan
+                    scanned[bucket] = rows.get(bucket, array('q'))
+                token = directory['token']
+                self.store.write(
+                    {self._bucket_key(subject_id, token, bucket): ids for bucket, ids in scanned.items()},
+                    self.config['TIMEOUT'],
+                )
+                for bucket, ids in scanned.items():
+                    directory['buckets'][bucket] = len(ids)
+                self.cache.set(self._directory_key(subject_id), directory, self.config['TIMEOUT'])
+
+            self._locked(subject_id, update)
+
+    def add(self, questions):
+        """Append newly created questions to the pools of their subjects."""
+        by_subject = defaultdict(lambda: defaultdict(list))
+        for q in questions:
+            subject_id, bucket = question_bucket(q)
+            by_subject[subject_id][bucket].append(q.id)
+
+        for subject_id, additions in by_subject.items():
+            self._locked(subject_id, lambda directory, s=subject_id, a=additions: self._append(s, a, directory))
+
+    def _append(self, subject_id, additions, directory):
+        token = directory['token']
+        keys = {bucket: self._bucket_key(subject_id, token, bucket) for bucket in additions}
+        existing = [keys[b] for b in additions if directory['buckets'].get(b)]
+        timeout = self.config['TIMEOUT']
+        if not self.store.append({keys[b]: ids for b, ids in additions.items()}, timeout, existing):
+            self.invalidate(subject_id)  # A bucket was evicted
+            return
+
+        for bucket, ids in additions.items():
+            directory['buckets'][bucket] = directory['buckets'].get(bucket, 0) + len(ids)
+        self.cache.set(self._directory_key(subject_id), directory, timeout)
+
+    # ------------------------------------------------------------------
+    # Sampling
+    # ------------------------------------------------------------------
+
+    def count(self, subject_id, **filters):
+        directory = self._directory(subject_id)
+        return sum(size for bucket, size in directory['buckets'].items() if self._matches(bucket, filters))
+
+    def sample_ids(self, subject_id, k, difficulty_weights=None, exclude_ids=(), rng=None, **filters):
+        """
+        Draw up to ``k`` distinct question ids matching ``filters`` (any of
+        DIMENSIONS; a list/tuple matches several values, None matches NULL).
+
+        Draws are spread over the matching buckets in proportion to their
+        size. When ``difficulty_weights`` is given (e.g. {"EASY": 20,
+        "MEDIUM": 60, "HARD": 20}), k is first split across difficulties; a
+        difficulty that runs short is backfilled from the other weighted ones,
+        then from any other difficulty.
+        """
+        rng = rng or random
+        directory = self._directory(subject_id)
+        matching = {b: n for b, n in directory['buckets'].items() if n and self._matches(b, filters)}
+        if not matching or k <= 0:
+            return []
+
+        allocation = self._allocate(matching, k, difficulty_weights)
+        exclude = set(exclude_ids)
+        drawn = self._draw(subject_id, directory, allocation, len(exclude), rng)
+        if drawn is None:
+            # A bucket was evicted: rebuild once and draw from what is there
+            directory = self.rebuild(subject_id)
+            drawn = self._draw(subject_id, directory, allocation, len(exclude), rng) or {}
+
+        sampled = []
+        for bucket, n in allocation.items():
+            sampled.extend([i for i in drawn.get(bucket, []) if i not in exclude][:n])
+        rng.shuffle(sampled)
+        return sampled
+
+    def _draw(self, subject_id, directory, allocation, extra, rng):
+        """{bucket: drawn ids} (n + ``extra`` per bucket, to allow for exclusions); None if one is missing."""
+        keys = {b: self._bucket_key(subject_id, directory['token'], b) for b in allocation}
+        requests = {
+            keys[b]: (directory['buckets'].get(b, 0), n + extra)
+            for b, n in allocation.items() if directory['buckets'].get(b)
+        }
+        drawn = self.store.draw(requests, rng)
+        if len(drawn) != len(requests):
+            return None
+        return {b: drawn[keys[b]] for b in allocation if keys[b] in drawn}
+
+    def sample(self, subject_id, k, difficulty_weights=None, exclude_ids=(), rng=None, **filters):
+        """
+        Like sample_ids() but returns Question rows in sampled order,
+        topping up from the pool if some sampled ids no longer belong to it.
+        """
+        rows = Question.objects.filter(subject_id=subject_id)
+        ids = self.sample_ids(subject_id, k, difficulty_weights, exclude_ids, rng, **filters)
+        found = rows.in_bulk(ids)
+        questions = [found[i] for i in ids if i in found]
+        if len(questions) < len(ids):
+            # Deleted (or moved) questions: rebuild and top up once
+            self.invalidate(subject_id)
+            extra = self.sample_ids(subject_id, len(ids) - len(questions), difficulty_weights,
+                                    set(exclude_ids) | set(ids), rng, **filters)
+            found = rows.in_bulk(extra)
+            questions.extend(found[i] for i in extra if i in found)
+        return questions
+
+    @staticmethod
+    def _matches(bucket, filters):
+        for dimension, wanted in filters.items():
+            value = bucket[DIMENSIONS.index(dimension)]
+            if dimension == 'year':
+                wanted = [_year(w) for w in wanted] if isinstance(wanted, (list, tuple, set)) else _year(wanted)
+            if isinstance(wanted, (list, tuple, set)):
+                if value not in wanted:
+                    return False
+            elif value != wanted:
+                return False
+        return True
+
+    @staticmethod
+    def _allocate(matching, k, difficulty_weights=None):
+        """Per-bucket draw counts: stratified by difficulty, then by bucket size."""
+        total = sum(matching.values())
+        k = min(k, total)
+        difficulty_index = DIMENSIONS.index('difficulty')
+
+        if difficulty_weights:
+            strata = defaultdict(dict)
+            for bucket, n in matching.items():
+                strata[bucket[difficulty_index]][bucket] = n
+            levels = list(strata)
+            sizes = {level: sum(strata[level].values()) for level in levels}
+            targets = dict(zip(levels, _largest_remainder(k, [difficulty_weights.get(l, 0) for l in levels])))
+            if not any(targets.values()):
+                targets = dict(zip(levels, _largest_remainder(k, [sizes[l] for l in levels])))
+            # Cap each stratum at its size and hand the shortfall to the other
+            # weighted difficulties first, then to the unweighted ones
+            quota = {level: min(targets[level], sizes[level]) for level in levels}
+            weighted = [l for l in levels if difficulty_weights.get(l, 0) > 0]
+            for candidates in (weighted, levels):
+                shortfall = k - sum(quota.values())
+                while shortfall > 0:
+                    room = [l for l in candidates if sizes[l] > quota[l]]
+                    if not room:
+                        break
+                    extra = _largest_remainder(shortfall, [sizes[l] - quota[l] for l in room])
+                    for level, more in zip(room, extra):
+                        quota[level] += min(more, sizes[level] - quota[level])
+                    shortfall = k - sum(quota.values())
+            groups = [(strata[level], quota[level]) for level in levels]
+        else:
+            groups = [(matching, k)]
+
+        allocation = {}
+        for buckets, quota in groups:
+            order = list(buckets)
+            for bucket, n in zip(order, _largest_remainder(quota, [buckets[b] for b in order])):
+                if n:
+                    allocation[bucket] = min(n, buckets[bucket])
+            # Proportional shares never exceed a bucket; rounding can leave one short
+            missing = quota - sum(allocation.get(b, 0) for b in order)
+            for bucket in order:
+                if missing <= 0:
+                    break
+                more = min(missing, buckets[bucket] - allocation.get(bucket, 0))
+                if more > 0:
+                    allocation[bucket] = allocation.get(bucket, 0) + more
+                    missing -= more
+        return allocation
+
+
+_pool_index = None
+
+
+def get_question_pool():
+    global _pool_index
+    if _pool_index is None:
+        _pool_index = QuestionPoolIndex()
+    return _pool_index
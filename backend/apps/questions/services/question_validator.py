@@ -0,0 +1,157 @@
+import logging
+import re
+from typing import List, Tuple
+
+from ..models import Question
+
+logger = logging.getLogger(__name__)
+
+QUESTION_TYPES = {code for code, _ in Question.QUESTION_TYPES}
+DIFFICULTY_LEVELS = {code for code, _ in Question.DIFFICULTY_LEVELS}
+OPTION_LETTER = re.compile(r'^\(?([a-hA-H])[.):]?$')
+
+
+class QuestionPayloadValidator:
+    """
+    Validates and normalises AI question payloads before they are written.
+
+    The generators ask for different shapes (``content`` or ``question``,
+    ``explanation`` or ``guidance``, a correct option as an index, a letter
+    or the option text), so every item is reduced to one canonical dict:
+
+        content, question_type, difficulty, guidance, metadata,
+        answers: [{'content', 'is_correct', 'explanation'}]
+
+    With ``trust_payload`` an item's own ``type`` and ``difficulty`` win over
+    the requested ones when they are valid choices.
+
+    Items that cannot be stored meaningfully (no question text, an MCQ with
+    fewer than two options or no identifiable correct option) are rejected
+    with a reason instead of being saved half-formed.
+    """
+
+    def __init__(self, question_type='MCQ', difficulty='MEDIUM', metadata=None, trust_payload=False):
+        self.question_type = question_type
+        self.difficulty = difficulty
+        self.metadata = metadata
+        self.trust_payload = trust_payload
+
+    @staticmethod
+    def extract_items(payload):
+        """Unwrap ``{"questions": [...]}`` responses; raise if no list is found."""
+        items = payload.get('questions', payload) if isinstance(payload, dict) else payload
+        if not isinstance(items, list):
+            raise ValueError("AI response format error: expected list of questions")
+        return items
+
+    def validate(self, items) -> Tuple[List[dict], List[Tuple[int, str]]]:
+        """Return ``(valid, errors)``; errors are ``(item index, reason)`` pairs."""
+        valid, errors = [], []
+        for index, data in enumerate(items):
+            try:
+                valid.append(self.normalize(data))
+            except ValueError as e:
+                errors.append((index, str(e)))
+        if errors:
+            logger.warning(f"Rejected {len(errors)} of {len(items)} generated questions: {errors[:5]}")
+        return valid, errors
+
+    def normalize(self, data):
+        if not isinstance(data, dict):
+            raise ValueError("item is not an object")
+
+        content = str(data.get('content') or data.get('question') or '').strip()
+        if not content:
+            raise ValueError("missing question text")
+
+        q_type = self.question_type
+        if self.trust_payload and data.get('type') in QUESTION_TYPES:
+            q_type = data['type']
+
+        difficulty = self.difficulty
+        if self.trust_payload and data.get('difficulty') in DIFFICULTY_LEVELS:
+            difficulty = data['difficulty']
+
+        explanation = data.get('explanation') or ''
+        metadata = dict(self.metadata) if self.metadata is not None else data.get('metadata') or {}
+
+        if q_type == 'MCQ':
+            answers = self._mcq_answers(data, explanation)
+        elif q_type == 'THEORY':
+            answers = [{'content': data.get('answer', ''), 'is_correct': True, 'explanation': explanation}]
+        elif q_type == 'TRUE_FALSE':
+            correct = str(data.get('correct_answer', 'True')).lower() == 'true'
+            answers = [
+                {'content': 'True', 'is_correct': correct, 'explanation': explanation if correct else ''},
+                {'content': 'False', 'is_correct': not correct, 'explanation': explanation if not correct else ''},
+            ]
+        elif q_type == 'FILL_BLANK':
+            answers = [{'content': data.get('correct_answer', ''), 'is_correct': True, 'explanation': explanation}]
+        else:
+            # MATCHING / ORDERING keep their pairs or sequence in metadata
+            answers = []
+
+        return {
+            'content': content,
+            'question_type': q_type,
+            'difficulty': difficulty,
+            'guidance': data.get('guidance') or explanation or (data.get('answer', '') if q_type == 'THEORY' else ''),
+            'metadata': metadata,
+            'answers': answers,
+        }
+
+    def _mcq_answers(self, data, explanation):
+        options = [str(opt).strip() for opt in data.get('options') or [] if str(opt).strip()]
+        if len(options) < 2:
+            raise ValueError("multiple-choice question needs at least two options")
+
+        correct_idx = self.resolve_correct_index(
+            options, data.get('correct_answer_index'), data.get('correct_answer', data.get('answer'))
+        )
+        if correct_idx is None:
+            raise ValueError("no option matches the correct answer")
+
+        return [
+            {'content': opt, 'is_correct': idx == correct_idx, 'explanation': explanation if idx == correct_idx else ''}
+            for idx, opt in enumerate(options)
+        ]
+
+    @staticmethod
+    def resolve_correct_index(options, correct_idx=None, correct=None):
+        """
+        Index of the correct option, trying in order: an explicit index, an
+        integer answer, the exact option text, an option letter ("B", "b)"),
+        then an option that starts with or contains the answer text.
+        """
+        for candidate in (correct_idx, correct if isinstance(correct, int) and not isinstance(correct, bool) else None):
+            if candidate is None:
+                continue
+            try:
+                idx = int(candidate)
+            except (ValueError, TypeError):
+                continue
+            if 0 <= idx < len(options):
+                return idx
+
+        if not isinstance(correct, str) or not correct.strip():
+            return None
+
+        norm_correct = correct.strip().lower()
+        norm_options = [opt.lower() for opt in options]
+        if norm_correct in norm_options:
+            return norm_options.index(norm_correct)
+
+        letter = OPTION_LETTER.match(norm_correct)
+        if letter:
+            idx = ord(letter.group(1).lower()) - ord('a')
+            if idx < len(options):
+                return idx
+
+        for idx, opt in enumerate(norm_options):
+            if opt.startswith(norm_correct) or (len(opt) > 1 and norm_correct.startswith(opt)):
+                return idx
+        if len(norm_correct) > 3:
+            for idx, opt in enumerate(norm_options):
+                if norm_correct in opt:
+                    return idx
+        return None
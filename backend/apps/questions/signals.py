@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Question
+from .services.question_pool import get_question_pool, question_bucket, stored_bucket
+
+# Fields that decide which pool a question belongs to
+POOL_FIELDS = {'subject', 'subject_id', 'exam_type', 'exam_type_id', 'difficulty',
+               'question_type', 'metadata', 'topic', 'topic_id'}
+
+
+@receiver(pre_save, sender=Question)
+def remember_question_pool(sender, instance, update_fields=None, **kwargs):
+    # Where the question sits before the save, so a move refreshes the old bucket too
+    instance._pool_origin = None
+    if instance.pk and (update_fields is None or POOL_FIELDS.intersection(update_fields)):
+        instance._pool_origin = stored_bucket(instance.pk)
+
+
+@receiver(post_save, sender=Question)
+def update_question_pool(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        transaction.on_commit(lambda: get_question_pool().add([instance]))
+        return
+    origin = getattr(instance, '_pool_origin', None)
+    target = question_bucket(instance)
+    if origin is not None and origin != target:
+        # Moved to another bucket (or subject): re-scan just the two buckets
+        transaction.on_commit(lambda: get_question_pool().refresh_buckets([origin, target]))
+
+
+@receiver(post_delete, sender=Question)
+def drop_deleted_question(sender, instance, **kwargs):
+    located = question_bucket(instance)
+    transaction.on_commit(lambda: get_question_pool().refresh_buckets([located]))
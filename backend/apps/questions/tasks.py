@@ -0,0 +1,6 @@
+from .services.difficulty_calibrator import calibrate_question_bank as run_calibration
+
+
+def calibrate_question_bank(model=None):
+    """Django-Q entry point for IRT calibration (see services/difficulty_calibrator.py)."""
+    return run_calibration(model=model)
@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from apps.content.models import Subject
+from apps.questions.models import Answer, Question
+from apps.questions.services.question_generator import QuestionGenerationService
+from apps.questions.services.question_validator import QuestionPayloadValidator
+from apps.quiz.services import QuizService
+
+
+def mcq(content, options=("Abuja", "Lagos", "Kano", "Ibadan"), **extra):
+    return {"content": content, "options": list(options), "explanation": "Because.", **extra}
+
+
+class QuestionPayloadValidatorTest(TestCase):
+    def test_resolves_correct_option_from_any_answer_shape(self):
+        options = ["Abuja", "Lagos", "Kano", "Ibadan"]
+        resolve = QuestionPayloadValidator.resolve_correct_index
+        self.assertEqual(resolve(options, correct_idx="2"), 2)
+        self.assertEqual(resolve(options, correct=1), 1)
+        self.assertEqual(resolve(options, correct=" abuja "), 0)
+        self.assertEqual(resolve(options, correct="D"), 3)
+        self.assertEqual(resolve(options, correct="b)"), 1)
+        self.assertIsNone(resolve(options, correct="Port Harcourt"))
+
+    def test_rejects_unusable_items(self):
+        validator = QuestionPayloadValidator(question_type="MCQ")
+        valid, errors = validator.validate([
+            mcq("Capital of Nigeria?", correct_answer="Abuja"),
+            mcq("", correct_answer="Abuja"),
+            mcq("One option?", options=["Abuja"], correct_answer="Abuja"),
+            mcq("No key?", correct_answer="Accra"),
+            "not a dict",
+        ])
+        self.assertEqual([item["content"] for item in valid], ["Capital of Nigeria?"])
+        self.assertEqual([index for index, _ in errors], [1, 2, 3, 4])
+        self.assertEqual([a["is_correct"] for a in valid[0]["answers"]], [True, False, False, False])
+
+
+class BulkCreateQuestionsTest(TestCase):
+    def setUp(self):
+        self.subject = Subject.objects.create(name="Government", category="ARTS", description="Civics")
+
+    def test_persists_payload_with_constant_query_count(self):
+        payload = {"questions": [mcq(f"Question {i}?", correct_answer_index=i % 4) for i in range(30)]}
+        with self.assertNumQueries(5):  # savepoint, questions, answers, release, answers prefetch
+            questions = QuestionGenerationService.bulk_create_questions(payload, subject=self.subject)
+
+        self.assertEqual(len(questions), 30)
+        self.assertEqual(Question.objects.count(), 30)
+        self.assertEqual(Answer.objects.count(), 120)
+        with self.assertNumQueries(0):
+            correct = [[a.content for a in q.answers.all() if a.is_correct] for q in questions]
+        self.assertEqual(correct[:4], [["Abuja"], ["Lagos"], ["Kano"], ["Ibadan"]])
+
+    def test_existing_questions_are_reused_or_skipped(self):
+        first = QuestionGenerationService.bulk_create_questions(
+            [mcq("Seat of power?", correct_answer="Abuja")], subject=self.subject
+        )[0]
+        payload = [mcq("Seat of power?", correct_answer="Abuja"), mcq("Largest city?", correct_answer="Lagos")]
+
+        reused = QuestionGenerationService.bulk_create_questions(payload, subject=self.subject, existing="reuse")
+        self.assertEqual(reused[0].id, first.id)
+        self.assertEqual(Question.objects.filter(content="Largest city?").count(), 1)
+
+        skipped = QuestionGenerationService.bulk_create_questions(
+            payload + [mcq("Oldest city?", correct_answer="Kano")], subject=self.subject, existing="skip", limit=1
+        )
+        self.assertEqual([q.content for q in skipped], ["Oldest city?"])
+
+    def test_answer_types_limits_answer_rows(self):
+        payload = [{"content": "Discuss federalism.", "answer": "Model answer"}]
+        questions = QuestionGenerationService.bulk_create_questions(
+            payload, subject=self.subject, question_type="THEORY", answer_types=("MCQ",)
+        )
+        self.assertEqual(questions[0].guidance, "Model answer")
+        self.assertFalse(Answer.objects.exists())
+
+
+class QuizServiceBulkTest(TestCase):
+    def test_generate_quiz_uses_bulk_path(self):
+        user = get_user_model().objects.create_user(email="quizzer@example.com", password="pass12345")
+        router = mock.Mock()
+        router.generate_questions.return_value = [
+            {"question": "Capital of Nigeria?", "options": ["A. Abuja", "B. Lagos"], "correct_answer": "A"},
+            {"question": "Broken", "options": []},
+        ]
+        with mock.patch("apps.quiz.services.get_ai_router", return_value=router):
+            quiz = QuizService.generate_quiz(user, None, "Geography", "EASY", question_count=2)
+
+        questions = list(quiz.questions.all())
+        self.assertEqual(len(questions), 1)
+        self.assertEqual(questions[0].answers.get(is_correct=True).content, "A. Abuja")
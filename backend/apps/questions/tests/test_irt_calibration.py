@@ -0,0 +1,106 @@
+from io import StringIO
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from apps.content.models import Subject
+from apps.exams.models import ExamAttempt, MockExam, MockExamQuestion
+from apps.exams.services.exam_generator import get_past_exam_type
+from apps.questions.models import Answer, LearnerAbility, Question, QuestionAttempt, QuestionCalibration
+from apps.questions.services.difficulty_calibrator import (
+    collect_responses, fit_irt, get_calibration_config, get_item_parameters,
+)
+from apps.quiz.models import AnswerAttempt, Quiz, QuizAttempt
+
+
+def simulate(n_users=400, n_items=40, seed=7, two_pl=True):
+    rng = np.random.default_rng(seed)
+    theta = rng.normal(size=n_users)
+    b = rng.normal(size=n_items)
+    a = rng.uniform(0.6, 2.0, size=n_items) if two_pl else np.ones(n_items)
+    users = np.repeat(np.arange(n_users), n_items)
+    items = np.tile(np.arange(n_items), n_users)
+    p = 1 / (1 + np.exp(-a[items] * (theta[users] - b[items])))
+    return users, items, (rng.random(len(p)) < p).astype(np.int8), theta, b, a
+
+
+class FitIrtTest(SimpleTestCase):
+    def test_recovers_2pl_parameters_in_chunks(self):
+        users, items, y, theta, b, a = simulate()
+        config = {**get_calibration_config(), 'FIT_CHUNK_SIZE': 1000}
+        fit = fit_irt(users + 100, items + 500, y, model='2PL', config=config)
+        self.assertTrue(fit.converged)
+        self.assertEqual(fit.question_ids[0], 500)
+        self.assertGreater(np.corrcoef(fit.difficulty, b)[0, 1], 0.95)
+        self.assertGreater(np.corrcoef(fit.discrimination, a)[0, 1], 0.6)
+        self.assertGreater(np.corrcoef(fit.ability, theta)[0, 1], 0.9)
+
+        # Chunking only changes how the sums are taken
+        whole = fit_irt(users + 100, items + 500, y, model='2PL')
+        np.testing.assert_allclose(fit.difficulty, whole.difficulty, atol=1e-6)
+
+    def test_1pl_keeps_unit_discrimination_and_finite_extremes(self):
+        users, items, y, theta, b, _ = simulate(two_pl=False)
+        y[users == 0] = 1
+        fit = fit_irt(users, items, y, model='1PL')
+        self.assertTrue(np.all(fit.discrimination == 1))
+        self.assertGreater(np.corrcoef(fit.difficulty, b)[0, 1], 0.95)
+        self.assertTrue(np.isfinite(fit.ability[0]))
+        self.assertEqual(fit.ability.argmax(), 0)
+
+
+class CalibrateQuestionBankTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.subject = Subject.objects.create(name="Biology", category="STEM", description="Biology")
+        self.users = [
+            get_user_model().objects.create_user(email=f"irt{i}@example.com", password="pass12345") for i in range(6)
+        ]
+        self.questions, self.correct = [], []
+        for i in range(6):
+            q = Question.objects.create(subject=self.subject, content=f"Cell {i}?")
+            self.correct.append(Answer.objects.create(question=q, content="Yes", is_correct=True).id)
+            Answer.objects.create(question=q, content="No", is_correct=False)
+            self.questions.append(q)
+
+    def test_collects_all_sources_and_stores_parameters(self):
+        # Practice: user i gets questions 0..i right
+        for i, user in enumerate(self.users):
+            for j, q in enumerate(self.questions[:3]):
+                QuestionAttempt.objects.create(user=user, question=q, is_correct=j <= i)
+        # Quiz answers on questions 3 and 4
+        quiz = Quiz.objects.create(title="Cells", topic="Cells", created_by=self.users[0])
+        for i, user in enumerate(self.users):
+            attempt = QuizAttempt.objects.create(user=user, quiz=quiz)
+            for q in self.questions[3:5]:
+                AnswerAttempt.objects.create(quiz_attempt=attempt, question=q, is_correct=i >= 3)
+        # Exams on question 5; unanswered responses are skipped
+        exam = MockExam.objects.create(title="Bio", exam_type=get_past_exam_type("JAMB"), subject=self.subject)
+        MockExamQuestion.objects.create(mock_exam=exam, question=self.questions[5])
+        for i, user in enumerate(self.users):
+            answer = self.correct[5] if i % 2 else ("" if i == 0 else self.correct[5] + 1)
+            ExamAttempt.objects.create(
+                user=user, mock_exam=exam, auto_graded=True, raw_responses={str(self.questions[5].id): answer}
+            )
+
+        log = collect_responses(chunk_size=2)
+        self.assertEqual(len(log), 6 * 3 + 6 * 2 + 5)
+
+        out = StringIO()
+        call_command("calibrate_questions", "--model", "1PL", stdout=out)
+        self.assertIn("Calibrated 6 questions and 6 learners (1PL)", out.getvalue())
+        parameters = get_item_parameters([q.id for q in self.questions])
+        self.assertEqual(len(parameters), 6)
+        # Fewer people got question 2 right than question 0
+        self.assertGreater(parameters[self.questions[2].id][1], parameters[self.questions[0].id][1])
+        self.assertEqual(QuestionCalibration.objects.get(question=self.questions[5]).responses, 5)
+
+        abilities = dict(LearnerAbility.objects.values_list("user_id", "ability"))
+        self.assertGreater(abilities[self.users[5].id], abilities[self.users[0].id])
+
+        # Rerunning updates rows in place
+        call_command("calibrate_questions", stdout=StringIO())
+        self.assertEqual(QuestionCalibration.objects.filter(model="2PL").count(), 6)
@@ -0,0 +1,151 @@
+import random
+from collections import Counter
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from apps.content.models import Subject
+from apps.questions.models import Question
+from apps.questions.services.question_generator import QuestionGenerationService
+from apps.questions.services.question_pool import QuestionPoolIndex, RedisBucketStore
+
+
+class FakeRedis:
+    """The few string commands RedisBucketStore uses, counting bytes sent back."""
+
+    def __init__(self):
+        self.data = {}
+        self.bytes_read = 0
+
+    def set(self, key, value, ex=None):
+        self.data[key] = bytes(value)
+
+    def getrange(self, key, start, end):
+        value = self.data.get(key, b"")[start:end + 1]
+        self.bytes_read += len(value)
+        return value
+
+    def append(self, key, value):
+        self.data[key] = self.data.get(key, b"") + value
+
+    def expire(self, key, seconds):
+        pass
+
+    def exists(self, *keys):
+        return sum(key in self.data for key in keys)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class QuestionPoolIndexTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.pool = QuestionPoolIndex()
+        self.subject = Subject.objects.create(name="Physics", category="STEM", description="Physics")
+        for difficulty, count in (("EASY", 30), ("MEDIUM", 50), ("HARD", 20)):
+            Question.objects.bulk_create([
+                Question(subject=self.subject, content=f"{difficulty} {i}", difficulty=difficulty,
+                         metadata={"year": 2019 if i % 2 else "2020"})
+                for i in range(count)
+            ])
+
+    def test_samples_without_loading_rows(self):
+        self.assertEqual(self.pool.count(self.subject.id, question_type="MCQ"), 100)
+        self.assertEqual(self.pool.count(self.subject.id, year=2020), 50)
+
+        with self.assertNumQueries(0):
+            ids = self.pool.sample_ids(self.subject.id, 10, rng=random.Random(1), difficulty="HARD")
+        self.assertEqual(len(set(ids)), 10)
+        self.assertEqual(set(Question.objects.filter(id__in=ids).values_list("difficulty", flat=True)), {"HARD"})
+
+    def test_difficulty_weights_stratify_and_backfill(self):
+        questions = self.pool.sample(self.subject.id, 40, {"EASY": 1, "HARD": 3}, rng=random.Random(2))
+        mix = Counter(q.difficulty for q in questions)
+        # HARD is short (20 < 30), the shortfall goes to EASY
+        self.assertEqual(mix, {"EASY": 20, "HARD": 20})
+
+    def test_new_and_deleted_questions_update_the_pool(self):
+        self.assertEqual(self.pool.count(self.subject.id, difficulty="EASY"), 30)
+        with self.captureOnCommitCallbacks(execute=True):
+            QuestionGenerationService.bulk_create_questions(
+                [{"content": "Unit of force?", "options": ["Newton", "Joule"], "correct_answer": "Newton"}],
+                subject=self.subject, difficulty="EASY",
+            )
+            Question.objects.create(subject=self.subject, content="Unit of work?", difficulty="EASY")
+        self.assertEqual(self.pool.count(self.subject.id, difficulty="EASY"), 32)
+
+        doomed = Question.objects.filter(subject=self.subject, difficulty="HARD").first()
+        with self.captureOnCommitCallbacks(execute=True):
+            doomed.delete()
+        sampled = self.pool.sample(self.subject.id, 20, difficulty="HARD")
+        self.assertEqual(len(sampled), 19)
+
+    def test_question_moved_to_another_subject_leaves_the_old_pool(self):
+        chemistry = Subject.objects.create(name="Chemistry", category="STEM", description="Chemistry")
+        self.assertEqual(self.pool.count(self.subject.id), 100)
+        self.assertEqual(self.pool.count(chemistry.id), 0)
+
+        question = Question.objects.filter(subject=self.subject, difficulty="EASY").first()
+        question.subject = chemistry
+        with self.captureOnCommitCallbacks(execute=True):
+            question.save()
+        self.assertEqual(self.pool.count(self.subject.id), 99)
+        self.assertEqual(self.pool.count(self.subject.id, difficulty="EASY"), 29)
+        self.assertEqual(self.pool.count(chemistry.id), 1)
+
+    def test_plain_save_without_a_move_keeps_the_pool(self):
+        self.pool.count(self.subject.id)
+        question = Question.objects.filter(subject=self.subject).first()
+        question.content = "Edited"
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            question.save()
+        self.assertEqual(callbacks, [])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.pool.count(self.subject.id), 100)
+
+
+class RedisBucketStoreTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.redis = FakeRedis()
+        self.pool = QuestionPoolIndex()
+        store = RedisBucketStore.__new__(RedisBucketStore)
+        store.client = self.redis
+        self.pool._redis_stores["fake"] = store
+        self.pool._config = {"CACHE_ALIAS": "default", "TIMEOUT": 60, "LOCK_TIMEOUT": 10,
+                             "BACKEND": "redis", "REDIS_URL": "fake"}
+        self.subject = Subject.objects.create(name="Physics", category="STEM", description="Physics")
+        Question.objects.bulk_create([
+            Question(subject=self.subject, content=f"Q {i}", difficulty="MEDIUM") for i in range(500)
+        ])
+
+    def test_draw_reads_only_the_sampled_ids(self):
+        self.pool.count(self.subject.id)
+        self.redis.bytes_read = 0
+        ids = self.pool.sample_ids(self.subject.id, 12, rng=random.Random(3))
+        self.assertEqual(len(set(ids)), 12)
+        self.assertEqual(self.redis.bytes_read, 12 * 8)
+        self.assertEqual(Question.objects.filter(id__in=ids, subject=self.subject).count(), 12)
+
+    def test_append_and_evicted_bucket(self):
+        self.pool.count(self.subject.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            Question.objects.create(subject=self.subject, content="New", difficulty="MEDIUM")
+        self.assertEqual(self.pool.count(self.subject.id), 501)
+
+        self.redis.data.clear()  # Evicted: the draw rebuilds once
+        ids = self.pool.sample_ids(self.subject.id, 5, rng=random.Random(4))
+        self.assertEqual(len(set(ids)), 5)
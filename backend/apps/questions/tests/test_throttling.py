@@ -0,0 +1,33 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+
+from ai_services.rate_limiter import reset_rate_limit_backend
+from apps.questions.throttling import AIGenerationRateThrottle
+
+
+@override_settings(AI_RATE_LIMIT={"BACKEND": "local"})
+class AIGenerationRateThrottleTest(TestCase):
+    def setUp(self):
+        reset_rate_limit_backend()
+        self.user = get_user_model().objects.create_user(email="throttled@example.com", password="pass12345")
+
+    def tearDown(self):
+        reset_rate_limit_backend()
+
+    def request(self):
+        request = APIRequestFactory().post("/api/questions/generate/")
+        request.user = self.user
+        return request
+
+    @mock.patch.object(AIGenerationRateThrottle, "THROTTLE_RATES", {"ai_generation": "2/min"})
+    def test_limits_per_user_with_retry_after(self):
+        outcomes = []
+        for _ in range(3):
+            throttle = AIGenerationRateThrottle()
+            outcomes.append(throttle.allow_request(self.request(), None))
+
+        self.assertEqual(outcomes, [True, True, False])
+        self.assertTrue(0 < throttle.wait() <= 60)
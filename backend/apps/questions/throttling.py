@@ -1,4 +1,26 @@
 from rest_framework.throttling import UserRateThrottle
 
+from ai_services.rate_limiter import RateLimit
+
+
 class AIGenerationRateThrottle(UserRateThrottle):
+    """
+    DRF's ``ai_generation`` rate, enforced by the shared Redis limiter.
+
+    The stock throttle keeps a request history list in the cache and
+    rewrites it without a lock, so parallel requests can all pass.
+    Here the check and the increment are one atomic call.
+    """
     scope = 'ai_generation'
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.result = RateLimit(self.scope, self.num_requests, self.duration).hit(self.key)
+        return self.result.allowed
+
+    def wait(self):
+        return self.result.retry_after
@@ -154,10 +154,10 @@ class QuestionViewSet(viewsets.ReadOnlyModelViewSet):
                  return Response({'error': 'text_answer required'}, status=status.HTTP_400_BAD_REQUEST)
             
             try:
-                from ai_services.router import AIRouter
+                from ai_services.router import get_ai_router
                 from asgiref.sync import async_to_sync
                 
-                ai = AIRouter()
+                ai = get_ai_router()
                 # Use model answer from Answer object if available
                 model_answer = ""
                 ans_obj = question.answers.first()
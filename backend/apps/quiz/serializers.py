@@ -63,6 +63,7 @@ class QuizGenerationSerializer(serializers.Serializer):
     exam_type = serializers.CharField(default="MCQ")
     subject_id = serializers.IntegerField(required=False, allow_null=True)
     document_id = serializers.CharField(required=False, allow_null=True) # UUID string
+    document_ids = serializers.ListField(child=serializers.CharField(), required=False, allow_empty=True)
 
 class AnswerSubmissionSerializer(serializers.Serializer):
     question_id = serializers.IntegerField(required=True)
@@ -1,22 +1,23 @@
 import logging
 import json
 from django.db import transaction
-from apps.questions.models import Question, Answer
+from apps.questions.services.question_generator import QuestionGenerationService
 from apps.quiz.models import Quiz
 from apps.study_tools.models import Document
-from ai_services.router import AIRouter
+from ai_services.router import get_ai_router
 
 logger = logging.getLogger(__name__)
 
 class QuizService:
     @staticmethod
-    def generate_quiz(user, subject, topic, difficulty, question_count=5, question_type="MCQ", exam_mode=None, document_id=None):
+    def generate_quiz(user, subject, topic, difficulty, question_count=5, question_type="MCQ", exam_mode=None, document_id=None, document_ids=None):
         """
         Generates a quiz using AI.
         question_type: MCQ, THEORY
         exam_mode: JAMB, WAEC (String name of ExamType)
+        document_ids: ground the quiz in several of the user's documents at once
         """
-        router = AIRouter()
+        router = get_ai_router()
         additional_context = ""
         source_document = None
         exam_type_obj = None
@@ -30,7 +31,14 @@ class QuizService:
                 logger.warning(f"ExamType '{exam_mode}' not found.")
 
         # Handle RAG context
-        if document_id:
+        if document_ids:
+            try:
+                additional_context = router._get_library_context(
+                    user.id, f"key concepts in {topic}", k=8, document_ids=document_ids
+                )
+            except Exception as e:
+                logger.error(f"Error reading library context for quiz: {e}")
+        elif document_id:
             try:
                 # Use RAG to get relevant context for the whole document (summary or chunks)
                 # Since quiz questions cover the whole doc, we might want a summary or just use the content field directly if small.
@@ -43,12 +51,14 @@ class QuizService:
         # Call AI Router
         try:
             # Expected format from AI: List of dicts
+            # Uncached: the questions are saved as new rows, so a replayed payload would duplicate them
             ai_response = router.generate_questions(
                 topic=topic,
                 difficulty=difficulty,
                 count=question_count,
                 q_type=question_type,
-                additional_context=additional_context
+                additional_context=additional_context,
+                use_cache=False
             )
             
             # Parse response if it's a string (sometimes AI returns stringified JSON)
@@ -102,51 +112,13 @@ class QuizService:
                 source_document=source_document
             )
 
-            for q_data in questions_data:
-                # Create Question
-                question = Question.objects.create(
-                    subject=final_subject,
-                    content=q_data.get("question") or q_data.get("content"),
-                    question_type=question_type,
-                    difficulty=difficulty,
-                    guidance=q_data.get("explanation", "")
-                )
-                
-                # Create Answers
-                options = q_data.get("options", [])
-                correct_ans = q_data.get("correct_answer") or q_data.get("answer")
-                
-                if question_type == "MCQ":
-                    correct_idx = q_data.get("correct_answer_index")
-                    
-                    for idx, opt in enumerate(options):
-                        if not opt: continue
-                        
-                        is_correct = False
-                        
-                        # Use index if available and valid
-                        if correct_idx is not None and isinstance(correct_idx, int):
-                            if idx == correct_idx:
-                                is_correct = True
-                        else:
-                            # Fallback to robust matching
-                            str_opt = str(opt).strip()
-                            str_correct = str(correct_ans).strip()
-                            
-                            if str_correct == str_opt:
-                                is_correct = True
-                            elif str_opt.lower().startswith(str_correct.lower()):
-                                is_correct = True
-                            elif str_correct.lower().startswith(str_opt.lower()) and len(str_opt) > 1:
-                                is_correct = True
-                        
-                        Answer.objects.create(
-                            question=question,
-                            content=str(opt).strip(),
-                            is_correct=is_correct,
-                            explanation=q_data.get("explanation", "") if is_correct else ""
-                        )
-                
-                quiz.questions.add(question)
+            questions = QuestionGenerationService.bulk_create_questions(
+                questions_data,
+                subject=final_subject,
+                difficulty=difficulty,
+                question_type=question_type,
+                answer_types=('MCQ',),
+            )
+            quiz.questions.add(*questions)
             
             return quiz
@@ -6,7 +6,7 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-def generate_quiz_async(user_id, subject_id, topic, difficulty, question_count, question_type, document_id=None):
+def generate_quiz_async(user_id, subject_id, topic, difficulty, question_count, question_type, document_id=None, document_ids=None):
     User = get_user_model()
     try:
         user = User.objects.get(id=user_id)
@@ -19,7 +19,8 @@ def generate_quiz_async(user_id, subject_id, topic, difficulty, question_count,
             difficulty=difficulty,
             question_count=question_count,
             question_type=question_type, 
-            document_id=document_id
+            document_id=document_id,
+            document_ids=document_ids
         )
         return {"status": "success", "quiz_id": quiz.id}
     except Exception as e:
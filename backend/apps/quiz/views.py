@@ -52,7 +52,8 @@ class QuizViewSet(viewsets.ModelViewSet):
                 difficulty=data['difficulty'],
                 question_count=data['question_count'],
                 question_type=data['exam_type'],
-                document_id=data.get('document_id')
+                document_id=data.get('document_id'),
+                document_ids=data.get('document_ids')
             )
             return Response({"task_id": task_id, "status": "processing"}, status=status.HTTP_202_ACCEPTED)
         except Exception as e:
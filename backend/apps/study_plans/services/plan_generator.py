@@ -9,7 +9,7 @@ from django.db.models import Q
 
 from apps.content.models import Topic, Subject, ExamType
 from apps.analytics.models import TopicMastery, ProgressTracker
-from ai_services.router import AIRouter
+from ai_services.router import get_ai_router
 from ..models import StudyPlan, StudyTask, StudyReminder
 
 logger = logging.getLogger(__name__)
@@ -18,7 +18,7 @@ class StudyPlanGenerationService:
     """Service for AI-based study plan generation."""
     
     def __init__(self):
-        self.ai_router = AIRouter()
+        self.ai_router = get_ai_router()
     
     def generate_study_plan(
         self,
@@ -0,0 +1,125 @@
+import random
+import re
+import time
+import zlib
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.study_tools.services.chunking import CHUNKERS, get_chunker, split_sentences
+from apps.study_tools.services.text_extraction import iter_pdf_pages, iter_text_segments
+
+HASH_DIMENSIONS = 2 ** 15
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text):
+    return ' '.join(text.split())
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare chunking strategies on a document: chunk sizes, prompt bytes injected '
+        'for the top-k chunks, and recall@k of the chunk that contains each query sentence'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='PDF, .txt or .md file')
+        parser.add_argument('--strategies', default=','.join(CHUNKERS), help='Comma-separated strategies')
+        parser.add_argument('--k', type=int, default=3, help='Chunks injected per question (as in _get_document_context)')
+        parser.add_argument('--queries', type=int, default=200, help='Number of sampled query sentences')
+        parser.add_argument('--max-tokens', type=int, default=None, help='Override DOCUMENT_CHUNKING MAX_TOKENS')
+        parser.add_argument('--embeddings', action='store_true',
+                            help='Rank with the configured AI embedding providers instead of hashed TF-IDF')
+        parser.add_argument('--seed', type=int, default=13)
+
+    def handle(self, *args, **options):
+        pages = self._load_pages(options['path'])
+        full_text = normalize(' '.join(text for _, text in pages))
+
+        rng = random.Random(options['seed'])
+        candidates = [s for s in split_sentences(full_text) if len(s.split()) >= 8]
+        if not candidates:
+            raise CommandError('Document has no sentences long enough to use as queries')
+        sentences = rng.sample(candidates, min(options['queries'], len(candidates)))
+        # Queries drop every third word so they are not verbatim substrings of the text
+        queries = [' '.join(w for i, w in enumerate(s.split()) if i % 3 != 2) for s in sentences]
+
+        overrides = {'max_tokens': options['max_tokens']} if options['max_tokens'] else {}
+        rows = []
+        for strategy in [s.strip() for s in options['strategies'].split(',') if s.strip()]:
+            if strategy not in CHUNKERS:
+                raise CommandError(f"Unknown strategy '{strategy}'")
+            started = time.perf_counter()
+            chunks = [c for c in get_chunker(strategy, **overrides).chunk(pages) if c.text]
+            chunk_seconds = time.perf_counter() - started
+
+            texts = [normalize(c.text) for c in chunks]
+            ranked = self._rank(texts, queries, options['k'], options['embeddings'])
+
+            hits, prompt_bytes = 0, []
+            for sentence, top in zip(sentences, ranked):
+                retrieved = [texts[i] for i in top]
+                prompt_bytes.append(sum(len(t.encode('utf-8')) for t in retrieved))
+                hits += any(sentence in t for t in retrieved)
+
+            tokens = np.array([c.tokens for c in chunks])
+            rows.append({
+                'strategy': strategy,
+                'chunks': len(chunks),
+                'mean_tokens': tokens.mean(),
+                'p95_tokens': np.percentile(tokens, 95),
+                'prompt_bytes': np.mean(prompt_bytes),
+                'recall': hits / len(sentences),
+                'chunk_ms': chunk_seconds * 1000,
+            })
+
+        self.stdout.write(
+            f"{len(pages)} pages, {len(full_text)} chars, {len(sentences)} queries, k={options['k']}, "
+            f"ranking={'embeddings' if options['embeddings'] else 'hashed tf-idf'}"
+        )
+        self.stdout.write(f"{'strategy':<10} {'chunks':>7} {'mean tok':>9} {'p95 tok':>8} "
+                          f"{'prompt B/turn':>14} {'recall@k':>9} {'chunk ms':>9}")
+        for row in rows:
+            self.stdout.write(
+                f"{row['strategy']:<10} {row['chunks']:>7} {row['mean_tokens']:>9.1f} {row['p95_tokens']:>8.0f} "
+                f"{row['prompt_bytes']:>14.0f} {row['recall']:>9.1%} {row['chunk_ms']:>9.1f}"
+            )
+
+    def _load_pages(self, path):
+        if path.lower().endswith('.pdf'):
+            pages = [(page, text + "\n") for page, text, _ in iter_pdf_pages(path)]
+        else:
+            pages = [(page, text) for page, text, _ in iter_text_segments(path)]
+        if not pages:
+            raise CommandError('No text extracted')
+        return pages
+
+    def _rank(self, texts, queries, k, use_embeddings):
+        if use_embeddings:
+            from ai_services.router import get_ai_router
+            from apps.study_tools.services.vector_store import normalize_vector
+            router = get_ai_router()
+            matrix = np.stack([normalize_vector(v) for v in router.generate_embeddings(texts)])
+            query_matrix = np.stack([normalize_vector(v) for v in router.generate_embeddings(queries)])
+        else:
+            matrix, idf = self._tfidf(texts)
+            query_matrix, _ = self._tfidf(queries, idf)
+
+        scores = query_matrix @ matrix.T
+        k = min(k, len(texts))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        return top
+
+    def _tfidf(self, texts, idf=None):
+        """Hashed TF-IDF rows (L2-normalised), a lexical stand-in for embeddings."""
+        matrix = np.zeros((len(texts), HASH_DIMENSIONS), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in WORD.findall(text.lower()):
+                matrix[row, zlib.crc32(word.encode()) % HASH_DIMENSIONS] += 1
+        if idf is None:
+            df = (matrix > 0).sum(axis=0)
+            idf = np.log((1 + len(texts)) / (1 + df)).astype(np.float32) + 1
+        matrix = np.log1p(matrix) * idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms), idf
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.study_tools.models import DocumentChunk
+from apps.study_tools.services.vector_store import PgVectorStore, pgvector_available
+
+class Command(BaseCommand):
+    help = 'Copy stored chunk embeddings into the pgvector column (run after switching VECTOR_STORE to pgvector)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--document', action='append', default=[], help='Only index this document id (repeatable)')
+
+    def handle(self, *args, **options):
+        if not pgvector_available():
+            raise CommandError('The embedding_pgvector column is missing (PostgreSQL with the vector extension is required)')
+
+        documents = DocumentChunk.objects.filter(embedding__isnull=False)
+        if options['document']:
+            documents = documents.filter(document_id__in=options['document'])
+        document_ids = documents.values_list('document_id', flat=True).distinct()
+
+        store = PgVectorStore()
+        count = 0
+        for document_id in document_ids.iterator():
+            store.index_document(document_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} documents'))
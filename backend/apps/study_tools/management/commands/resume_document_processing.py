@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from apps.study_tools.services.document_pipeline import DocumentPipeline
+
+class Command(BaseCommand):
+    help = 'Re-queue documents whose ingestion stalled (and optionally failed ones) so they resume from their last stage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--failed', action='store_true', help='Also retry documents that failed')
+
+    def handle(self, *args, **options):
+        count = DocumentPipeline.resume_stalled(include_failed=options['failed'])
+        self.stdout.write(self.style.SUCCESS(f'Re-queued {count} documents'))
@@ -0,0 +1,121 @@
+import logging
+
+import numpy as np
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+
+def json_to_blob(apps, schema_editor):
+    DocumentChunk = apps.get_model('study_tools', 'DocumentChunk')
+    batch = []
+    for chunk in DocumentChunk.objects.exclude(embedding=None).only('id', 'embedding').iterator(chunk_size=500):
+        vector = np.asarray(chunk.embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+        chunk.embedding_vector = vector.astype('<f4').tobytes()
+        batch.append(chunk)
+        if len(batch) >= 500:
+            DocumentChunk.objects.bulk_update(batch, ['embedding_vector'])
+            batch = []
+    if batch:
+        DocumentChunk.objects.bulk_update(batch, ['embedding_vector'])
+
+
+# Fixed here so the schema never depends on the settings active at migrate time.
+# 1024 is the width of the configured embedding models (Cohere embed-english-v3.0,
+# mistral-embed); VECTOR_STORE['DIMENSIONS'] must match it.
+PGVECTOR_DIMENSIONS = 1024
+PGVECTOR_INDEX = 'study_tools_documentchunk_pgvector_hnsw'
+
+
+def add_pgvector_column(apps, schema_editor):
+    """
+    pgvector column + HNSW index used by PgVectorStore; skipped off PostgreSQL.
+
+    Without the ``vector`` extension the column is left out (with a
+    warning) and get_vector_store() falls back to the NumPy store.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from django.db import transaction
+    from django.db.utils import DatabaseError
+
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            with schema_editor.connection.cursor() as cursor:
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    except DatabaseError as e:
+        logger.warning(f"pgvector extension unavailable ({e}); document retrieval will use the NumPy store")
+        return
+
+    schema_editor.execute(
+        "ALTER TABLE study_tools_documentchunk "
+        f"ADD COLUMN IF NOT EXISTS embedding_pgvector vector({PGVECTOR_DIMENSIONS})"
+    )
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {PGVECTOR_INDEX} ON study_tools_documentchunk "
+        "USING hnsw (embedding_pgvector vector_cosine_ops)"
+    )
+    backfill_pgvector_column(apps, schema_editor)
+
+
+def backfill_pgvector_column(apps, schema_editor):
+    """Copy the existing chunk embeddings into embedding_pgvector."""
+    DocumentChunk = apps.get_model('study_tools', 'DocumentChunk')
+    rows = DocumentChunk.objects.exclude(embedding=None).values_list('id', 'embedding')
+    batch = []
+    with schema_editor.connection.cursor() as cursor:
+        for chunk_id, blob in rows.iterator(chunk_size=500):
+            vector = np.frombuffer(bytes(blob), dtype='<f4')
+            if len(vector) != PGVECTOR_DIMENSIONS:
+                continue
+            batch.append(('[' + ','.join(repr(float(x)) for x in vector) + ']', chunk_id))
+            if len(batch) >= 500:
+                cursor.executemany(
+                    "UPDATE study_tools_documentchunk SET embedding_pgvector = %s::vector WHERE id = %s", batch
+                )
+                batch = []
+        if batch:
+            cursor.executemany(
+                "UPDATE study_tools_documentchunk SET embedding_pgvector = %s::vector WHERE id = %s", batch
+            )
+
+
+def drop_pgvector_column(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {PGVECTOR_INDEX}")
+    schema_editor.execute("ALTER TABLE study_tools_documentchunk DROP COLUMN IF EXISTS embedding_pgvector")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('study_tools', '0002_flashcard_flashcardreviewlog_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentchunk',
+            name='embedding_vector',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.RunPython(json_to_blob, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='documentchunk',
+            name='embedding',
+        ),
+        migrations.RenameField(
+            model_name='documentchunk',
+            old_name='embedding_vector',
+            new_name='embedding',
+        ),
+        migrations.AlterField(
+            model_name='documentchunk',
+            name='embedding',
+            field=models.BinaryField(help_text='L2-normalised float32 embedding (see services.vector_store.encode_vector)', null=True),
+        ),
+        migrations.RunPython(add_pgvector_column, drop_pgvector_column),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.3 on 2026-10-17 03:09
+
+from django.db import migrations, models
+
+
+def mark_processed_documents_done(apps, schema_editor):
+    Document = apps.get_model('study_tools', 'Document')
+    Document.objects.filter(processed=True).update(processing_stage='done')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('study_tools', '0003_documentchunk_binary_embedding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='processing_stage',
+            field=models.CharField(choices=[('extract', 'Extract'), ('chunk', 'Chunk'), ('embed', 'Embed'), ('index', 'Index'), ('done', 'Done')], default='extract', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='stage_progress',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='stage_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('queued', 'Queued'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.RunPython(mark_processed_documents_done, migrations.RunPython.noop),
+    ]
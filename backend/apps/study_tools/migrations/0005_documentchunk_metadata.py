@@ -0,0 +1,28 @@
+# Generated by Django 5.0.3 on 2026-10-17 03:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('study_tools', '0004_document_pipeline_stages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentchunk',
+            name='page_number',
+            field=models.IntegerField(blank=True, help_text='Page the chunk starts on (PDFs only)', null=True),
+        ),
+        migrations.AddField(
+            model_name='documentchunk',
+            name='section',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='documentchunk',
+            name='token_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
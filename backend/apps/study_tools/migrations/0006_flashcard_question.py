@@ -0,0 +1,27 @@
+# Generated by Django 5.0.3 on 2026-10-17 03:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0003_alter_examtype_is_active_alter_subject_is_active_and_more'),
+        ('questions', '0002_alter_question_difficulty_and_more'),
+        ('study_tools', '0005_documentchunk_metadata'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashcard',
+            name='question',
+            field=models.ForeignKey(blank=True, help_text='Question a mistake card was made from (one card per user and question)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='flashcards', to='questions.question'),
+        ),
+        migrations.AddConstraint(
+            model_name='flashcard',
+            constraint=models.UniqueConstraint(condition=models.Q(('question__isnull', False)), fields=('user', 'question'), name='unique_flashcard_per_user_question'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+SCHEDULE_NAME = 'resume-stalled-documents'
+
+
+def create_schedule(apps, schema_editor):
+    Schedule = apps.get_model('django_q', 'Schedule')
+    Schedule.objects.update_or_create(
+        name=SCHEDULE_NAME,
+        defaults={
+            'func': 'apps.study_tools.tasks.resume_stalled_documents',
+            'schedule_type': 'I',  # Schedule.MINUTES
+            'minutes': 5,
+            'repeats': -1,
+        },
+    )
+
+
+def delete_schedule(apps, schema_editor):
+    apps.get_model('django_q', 'Schedule').objects.filter(name=SCHEDULE_NAME).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_q', '0018_task_success_index'),
+        ('study_tools', '0006_flashcard_question'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_schedule, delete_schedule),
+    ]
@@ -24,10 +24,22 @@ class Document(models.Model):
     processed = models.BooleanField(default=False)
     processing_status = models.CharField(max_length=20, default='pending', choices=[
         ('pending', 'Pending'),
+        ('queued', 'Queued'),
         ('processing', 'Processing'),
         ('completed', 'Completed'),
         ('failed', 'Failed')
     ])
+    # Ingestion pipeline position (see services/document_pipeline.py); a failed or
+    # interrupted document resumes from this stage.
+    processing_stage = models.CharField(max_length=20, default='extract', choices=[
+        ('extract', 'Extract'),
+        ('chunk', 'Chunk'),
+        ('embed', 'Embed'),
+        ('index', 'Index'),
+        ('done', 'Done')
+    ])
+    stage_progress = models.JSONField(default=dict, blank=True)
+    stage_updated_at = models.DateTimeField(null=True, blank=True)
     error_message = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -58,7 +70,14 @@ class DocumentChunk(models.Model):
     document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='chunks')
     chunk_index = models.IntegerField()
     content = models.TextField()
-    embedding = models.JSONField(help_text="Vector embedding as a list of floats")
+    # Chunker metadata (see services/chunking.py)
+    page_number = models.IntegerField(null=True, blank=True, help_text="Page the chunk starts on (PDFs only)")
+    section = models.CharField(max_length=255, blank=True, default='')
+    token_count = models.IntegerField(default=0)
+    embedding = models.BinaryField(
+        null=True,
+        help_text="L2-normalised float32 embedding (see services.vector_store.encode_vector)"
+    )
     
     class Meta:
         ordering = ['chunk_index']
@@ -92,6 +111,10 @@ class Flashcard(models.Model):
         ('ai_generated', 'AI Generated'),
         ('exam_mistake', 'Exam Mistake')
     ], default='manual')
+    question = models.ForeignKey(
+        'questions.Question', on_delete=models.SET_NULL, null=True, blank=True, related_name='flashcards',
+        help_text="Question a mistake card was made from (one card per user and question)"
+    )
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -102,6 +125,13 @@ class Flashcard(models.Model):
             models.Index(fields=['user', 'next_review']),
             models.Index(fields=['subject', 'topic']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'question'],
+                condition=models.Q(question__isnull=False),
+                name='unique_flashcard_per_user_question',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.front[:50]}"
@@ -28,6 +28,15 @@ class DocumentSerializer(serializers.ModelSerializer):
         model = Document
         fields = [
             'id', 'title', 'file', 'file_type', 'processed', 
-            'processing_status', 'created_at', 'updated_at'
+            'processing_status', 'processing_stage', 'stage_progress', 'error_message',
+            'created_at', 'updated_at'
         ]
-        read_only_fields = ['processed', 'processing_status', 'created_at']
+        read_only_fields = [
+            'processed', 'processing_status', 'processing_stage', 'stage_progress', 'error_message', 'created_at'
+        ]
+
+
+class DocumentSearchSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=1000)
+    k = serializers.IntegerField(default=5, min_value=1, max_value=20)
+    document_ids = serializers.ListField(child=serializers.UUIDField(), required=False)
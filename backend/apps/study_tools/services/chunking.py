@@ -0,0 +1,256 @@
+"""
+Pluggable, token-aware document chunkers.
+
+Every chunker consumes a stream of ``(page_number, text)`` pieces (see
+text_extraction.py) and yields Chunk objects carrying the page the chunk
+starts on, the section heading it belongs to and its token count (counted
+with the estimator shared with prompt budgeting, see ai_services/tokens.py).
+
+Strategies (DOCUMENT_CHUNKING['STRATEGY']):
+    fixed      legacy 1000-char windows with 100 chars of overlap
+    sentence   packs whole sentences up to MAX_TOKENS
+    paragraph  packs whole paragraphs, splitting oversized ones by sentence
+    heading    like paragraph, but never crosses a detected heading and
+               records the heading as the chunk's section
+"""
+import re
+
+from django.conf import settings
+
+from ai_services.tokens import get_token_estimator
+
+DEFAULTS = {
+    'STRATEGY': 'heading',
+    'MAX_TOKENS': 200,
+    'OVERLAP_TOKENS': 30,
+}
+
+# A sentence ends at . ! or ? followed by whitespace and an upper-case letter,
+# digit or opening quote/bracket; decimals ("3.14") and formulas are left intact.
+SENTENCE_END = re.compile(r'(?<=[.!?])["\')\]]?\s+(?=["\'(\[]?[A-Z0-9])')
+ABBREVIATIONS = {'mr', 'mrs', 'ms', 'dr', 'prof', 'st', 'fig', 'eq', 'no', 'vs', 'etc', 'e.g', 'i.e', 'approx'}
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+MARKDOWN_HEADING = re.compile(r'^\s{0,3}#{1,6}\s+(.+?)\s*#*\s*$')
+NUMBERED_HEADING = re.compile(
+    r'^\s*((chapter|section|unit|part|topic)\s+[\dIVXivx]+[.:]?|\d+(\.\d+)*\.?|[IVX]+\.)\s+[A-Z].{0,78}$',
+    re.IGNORECASE,
+)
+
+
+def get_chunking_config():
+    return {**DEFAULTS, **getattr(settings, 'DOCUMENT_CHUNKING', {})}
+
+
+class Chunk:
+    __slots__ = ('text', 'page', 'section', 'tokens')
+
+    def __init__(self, text, page=None, section='', tokens=0):
+        self.text = text
+        self.page = page
+        self.section = section
+        self.tokens = tokens
+
+    def __repr__(self):
+        return f"Chunk(page={self.page}, section={self.section!r}, tokens={self.tokens}, text={self.text[:40]!r})"
+
+
+def split_sentences(text):
+    """Split text into sentences without breaking abbreviations or decimals."""
+    sentences, start = [], 0
+    for match in SENTENCE_END.finditer(text):
+        candidate = text[start:match.start()].rstrip()
+        last_word = candidate.rsplit(None, 1)[-1].rstrip('.').lower() if candidate else ''
+        if last_word in ABBREVIATIONS or (len(last_word) == 1 and last_word.isalpha()):
+            continue
+        if candidate:
+            sentences.append(candidate)
+        start = match.end()
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+def detect_heading(line):
+    """Return the heading text if ``line`` looks like a heading, else None."""
+    stripped = line.strip()
+    if not stripped or len(stripped) > 80:
+        return None
+    match = MARKDOWN_HEADING.match(stripped)
+    if match:
+        return match.group(1)
+    if NUMBERED_HEADING.match(stripped) and not stripped.endswith(('.', ',', ';')):
+        return stripped
+    letters = [c for c in stripped if c.isalpha()]
+    if len(letters) >= 4 and all(c.isupper() for c in letters) and not stripped.endswith(('.', ',')):
+        return stripped
+    return None
+
+
+class BaseChunker:
+    name = 'base'
+    joiner = ' '
+
+    def __init__(self, max_tokens=200, overlap_tokens=30, estimator=None):
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.estimator = estimator or get_token_estimator()
+
+    def units(self, pages):
+        """Yield ``(text, page, section, starts_section)`` packing units."""
+        raise NotImplementedError
+
+    def _split_oversized(self, text):
+        """Break a unit that exceeds the budget into sentence- then word-sized pieces."""
+        pieces = []
+        for sentence in split_sentences(text):
+            if self.estimator.count(sentence) <= self.max_tokens:
+                pieces.append(sentence)
+                continue
+            words, current = sentence.split(), []
+            for word in words:
+                current.append(word)
+                if self.estimator.count(' '.join(current)) > self.max_tokens and len(current) > 1:
+                    current.pop()
+                    pieces.append(' '.join(current))
+                    current = [word]
+            if current:
+                pieces.append(' '.join(current))
+        return pieces
+
+    def chunk(self, pages):
+        current, current_tokens, section = [], 0, ''
+
+        def flush():
+            text = self.joiner.join(unit[0] for unit in current).strip()
+            return Chunk(text, page=current[0][1], section=section, tokens=self.estimator.count(text))
+
+        for text, page, unit_section, starts_section in self.units(pages):
+            if starts_section and current:
+                yield flush()
+                current, current_tokens = [], 0
+            section = unit_section
+
+            tokens = self.estimator.count(text)
+            pieces = [(text, tokens)] if tokens <= self.max_tokens else [
+                (piece, self.estimator.count(piece)) for piece in self._split_oversized(text)
+            ]
+            for piece, piece_tokens in pieces:
+                if current and current_tokens + piece_tokens > self.max_tokens:
+                    yield flush()
+                    # Carry whole trailing units as overlap, within the budget
+                    overlap, overlap_tokens = [], 0
+                    for unit in reversed(current):
+                        if overlap_tokens + unit[2] > self.overlap_tokens:
+                            break
+                        overlap.insert(0, unit)
+                        overlap_tokens += unit[2]
+                    current, current_tokens = overlap, overlap_tokens
+                current.append((piece, page, piece_tokens))
+                current_tokens += piece_tokens
+
+        if current:
+            yield flush()
+
+
+class FixedChunker(BaseChunker):
+    """Legacy character windows (1000 chars, 100 overlap, cut at the last space)."""
+
+    name = 'fixed'
+    CHUNK_SIZE = 1000
+    OVERLAP = 100
+
+    def chunk(self, pages):
+        buffer, base = "", 0  # base: absolute offset of buffer[0]
+        page_starts = []  # (absolute offset, page) for pages still in the buffer
+
+        def emit(text, absolute):
+            page = None
+            for start, number in page_starts:
+                if start > absolute:
+                    break
+                page = number
+            return Chunk(text, page=page, tokens=self.estimator.count(text))
+
+        for page, piece in pages:
+            page_starts.append((base + len(buffer), page))
+            buffer += piece
+            pos = 0
+            while len(buffer) - pos > self.CHUNK_SIZE:
+                window = buffer[pos:pos + self.CHUNK_SIZE]
+                last_space = window.rfind(' ')
+                # Only cut at a space that still moves the window forward
+                end = last_space if last_space > self.OVERLAP else self.CHUNK_SIZE
+                yield emit(window[:end], base + pos)
+                pos += end - self.OVERLAP
+            base += pos
+            buffer = buffer[pos:]
+            # Forget pages that end before the buffer, keeping the one it starts on
+            while len(page_starts) > 1 and page_starts[1][0] <= base:
+                page_starts.pop(0)
+        if buffer:
+            yield emit(buffer, base)
+
+
+class SentenceChunker(BaseChunker):
+    name = 'sentence'
+
+    def units(self, pages):
+        for page, text in pages:
+            for sentence in split_sentences(' '.join(text.split())):
+                yield sentence, page, '', False
+
+
+class ParagraphChunker(BaseChunker):
+    name = 'paragraph'
+    joiner = '\n\n'
+
+    def units(self, pages):
+        for page, text in pages:
+            for paragraph in PARAGRAPH_BREAK.split(text):
+                paragraph = ' '.join(paragraph.split())
+                if paragraph:
+                    yield paragraph, page, '', False
+
+
+class HeadingChunker(ParagraphChunker):
+    name = 'heading'
+
+    def units(self, pages):
+        section = ''
+        for page, text in pages:
+            for paragraph in PARAGRAPH_BREAK.split(text):
+                body = []
+                for line in paragraph.splitlines():
+                    heading = detect_heading(line)
+                    if heading is None:
+                        body.append(line)
+                        continue
+                    if body:
+                        yield ' '.join(' '.join(body).split()), page, section, False
+                        body = []
+                    section = heading[:255]
+                    # Headings open a new chunk and lead its text
+                    yield heading, page, section, True
+                joined = ' '.join(' '.join(body).split())
+                if joined:
+                    yield joined, page, section, False
+
+
+CHUNKERS = {
+    'fixed': FixedChunker,
+    'sentence': SentenceChunker,
+    'paragraph': ParagraphChunker,
+    'heading': HeadingChunker,
+}
+
+
+def get_chunker(strategy=None, **overrides):
+    """Build the configured chunker (DOCUMENT_CHUNKING), optionally overriding options."""
+    config = {**get_chunking_config(), **{k.upper(): v for k, v in overrides.items()}}
+    chunker_class = CHUNKERS[strategy or config['STRATEGY']]
+    return chunker_class(
+        max_tokens=config['MAX_TOKENS'],
+        overlap_tokens=config['OVERLAP_TOKENS'],
+        estimator=get_token_estimator(),
+    )
@@ -0,0 +1,195 @@
+"""
+Durable document ingestion on the Django-Q cluster.
+
+Uploads are queued (processing_status='queued') and admitted by dispatch()
+while global and per-user concurrency slots are free. Every stage of
+DocumentProcessor runs as its own Django-Q task and, on success, enqueues the
+next one, so a worker restart only loses the stage that was in flight; the
+document is picked up again from Document.processing_stage. Every dispatch()
+first re-queues documents whose stage made no progress for
+STALE_AFTER_SECONDS, and a Django-Q schedule runs resume_stalled() every few
+minutes (migration 0007) so recovery does not wait for the next upload.
+"""
+import logging
+import os
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django_q.tasks import async_task
+
+from ..models import Document
+from .document_processor import DocumentProcessor
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'GLOBAL_CONCURRENCY': 4,
+    'PER_USER_CONCURRENCY': 1,
+    'EMBED_CHUNKS_PER_PASS': 256,
+    'STALE_AFTER_SECONDS': 900,
+    # Per-stage task timeout; below STALE_AFTER_SECONDS and Q_CLUSTER['retry']
+    'TASK_TIMEOUT': 600,
+    'PDF_WORKERS': min(4, os.cpu_count() or 1),
+    'PDF_PARALLEL_MIN_PAGES': 40,
+    'PDF_PAGES_PER_TASK': 16,
+    'SLOW_PAGE_SECONDS': 2.0,
+    # Storage path (default storage) of extracted page spools
+    'SPOOL_LOCATION': 'document-spool',
+    'TASK_GROUP': 'document-ingestion',
+}
+
+
+def get_pipeline_config():
+    return {**DEFAULTS, **getattr(settings, 'DOCUMENT_PIPELINE', {})}
+
+
+class DocumentPipeline:
+
+    @staticmethod
+    def enqueue_document(document_id):
+        """Queue a document for (re)processing from its current stage."""
+        Document.objects.filter(id=document_id).exclude(
+            processing_status__in=['queued', 'processing', 'completed']
+        ).update(processing_status='queued', error_message=None, stage_updated_at=timezone.now())
+        DocumentPipeline.dispatch()
+
+    @staticmethod
+    def dispatch():
+        """Start queued documents, oldest first, while concurrency slots are free."""
+        config = get_pipeline_config()
+        DocumentPipeline._requeue_stalled(config)
+        active = Document.objects.filter(processing_status='processing')
+        running = active.count()
+        per_user = Counter(active.values_list('user_id', flat=True))
+
+        if running >= config['GLOBAL_CONCURRENCY']:
+            return 0
+
+        started = 0
+        queued = Document.objects.filter(processing_status='queued').order_by('created_at').values_list('id', 'user_id')
+        for document_id, user_id in queued.iterator():
+            if running >= config['GLOBAL_CONCURRENCY']:
+                break
+            if per_user[user_id] >= config['PER_USER_CONCURRENCY']:
+                continue
+            # Conditional update so concurrent dispatchers cannot claim the same document
+            claimed = Document.objects.filter(id=document_id, processing_status='queued').update(
+                processing_status='processing', stage_updated_at=timezone.now()
+            )
+            if not claimed:
+                continue
+            running += 1
+            per_user[user_id] += 1
+            started += 1
+            DocumentPipeline._enqueue_stage(document_id)
+        return started
+
+    @staticmethod
+    def _enqueue_stage(document_id):
+        config = get_pipeline_config()
+        async_task(
+            'apps.study_tools.tasks.run_document_stage',
+            str(document_id),
+            group=config['TASK_GROUP'],
+            timeout=config['TASK_TIMEOUT'],
+        )
+
+    @staticmethod
+    def _requeue_stalled(config):
+        """Queue documents whose stage task died (no progress for STALE_AFTER_SECONDS) again."""
+        cutoff = timezone.now() - timedelta(seconds=config['STALE_AFTER_SECONDS'])
+        count = Document.objects.filter(processing_status='processing', stage_updated_at__lt=cutoff).update(
+            processing_status='queued', stage_updated_at=timezone.now()
+        )
+        if count:
+            logger.warning(f"Re-queued {count} stalled documents")
+        return count
+
+    @staticmethod
+    def run_stage(document_id, enqueue_next=True):
+        """
+        Run the document's current stage and persist its progress.
+        Returns True while stages remain.
+        """
+        try:
+            document = Document.objects.get(id=document_id)
+        except Document.DoesNotExist:
+            if enqueue_next:
+                DocumentPipeline.dispatch()
+            return False
+
+        if document.processing_stage == 'done':
+            return False
+        if enqueue_next and document.processing_status != 'processing':
+            # Duplicate delivery or the document was re-queued meanwhile
+            logger.info(f"Skipping stage task for document {document.id} ({document.processing_status})")
+            return False
+
+        stage = document.processing_stage
+        if document.processing_status != 'processing':
+            document.processing_status = 'processing'
+        logger.info(f"Running '{stage}' stage for document {document.id}: {document.title}")
+
+        started = time.monotonic()
+        try:
+            finished = DocumentProcessor.run_stage(document, stage)
+        except Exception as e:
+            logger.error(f"Error processing document {document_id} at stage '{stage}': {e}")
+            document.processing_status = 'failed'
+            document.error_message = f"{stage}: {e}"
+            document.stage_updated_at = timezone.now()
+            document.save(update_fields=['processing_status', 'error_message', 'stage_updated_at'])
+            if enqueue_next:
+                DocumentPipeline.dispatch()
+            return False
+
+        progress = dict(document.stage_progress or {})
+        timings = progress.setdefault('timings', {})
+        timings[stage] = round(timings.get(stage, 0) + time.monotonic() - started, 3)
+        document.stage_progress = progress
+
+        if finished:
+            stages = DocumentProcessor.STAGES
+            document.processing_stage = stages[stages.index(stage) + 1] if stage != stages[-1] else 'done'
+        if document.processing_stage == 'done':
+            document.processed = True
+            document.processing_status = 'completed'
+            logger.info(f"Successfully processed document {document.id}")
+
+        document.stage_updated_at = timezone.now()
+        document.save(update_fields=[
+            'processing_stage', 'processing_status', 'processed', 'stage_progress', 'stage_updated_at'
+        ])
+        if finished:
+            DocumentProcessor.stage_saved(document, stage)
+
+        if document.processing_stage != 'done':
+            if enqueue_next:
+                DocumentPipeline._enqueue_stage(document.id)
+            return True
+        if enqueue_next:
+            DocumentPipeline.dispatch()
+        return False
+
+    @staticmethod
+    def resume_stalled(include_failed=False):
+        """
+        Re-queue documents whose stage task died (no progress for
+        STALE_AFTER_SECONDS) and, optionally, failed documents. They resume
+        from their recorded stage.
+        """
+        count = DocumentPipeline._requeue_stalled(get_pipeline_config())
+        if include_failed:
+            count += Document.objects.filter(processing_status='failed').update(
+                processing_status='queued', error_message=None, stage_updated_at=timezone.now()
+            )
+        # Uploads that never made it into the queue
+        count += Document.objects.filter(processing_status='pending').update(
+            processing_status='queued', stage_updated_at=timezone.now()
+        )
+        DocumentPipeline.dispatch()
+        return count
+
@@ -1,118 +1,217 @@
-import os
+import heapq
+import json
 import logging
-from pypdf import PdfReader
+import tempfile
 from django.conf import settings
-from ..models import Document
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from .chunking import get_chunker
+from .text_extraction import iter_pdf_pages, iter_text_segments
 
 logger = logging.getLogger(__name__)
 
 class DocumentProcessor:
+    """
+    Ingestion stages for a Document: extract -> chunk -> embed -> index.
+
+    Each stage persists its output (spooled page texts, DocumentChunk rows,
+    chunk embeddings, vector indexes) so a crashed or failed document can be
+    resumed from Document.processing_stage, on any worker. The page spool
+    lives in the default storage backend next to the uploads. Scheduling,
+    progress and concurrency limits live in services/document_pipeline.py.
+    """
+
+    STAGES = ['extract', 'chunk', 'embed', 'index']
+
     @staticmethod
     def process_document(document_id):
         """
-        Process a document: extract text and update status.
-        This method is intended to be run in a background thread/task.
+        Process a document inline, running every remaining stage.
+        Background processing goes through DocumentPipeline.enqueue_document.
         """
-        try:
-            document = Document.objects.get(id=document_id)
-            if document.processed:
-                return
-
-            logger.info(f"Starting processing for document {document.id}: {document.title}")
-            document.processing_status = 'processing'
-            document.save(update_fields=['processing_status'])
-
-            file_path = document.file.path
-            extracted_text = ""
-
-            if document.file_type == 'pdf':
-                extracted_text = DocumentProcessor._extract_from_pdf(file_path)
-            elif document.file_type in ['txt', 'md']:
-                extracted_text = DocumentProcessor._extract_from_text(file_path)
-            else:
-                raise ValueError(f"Unsupported file type: {document.file_type}")
-
-            # RAG Implementation: Chunking and Embedding
-            DocumentProcessor._process_rag(document, extracted_text)
-
-            document.processed = True
-            document.processing_status = 'completed'
-            document.save(update_fields=['processed', 'processing_status', 'content']) # Updated content in _process_rag
-            logger.info(f"Successfully processed document {document.id}")
-
-        except Exception as e:
-            logger.error(f"Error processing document {document_id}: {e}")
-            try:
-                document = Document.objects.get(id=document_id)
-                document.processing_status = 'failed'
-                document.error_message = str(e)
-                document.save(update_fields=['processing_status', 'error_message'])
-            except Exception:
-                pass
+        from .document_pipeline import DocumentPipeline
+
+        while DocumentPipeline.run_stage(document_id, enqueue_next=False):
+            pass
 
     @staticmethod
-    def _extract_from_pdf(file_path):
-        reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+    def run_stage(document, stage):
+        """
+        Run one stage. Returns True when the stage is finished, False when it
+        needs another pass (large documents are embedded in several passes).
+        """
+        handler = getattr(DocumentProcessor, f'_stage_{stage}')
+        return handler(document)
+
+    # ------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------
 
     @staticmethod
-    def _extract_from_text(file_path):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
+    def _stage_extract(document):
+        """
+        Stream page texts into a JSON-lines spool file, stored under
+        DOCUMENT_PIPELINE['SPOOL_LOCATION'] in the default storage so any
+        worker can run the chunk stage; it reads the spool back page by page.
+        """
+        from .document_pipeline import get_pipeline_config
+
+        config = get_pipeline_config()
+        spool_name = DocumentProcessor._spool_name(document)
+
+        page_count, total_seconds, slowest = 0, 0.0, []
+        with tempfile.TemporaryFile() as spool:
+            for page_number, text, seconds in DocumentProcessor._iter_pages(document, config):
+                spool.write((json.dumps({'page': page_number, 'text': text}) + "\n").encode('utf-8'))
+                page_count += 1
+                total_seconds += seconds
+                if page_number is not None:
+                    slowest = heapq.nlargest(5, slowest + [(round(seconds, 3), page_number)])
+                    if seconds > config['SLOW_PAGE_SECONDS']:
+                        logger.warning(f"Page {page_number} of document {document.id} took {seconds:.1f}s to extract")
+            spool.seek(0)
+            # The chunk stage only reads the spool once this stage is saved,
+            # so a copy cut short by a crash is simply overwritten on retry
+            default_storage.delete(spool_name)
+            default_storage.save(spool_name, File(spool))
+
+        progress = dict(document.stage_progress or {})
+        progress['extract'] = {
+            'pages': page_count,
+            'seconds': round(total_seconds, 3),
+            'slowest_pages': [{'page': page, 'seconds': secs} for secs, page in slowest],
+        }
+        document.stage_progress = progress
+        return True
 
     @staticmethod
-    def _process_rag(document, text):
+    def _stage_chunk(document):
         """
-        Chunks the text, generates embeddings, and saves to DocumentChunk.
+        Chunk the spooled pages incrementally with the configured chunker
+        (DOCUMENT_CHUNKING), then store the full text on Document.content
+        once every chunk exists.
         """
         from ..models import DocumentChunk
-        from ai_services.router import AIRouter
 
-        # Save full text first
-        document.content = text
-        document.save(update_fields=['content'])
+        spool_name = DocumentProcessor._spool_name(document)
+        if not default_storage.exists(spool_name):
+            # Spool lost (e.g. discarded before a crash): extract again
+            logger.warning(f"Page spool of document {document.id} is missing, re-extracting")
+            DocumentProcessor._stage_extract(document)
 
-        # Simple chunking strategy: 1000 chars with 100 overlap
-        CHUNK_SIZE = 1000
-        OVERLAP = 100
-        
-        chunks = []
-        start = 0
-        text_len = len(text)
-        
-        while start < text_len:
-            end = min(start + CHUNK_SIZE, text_len)
-            chunk_text = text[start:end]
-            
-            # Adjust to nearest space to avoid cutting words
-            if end < text_len:
-                last_space = chunk_text.rfind(' ')
-                if last_space != -1:
-                    end = start + last_space
-                    chunk_text = text[start:end]
-            
-            chunks.append(chunk_text)
-            start = end - OVERLAP if end < text_len else end # Move window with overlap
-
-        # Generate embeddings and save chunks
-        router = AIRouter()
-        
-        # Clear existing chunks if re-processing
-        document.chunks.all().delete()
-        
-        for i, chunk_text in enumerate(chunks):
-            try:
-                embedding = router.generate_embedding(chunk_text)
-                DocumentChunk.objects.create(
+        chunk_count = 0
+        with transaction.atomic():
+            # Clear existing chunks if re-processing
+            document.chunks.all().delete()
+            batch = []
+            for chunk in get_chunker().chunk(DocumentProcessor._read_spool(spool_name)):
+                if not chunk.text:
+                    continue
+                batch.append(DocumentChunk(
                     document=document,
-                    chunk_index=i,
-                    content=chunk_text,
-                    embedding=embedding
-                )
-            except Exception as e:
-                logger.error(f"Failed to generate embedding for chunk {i}: {e}")
-                # Continue processing other chunks even if one fails
-                continue
+                    chunk_index=chunk_count,
+                    content=chunk.text,
+                    page_number=chunk.page,
+                    section=chunk.section,
+                    token_count=chunk.tokens,
+                ))
+                chunk_count += 1
+                if len(batch) >= 500:
+                    DocumentChunk.objects.bulk_create(batch)
+                    batch = []
+            if batch:
+                DocumentChunk.objects.bulk_create(batch)
+
+        document.content = "".join(text for _, text in DocumentProcessor._read_spool(spool_name))
+        document.save(update_fields=['content'])
+
+        progress = dict(document.stage_progress or {})
+        progress.update({'chunks_total': chunk_count, 'chunks_embedded': 0})
+        document.stage_progress = progress
+        return True
+
+    @staticmethod
+    def _stage_embed(document):
+        """
+        Embed the next batch of chunks that have no vector yet. Chunks whose
+        embedding still fails after the router's retries are dropped, as before.
+        """
+        from ai_services.router import get_ai_router
+        from .document_pipeline import get_pipeline_config
+        from .vector_store import encode_vector
+
+        batch_size = get_pipeline_config()['EMBED_CHUNKS_PER_PASS']
+        pending = list(document.chunks.filter(embedding__isnull=True).order_by('chunk_index')[:batch_size])
+        if not pending:
+            return True
+
+        # Raises if every provider fails, leaving the document resumable at this stage
+        embeddings = get_ai_router().generate_embeddings([chunk.content for chunk in pending])
+
+        embedded, failed = [], []
+        for chunk, embedding in zip(pending, embeddings):
+            if embedding is None:
+                failed.append(chunk.id)
+            else:
+                chunk.embedding = encode_vector(embedding)
+                embedded.append(chunk)
+
+        with transaction.atomic():
+            document.chunks.model.objects.bulk_update(embedded, ['embedding'], batch_size=500)
+            if failed:
+                logger.error(f"Dropping {len(failed)} chunks of document {document.id} that could not be embedded")
+                document.chunks.filter(id__in=failed).delete()
+
+        progress = dict(document.stage_progress or {})
+        progress['chunks_embedded'] = progress.get('chunks_embedded', 0) + len(embedded)
+        document.stage_progress = progress
+        return not document.chunks.filter(embedding__isnull=True).exists()
+
+    @staticmethod
+    def _stage_index(document):
+        from .library_index import get_library_index
+        from .vector_store import get_vector_store
+
+        get_vector_store().index_document(document.id)
+        get_library_index().add_document(document)
+        return True
+
+    @staticmethod
+    def stage_saved(document, stage):
+        """Clean-up that must wait until the stage's completion is saved."""
+        if stage == 'chunk':
+            # Until the 'chunk' advance is committed a resumed run still needs the spool
+            default_storage.delete(DocumentProcessor._spool_name(document))
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _iter_pages(document, config):
+        file_path = document.file.path
+
+        if document.file_type == 'pdf':
+            return iter_pdf_pages(
+                file_path,
+                workers=config['PDF_WORKERS'],
+                parallel_min_pages=config['PDF_PARALLEL_MIN_PAGES'],
+                pages_per_task=config['PDF_PAGES_PER_TASK'],
+            )
+        elif document.file_type in ['txt', 'md']:
+            return iter_text_segments(file_path)
+        raise ValueError(f"Unsupported file type: {document.file_type}")
+
+    @staticmethod
+    def _spool_name(document):
+        from .document_pipeline import get_pipeline_config
+        return f"{get_pipeline_config()['SPOOL_LOCATION']}/{document.id}.pages.jsonl"
+
+    @staticmethod
+    def _read_spool(spool_name):
+        with default_storage.open(spool_name, 'rb') as spool:
+            for line in spool:
+                page = json.loads(line.decode('utf-8'))
+                # Pages are newline-separated in the extracted text
+                yield page['page'], page['text'] + ("\n" if page['page'] is not None else "")
@@ -0,0 +1,300 @@
+"""
+Per-user approximate nearest-neighbour index over all of a user's DocumentChunks.
+
+Each user's chunk vectors live in one float32 matrix. Small libraries are
+searched exactly; once a library reaches VECTOR_STORE['IVF_MIN_ROWS'] chunks
+an IVF (inverted file) index is trained with spherical k-means and queries
+only score the rows in the VECTOR_STORE['IVF_NPROBE'] closest clusters.
+
+Indexes are updated per document: DocumentProcessor calls add_document() when
+a document finishes, and every lookup diffs the per-document (chunk count,
+max chunk id) signatures against the database at most every
+LIBRARY_SYNC_SECONDS, so changes made by other processes are picked up
+without rebuilding the whole index.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.db.models import Count, Max
+
+from .vector_store import VECTOR_DTYPE, RetrievalMetrics, get_vector_store_config, normalize_vector
+
+logger = logging.getLogger(__name__)
+
+KMEANS_ITERATIONS = 8
+KMEANS_SAMPLE_PER_LIST = 64
+
+
+class UserLibraryIndex:
+    """IVF index over one user's document chunks."""
+
+    def __init__(self, user_id, config):
+        self.user_id = user_id
+        self.config = config
+        self._lock = threading.Lock()
+        self.dimensions = None
+        self.ids = np.empty(0, dtype=np.int64)
+        self.doc_codes = np.empty(0, dtype=np.int32)
+        self.matrix = np.empty((0, 0), dtype=VECTOR_DTYPE)
+        self.centroids = None
+        self.assignments = None
+        self.trained_rows = 0
+        self.documents = {}  # document_id -> signature
+        self.skipped = {}  # document_id -> signature (embedding size mismatch)
+        self._codes = {}
+        self._synced_at = 0.0
+
+    # ------------------------------------------------------------------
+    # Database sync
+    # ------------------------------------------------------------------
+
+    def _chunks(self):
+        from ..models import DocumentChunk
+        return DocumentChunk.objects.filter(document__user_id=self.user_id, embedding__isnull=False)
+
+    def _db_signatures(self):
+        rows = self._chunks().values('document_id').annotate(count=Count('id'), last=Max('id'))
+        return {str(row['document_id']): (row['count'], row['last']) for row in rows}
+
+    def sync(self, force=False):
+        """Bring the index in line with the database, one document at a time."""
+        now = time.monotonic()
+        if not force and now - self._synced_at < self.config['LIBRARY_SYNC_SECONDS']:
+            return
+        signatures = self._db_signatures()
+        with self._lock:
+            known = {**self.documents, **self.skipped}
+        stale = [doc for doc in known if doc not in signatures]
+        changed = [doc for doc, sig in signatures.items() if known.get(doc) != sig]
+        if stale or changed:
+            self._apply(remove=stale + changed, add={doc: signatures[doc] for doc in changed})
+        self._synced_at = now
+
+    def add_document(self, document_id):
+        document_id = str(document_id)
+        stats = self._chunks().filter(document_id=document_id).aggregate(count=Count('id'), last=Max('id'))
+        add = {document_id: (stats['count'], stats['last'])} if stats['count'] else {}
+        self._apply(remove=[document_id], add=add)
+
+    def remove_document(self, document_id):
+        self._apply(remove=[str(document_id)], add={})
+
+    def _load(self, document_ids):
+        rows = list(
+            self._chunks().filter(document_id__in=document_ids).values_list('id', 'document_id', 'embedding')
+        )
+        return [(chunk_id, str(doc_id), bytes(blob)) for chunk_id, doc_id, blob in rows]
+
+    def _apply(self, remove, add):
+        rows = self._load(list(add)) if add else []
+
+        with self._lock:
+            ids, doc_codes, matrix = self.ids, self.doc_codes, self.matrix
+            assignments = self.assignments
+
+            removed_codes = [self._codes[doc] for doc in remove if doc in self._codes]
+            if removed_codes and len(ids):
+                keep = ~np.isin(doc_codes, removed_codes)
+                ids, doc_codes, matrix = ids[keep], doc_codes[keep], matrix[keep]
+                if assignments is not None:
+                    assignments = assignments[keep]
+            for doc in remove:
+                self.documents.pop(doc, None)
+                self.skipped.pop(doc, None)
+
+            dimensions = self.dimensions if len(ids) else None
+            new_ids, new_codes, blobs = [], [], []
+            for chunk_id, doc_id, blob in rows:
+                width = len(blob) // VECTOR_DTYPE.itemsize
+                if dimensions is None:
+                    dimensions = width
+                if width != dimensions:
+                    self.skipped[doc_id] = add[doc_id]
+                    continue
+                code = self._codes.setdefault(doc_id, len(self._codes))
+                new_ids.append(chunk_id)
+                new_codes.append(code)
+                blobs.append(blob)
+            for doc_id, signature in add.items():
+                if doc_id not in self.skipped:
+                    self.documents[doc_id] = signature
+            if self.skipped:
+                logger.warning(f"User {self.user_id}: {len(self.skipped)} documents skipped (embedding size mismatch)")
+
+            if blobs:
+                new_matrix = np.frombuffer(b''.join(blobs), dtype=VECTOR_DTYPE).reshape(len(blobs), dimensions)
+                matrix = np.vstack([matrix, new_matrix]) if len(ids) else new_matrix.copy()
+                ids = np.concatenate([ids, np.asarray(new_ids, dtype=np.int64)])
+                doc_codes = np.concatenate([doc_codes, np.asarray(new_codes, dtype=np.int32)])
+                if assignments is not None:
+                    assignments = np.concatenate([assignments, self._assign(self.centroids, new_matrix)])
+
+            self.ids, self.doc_codes, self.matrix = ids, doc_codes, matrix
+            self.assignments = assignments
+            self.dimensions = dimensions
+            self._maybe_retrain()
+
+    # ------------------------------------------------------------------
+    # IVF
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _assign(centroids, vectors):
+        return np.argmax(vectors @ centroids.T, axis=1).astype(np.int32)
+
+    def _maybe_retrain(self):
+        # Caller holds self._lock
+        rows = len(self.ids)
+        if rows < self.config['IVF_MIN_ROWS']:
+            self.centroids, self.assignments, self.trained_rows = None, None, 0
+            return
+        if self.centroids is not None and self.trained_rows / 2 <= rows <= self.trained_rows * 2:
+            return
+
+        nlist = int(min(1024, max(1, np.sqrt(rows))))
+        rng = np.random.default_rng(0)
+        sample_size = min(rows, nlist * KMEANS_SAMPLE_PER_LIST)
+        sample = self.matrix[rng.choice(rows, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            labels = self._assign(centroids, sample)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            filled = norms[:, 0] > 0
+            centroids[filled] = sums[filled] / norms[filled]
+
+        self.centroids = centroids
+        self.assignments = self._assign(centroids, self.matrix)
+        self.trained_rows = rows
+        logger.info(f"Trained IVF index for user {self.user_id}: {rows} chunks, {nlist} lists")
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def search(self, query, k, document_ids=None):
+        """Return [(chunk_id, score)] for the ``k`` best chunks."""
+        with self._lock:
+            ids, doc_codes, matrix = self.ids, self.doc_codes, self.matrix
+            centroids, assignments = self.centroids, self.assignments
+            codes = self._codes
+
+        if not len(ids) or k <= 0:
+            return []
+        if query.shape[0] != matrix.shape[1]:
+            logger.warning(f"Query embedding size {query.shape[0]} does not match library index ({matrix.shape[1]})")
+            return []
+
+        if document_ids is not None:
+            # Restricted searches are exact over the selected documents
+            wanted = [codes[str(doc)] for doc in document_ids if str(doc) in codes]
+            candidates = np.flatnonzero(np.isin(doc_codes, wanted))
+        elif centroids is not None:
+            nprobe = min(self.config['IVF_NPROBE'], len(centroids))
+            closeness = centroids @ query
+            probes = np.argpartition(-closeness, nprobe - 1)[:nprobe]
+            candidates = np.flatnonzero(np.isin(assignments, probes))
+        else:
+            candidates = None
+
+        if candidates is not None:
+            if not len(candidates):
+                return []
+            scores = matrix[candidates] @ query
+        else:
+            scores = matrix @ query
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        rows = candidates[top] if candidates is not None else top
+        return [(int(ids[row]), float(scores[i])) for row, i in zip(rows, top)]
+
+
+class LibraryIndex:
+    """Process-wide collection of per-user indexes (LRU-bounded)."""
+
+    def __init__(self, config=None):
+        self.config = config or get_vector_store_config()
+        self._lock = threading.Lock()
+        self._indexes = OrderedDict()
+        self.metrics = RetrievalMetrics(self.config['LATENCY_SAMPLES'])
+
+    def _index(self, user_id, create=True):
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                if not create:
+                    return None
+                index = UserLibraryIndex(user_id, self.config)
+                self._indexes[user_id] = index
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.config['LIBRARY_MAX_USERS']:
+                self._indexes.popitem(last=False)
+            return index
+
+    def add_document(self, document):
+        """Incrementally (re)index a processed document if its owner's index is loaded."""
+        index = self._index(document.user_id, create=False)
+        if index is not None:
+            index.add_document(document.id)
+
+    def remove_document(self, document):
+        index = self._index(document.user_id, create=False)
+        if index is not None:
+            index.remove_document(document.id)
+
+    def search(self, user_id, query_vector, k=5, document_ids=None):
+        """
+        Return up to ``k`` of the user's chunks closest to ``query_vector`` as
+        dicts with document_id, document_title, chunk_index, content and score.
+        """
+        from ..models import DocumentChunk
+
+        start = time.perf_counter()
+        try:
+            index = self._index(user_id)
+            index.sync()
+            hits = index.search(normalize_vector(query_vector), k, document_ids)
+            chunks = DocumentChunk.objects.select_related('document').only(
+                'id', 'chunk_index', 'content', 'document__id', 'document__title'
+            ).in_bulk([chunk_id for chunk_id, _ in hits])
+
+            results = []
+            for chunk_id, score in hits:
+                chunk = chunks.get(chunk_id)
+                if chunk is None:
+                    continue
+                results.append({
+                    'document_id': str(chunk.document.id),
+                    'document_title': chunk.document.title,
+                    'chunk_index': chunk.chunk_index,
+                    'content': chunk.content,
+                    'score': score,
+                })
+            return results
+        finally:
+            self.metrics.record(time.perf_counter() - start)
+
+    def stats(self):
+        with self._lock:
+            users = len(self._indexes)
+        return {'backend': 'library_ivf', 'users': users, **self.metrics.snapshot()}
+
+
+_library_index = None
+_library_index_lock = threading.Lock()
+
+
+def get_library_index():
+    """Return the process-wide per-user library index."""
+    global _library_index
+    if _library_index is None:
+        with _library_index_lock:
+            if _library_index is None:
+                _library_index = LibraryIndex()
+    return _library_index
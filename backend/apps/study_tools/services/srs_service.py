@@ -1,7 +1,7 @@
 from datetime import timedelta
 from django.utils import timezone
 from apps.study_tools.models import Flashcard, FlashcardReviewLog
-from apps.questions.models import QuestionAttempt
+from apps.questions.models import Answer, QuestionAttempt
 
 class SRSService:
     """
@@ -68,27 +68,63 @@ class SRSService:
         if question_attempt.is_correct:
             return None
 
-        question = question_attempt.question
-        
-        # Check if a flashcard for this question already exists for this user
-        # (We can use a hash of the content or the question ID in metadata if we had it)
-        # For now, let's just create it if it's a new mistake session
-        
-        front = question.content
-        
-        # Collect correct answers for the back of the card
-        correct_answers = question.answers.filter(is_correct=True)
-        back = "Correct Answer(s):\n" + "\n".join([f"- {a.content}" for a in correct_answers])
-        
-        if question.guidance:
-            back += f"\n\nExplanation:\n{question.guidance}"
-            
-        flashcard = Flashcard.objects.create(
-            user=user,
-            subject=question.subject,
-            topic=question.topic,
-            front=front,
-            back=back,
-            source_type='exam_mistake'
-        )
-        return flashcard
+        cards = SRSService.generate_from_mistakes(user, [question_attempt.question])
+        return cards[0] if cards else None
+
+    @staticmethod
+    def generate_from_mistakes(user, questions):
+        """
+        Creates one flashcard per missed question that the user has no card for yet.
+
+        ``questions`` are Question rows or entries of an exam answer key
+        (apps.exams.services.answer_key), which already carry every correct
+        answer text, so no per-question answer lookup is needed. Existing
+        cards are found with one query on (user, question) and new ones are
+        written with a single bulk_create. Returns the saved flashcards of
+        the questions that had none, re-read so they carry primary keys.
+        """
+        questions = list({q.id: q for q in questions}.values())
+        if not questions:
+            return []
+
+        existing = set(Flashcard.objects.filter(
+            user=user, question_id__in=[q.id for q in questions]
+        ).values_list('question_id', flat=True))
+        fresh = [q for q in questions if q.id not in existing]
+        if not fresh:
+            return []
+
+        # Correct answers: from the answer key when given, else one query for all
+        correct = {}
+        for q in fresh:
+            texts = getattr(q, 'correct_answer_texts', None)
+            if not texts and getattr(q, 'correct_answer_text', None):
+                texts = [q.correct_answer_text]
+            if texts:
+                correct[q.id] = list(texts)
+        lookup = [q.id for q in fresh if q.id not in correct]
+        if lookup:
+            for question_id, content in Answer.objects.filter(
+                question_id__in=lookup, is_correct=True
+            ).values_list('question_id', 'content'):
+                correct.setdefault(question_id, []).append(content)
+
+        cards = []
+        for q in fresh:
+            back = "Correct Answer(s):\n" + "\n".join([f"- {a}" for a in correct.get(q.id, [])])
+            if q.guidance:
+                back += f"\n\nExplanation:\n{q.guidance}"
+            cards.append(Flashcard(
+                user=user,
+                question_id=q.id,
+                subject_id=q.subject_id,
+                topic_id=q.topic_id,
+                front=q.content,
+                back=back,
+                source_type='exam_mistake'
+            ))
+
+        # ignore_conflicts covers a concurrent grader creating the same card,
+        # but leaves the instances without primary keys
+        Flashcard.objects.bulk_create(cards, ignore_conflicts=True)
+        return list(Flashcard.objects.filter(user=user, question_id__in=[q.id for q in fresh]))
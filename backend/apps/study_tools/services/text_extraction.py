@@ -0,0 +1,73 @@
+"""
+Streaming text extraction for uploaded documents.
+
+Extractors are generators of ``(page_number, text, seconds)`` so the chunker
+can consume a document page by page instead of waiting for (and holding) the
+whole text. Large PDFs are fanned out across a process pool in contiguous
+page ranges; pages are still yielded in order. Text files have no pages and
+are yielded in ~64KB segments with ``page_number`` set to None.
+"""
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from pypdf import PdfReader
+
+logger = logging.getLogger(__name__)
+
+TEXT_SEGMENT_CHARS = 64 * 1024
+
+
+def _extract_page_range(file_path, start, stop):
+    """Worker: extract pages [start, stop) of a PDF. Runs in a child process."""
+    reader = PdfReader(file_path)
+    pages = []
+    for index in range(start, stop):
+        started = time.perf_counter()
+        text = reader.pages[index].extract_text() or ""
+        pages.append((index + 1, text, time.perf_counter() - started))
+    return pages
+
+
+def _can_fork_workers():
+    # Daemonic processes (e.g. daemonized Django-Q workers) may not have children
+    return not multiprocessing.current_process().daemon
+
+
+def iter_pdf_pages(file_path, workers=1, parallel_min_pages=40, pages_per_task=16):
+    """Yield ``(page_number, text, seconds)`` for every page of a PDF, in order."""
+    reader = PdfReader(file_path)
+    page_count = len(reader.pages)
+
+    if workers > 1 and page_count >= parallel_min_pages and _can_fork_workers():
+        del reader
+        ranges = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+        logger.info(f"Extracting {page_count} pages from {os.path.basename(file_path)} with {workers} processes")
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+            # map() yields results in submission order, one page range at a time
+            for pages in executor.map(
+                _extract_page_range,
+                [file_path] * len(ranges),
+                [start for start, _ in ranges],
+                [stop for _, stop in ranges],
+            ):
+                yield from pages
+        return
+
+    for index, page in enumerate(reader.pages):
+        started = time.perf_counter()
+        text = page.extract_text() or ""
+        yield index + 1, text, time.perf_counter() - started
+
+
+def iter_text_segments(file_path, segment_chars=TEXT_SEGMENT_CHARS):
+    """Yield ``(None, text, seconds)`` segments of a plain-text/markdown file."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        while True:
+            started = time.perf_counter()
+            lines = f.readlines(segment_chars)
+            if not lines:
+                return
+            yield None, "".join(lines), time.perf_counter() - started
@@ -0,0 +1,323 @@
+"""
+Vector storage and top-k retrieval for DocumentChunk embeddings.
+
+Embeddings are stored as L2-normalised little-endian float32 blobs, so cosine
+similarity is a plain dot product. The default NumPy store keeps one
+contiguous matrix per document in an in-process LRU and answers a query with
+a single matmul + argpartition. On PostgreSQL with the ``vector`` extension,
+VECTOR_STORE['BACKEND'] = 'pgvector' pushes the ranking into the database
+(a ``vector(DIMENSIONS)`` column with an HNSW index, see migration 0003).
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Max
+
+logger = logging.getLogger(__name__)
+
+VECTOR_DTYPE = np.dtype('<f4')
+
+DEFAULTS = {
+    'BACKEND': 'numpy',
+    'CACHE_DOCUMENTS': 64,
+    # Width of the pgvector column created by migration 0003 (PGVECTOR_DIMENSIONS)
+    'DIMENSIONS': 1024,
+    # HNSW candidate list; larger keeps per-document filtered queries from coming back short
+    'PGVECTOR_EF_SEARCH': 200,
+    'LATENCY_SAMPLES': 500,
+    # Per-user library index (see library_index.py)
+    'IVF_MIN_ROWS': 2000,
+    'IVF_NPROBE': 8,
+    'LIBRARY_SYNC_SECONDS': 5,
+    'LIBRARY_MAX_USERS': 256,
+}
+
+
+def get_vector_store_config():
+    return {**DEFAULTS, **getattr(settings, 'VECTOR_STORE', {})}
+
+
+def pgvector_available(db=connection):
+    """Whether the database has the embedding_pgvector column (PostgreSQL with pgvector)."""
+    if db.vendor != 'postgresql':
+        return False
+    from ..models import DocumentChunk
+
+    table = DocumentChunk._meta.db_table
+    with db.cursor() as cursor:
+        columns = db.introspection.get_table_description(cursor, table)
+    return any(column.name == PgVectorStore.column for column in columns)
+
+
+def normalize_vector(values):
+    """Return ``values`` as a unit-length float32 array (zero vectors stay zero)."""
+    vector = np.asarray(values, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector = vector / norm
+    return vector.astype(VECTOR_DTYPE, copy=False)
+
+
+def encode_vector(values):
+    """Serialise an embedding for DocumentChunk.embedding."""
+    return normalize_vector(values).tobytes()
+
+
+def decode_vector(blob):
+    return np.frombuffer(bytes(blob), dtype=VECTOR_DTYPE)
+
+
+class RetrievalMetrics:
+    """Rolling retrieval latency samples, per backend."""
+
+    def __init__(self, maxlen):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=maxlen)
+        self._count = 0
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self._count += 1
+
+    def snapshot(self):
+        with self._lock:
+            samples = np.array(self._samples, dtype=np.float64)
+            count = self._count
+        if not len(samples):
+            return {'count': count, 'p50_ms': None, 'p95_ms': None, 'max_ms': None}
+        return {
+            'count': count,
+            'p50_ms': round(float(np.percentile(samples, 50)) * 1000, 2),
+            'p95_ms': round(float(np.percentile(samples, 95)) * 1000, 2),
+            'max_ms': round(float(samples.max()) * 1000, 2),
+        }
+
+
+class BaseVectorStore:
+    """Interface shared by the retrieval backends."""
+
+    name = 'base'
+
+    def __init__(self, config=None):
+        self.config = config or get_vector_store_config()
+        self.metrics = RetrievalMetrics(self.config['LATENCY_SAMPLES'])
+
+    def index_document(self, document_id):
+        """Called once a document's chunks have been (re)written."""
+
+    def remove_document(self, document_id):
+        """Called when a document's chunks are deleted."""
+
+    def search(self, document_id, query_vector, k=3):
+        """
+        Return up to ``k`` chunks of ``document_id`` most similar to
+        ``query_vector`` as dicts with id, chunk_index, content and score.
+        """
+        start = time.perf_counter()
+        try:
+            return self._search(document_id, normalize_vector(query_vector), k)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.metrics.record(elapsed)
+            logger.debug(f"{self.name} retrieval for document {document_id} took {elapsed * 1000:.1f}ms")
+
+    def _search(self, document_id, query, k):
+        raise NotImplementedError
+
+    def stats(self):
+        return {'backend': self.name, **self.metrics.snapshot()}
+
+
+class NumpyVectorStore(BaseVectorStore):
+    """
+    Exact cosine search over a cached per-document float32 matrix.
+
+    A cached matrix is validated against the document's (chunk count, max
+    chunk id) on every query, so re-processing in another worker process is
+    picked up without any shared invalidation channel.
+    """
+
+    name = 'numpy'
+
+    def __init__(self, config=None):
+        super().__init__(config)
+        self._lock = threading.Lock()
+        self._matrices = OrderedDict()
+
+    def _chunks(self, document_id):
+        from ..models import DocumentChunk
+        return DocumentChunk.objects.filter(document_id=document_id, embedding__isnull=False)
+
+    def _signature(self, document_id):
+        stats = self._chunks(document_id).aggregate(count=Count('id'), last=Max('id'))
+        return stats['count'], stats['last']
+
+    def _load(self, document_id):
+        rows = list(self._chunks(document_id).order_by('chunk_index').values_list('id', 'embedding'))
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=VECTOR_DTYPE)
+
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        blobs = [bytes(row[1]) for row in rows]
+        width = len(blobs[0])
+        if any(len(blob) != width for blob in blobs):
+            # Mixed embedding spaces; keep the dominant dimension only
+            widths = [len(blob) for blob in blobs]
+            width = max(set(widths), key=widths.count)
+            keep = [i for i, w in enumerate(widths) if w == width]
+            logger.warning(f"Document {document_id} has mixed embedding sizes; using {len(keep)}/{len(rows)} chunks")
+            ids = ids[keep]
+            blobs = [blobs[i] for i in keep]
+        matrix = np.frombuffer(b''.join(blobs), dtype=VECTOR_DTYPE).reshape(len(blobs), -1)
+        return ids, matrix
+
+    def _matrix(self, document_id):
+        key = str(document_id)
+        signature = self._signature(document_id)
+        with self._lock:
+            cached = self._matrices.get(key)
+            if cached is not None and cached[0] == signature:
+                self._matrices.move_to_end(key)
+                return cached[1], cached[2]
+
+        ids, matrix = self._load(document_id)
+        with self._lock:
+            self._matrices[key] = (signature, ids, matrix)
+            self._matrices.move_to_end(key)
+            while len(self._matrices) > self.config['CACHE_DOCUMENTS']:
+                self._matrices.popitem(last=False)
+        return ids, matrix
+
+    def index_document(self, document_id):
+        self.remove_document(document_id)
+
+    def remove_document(self, document_id):
+        with self._lock:
+            self._matrices.pop(str(document_id), None)
+
+    def _search(self, document_id, query, k):
+        from ..models import DocumentChunk
+
+        ids, matrix = self._matrix(document_id)
+        if not len(ids) or k <= 0:
+            return []
+        if matrix.shape[1] != query.shape[0]:
+            logger.warning(
+                f"Query embedding size {query.shape[0]} does not match document {document_id} ({matrix.shape[1]})"
+            )
+            return []
+
+        scores = matrix @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+
+        chunks = DocumentChunk.objects.only('id', 'chunk_index', 'content').in_bulk(ids[top].tolist())
+        results = []
+        for i in top:
+            chunk = chunks.get(int(ids[i]))
+            if chunk is None:
+                continue
+            results.append({
+                'id': chunk.id,
+                'chunk_index': chunk.chunk_index,
+                'content': chunk.content,
+                'score': float(scores[i]),
+            })
+        return results
+
+
+class PgVectorStore(BaseVectorStore):
+    """
+    Ranks chunks inside PostgreSQL using the pgvector ``<=>`` operator.
+
+    Uses the ``embedding_pgvector`` column and HNSW index added by the
+    study_tools migration when the database is PostgreSQL and the ``vector``
+    extension is available. Embeddings of another width than
+    VECTOR_STORE['DIMENSIONS'] are not indexed. Documents processed while
+    another backend was active are indexed with ``manage.py index_pgvector``.
+    """
+
+    name = 'pgvector'
+    column = 'embedding_pgvector'
+
+    def _table(self):
+        from ..models import DocumentChunk
+        return DocumentChunk._meta.db_table
+
+    @staticmethod
+    def _literal(vector):
+        return '[' + ','.join(repr(float(x)) for x in vector) + ']'
+
+    def index_document(self, document_id):
+        from ..models import DocumentChunk
+
+        rows = DocumentChunk.objects.filter(
+            document_id=document_id, embedding__isnull=False
+        ).values_list('id', 'embedding')
+        dimensions = self.config['DIMENSIONS']
+        params, skipped = [], 0
+        for chunk_id, blob in rows:
+            vector = decode_vector(blob)
+            if len(vector) != dimensions:
+                skipped += 1
+                continue
+            params.append((self._literal(vector), chunk_id))
+        if skipped:
+            logger.warning(f"Document {document_id}: {skipped} embeddings are not {dimensions}-d; not indexed")
+        if not params:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"UPDATE {self._table()} SET {self.column} = %s::vector WHERE id = %s",
+                params,
+            )
+
+    def _search(self, document_id, query, k):
+        if len(query) != self.config['DIMENSIONS']:
+            logger.warning(f"Query embedding size {len(query)} does not match pgvector column")
+            return []
+        literal = self._literal(query)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SET LOCAL hnsw.ef_search = %s", [int(self.config['PGVECTOR_EF_SEARCH'])])
+            cursor.execute(
+                f"SELECT id, chunk_index, content, 1 - ({self.column} <=> %s::vector) AS score "
+                f"FROM {self._table()} "
+                f"WHERE document_id = %s AND {self.column} IS NOT NULL "
+                f"ORDER BY {self.column} <=> %s::vector LIMIT %s",
+                [literal, str(document_id), literal, k],
+            )
+            return [
+                {'id': row[0], 'chunk_index': row[1], 'content': row[2], 'score': float(row[3])}
+                for row in cursor.fetchall()
+            ]
+
+
+BACKENDS = {
+    'numpy': NumpyVectorStore,
+    'pgvector': PgVectorStore,
+}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_vector_store():
+    """Return the process-wide vector store selected by VECTOR_STORE['BACKEND']."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = get_vector_store_config()
+                backend = config['BACKEND']
+                if backend == 'pgvector' and not pgvector_available():
+                    logger.warning("pgvector store requires PostgreSQL with the vector extension; falling back to numpy")
+                    backend = 'numpy'
+                _store = BACKENDS[backend](config)
+    return _store
@@ -0,0 +1,18 @@
+import logging
+
+from .services.document_pipeline import DocumentPipeline
+
+logger = logging.getLogger(__name__)
+
+
+def run_document_stage(document_id):
+    """
+    Django-Q entry point for one ingestion stage.
+    Enqueued by DocumentPipeline; each stage enqueues the next on success.
+    """
+    DocumentPipeline.run_stage(document_id)
+
+
+def resume_stalled_documents():
+    """Scheduled (see migration 0007): re-queue stalled documents and start queued ones."""
+    return DocumentPipeline.resume_stalled()
@@ -0,0 +1,43 @@
+from django.test import SimpleTestCase
+
+from ai_services.tokens import get_token_estimator
+from apps.study_tools.services.chunking import (
+    FixedChunker, HeadingChunker, SentenceChunker, detect_heading, split_sentences,
+)
+
+PAGES = [
+    (1, "PHOTOSYNTHESIS\n\nPlants convert light energy into chemical energy. The rate is 0.5 units per s.\n"
+        "Chlorophyll absorbs red and blue light.\n\n1.2 Light Reactions\n\nWater is split and oxygen is released."),
+    (2, "The Calvin cycle fixes carbon dioxide. " * 30),
+]
+
+
+class ChunkingTest(SimpleTestCase):
+    def test_sentence_split_keeps_decimals_and_abbreviations(self):
+        sentences = split_sentences("Dr. Ade measured 3.14 metres. It was e.g. Short. Done!")
+        self.assertEqual(sentences, ["Dr. Ade measured 3.14 metres.", "It was e.g. Short.", "Done!"])
+
+    def test_heading_detection(self):
+        self.assertEqual(detect_heading("## Cell Division"), "Cell Division")
+        self.assertEqual(detect_heading("1.2 Light Reactions"), "1.2 Light Reactions")
+        self.assertEqual(detect_heading("PHOTOSYNTHESIS"), "PHOTOSYNTHESIS")
+        self.assertIsNone(detect_heading("Plants convert light energy into chemical energy."))
+
+    def test_heading_chunks_carry_section_and_page(self):
+        chunks = list(HeadingChunker(max_tokens=60, overlap_tokens=0).chunk(PAGES))
+        self.assertEqual(chunks[0].section, "PHOTOSYNTHESIS")
+        self.assertEqual(chunks[0].page, 1)
+        self.assertTrue(chunks[1].text.startswith("1.2 Light Reactions"))
+        self.assertEqual(chunks[-1].page, 2)
+        # The Calvin cycle text on page 2 still belongs to the last heading
+        self.assertEqual(chunks[-1].section, "1.2 Light Reactions")
+
+    def test_token_budget_is_respected(self):
+        estimator = get_token_estimator()
+        for chunker in (SentenceChunker(max_tokens=40, overlap_tokens=10), HeadingChunker(max_tokens=40)):
+            chunks = list(chunker.chunk(PAGES))
+            self.assertTrue(all(estimator.count(chunk.text) <= 40 for chunk in chunks), chunker.name)
+
+    def test_fixed_chunker_tracks_pages(self):
+        chunks = list(FixedChunker().chunk([(1, "a " * 700), (2, "b " * 700)]))
+        self.assertEqual([chunk.page for chunk in chunks], [1, 1, 2, 2])
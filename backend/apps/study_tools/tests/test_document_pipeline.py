@@ -0,0 +1,113 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django_q.models import Schedule
+
+from apps.study_tools.models import Document
+from apps.study_tools.services.document_pipeline import DocumentPipeline
+from apps.study_tools.services.document_processor import DocumentProcessor
+
+
+class FakeRouter:
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def generate_embeddings(self, texts):
+        if self.fail:
+            raise Exception("All AI providers failed embedding generation")
+        return [[1.0, float(len(text))] for text in texts]
+
+
+@override_settings(DOCUMENT_PIPELINE={"GLOBAL_CONCURRENCY": 2, "PER_USER_CONCURRENCY": 1, "EMBED_CHUNKS_PER_PASS": 2})
+class DocumentPipelineTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="uploader@example.com", password="pass12345")
+        self.enqueued = []
+        patcher = mock.patch(
+            "apps.study_tools.services.document_pipeline.async_task",
+            side_effect=lambda func, document_id, **kwargs: self.enqueued.append(document_id),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _upload(self, text="word " * 500):
+        document = Document(user=self.user, title="Notes", file_type="txt")
+        document.file.save("notes.txt", ContentFile(text.encode()), save=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            document.save()
+        self.addCleanup(document.file.delete, save=False)
+        return document
+
+    def _drain(self, router):
+        with mock.patch("ai_services.router.get_ai_router", return_value=router):
+            while self.enqueued:
+                DocumentPipeline.run_stage(self.enqueued.pop(0))
+
+    def test_upload_runs_all_stages(self):
+        document = self._upload()
+        self._drain(FakeRouter())
+
+        document.refresh_from_db()
+        self.assertEqual(document.processing_status, "completed")
+        self.assertEqual(document.processing_stage, "done")
+        self.assertEqual(document.stage_progress["chunks_embedded"], document.stage_progress["chunks_total"])
+        self.assertFalse(document.chunks.filter(embedding__isnull=True).exists())
+
+    def test_per_user_concurrency_limit(self):
+        first = self._upload()
+        second = self._upload()
+        self.assertEqual(self.enqueued, [str(first.id)])
+        second.refresh_from_db()
+        self.assertEqual(second.processing_status, "queued")
+
+        self._drain(FakeRouter())
+        second.refresh_from_db()
+        self.assertEqual(second.processing_status, "completed")
+
+    def test_failed_embed_stage_resumes(self):
+        document = self._upload()
+        self._drain(FakeRouter(fail=True))
+        document.refresh_from_db()
+        self.assertEqual(document.processing_status, "failed")
+        self.assertEqual(document.processing_stage, "embed")
+        chunk_ids = set(document.chunks.values_list("id", flat=True))
+
+        DocumentPipeline.resume_stalled(include_failed=True)
+        self._drain(FakeRouter())
+        document.refresh_from_db()
+        self.assertEqual(document.processing_status, "completed")
+        # Chunks from the earlier run were kept, only embeddings were added
+        self.assertEqual(set(document.chunks.values_list("id", flat=True)), chunk_ids)
+
+    def test_chunk_stage_survives_lost_spool(self):
+        document = self._upload()
+        DocumentPipeline.run_stage(self.enqueued.pop(0))
+        document.refresh_from_db()
+        self.assertEqual(document.processing_stage, "chunk")
+        spool_name = DocumentProcessor._spool_name(document)
+        self.assertTrue(default_storage.exists(spool_name))
+
+        # Another worker, or a crash after the spool was discarded
+        default_storage.delete(spool_name)
+        self._drain(FakeRouter())
+        document.refresh_from_db()
+        self.assertEqual(document.processing_status, "completed")
+        self.assertTrue(document.content.startswith("word word"))
+        self.assertFalse(default_storage.exists(spool_name))
+
+    def test_stalled_document_is_picked_up_by_the_next_dispatch(self):
+        document = self._upload()
+        self.enqueued.clear()  # The stage task died with its worker
+        Document.objects.filter(id=document.id).update(stage_updated_at=timezone.now() - timedelta(hours=1))
+
+        DocumentPipeline.dispatch()
+        self.assertEqual(self.enqueued, [str(document.id)])
+        self._drain(FakeRouter())
+        document.refresh_from_db()
+        self.assertEqual(document.processing_status, "completed")
+        self.assertTrue(Schedule.objects.filter(func="apps.study_tools.tasks.resume_stalled_documents").exists())
@@ -0,0 +1,60 @@
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from apps.study_tools.models import Document, DocumentChunk
+from apps.study_tools.services.library_index import LibraryIndex
+from apps.study_tools.services.vector_store import encode_vector, get_vector_store_config
+
+
+class LibraryIndexTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="library@example.com", password="pass12345")
+        self.rng = np.random.default_rng(7)
+        self.documents = Document.objects.bulk_create([
+            Document(user=self.user, title=f"Doc {i}", file=f"doc{i}.txt", file_type="txt") for i in range(3)
+        ])
+        for document in self.documents:
+            self._add_chunks(document, 40)
+        config = {**get_vector_store_config(), "IVF_MIN_ROWS": 50, "IVF_NPROBE": 4, "LIBRARY_SYNC_SECONDS": 0}
+        self.index = LibraryIndex(config)
+
+    def _add_chunks(self, document, count, start=0):
+        DocumentChunk.objects.bulk_create([
+            DocumentChunk(
+                document=document, chunk_index=start + i, content=f"{document.title} #{start + i}",
+                embedding=encode_vector(self.rng.normal(size=16)),
+            )
+            for i in range(count)
+        ])
+
+    def _vector(self, document, chunk_index):
+        chunk = DocumentChunk.objects.get(document=document, chunk_index=chunk_index)
+        return np.frombuffer(chunk.embedding, dtype="<f4")
+
+    def test_finds_exact_chunk_across_documents(self):
+        query = self._vector(self.documents[1], 5)
+        [best] = self.index.search(self.user.id, query, k=1)
+        self.assertEqual(best["document_title"], "Doc 1")
+        self.assertEqual(best["chunk_index"], 5)
+        self.assertIsNotNone(self.index._index(self.user.id).centroids)
+
+    def test_restricted_to_documents(self):
+        query = self._vector(self.documents[1], 5)
+        results = self.index.search(self.user.id, query, k=3, document_ids=[self.documents[2].id])
+        self.assertEqual({r["document_title"] for r in results}, {"Doc 2"})
+
+    def test_incremental_add_and_remove(self):
+        self.index.search(self.user.id, self._vector(self.documents[0], 0), k=1)
+        [extra] = Document.objects.bulk_create([
+            Document(user=self.user, title="Extra", file="extra.txt", file_type="txt")
+        ])
+        self._add_chunks(extra, 5)
+        self.index.add_document(extra)
+        self.assertEqual(self.index.search(self.user.id, self._vector(extra, 3), k=1)[0]["document_title"], "Extra")
+
+        self.documents[0].delete()
+        user_index = self.index._index(self.user.id)
+        user_index.sync()
+        self.assertEqual(len(user_index.ids), 85)
+        self.assertNotIn(str(self.documents[0].id), user_index.documents)
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from apps.content.models import Subject
+from apps.exams.models import MockExam, MockExamQuestion
+from apps.exams.services.answer_key import ExamAnswerKey
+from apps.exams.services.exam_generator import get_past_exam_type
+from apps.questions.models import Answer, Question
+from apps.study_tools.models import Flashcard
+from apps.study_tools.services.srs_service import SRSService
+
+
+class GenerateFromMistakesTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="srs@example.com", password="pass12345")
+        self.subject = Subject.objects.create(name="Chemistry", category="STEM", description="Chemistry")
+        self.questions = []
+        for i in range(30):
+            q = Question.objects.create(subject=self.subject, content=f"Element {i}?", guidance="Periodic table")
+            Answer.objects.create(question=q, content=f"Symbol {i}", is_correct=True)
+            Answer.objects.create(question=q, content="Wrong", is_correct=False)
+            self.questions.append(q)
+
+    def test_one_bulk_insert_and_no_duplicates(self):
+        with self.assertNumQueries(4):
+            cards = SRSService.generate_from_mistakes(self.user, self.questions + self.questions[:5])
+        self.assertEqual(len(cards), 30)
+        self.assertTrue(all(card.pk for card in cards))
+        card = Flashcard.objects.get(user=self.user, question=self.questions[3])
+        self.assertEqual(card.back, "Correct Answer(s):\n- Symbol 3\n\nExplanation:\nPeriodic table")
+        self.assertEqual(card.source_type, "exam_mistake")
+
+        # Missing the same questions again adds nothing
+        with self.assertNumQueries(1):
+            self.assertEqual(SRSService.generate_from_mistakes(self.user, self.questions[:10]), [])
+        attempt = SimpleNamespace(is_correct=False, question=self.questions[0])
+        self.assertIsNone(SRSService.auto_generate_from_mistake(self.user, attempt))
+        self.assertEqual(Flashcard.objects.filter(user=self.user).count(), 30)
+
+        extra = Question.objects.create(subject=self.subject, content="Noble gas?")
+        Answer.objects.create(question=extra, content="Neon", is_correct=True)
+        card = SRSService.auto_generate_from_mistake(self.user, SimpleNamespace(is_correct=False, question=extra))
+        self.assertEqual(card, Flashcard.objects.get(user=self.user, question=extra))
+
+    def test_answer_key_entries_skip_the_answer_lookup(self):
+        q = self.questions[0]
+        keyed = SimpleNamespace(
+            id=q.id, content=q.content, guidance="", subject_id=self.subject.id, topic_id=None,
+            correct_answer_text="Symbol 0",
+        )
+        with self.assertNumQueries(3):
+            SRSService.generate_from_mistakes(self.user, [keyed])
+        self.assertEqual(Flashcard.objects.get(question=q).back, "Correct Answer(s):\n- Symbol 0")
+
+    def test_answer_key_carries_every_correct_answer(self):
+        q = self.questions[1]
+        Answer.objects.create(question=q, content="Also right", is_correct=True)
+        exam = MockExam.objects.create(title="Chem", exam_type=get_past_exam_type("JAMB"), subject=self.subject)
+        MockExamQuestion.objects.create(mock_exam=exam, question=q, order=1)
+
+        [keyed] = ExamAnswerKey.load(exam.id)
+        self.assertEqual(keyed.correct_answer_texts, ("Symbol 1", "Also right"))
+        [card] = SRSService.generate_from_mistakes(self.user, [keyed])
+        self.assertEqual(card.back, "Correct Answer(s):\n- Symbol 1\n- Also right\n\nExplanation:\nPeriodic table")
@@ -0,0 +1,71 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from apps.study_tools.services.chunking import FixedChunker
+from apps.study_tools.services.text_extraction import iter_pdf_pages, iter_text_segments
+
+
+def write_pdf(path, page_texts):
+    """Write a minimal PDF with one line of Helvetica text per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    body, offsets = b"%PDF-1.4\n", []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{obj}\nendobj\n".encode()
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    body += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(body)
+
+
+class TextExtractionTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_parallel_pdf_extraction_preserves_page_order(self):
+        path = os.path.join(self.tmp.name, "book.pdf")
+        write_pdf(path, [f"Page number {i}" for i in range(1, 10)])
+
+        sequential = [(page, text) for page, text, _ in iter_pdf_pages(path)]
+        parallel = [(page, text) for page, text, _ in iter_pdf_pages(path, workers=2, parallel_min_pages=2, pages_per_task=2)]
+
+        self.assertEqual(sequential, parallel)
+        self.assertEqual([page for page, _ in parallel], list(range(1, 10)))
+        self.assertIn("Page number 7", parallel[6][1])
+
+    def test_text_segments_cover_file(self):
+        path = os.path.join(self.tmp.name, "notes.txt")
+        content = "".join(f"line {i}\n" for i in range(5000))
+        with open(path, "w") as f:
+            f.write(content)
+        segments = list(iter_text_segments(path, segment_chars=4096))
+        self.assertGreater(len(segments), 1)
+        self.assertEqual("".join(text for _, text, _ in segments), content)
+
+    def test_streaming_chunks_overlap_and_cover_text(self):
+        text = " ".join(f"word{i}" for i in range(2000))
+        pieces = [text[i:i + 700] for i in range(0, len(text), 700)]
+        chunks = [chunk.text for chunk in FixedChunker().chunk((None, piece) for piece in pieces)]
+
+        self.assertTrue(all(len(chunk) <= 1000 for chunk in chunks))
+        self.assertEqual(chunks[0], text[:len(chunks[0])])
+        self.assertTrue(text.endswith(chunks[-1]))
+        for previous, current in zip(chunks, chunks[1:]):
+            self.assertEqual(previous[-100:], current[:100])
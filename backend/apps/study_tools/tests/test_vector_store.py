@@ -0,0 +1,59 @@
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from apps.study_tools.models import Document, DocumentChunk
+from apps.study_tools.services import vector_store
+from apps.study_tools.services.vector_store import NumpyVectorStore, decode_vector, encode_vector
+
+
+class NumpyVectorStoreTest(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(email="reader@example.com", password="pass12345")
+        # bulk_create skips the post_save processing signal
+        [self.document] = Document.objects.bulk_create([
+            Document(user=user, title="Cells", file="cells.txt", file_type="txt")
+        ])
+        vectors = [[1, 0, 0], [0, 1, 0], [0.9, 0.1, 0], [0, 0, 1]]
+        DocumentChunk.objects.bulk_create([
+            DocumentChunk(document=self.document, chunk_index=i, content=f"chunk {i}", embedding=encode_vector(v))
+            for i, v in enumerate(vectors)
+        ])
+        self.store = NumpyVectorStore()
+
+    def test_vectors_are_normalised_float32(self):
+        vector = decode_vector(encode_vector([3, 4]))
+        self.assertEqual(vector.dtype, np.float32)
+        np.testing.assert_allclose(vector, [0.6, 0.8], rtol=1e-6)
+
+    def test_top_k_is_ordered_by_similarity(self):
+        results = self.store.search(self.document.id, [2, 0, 0], k=2)
+        self.assertEqual([r["chunk_index"] for r in results], [0, 2])
+        self.assertAlmostEqual(results[0]["score"], 1.0, places=5)
+        self.assertEqual(self.store.stats()["count"], 1)
+
+    def test_reprocessed_document_is_reloaded(self):
+        self.store.search(self.document.id, [1, 0, 0], k=1)
+        DocumentChunk.objects.create(
+            document=self.document, chunk_index=4, content="new", embedding=encode_vector([0, -1, 5])
+        )
+        self.assertEqual(self.store.search(self.document.id, [0, -1, 5], k=1)[0]["content"], "new")
+
+    def test_dimension_mismatch_returns_nothing(self):
+        self.assertEqual(self.store.search(self.document.id, [1, 0], k=2), [])
+
+
+class GetVectorStoreTest(TestCase):
+    def setUp(self):
+        vector_store._store = None
+        self.addCleanup(setattr, vector_store, "_store", None)
+
+    @override_settings(VECTOR_STORE={"BACKEND": "pgvector"})
+    def test_pgvector_without_the_column_falls_back_to_numpy(self):
+        self.assertFalse(vector_store.pgvector_available())
+        self.assertIsInstance(vector_store.get_vector_store(), NumpyVectorStore)
+
+    def test_index_pgvector_requires_the_column(self):
+        with self.assertRaises(CommandError):
+            call_command("index_pgvector")
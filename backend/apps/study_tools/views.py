@@ -1,14 +1,17 @@
 from rest_framework import viewsets, status, filters
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.utils import timezone
 from .models import Document, Flashcard
 from .serializers import (
     FlashcardSerializer, FlashcardReviewSerializer, 
-    FlashcardSummarySerializer, DocumentSerializer
+    FlashcardSummarySerializer, DocumentSerializer, DocumentSearchSerializer
 )
 from .services.srs_service import SRSService
+from .services.document_pipeline import DocumentPipeline
+from .services.library_index import get_library_index
+from .services.vector_store import get_vector_store
 
 class DocumentViewSet(viewsets.ModelViewSet):
     """
@@ -23,6 +26,54 @@ class DocumentViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=True, methods=['post'])
+    def reprocess(self, request, pk=None):
+        """
+        Re-queue a failed document; it resumes from the stage that failed.
+        """
+        document = self.get_object()
+        if document.processing_status != 'failed':
+            return Response({"error": "Only failed documents can be reprocessed"}, status=status.HTTP_400_BAD_REQUEST)
+        DocumentPipeline.enqueue_document(document.id)
+        document.refresh_from_db()
+        return Response(self.get_serializer(document).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Semantic search across all of the user's processed documents.
+        Query params: q, k (default 5), document_ids (comma-separated, optional).
+        """
+        params = request.query_params.dict()
+        if params.get('document_ids'):
+            params['document_ids'] = [d for d in params['document_ids'].split(',') if d]
+        else:
+            params.pop('document_ids', None)
+        serializer = DocumentSearchSerializer(data=params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        from ai_services.router import get_ai_router
+        try:
+            query_embedding = get_ai_router().generate_embedding(data['q'])
+        except Exception as e:
+            return Response({"error": f"Search is unavailable: {e}"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        results = get_library_index().search(
+            request.user.id, query_embedding, k=data['k'], document_ids=data.get('document_ids')
+        )
+        return Response({'query': data['q'], 'results': results})
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser], url_path='retrieval-metrics')
+    def retrieval_metrics(self, request):
+        """
+        Chunk retrieval latency (p50/p95) for this process's vector store and library index.
+        """
+        return Response({
+            'document': get_vector_store().stats(),
+            'library': get_library_index().stats(),
+        })
+
 class FlashcardViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing user flashcards and SRS reviews.
@@ -312,11 +312,101 @@ MISTRAL_MODEL = os.getenv("MISTRAL_MODEL", "")
 MISTRAL_BASE_URL = os.getenv("MISTRAL_BASE_URL", "https://api.mistral.ai/v1")
 MISTRAL_TIMEOUT = int(os.getenv("MISTRAL_TIMEOUT", 60))
 
+# LLM response cache (ai_services/cache.py): local LRU in front of CACHES["default"]
+AI_CACHE = {
+    "ENABLED": os.getenv("AI_CACHE_ENABLED", "True") == "True",
+    "LOCAL_MAXSIZE": int(os.getenv("AI_CACHE_LOCAL_MAXSIZE", 512)),
+    "NEGATIVE_TTL": int(os.getenv("AI_CACHE_NEGATIVE_TTL", 30)),
+    "TTLS": {
+        "generate_questions": int(os.getenv("AI_CACHE_TTL_QUESTIONS", 60 * 60 * 24)),
+        "generate_topics": int(os.getenv("AI_CACHE_TTL_TOPICS", 60 * 60 * 24 * 7)),
+        "generate_study_plan": int(os.getenv("AI_CACHE_TTL_STUDY_PLAN", 60 * 60 * 6)),
+        "grade_theory": int(os.getenv("AI_CACHE_TTL_GRADING", 60 * 60 * 24 * 30)),
+    },
+}
+
+# Provider circuit breakers and hedged requests (ai_services/circuit_breaker.py).
+# Breaker state is shared across workers through CACHES["default"].
+AI_ROUTER = {
+    "HEDGING": os.getenv("AI_ROUTER_HEDGING", "False") == "True",
+    "HEDGE_MAX_WORKERS": int(os.getenv("AI_ROUTER_HEDGE_MAX_WORKERS", 8)),
+    "HEDGE_MIN_DELAY": float(os.getenv("AI_ROUTER_HEDGE_MIN_DELAY", 0.5)),
+    "HEDGE_MAX_DELAY": float(os.getenv("AI_ROUTER_HEDGE_MAX_DELAY", 10)),
+    "ERROR_RATE_THRESHOLD": float(os.getenv("AI_BREAKER_ERROR_RATE", 0.5)),
+    "MIN_REQUESTS": int(os.getenv("AI_BREAKER_MIN_REQUESTS", 5)),
+    "CONSECUTIVE_FAILURES": int(os.getenv("AI_BREAKER_CONSECUTIVE_FAILURES", 3)),
+    "WINDOW_SECONDS": int(os.getenv("AI_BREAKER_WINDOW_SECONDS", 60)),
+    "COOLDOWN_SECONDS": int(os.getenv("AI_BREAKER_COOLDOWN_SECONDS", 30)),
+    # After the cooldown a single probe call decides whether the breaker closes
+    "PROBE_TIMEOUT_SECONDS": int(os.getenv("AI_BREAKER_PROBE_TIMEOUT_SECONDS", 30)),
+    "SLOW_CALL_SECONDS": float(os.getenv("AI_BREAKER_SLOW_CALL_SECONDS", 20)),
+}
+
+# Batched embeddings for document ingestion (AIRouter.generate_embeddings)
+AI_EMBEDDINGS = {
+    "EMBEDDING_CONCURRENCY": int(os.getenv("AI_EMBEDDING_CONCURRENCY", 4)),
+    "EMBEDDING_RETRIES": int(os.getenv("AI_EMBEDDING_RETRIES", 2)),
+    "EMBEDDING_RETRY_BACKOFF": float(os.getenv("AI_EMBEDDING_RETRY_BACKOFF", 1.0)),
+    "EMBEDDING_QUOTA_WAIT": float(os.getenv("AI_EMBEDDING_QUOTA_WAIT", 30)),
+}
+
+# Shared provider connection pools (ai_services/registry.py).
+# HTTP/2 is used only if `h2` is installed.
+AI_HTTP = {
+    "HTTP2": os.getenv("AI_HTTP2", "True") == "True",
+    "HTTP_MAX_CONNECTIONS": int(os.getenv("AI_HTTP_MAX_CONNECTIONS", 100)),
+    "HTTP_MAX_KEEPALIVE": int(os.getenv("AI_HTTP_MAX_KEEPALIVE", 20)),
+    "HTTP_KEEPALIVE_EXPIRY": float(os.getenv("AI_HTTP_KEEPALIVE_EXPIRY", 60)),
+}
+
+# Shared rate limiter (ai_services/rate_limiter.py): atomic Lua scripts on Redis.
+# Used for chat messages, the ai_generation throttle and outbound provider quotas.
+AI_RATE_LIMIT = {
+    "BACKEND": os.getenv("AI_RATE_LIMIT_BACKEND", "redis"),
+    "RETRY_SECONDS": int(os.getenv("AI_RATE_LIMIT_RETRY_SECONDS", 30)),
+    # "<calls>/<s|m|h|d>" per provider; unset means unlimited
+    "PROVIDER_QUOTAS": {
+        "groq": os.getenv("GROQ_RATE_LIMIT", "30/m"),
+        "mistral": os.getenv("MISTRAL_RATE_LIMIT") or None,
+        "cohere": os.getenv("COHERE_RATE_LIMIT", "20/m"),
+        "huggingface": os.getenv("HUGGINGFACE_RATE_LIMIT") or None,
+    },
+}
+
+# Document chunk retrieval: "numpy" (in-process matrices) or "pgvector" (PostgreSQL only)
+VECTOR_STORE = {
+    "BACKEND": os.getenv("VECTOR_STORE_BACKEND", "numpy"),
+    "CACHE_DOCUMENTS": int(os.getenv("VECTOR_STORE_CACHE_DOCUMENTS", 64)),
+    # Width of the pgvector column (must match the embedding model)
+    "DIMENSIONS": int(os.getenv("VECTOR_STORE_DIMENSIONS", 1024)),
+    "PGVECTOR_EF_SEARCH": int(os.getenv("VECTOR_STORE_PGVECTOR_EF_SEARCH", 200)),
+    # Cross-document search: exact below IVF_MIN_ROWS chunks, IVF above
+    "IVF_MIN_ROWS": int(os.getenv("LIBRARY_INDEX_IVF_MIN_ROWS", 2000)),
+    "IVF_NPROBE": int(os.getenv("LIBRARY_INDEX_IVF_NPROBE", 8)),
+    "LIBRARY_SYNC_SECONDS": float(os.getenv("LIBRARY_INDEX_SYNC_SECONDS", 5)),
+    "LIBRARY_MAX_USERS": int(os.getenv("LIBRARY_INDEX_MAX_USERS", 256)),
+}
+
 ALOC_ACCESS_TOKEN = os.getenv("ALOC_ACCESS_TOKEN", "")
 ALOC_ACCESS_TOKEN_SECONDARY = os.getenv("ALOC_ACCESS_TOKEN_SECONDARY", "")
 ALOC_BASE_URL = os.getenv("ALOC_BASE_URL", "https://questions.aloc.com.ng/api/v2")
 ALOC_TIMEOUT = int(os.getenv("ALOC_TIMEOUT", 60))
 
+# Async ALOC harvester (apps/exams/services/aloc_client.py)
+ALOC_CLIENT = {
+    # Per-access-token AIMD concurrency: start, ceiling
+    "INITIAL_CONCURRENCY": int(os.getenv("ALOC_INITIAL_CONCURRENCY", 2)),
+    "MAX_CONCURRENCY": int(os.getenv("ALOC_MAX_CONCURRENCY", 8)),
+    # Consecutive duplicates after which a subject/year counts as exhausted
+    "SATURATION_STREAK": int(os.getenv("ALOC_SATURATION_STREAK", 25)),
+    # Request budget per harvest = target * factor + 10
+    "REQUEST_BUDGET_FACTOR": float(os.getenv("ALOC_REQUEST_BUDGET_FACTOR", 4)),
+    # Exam creation only tops up from live ALOC within this budget; run the
+    # mirror_aloc_questions command to pre-harvest instead
+    "LIVE_FETCH": os.getenv("ALOC_LIVE_FETCH", "True") == "True",
+    "LIVE_FETCH_SECONDS": float(os.getenv("ALOC_LIVE_FETCH_SECONDS", 15)),
+}
+
 
 # ============================================================================
 # PAYSTACK SETTINGS
@@ -337,12 +427,93 @@ Q_CLUSTER = {
     'workers': 2,
     'recycle': 500,
     'timeout': 60,
+    # Longer than any per-task timeout (EXAM_SUBMISSION['TASK_TIMEOUT']) so a running
+    # task is not redelivered; claims on the job rows guard against duplicates anyway
+    'retry': 720,
     'compress': True,
     'save_limit': 250,
     'queue_limit': 500,
     'cpu_affinity': 1,
     'label': 'Django Q',
-    'orm': 'default' # Uses SQLite/Postgres as the message broker (no Redis required)
+    'orm': 'default', # Uses SQLite/Postgres as the message broker (no Redis required)
+    # Opt-in: non-daemonic workers let document ingestion fan PDF pages out to a
+    # process pool, but it changes worker process behaviour for every task.
+    # Daemonic workers (the default) extract PDFs serially.
+    'daemonize_workers': os.getenv('Q_CLUSTER_DAEMONIZE_WORKERS', 'True') == 'True',
+}
+
+# Document ingestion stages run as Django-Q tasks; these bound how many
+# documents are processed at once (see apps/study_tools/services/document_pipeline.py)
+DOCUMENT_PIPELINE = {
+    'GLOBAL_CONCURRENCY': int(os.getenv('DOCUMENT_PIPELINE_GLOBAL_CONCURRENCY', 4)),
+    'PER_USER_CONCURRENCY': int(os.getenv('DOCUMENT_PIPELINE_PER_USER_CONCURRENCY', 1)),
+    'EMBED_CHUNKS_PER_PASS': int(os.getenv('DOCUMENT_PIPELINE_EMBED_CHUNKS_PER_PASS', 256)),
+    'STALE_AFTER_SECONDS': int(os.getenv('DOCUMENT_PIPELINE_STALE_AFTER_SECONDS', 900)),
+    'TASK_TIMEOUT': int(os.getenv('DOCUMENT_PIPELINE_TASK_TIMEOUT', 600)),
+    # Large PDFs are extracted across a process pool, PDF_PAGES_PER_TASK pages per task
+    'PDF_WORKERS': int(os.getenv('DOCUMENT_PIPELINE_PDF_WORKERS', min(4, os.cpu_count() or 1))),
+    'PDF_PARALLEL_MIN_PAGES': int(os.getenv('DOCUMENT_PIPELINE_PDF_PARALLEL_MIN_PAGES', 40)),
+    'PDF_PAGES_PER_TASK': int(os.getenv('DOCUMENT_PIPELINE_PDF_PAGES_PER_TASK', 16)),
+    'SLOW_PAGE_SECONDS': float(os.getenv('DOCUMENT_PIPELINE_SLOW_PAGE_SECONDS', 2.0)),
+}
+
+# Chunking strategy for ingested documents: fixed | sentence | paragraph | heading
+# (compare them with `manage.py benchmark_chunking`)
+DOCUMENT_CHUNKING = {
+    'STRATEGY': os.getenv('DOCUMENT_CHUNKING_STRATEGY', 'heading'),
+    'MAX_TOKENS': int(os.getenv('DOCUMENT_CHUNKING_MAX_TOKENS', 200)),
+    'OVERLAP_TOKENS': int(os.getenv('DOCUMENT_CHUNKING_OVERLAP_TOKENS', 30)),
+}
+
+# Question-id pools used to sample exams and practice sets (apps/questions/services/question_pool.py)
+QUESTION_POOL = {
+    'CACHE_ALIAS': os.getenv('QUESTION_POOL_CACHE_ALIAS', 'default'),
+    'TIMEOUT': int(os.getenv('QUESTION_POOL_TIMEOUT', 60 * 60 * 24)),
+    'LOCK_TIMEOUT': int(os.getenv('QUESTION_POOL_LOCK_TIMEOUT', 10)),
+    # auto | redis | cache; auto stores buckets as raw Redis strings when the alias is Redis
+    'BACKEND': os.getenv('QUESTION_POOL_BACKEND', 'auto'),
+    'REDIS_URL': os.getenv('QUESTION_POOL_REDIS_URL') or None,
+}
+
+# Exam grading: theory answers graded concurrently after objective scoring
+EXAM_GRADING = {
+    "THEORY_CONCURRENCY": int(os.getenv("EXAM_GRADING_THEORY_CONCURRENCY", 4)),
+    "THEORY_TIMEOUT": float(os.getenv("EXAM_GRADING_THEORY_TIMEOUT", 90)),
+    "THEORY_PHASE_TIMEOUT": float(os.getenv("EXAM_GRADING_THEORY_PHASE_TIMEOUT", 300)),
+}
+
+# Background mock-exam generation (apps/exams/services/exam_jobs.py)
+EXAM_GENERATION = {
+    "STALE_AFTER_SECONDS": int(os.getenv("EXAM_GENERATION_STALE_AFTER_SECONDS", 600)),
+}
+
+# Deferred exam submissions (apps/exams/services/exam_submission.py)
+EXAM_SUBMISSION = {
+    "TASK_TIMEOUT": int(os.getenv("EXAM_SUBMISSION_TASK_TIMEOUT", 480)),
+    "STALE_AFTER_SECONDS": int(os.getenv("EXAM_SUBMISSION_STALE_AFTER_SECONDS", 600)),
+}
+
+# Cached per-exam questions + correct answers (apps/exams/services/answer_key.py)
+EXAM_ANSWER_KEY = {
+    "CACHE_ALIAS": os.getenv("EXAM_ANSWER_KEY_CACHE_ALIAS", "default"),
+    "TIMEOUT": int(os.getenv("EXAM_ANSWER_KEY_TIMEOUT", 60 * 60 * 24)),
+}
+
+# Adaptive (CAT) mock exams (apps/exams/services/adaptive_exam.py)
+ADAPTIVE_EXAM = {
+    "MIN_ITEMS": int(os.getenv("ADAPTIVE_EXAM_MIN_ITEMS", 10)),
+    "MAX_ITEMS": int(os.getenv("ADAPTIVE_EXAM_MAX_ITEMS", 30)),
+    "TARGET_SE": float(os.getenv("ADAPTIVE_EXAM_TARGET_SE", 0.3)),
+    "CACHE_ALIAS": os.getenv("ADAPTIVE_EXAM_CACHE_ALIAS", "default"),
+}
+
+# IRT calibration of questions and learners (apps/questions/services/difficulty_calibrator.py)
+IRT_CALIBRATION = {
+    "MODEL": os.getenv("IRT_CALIBRATION_MODEL", "2PL"),
+    "CHUNK_SIZE": int(os.getenv("IRT_CALIBRATION_CHUNK_SIZE", 5000)),
+    "MAX_ITERATIONS": int(os.getenv("IRT_CALIBRATION_MAX_ITERATIONS", 100)),
+    "MIN_ITEM_RESPONSES": int(os.getenv("IRT_CALIBRATION_MIN_ITEM_RESPONSES", 5)),
+    "MIN_USER_RESPONSES": int(os.getenv("IRT_CALIBRATION_MIN_USER_RESPONSES", 3)),
 }
 
 # ============================================================================
@@ -407,4 +578,42 @@ CHAT_RATE_LIMITS = {
     "premium": {
         "messages_per_hour": None  # Unlimited
     }
-}
\ No newline at end of file
+}
+# Coalesced delivery of streamed tutor replies (apps/ai_tutor/services/stream_delivery.py)
+CHAT_STREAMING = {
+    "FLUSH_INTERVAL_MS": int(os.getenv("CHAT_STREAM_FLUSH_INTERVAL_MS", 30)),
+    "FLUSH_BYTES": int(os.getenv("CHAT_STREAM_FLUSH_BYTES", 256)),
+    "MAX_PENDING_BYTES": int(os.getenv("CHAT_STREAM_MAX_PENDING_BYTES", 64 * 1024)),
+    "MAX_STALL_SECONDS": float(os.getenv("CHAT_STREAM_MAX_STALL_SECONDS", 10)),
+    # Client acknowledgements: the writer stays within MAX_UNACKED_FRAMES of the last chat_ack
+    "MAX_UNACKED_FRAMES": int(os.getenv("CHAT_STREAM_MAX_UNACKED_FRAMES", 32)),
+    "ACK_EVERY_FRAMES": int(os.getenv("CHAT_STREAM_ACK_EVERY_FRAMES", 8)),
+}
+
+# Cached learner snapshot for tutor prompts (apps/ai_tutor/services/learner_snapshot.py)
+LEARNER_SNAPSHOT = {
+    "TIMEOUT": int(os.getenv("LEARNER_SNAPSHOT_TIMEOUT", 60 * 60 * 6)),
+    "WEAK_THRESHOLD": float(os.getenv("LEARNER_SNAPSHOT_WEAK_THRESHOLD", 0.60)),
+    "RECENT_DAYS": int(os.getenv("LEARNER_SNAPSHOT_RECENT_DAYS", 7)),
+}
+
+# Token counting shared by prompt budgets and document chunking (ai_services/tokens.py):
+# tiktoken ENCODING when installed, else CHARS_PER_TOKEN
+AI_TOKENIZER = {
+    "ENCODING": os.getenv("AI_TOKENIZER_ENCODING", "cl100k_base"),
+    "CHARS_PER_TOKEN": float(os.getenv("AI_TOKENIZER_CHARS_PER_TOKEN", 4.0)),
+}
+
+# Token budget for tutor chat prompts (ai_services/prompt_budget.py)
+AI_PROMPT_BUDGET = {
+    "MAX_PROMPT_TOKENS": int(os.getenv("AI_PROMPT_MAX_TOKENS", 6000)),
+    "SUMMARY_MAX_TOKENS": int(os.getenv("AI_PROMPT_SUMMARY_MAX_TOKENS", 400)),
+    "MAX_RECENT_TURNS": int(os.getenv("AI_PROMPT_MAX_RECENT_TURNS", 12)),
+    "CONTEXT_SHARE": float(os.getenv("AI_PROMPT_CONTEXT_SHARE", 0.6)),
+}
+
+# Rolling conversation summary in ChatSession.metadata (apps/ai_tutor/services/conversation_memory.py)
+CHAT_MEMORY = {
+    "KEEP_RECENT_TURNS": int(os.getenv("CHAT_MEMORY_KEEP_RECENT_TURNS", 6)),
+    "MIN_NEW_TURNS": int(os.getenv("CHAT_MEMORY_MIN_NEW_TURNS", 4)),
+}
@@ -12,6 +12,8 @@ export interface WebSocketMessage {
     role?: 'user' | 'assistant';
     message?: string;
     delta?: string;
+    seq?: number;
+    ack?: boolean;
     message_id?: string;
     temp_id?: string;
     image_url?: string | null;
@@ -97,6 +99,10 @@ export const useWebSocket = ({
                 try {
                     const data: WebSocketMessage = JSON.parse(event.data);
                     onMessageRef.current?.(data);
+                    // The server holds the stream until chunks it asks about are acknowledged
+                    if (data.type === 'chat_chunk' && data.ack) {
+                        ws.send(JSON.stringify({ type: 'chat_ack', message_id: data.message_id, seq: data.seq }));
+                    }
                 } catch (error) {
                     console.error('Failed to parse WebSocket message:', error);
                 }
@@ -18,6 +18,23 @@ export interface Answer {
   explanation?: string
 }
 
+export interface ExamGenerationProgress {
+  stage: string
+  done: number | null
+  total: number | null
+  message: string
+}
+
+export interface ExamGenerationJob {
+  id: string
+  status: 'queued' | 'running' | 'completed' | 'failed'
+  progress: Partial<ExamGenerationProgress>
+  error_message: string
+  mock_exam: MockExam | null
+  created_at: string
+  updated_at: string
+}
+
 export interface MockExam {
   id: number
   title: string
@@ -32,6 +49,7 @@ export interface MockExam {
   passing_score: number
   is_active: boolean
   is_public: boolean
+  mode?: 'fixed' | 'adaptive'
   question_count: number
   attempt_count: number
   average_score: number
@@ -40,6 +58,21 @@ export interface MockExam {
   questions?: Question[]
 }
 
+export interface AdaptiveExamProgress {
+  attempt_id: number
+  answered: number
+  max_items: number
+  finished: boolean
+  question: Pick<Question, 'id' | 'content' | 'question_type' | 'answers'> | null
+}
+
+export interface ExamGrading {
+  phase: 'theory' | 'complete'
+  theory_total: number
+  theory_graded: number
+  breakdown: Record<string, any>
+}
+
 export interface ExamAttempt {
   id: number
   user_name: string
@@ -54,6 +87,7 @@ export interface ExamAttempt {
   raw_responses: Record<string, number | string>
   auto_graded: boolean
   attempted_questions: number
+  grading: ExamGrading | Record<string, never>
   remaining_time_seconds: number
   is_time_expired: boolean
   ip_address?: string
@@ -92,6 +126,22 @@ export interface ExamSubmission {
   time_taken_seconds: number
 }
 
+export interface ExamSubmissionJob {
+  id: string
+  status: 'queued' | 'running' | 'completed' | 'failed'
+  stages: Record<string, string>
+  error_message: string
+  attempt: ExamAttempt
+  result: ExamResult | null
+  created_at: string
+  updated_at: string
+}
+
+// Stop polling a generation job after this long (the backend fails jobs that stall)
+const GENERATION_POLL_LIMIT_MS = 15 * 60 * 1000
+// Stop polling a submission after this long (the backend re-queues submissions that stall)
+const SUBMISSION_POLL_LIMIT_MS = 15 * 60 * 1000
+
 export const ExamService = {
   /**
    * Get all available mock exams
@@ -152,6 +202,7 @@ export const ExamService = {
     subject_name: string
     exam_format?: string
     mode?: 'past_questions' | 'ai_generated'
+    adaptive?: boolean
     year?: number
     num_questions?: number
     duration_minutes?: number
@@ -160,8 +211,31 @@ export const ExamService = {
       MEDIUM?: number
       HARD?: number
     }
-  }): Promise<MockExam> => {
-    const response = await axiosInstance.post<MockExam>('/exams/create_exam/', payload)
+  }, onProgress?: (progress: Partial<ExamGenerationProgress>) => void): Promise<MockExam> => {
+    // Generation runs as a background job; progress is also pushed over the
+    // notifications WebSocket as "exam_generation" events.
+    const { data } = await axiosInstance.post<ExamGenerationJob>('/exams/create_exam/', payload)
+    let job = data
+    const deadline = Date.now() + GENERATION_POLL_LIMIT_MS
+    while (job.status === 'queued' || job.status === 'running') {
+      if (Date.now() > deadline) {
+        throw new Error('Exam generation is taking longer than expected. Please try again later.')
+      }
+      await new Promise(resolve => setTimeout(resolve, 2000))
+      job = await ExamService.getGenerationJob(job.id)
+      if (onProgress && job.progress) onProgress(job.progress)
+    }
+    if (job.status === 'failed' || !job.mock_exam) {
+      throw new Error(job.error_message || 'Exam generation failed')
+    }
+    return job.mock_exam
+  },
+
+  /**
+   * Status of a background exam generation job
+   */
+  getGenerationJob: async (jobId: string): Promise<ExamGenerationJob> => {
+    const response = await axiosInstance.get<ExamGenerationJob>(`/exams/jobs/${jobId}/`)
     return response.data
   },
 
@@ -173,18 +247,64 @@ export const ExamService = {
     return response.data
   },
 
+  /**
+   * Current question of an adaptive exam attempt
+   */
+  getAdaptiveQuestion: async (examId: number): Promise<AdaptiveExamProgress> => {
+    const response = await axiosInstance.get<AdaptiveExamProgress>(`/exams/${examId}/adaptive/`)
+    return response.data
+  },
+
+  /**
+   * Answer the current adaptive question; returns the next one (or finished)
+   */
+  answerAdaptiveQuestion: async (examId: number, questionId: number, answerId: number): Promise<AdaptiveExamProgress> => {
+    const response = await axiosInstance.post<AdaptiveExamProgress>(`/exams/${examId}/adaptive/`, {
+      question_id: questionId,
+      answer_id: answerId,
+    })
+    return response.data
+  },
+
   /**
    * Submit exam answers
    */
   submitExam: async (
     examId: number,
-    submission: ExamSubmission
+    submission: ExamSubmission,
+    onGrading?: (attempt: ExamAttempt) => void
   ): Promise<{
     attempt: ExamAttempt
     result: ExamResult
     validation: any
   }> => {
-    const response = await axiosInstance.post(`/exams/${examId}/submit/`, submission)
+    // Submission returns a receipt; grading runs in the background and is
+    // also pushed over the notifications WebSocket as "exam_submission" events.
+    const { data } = await axiosInstance.post<{ submission: ExamSubmissionJob; validation: any }>(
+      `/exams/${examId}/submit/`,
+      submission
+    )
+    let job = data.submission
+    const deadline = Date.now() + SUBMISSION_POLL_LIMIT_MS
+    while (!job.result && (job.status === 'queued' || job.status === 'running')) {
+      if (Date.now() > deadline) {
+        throw new Error('Grading is taking longer than expected. Your answers are saved; check your results later.')
+      }
+      await new Promise(resolve => setTimeout(resolve, 1000))
+      job = await ExamService.getSubmission(job.id)
+      if (onGrading && job.attempt.grading && 'phase' in job.attempt.grading) onGrading(job.attempt)
+    }
+    if (!job.result) {
+      throw new Error(job.error_message || 'Exam grading failed')
+    }
+    return { attempt: job.attempt, result: job.result, validation: data.validation }
+  },
+
+  /**
+   * Status of a submitted exam (receipt from submitExam)
+   */
+  getSubmission: async (submissionId: string): Promise<ExamSubmissionJob> => {
+    const response = await axiosInstance.get<ExamSubmissionJob>(`/exams/submissions/${submissionId}/`)
     return response.data
   },
 